@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+
+import argparse
+import csv
+import time
+
+from webcrawler.linkgraph import LinkGraph
+
+
+def print_summary ( summary, seconds ):
+    """
+    Prints the analysis of the link graph.
+    :param summary: see LinkGraph.get_summary
+    :param seconds: time spent analysing the link graph (float)
+    :return:
+    """
+    print ( "Analysed {urls} urls ({crawled} crawled) and {links} links in {0:.2f} seconds.".format ( seconds,
+                                                                                                     **summary ) )
+    print ( "Click depth: {0}; {1} urls unreachable from the domain root.".format (
+        ", ".join ( "{0} at depth {1}".format ( count, depth ) for depth, count in summary[ 'depths' ].items ( ) ),
+        summary[ 'unreachable' ] ) )
+    print ( "Orphan urls (no link to them): {orphans}. Near-orphan urls: {near_orphans}.".format ( **summary ) )
+    print ( "Strongly connected components: {components}, the largest one of {largest_component} urls, the one of the "
+            "domain root of {root_component} urls.".format ( **summary ) )
+
+    for title, key, value_format in (("Top PageRank", 'top_pagerank', "{0:.6f}"),
+                                     ("Most linked urls", 'top_in_degree', "{0} links"),
+                                     ("Deepest urls", 'deepest', "depth {0}")):
+        print ( "{0}:".format ( title ) )
+        for url, value in summary[ key ]:
+            print ( "  {0:>14}  {1}".format ( value_format.format ( value ), url ) )
+
+    for title, key in (("Orphan urls", 'orphan_urls'), ("Deepest near-orphan urls", 'near_orphan_urls')):
+        if summary[ key ]:
+            print ( "{0}:".format ( title ) )
+            for url in summary[ key ]:
+                print ( "  {0}".format ( url ) )
+
+
+def write_metrics ( link_graph, metrics, csv_path ):
+    """
+    Writes the metrics of every url in a CSV file.
+    :param link_graph: an instance of LinkGraph
+    :param metrics: see LinkGraph.get_metrics
+    :param csv_path: str
+    :return:
+    """
+    columns = ('depth', 'in_degree', 'out_degree', 'component', 'pagerank', 'is_orphan', 'is_near_orphan')
+    with open ( csv_path, 'w', newline='' ) as csv_file:
+        writer = csv.writer ( csv_file )
+        writer.writerow ( ('url', 'crawled') + columns )
+        values = [ metrics[ column ].tolist ( ) for column in columns ]
+        for url_id, url in enumerate ( link_graph.urls ):
+            writer.writerow ( [ url, int ( link_graph.visited[ url_id ] ) ] +
+                              [ int ( column_values[ url_id ] ) if column != 'pagerank' else column_values[ url_id ]
+                                for column, column_values in zip ( columns, values ) ] )
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Domain Crawler - Link Graph Analysis' )
+    parser.add_argument ( 'graph_path', metavar='Graph_File',
+                          help='link graph written by generate_sitemap.py --graph (<output file>.graph.npz)' )
+    parser.add_argument ( '--top', dest='top', type=int, default=10, metavar='N',
+                          help='urls listed per ranking (N>=0: default=10)' )
+    parser.add_argument ( '--near-orphan-links', dest='near_orphan_links', type=int, default=1, metavar='N',
+                          help='max links to a near-orphan url (N>=1: default=1)' )
+    parser.add_argument ( '--csv', dest='csv_path', metavar='File_Name',
+                          help='write the depth, in-degree, out-degree, component and PageRank of every url to ' +
+                               'File_Name' )
+    args = parser.parse_args ( )
+
+    try:
+        link_graph = LinkGraph.load ( args.graph_path )
+    except (ImportError, OSError, ValueError) as err:
+        print ( "Error {0} occurred. Link graph {1} cannot be read.".format ( err, args.graph_path ) )
+        return
+
+    start = time.perf_counter ( )
+    metrics = link_graph.get_metrics ( max_near_orphan_links=max ( 1, args.near_orphan_links ) )
+    seconds = time.perf_counter ( ) - start
+    print_summary ( link_graph.get_summary ( metrics, top=max ( 0, args.top ) ), seconds )
+
+    if args.csv_path:
+        try:
+            write_metrics ( link_graph, metrics, args.csv_path )
+        except OSError as err:
+            print ( "Error {0} occurred. Metrics file {1} cannot be written.".format ( err, args.csv_path ) )
+            return
+        print ( "Metrics of every url are written in {0}.".format ( args.csv_path ) )
+
+
+if __name__ == '__main__':
+    main ( )
@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+# Benchmarks the crawl engines on a reproducible synthetic site served from localhost: for every engine, it measures
+# the pages crawled per second and the peak memory (RSS) of the crawl, and checks the sitemap tree against the
+# generated site. Every crawl runs in a fresh process, so that its peak RSS is its own.
+#
+# The results can be saved (--save) and later compared with (--baseline): the script exits with status 1 if the
+# tree of a crawl is wrong, or if an engine has become slower or bigger than in the baseline beyond --tolerance.
+#
+# Usage (from the application home directory):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/bench_crawl.py --pages 2000 --latency 0.01 --save output/bench_baseline.json
+#   $ python benchmarks/bench_crawl.py --pages 2000 --latency 0.01 --baseline output/bench_baseline.json
+
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+
+import dflt_cfg
+from webcrawler.app_constant import *
+from webcrawler.async_crawler import AsyncCrawler
+from webcrawler.crawler import Crawler
+from webcrawler.process_crawler import ProcessCrawler
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+
+
+def get_tree_links ( root ):
+    """
+    :param root: an instance of UrlNode
+    :return: (parent url, child url) of every link of the UrlNode tree hierarchy, root first (list of 2-tuples)
+    """
+    tree_links = [ (None, root.url) ]
+    pending_urlnodes = [ root ]
+    while pending_urlnodes:
+        url_node = pending_urlnodes.pop ( )
+        for child_urlnode in url_node.child_urls:
+            tree_links.append ( (url_node.url, child_urlnode.url) )
+            pending_urlnodes.append ( child_urlnode )
+
+    return tree_links
+
+
+def crawl_site ( engine, cfg, results ):
+    """
+    Entry point of a crawl process: it crawls the site with engine and puts its measures into results.
+    :param engine: 'thread', 'async' or 'process' (str)
+    :param cfg: configuration of the crawl (dictionary, see dflt_cfg.DFLT_CFG)
+    :param results: queue receiving the measures of the crawl (multiprocessing.Queue)
+    :return:
+    """
+    # the error pages of the site would be logged on stderr
+    logging.disable ( logging.CRITICAL )
+
+    crawler_class = { 'thread': Crawler, 'async': AsyncCrawler, 'process': ProcessCrawler }[ engine ]
+    start = time.perf_counter ( )
+    crwlr = crawler_class ( cfg=cfg )
+    crwlr.start_url_parsing ( )
+    root = crwlr.release_urlparse_resources ( )
+    seconds = time.perf_counter ( ) - start
+
+    # ru_maxrss is in KB on Linux; the crawl processes of the process engine are children of this one
+    peak_rss = max ( resource.getrusage ( resource.RUSAGE_SELF ).ru_maxrss,
+                     resource.getrusage ( resource.RUSAGE_CHILDREN ).ru_maxrss )
+
+    results.put ( {
+        'seconds': seconds,
+        'pages': crwlr.frontier.get_stats ( )[ 'claimed' ],
+        'responses': crwlr.stats.get_snapshot ( )[ 'responses' ],
+        'peak_rss_mb': peak_rss / 1024,
+        'tree_links': get_tree_links ( root ),
+    } )
+
+
+def check_tree ( site, domain_name, tree_links ):
+    """
+    Compares the sitemap tree of a crawl with the generated site.
+    :param site: an instance of SyntheticSite
+    :param domain_name: absolute url of the site root (str)
+    :param tree_links: see get_tree_links
+    :return: number of missing urls, unexpected urls, urls mapped more than once, and links which are not on the \
+             page of their parent (dict)
+    """
+    expected_urls = site.get_reachable_urls ( domain_name )
+    tree_urls = [ url for _, url in tree_links ]
+    site_root = domain_name.rstrip ( '/' )
+
+    return {
+        'missing': len ( expected_urls - set ( tree_urls ) ),
+        'unexpected': len ( set ( tree_urls ) - expected_urls ),
+        'duplicates': len ( tree_urls ) - len ( set ( tree_urls ) ),
+        'wrong_links': sum ( 1 for parent_url, url in tree_links if parent_url is not None and
+                             url[ len ( site_root ): ] not in site.links.get ( parent_url[ len ( site_root ): ], ( ) ) ),
+    }
+
+
+def run_engine ( engine, cfg, site, domain_name, repeat ):
+    """
+    Crawls the site repeat times with engine, each time in a fresh process.
+    :return: the median measures of the crawls, with the errors of the tree of the last one (dict)
+    """
+    mp_context = multiprocessing.get_context ( 'spawn' )
+    runs = [ ]
+    for _ in range ( repeat ):
+        results = mp_context.Queue ( )
+        process = mp_context.Process ( target=crawl_site, args=(engine, cfg, results) )
+        process.start ( )
+        runs.append ( results.get ( ) )
+        process.join ( )
+
+    return {
+        'seconds': statistics.median ( run[ 'seconds' ] for run in runs ),
+        'pages': runs[ -1 ][ 'pages' ],
+        'pages_per_second': statistics.median ( run[ 'pages' ] / run[ 'seconds' ] for run in runs ),
+        'peak_rss_mb': statistics.median ( run[ 'peak_rss_mb' ] for run in runs ),
+        'tree_errors': check_tree ( site, domain_name, runs[ -1 ][ 'tree_links' ] ),
+    }
+
+
+def find_regressions ( results, baseline, tolerance ):
+    """
+    :param results: measures of every engine (dict, see run_engine)
+    :param baseline: results of a previous run of this script (dict)
+    :param tolerance: fraction by which an engine may be slower or bigger than in the baseline (float)
+    :return: description of every regression (list of str)
+    """
+    regressions = [ ]
+    for engine, measures in results.items ( ):
+        baseline_measures = baseline[ 'engines' ].get ( engine )
+        if not baseline_measures: continue
+
+        if measures[ 'pages_per_second' ] < baseline_measures[ 'pages_per_second' ] * (1 - tolerance):
+            regressions.append ( "{0}: {1:.1f} pages/sec instead of {2:.1f}".format (
+                engine, measures[ 'pages_per_second' ], baseline_measures[ 'pages_per_second' ] ) )
+        if measures[ 'peak_rss_mb' ] > baseline_measures[ 'peak_rss_mb' ] * (1 + tolerance):
+            regressions.append ( "{0}: peak RSS {1:.1f} MB instead of {2:.1f} MB".format (
+                engine, measures[ 'peak_rss_mb' ], baseline_measures[ 'peak_rss_mb' ] ) )
+
+    return regressions
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Crawl throughput, memory and correctness on a synthetic site' )
+    parser.add_argument ( '--pages', type=int, default=2000, help='pages in the synthetic site (default=2000)' )
+    parser.add_argument ( '--fan-out', type=int, default=10, help='child pages linked per page (default=10)' )
+    parser.add_argument ( '--depth', type=int, default=None, help='max clicks to a page (default=no limit)' )
+    parser.add_argument ( '--page-size', type=int, default=10240, help='bytes per page (default=10240)' )
+    parser.add_argument ( '--asset-ratio', type=float, default=0.2, help='fraction of assets (default=0.2)' )
+    parser.add_argument ( '--latency', type=float, default=0.01, help='server latency in seconds (default=0.01)' )
+    parser.add_argument ( '--error-rate', type=float, default=0.01, help='fraction of 500 pages (default=0.01)' )
+    parser.add_argument ( '--seed', type=int, default=0, help='seed of the synthetic site (default=0)' )
+    parser.add_argument ( '--engines', nargs='+', default=[ 'thread', 'async' ],
+                          choices=[ 'thread', 'async', 'process' ], help='engines to run (default=thread async)' )
+    parser.add_argument ( '--threads', type=int, default=8, help='parse threads (default=8)' )
+    parser.add_argument ( '--concurrency', type=int, default=100, help='async engine limit (default=100)' )
+    parser.add_argument ( '--processes', type=int, default=2, help='processes of the process engine (default=2)' )
+    parser.add_argument ( '--repeat', type=int, default=3, help='crawls per engine, the median is kept (default=3)' )
+    parser.add_argument ( '--save', metavar='FILE', help='save the results to FILE (JSON)' )
+    parser.add_argument ( '--baseline', metavar='FILE', help='compare the results with the ones saved in FILE' )
+    parser.add_argument ( '--tolerance', type=float, default=0.2,
+                          help='slow down or memory growth tolerated against the baseline (default=0.2)' )
+    args = parser.parse_args ( )
+
+    site_args = { 'num_pages': args.pages, 'fan_out': args.fan_out, 'depth': args.depth,
+                  'page_size': args.page_size, 'asset_ratio': args.asset_ratio, 'latency': args.latency,
+                  'error_rate': args.error_rate, 'seed': args.seed }
+    site = SyntheticSite ( **site_args )
+    server = LocalSiteServer ( site )
+    domain_name = server.start ( )
+
+    cfg = dict ( dflt_cfg.DFLT_CFG )
+    cfg.update ( { DOMAIN: domain_name, SYSTEM_PROXY: { }, NUM_THREADS: args.threads,
+                   MAX_CONCURRENCY: args.concurrency, PROCESSES: args.processes, PROGRESS_INTERVAL: 0 } )
+
+    results = dict ( )
+    print ( "{0:<10}{1:>10}{2:>10}{3:>12}{4:>12}  {5}".format ( "engine", "seconds", "pages", "pages/sec",
+                                                               "RSS (MB)", "tree" ) )
+    try:
+        for engine in args.engines:
+            measures = results[ engine ] = run_engine ( engine, cfg, site, domain_name, args.repeat )
+            tree_errors = measures[ 'tree_errors' ]
+            print ( "{0:<10}{1:>10.2f}{2:>10}{3:>12.1f}{4:>12.1f}  {5}".format (
+                engine, measures[ 'seconds' ], measures[ 'pages' ], measures[ 'pages_per_second' ],
+                measures[ 'peak_rss_mb' ], "ok" if not any ( tree_errors.values ( ) ) else tree_errors ) )
+    finally:
+        server.stop ( )
+
+    is_failed = any ( any ( measures[ 'tree_errors' ].values ( ) ) for measures in results.values ( ) )
+
+    if args.baseline:
+        with open ( args.baseline ) as baseline_file:
+            baseline = json.load ( baseline_file )
+        if baseline[ 'site' ] != site_args:
+            print ( "Warning: the baseline was measured on another site: {0}".format ( baseline[ 'site' ] ) )
+
+        for regression in find_regressions ( results, baseline, args.tolerance ):
+            print ( "Regression: " + regression )
+            is_failed = True
+
+    if args.save:
+        with open ( args.save, 'w' ) as save_file:
+            json.dump ( { 'site': site_args, 'engines': results }, save_file, indent=2 )
+
+    sys.exit ( 1 if is_failed else 0 )
+
+
+if __name__ == '__main__':
+    main ( )
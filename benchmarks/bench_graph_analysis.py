@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# Times the export of a synthetic link graph (write_link_graph) and every analysis of LinkGraph on it: click depth,
+# in-degree, orphans, strongly connected components and PageRank. The site is a tree of pages which also link to the
+# pages of a menu and to random pages, with a few pages no page links to.
+#
+# Usage (from the application home directory, numpy and scipy installed):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/bench_graph_analysis.py --pages 1000000 --links 10
+
+import argparse
+import os
+import tempfile
+import time
+from array import array
+
+import numpy
+
+from webcrawler import linkgraph
+from webcrawler.linkgraph import LinkGraph, write_link_graph
+from webcrawler.urlgraph import UrlGraph
+
+
+def make_url_graph ( num_pages, links_per_page, seed=0 ):
+    """
+    :param num_pages: int
+    :param links_per_page: average number of links per page (int)
+    :param seed: seed of the random generator (int)
+    :return: an instance of UrlGraph whose links are recorded, the domain root being url id 0
+    """
+    rand = numpy.random.default_rng ( seed )
+    url_graph = UrlGraph ( )
+    for page_no in range ( num_pages ):
+        url_graph.intern_url ( "http://example.com/page{0}.html".format ( page_no ) if page_no else
+                               "http://example.com/" )
+    url_graph.visited[ : ] = b'\x01' * num_pages
+
+    # tree links (page i is linked from page (i - 1) // 8), except for 0.1% of orphan pages
+    children = numpy.arange ( 1, num_pages )
+    children = children[ rand.random ( len ( children ) ) >= 0.001 ]
+    tree_sources, tree_targets = (children - 1) // 8, children
+
+    # menu links to the first 20 pages, then random links whose targets favour the first pages (power law)
+    num_random = max ( 0, num_pages * (links_per_page - 1) - num_pages * 20 // 10 )
+    menu_sources = numpy.repeat ( numpy.arange ( 0, num_pages, 10 ), 20 )
+    menu_targets = numpy.tile ( numpy.arange ( 20 ), len ( menu_sources ) // 20 ) % num_pages
+    random_sources = rand.integers ( 0, num_pages, num_random )
+    random_targets = (num_pages * rand.random ( num_random ) ** 3).astype ( numpy.int64 )
+
+    url_graph.edge_sources = array ( 'I', numpy.concatenate ( (tree_sources, menu_sources, random_sources) )
+                                     .astype ( numpy.uint32 ).tobytes ( ) )
+    url_graph.edge_targets = array ( 'I', numpy.concatenate ( (tree_targets, menu_targets, random_targets) )
+                                     .astype ( numpy.uint32 ).tobytes ( ) )
+    return url_graph
+
+
+def time_call ( name, function, *args, **kwargs ):
+    """
+    :param name: name printed with the time (str)
+    :param function: function to call
+    :return: the result of function
+    """
+    start = time.perf_counter ( )
+    result = function ( *args, **kwargs )
+    print ( "{0:<36}{1:>10.3f}".format ( name, time.perf_counter ( ) - start ) )
+    return result
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Export and analysis of the link graph' )
+    parser.add_argument ( '--pages', type=int, default=1000000, help='pages of the site (default=1000000)' )
+    parser.add_argument ( '--links', type=int, default=10, help='average links per page (default=10)' )
+    parser.add_argument ( '--tarjan', action='store_true',
+                          help='also time the components without scipy (iterative Tarjan, much slower)' )
+    args = parser.parse_args ( )
+
+    url_graph = make_url_graph ( args.pages, args.links )
+    graph_path = os.path.join ( tempfile.mkdtemp ( ), "bench.graph.npz" )
+
+    print ( "{0:<36}{1:>10}".format ( "step", "seconds" ) )
+    num_urls, num_links = time_call ( "export (dedup, CSR, savez)", write_link_graph, graph_path, url_graph, 0 )
+    print ( "  {0} urls, {1} links, {2:.1f} MB on disk".format ( num_urls, num_links,
+                                                                 os.path.getsize ( graph_path ) / 1e6 ) )
+    link_graph = time_call ( "load", LinkGraph.load, graph_path )
+    os.remove ( graph_path )
+    os.rmdir ( os.path.dirname ( graph_path ) )
+
+    start = time.perf_counter ( )
+    depths = time_call ( "click depth (level BFS)", link_graph.get_click_depths )
+    in_degrees = time_call ( "in-degree (bincount)", link_graph.get_in_degrees )
+    orphans = time_call ( "orphans", link_graph.get_orphans, in_degrees )
+    near_orphans = time_call ( "near-orphans", link_graph.get_near_orphans, in_degrees )
+    num_components, _ = time_call ( "strong components (scipy)" if linkgraph.connected_components else
+                                    "strong components (Tarjan)", link_graph.get_strong_components )
+    time_call ( "pagerank (power iteration)", link_graph.get_pagerank )
+    print ( "{0:<36}{1:>10.3f}".format ( "total analysis", time.perf_counter ( ) - start ) )
+    if args.tarjan:
+        time_call ( "strong components (Tarjan)", link_graph.get_strong_components_tarjan )
+
+    print ( "  max depth {0}, {1} unreachable, {2} orphans, {3} near-orphans, {4} components".format (
+        depths.max ( ), (depths < 0).sum ( ), len ( orphans ), len ( near_orphans ), num_components ) )
+
+
+if __name__ == '__main__':
+    main ( )
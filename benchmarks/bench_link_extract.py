@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+# Compares the throughput of the link extractor with the former regex over str(bytes) on a synthetic page.
+#
+# Usage (from the application home directory):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/bench_link_extract.py --size 8
+
+import argparse
+import random
+import re
+import time
+
+from webcrawler.crawler import Crawler
+from webcrawler.linkextract import LinkExtractor
+
+PAGE_URL = "http://example.com/section/index.html"
+
+
+def make_page ( size_mb, seed=0 ):
+    """
+    Generates a html page of about size_mb MB mixing links, text, comments and scripts.
+    :param size_mb: size of the page in MB (float)
+    :param seed: seed of the random generator (int)
+    :return: bytes
+    """
+    rand = random.Random ( seed )
+    blocks = [ ]
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        n = rand.randrange ( 100000 )
+        block = '<div class="item"><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit {0}.</p>' \
+                '<a class="nav" href="/section/page{0}.html" title="Page {0}">Page {0}</a>' \
+                '<!-- <a href="/commented{0}.html"> -->' \
+                '<script>var url = "<a href=\'/script{0}.html\'>";</script>' \
+                '<img src="/img/{0}.png" alt="image {0}"></div>\n'.format ( n )
+        blocks.append ( block )
+        size += len ( block )
+
+    return ''.join ( blocks ).encode ( 'utf-8' )
+
+
+def extract_with_regex ( page ):
+    """
+    Link extraction of the crawler before LinkExtractor: a regex over the repr of the whole page.
+    :param page: bytes
+    :return: list of links (str)
+    """
+    return re.findall ( '<a [^>]*href=[\'|"](.*?)[\'"].*?>', str ( page ) )
+
+
+def extract_with_link_extractor ( page ):
+    """
+    :param page: bytes
+    :return: list of links (str)
+    """
+    link_extractor = LinkExtractor ( PAGE_URL, 'utf-8' )
+    links = [ ]
+    for pos in range ( 0, len ( page ), Crawler.CHUNK_SIZE ):
+        links.extend ( link_extractor.feed ( page[ pos:pos + Crawler.CHUNK_SIZE ] ) )
+    links.extend ( link_extractor.close ( ) )
+    return links
+
+
+def run_extractor ( extract, page, repeat ):
+    """
+    :param extract: function taking the page and returning its links
+    :param page: bytes
+    :param repeat: number of runs; the fastest is kept (int)
+    :return: a 2-tuple (seconds (float), number of links (int))
+    """
+    best = float ( 'inf' )
+    for _ in range ( repeat ):
+        start = time.perf_counter ( )
+        links = extract ( page )
+        best = min ( best, time.perf_counter ( ) - start )
+
+    return best, len ( links )
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Regex over str(bytes) vs streaming link extractor' )
+    parser.add_argument ( '--size', type=float, default=8, help='size of the page in MB (default=8)' )
+    parser.add_argument ( '--repeat', type=int, default=3, help='runs per extractor, the fastest is kept (default=3)' )
+    args = parser.parse_args ( )
+
+    page = make_page ( args.size )
+    size_mb = len ( page ) / (1024 * 1024)
+
+    print ( "{0:<24}{1:>10}{2:>10}{3:>10}".format ( "extractor", "seconds", "links", "MB/s" ) )
+    for name, extract in (("regex over str(bytes)", extract_with_regex),
+                          ("LinkExtractor (64KB)", extract_with_link_extractor)):
+        seconds, links = run_extractor ( extract, page, args.repeat )
+        print ( "{0:<24}{1:>10.3f}{2:>10}{3:>10.1f}".format ( name, seconds, links, size_mb / seconds ) )
+
+
+if __name__ == '__main__':
+    main ( )
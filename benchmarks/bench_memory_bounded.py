@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+# Measures the peak RSS of the url bookkeeping of a crawl (url graph, frontier and sitemap) as the site grows, with
+# every url held in memory and with a memory budget (MEMORY_BUDGET): the pages are not downloaded, every page of a
+# synthetic site links to its fan-out new pages and to the pages of a menu, through the code path of the parse threads
+# (get_acceptable_urlnode, link_child_urlnode). Every size is crawled in a process of its own, and the sitemap is
+# written (to /dev/null) at the end.
+#
+# Usage (from the application home directory):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/bench_memory_bounded.py --urls 1000000 4000000 --budget 67108864
+
+import argparse
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import dflt_cfg
+from webcrawler.app_constant import *
+from webcrawler.crawler import Crawler
+from webcrawler.urlparse import UrlTree
+
+DOMAIN_NAME = "https://www.example.com/"
+
+
+def get_links ( page_no, fan_out ):
+    """
+    :param page_no: number of a page of the synthetic site (int)
+    :param fan_out: number of new pages linked by every page (int)
+    :return: links of the page: its new pages, then the menu (list of str)
+    """
+    return [ "/section{0}/item-{1}.html".format ( child_no % 100, child_no )
+             for child_no in range ( page_no * fan_out + 1, page_no * fan_out + fan_out + 1 ) ] + \
+           [ "/section{0}/item-{0}.html".format ( menu_no ) for menu_no in range ( 1, 11 ) ]
+
+
+def crawl ( num_urls, fan_out, memory_budget, spill_dir ):
+    """
+    Crawls the bookkeeping of a synthetic site of num_urls urls, in breadth first order.
+    :return: a 3-tuple (seconds (float), pages parsed (int), peak RSS in bytes (int))
+    """
+    cfg = { **dflt_cfg.DFLT_CFG, DOMAIN: DOMAIN_NAME, SYSTEM_PROXY: { }, MEMORY_BUDGET: memory_budget,
+            SPILL_DIR: spill_dir }
+    crwlr = Crawler ( cfg )
+
+    start = time.perf_counter ( )
+    root = crwlr.get_create_urlnode ( DOMAIN_NAME )
+    crwlr.insert_urlnodes_into_new_urls_queue ( root )
+    page_no = 0
+    while True:
+        frontier_entry = crwlr.frontier.get_nowait ( )
+        if not frontier_entry: break
+
+        url_node, depth = frontier_entry
+        if crwlr.update_visited_urlnodes_if_newurlnode ( url_node ):
+            url = url_node.url
+            links = get_links ( page_no, fan_out ) if len ( crwlr.url_graph ) < num_urls else [ ]
+            for link in links:
+                child_urlnode = crwlr.get_acceptable_urlnode ( link, url )
+                if child_urlnode:
+                    crwlr.link_child_urlnode ( url_node, child_urlnode, depth + 1 )
+            page_no += 1
+        crwlr.frontier.task_done ( )
+
+    with open ( os.devnull, 'w' ) as output_fd:
+        UrlTree ( root, cfg ).write_sitemap ( output_fd )
+    seconds = time.perf_counter ( ) - start
+
+    if crwlr.is_memory_bounded:
+        crwlr.frontier.close ( )
+        crwlr.url_graph.close ( )
+    crwlr.fetcher.close ( )
+    return seconds, page_no, resource.getrusage ( resource.RUSAGE_SELF ).ru_maxrss * 1024
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Peak RSS of the url bookkeeping, in memory vs memory-bounded' )
+    parser.add_argument ( '--urls', type=int, nargs='+', default=[ 250000, 1000000 ], help='sizes of the sites' )
+    parser.add_argument ( '--fan-out', type=int, default=10, help='new pages linked by every page (default=10)' )
+    parser.add_argument ( '--budget', type=int, default=64 * 1024 * 1024,
+                          help='memory budget in bytes (default=67108864)' )
+    parser.add_argument ( '--spill-dir', default=None, help='directory of the files on disk (default: temporary)' )
+    parser.add_argument ( '--child', nargs=2, type=int, metavar=('URLS', 'BUDGET'), help=argparse.SUPPRESS )
+    args = parser.parse_args ( )
+
+    logging.disable ( logging.CRITICAL )
+    if args.child:
+        print ( *crawl ( args.child[ 0 ], args.fan_out, args.child[ 1 ] or None, args.spill_dir ) )
+        return
+
+    print ( "{0:>10}{1:>16}{2:>12}{3:>14}{4:>16}".format ( "urls", "mode", "seconds", "pages/sec", "peak RSS (MB)" ) )
+    for num_urls in args.urls:
+        for mode, memory_budget in (("in memory", 0), ("bounded", args.budget)):
+            command = [ sys.executable, __file__, '--child', str ( num_urls ), str ( memory_budget ),
+                        '--fan-out', str ( args.fan_out ) ] + ([ '--spill-dir', args.spill_dir ] if args.spill_dir
+                                                              else [ ])
+            seconds, num_pages, peak_rss = subprocess.check_output ( command ).split ( )
+            print ( "{0:>10}{1:>16}{2:>12.1f}{3:>14.0f}{4:>16.0f}".format (
+                num_urls, mode, float ( seconds ), int ( num_pages ) / float ( seconds ), int ( peak_rss ) / 1e6 ) )
+
+
+if __name__ == '__main__':
+    main ( )
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+# Crawls a synthetic site served from localhost once while archiving its responses (ARCHIVE_PATH), then replays the
+# crawl from the archive (REPLAY_PATH) without the network: it compares the pages crawled per second, and checks that
+# the replays build the same sitemap tree as the live crawl.
+#
+# Usage (from the application home directory):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/bench_replay.py --pages 2000 --latency 0.01
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+from webcrawler.unittest.test_crawl_engines import get_tree_urls
+
+
+def time_crawl ( domain_name, settings ):
+    """
+    :param domain_name: absolute url of the site root (str)
+    :param settings: settings of the crawl (dictionary keyed by app_constant)
+    :return: a 3-tuple (seconds (float), pages crawled (int), urls of the sitemap tree (set of str))
+    """
+    start = time.perf_counter ( )
+    crwlr = api.create_crawler ( api.get_crawl_cfg ( domain_name, settings ) )
+    crwlr.start_url_parsing ( )
+    root = crwlr.release_urlparse_resources ( )
+    return time.perf_counter ( ) - start, crwlr.frontier.get_stats ( )[ 'claimed' ], get_tree_urls ( root )
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Live crawl vs replay of its page archive' )
+    parser.add_argument ( '--pages', type=int, default=2000, help='pages in the synthetic site (default=2000)' )
+    parser.add_argument ( '--page-size', type=int, default=10240, help='bytes per page (default=10240)' )
+    parser.add_argument ( '--asset-ratio', type=float, default=0.2, help='fraction of assets (default=0.2)' )
+    parser.add_argument ( '--latency', type=float, default=0.01, help='server latency in seconds (default=0.01)' )
+    parser.add_argument ( '--threads', type=int, default=8, help='parse threads (default=8)' )
+    parser.add_argument ( '--repeat', type=int, default=3, help='replays, the median is kept (default=3)' )
+    args = parser.parse_args ( )
+
+    # the error pages of the site would be logged on stderr
+    logging.disable ( logging.CRITICAL )
+
+    site = SyntheticSite ( num_pages=args.pages, page_size=args.page_size, asset_ratio=args.asset_ratio,
+                           latency=args.latency, error_rate=0.01 )
+    server = LocalSiteServer ( site )
+    domain_name = server.start ( )
+    settings = { SYSTEM_PROXY: { }, NUM_THREADS: args.threads, PROGRESS_INTERVAL: 0 }
+
+    with tempfile.TemporaryDirectory ( ) as output_dir:
+        archive_path = os.path.join ( output_dir, "bench.warc.gz" )
+        print ( "{0:<22}{1:>10}{2:>10}{3:>12}  {4}".format ( "crawl", "seconds", "pages", "pages/sec", "tree" ) )
+        try:
+            live_seconds, pages, live_urls = time_crawl ( domain_name, { **settings, ARCHIVE_PATH: archive_path } )
+        finally:
+            server.stop ( )
+        print ( "{0:<22}{1:>10.2f}{2:>10}{3:>12.1f}  {4}".format ( "live, archived", live_seconds, pages,
+                                                                   pages / live_seconds, "reference" ) )
+
+        runs = [ time_crawl ( domain_name, { **settings, REPLAY_PATH: archive_path } )
+                 for _ in range ( args.repeat ) ]
+        seconds = statistics.median ( run[ 0 ] for run in runs )
+        print ( "{0:<22}{1:>10.2f}{2:>10}{3:>12.1f}  {4}".format (
+            "replay", seconds, runs[ -1 ][ 1 ], runs[ -1 ][ 1 ] / seconds,
+            "same" if all ( run[ 2 ] == live_urls for run in runs ) else "DIFFERENT" ) )
+        print ( "archive: {0:.1f} MB for {1} pages of {2} bytes".format ( os.path.getsize ( archive_path ) / 1e6,
+                                                                         pages, args.page_size ) )
+
+
+if __name__ == '__main__':
+    main ( )
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# Compares the throughput (links normalized per second) of the former url pipeline of Crawler (get_simple_url twice,
+# is_http_url, is_internal_url and urljoin) with the memoized UrlCanonicalizer, on the links of a synthetic site whose
+# pages share menu links and link to spellings of the same urls, and counts the distinct urls each one keeps.
+#
+# Usage (from the application home directory):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/bench_url_canon.py --pages 2000 --links 60
+
+import argparse
+import random
+import time
+from urllib.parse import urljoin, urlparse
+
+from webcrawler.crawler import Crawler
+from webcrawler.urlcanon import UrlCanonicalizer
+
+DOMAIN_NAME = "http://example.com/"
+HOST = "example.com"
+
+
+def make_links ( num_pages, links_per_page, seed=0 ):
+    """
+    Generates the links of the pages of a site, as given by the link extractor (absolute urls): a menu shared by \
+    every page, then links to random pages, some of them spelt differently (host case, default port, fragment, \
+    tracking parameters, trailing slash), and a few external and non http links.
+    :param num_pages: int
+    :param links_per_page: int
+    :param seed: seed of the random generator (int)
+    :return: a list of (page url (str), links (list of str))
+    """
+    rand = random.Random ( seed )
+    menu = [ "http://example.com/section{0}/index.html".format ( section_no ) for section_no in range ( 20 ) ]
+    spellings = ("http://example.com/item{0}.html", "http://Example.com:80/item{0}.html",
+                 "http://example.com/item{0}.html#reviews", "http://example.com/item{0}.html?utm_source=feed",
+                 "http://example.com/item{0}.html?utm_source=feed&utm_medium=rss", "http://example.com/item{0}.html/")
+
+    pages = [ ]
+    for page_no in range ( num_pages ):
+        links = list ( menu )
+        for _ in range ( max ( 0, links_per_page - len ( menu ) - 2 ) ):
+            links.append ( rand.choice ( spellings ).format ( rand.randrange ( num_pages ) ) )
+        links.append ( "https://other.example.org/share?u={0}".format ( page_no ) )
+        links.append ( "mailto:contact@example.com" )
+        pages.append ( ("http://example.com/item{0}.html".format ( page_no ), links) )
+
+    return pages
+
+
+def normalize_former ( pages ):
+    """
+    Url pipeline of Crawler before UrlCanonicalizer, from get_acceptable_urlnode to get_create_urlnode.
+    :param pages: see make_links
+    :return: set of the urls kept (str)
+    """
+    urls = set ( )
+    for _, links in pages:
+        for link in links:
+            url = Crawler.get_simple_url ( link )
+            if not Crawler.is_http_url ( url ): continue
+            host = urlparse ( url ).netloc
+            if host != HOST and host != '': continue
+            urls.add ( urljoin ( DOMAIN_NAME, Crawler.get_simple_url ( url ) ) )
+
+    return urls
+
+
+def normalize_canonical ( pages, memo_size ):
+    """
+    :param pages: see make_links
+    :param memo_size: size of the memo of the canonicalizer (int)
+    :return: set of the urls kept (str)
+    """
+    canonicalizer = UrlCanonicalizer ( trailing_slash='strip', ignored_params=[ 'utm_*' ], memo_size=memo_size )
+    urls = set ( )
+    for page_url, links in pages:
+        for link in links:
+            url = canonicalizer.canonicalize ( link, page_url )
+            if url is None or url.split ( '/', 3 )[ 2 ] != HOST: continue
+            urls.add ( url )
+
+    return urls
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Former url pipeline vs memoized UrlCanonicalizer' )
+    parser.add_argument ( '--pages', type=int, default=2000, help='pages of the site (default=2000)' )
+    parser.add_argument ( '--links', type=int, default=60, help='links per page (default=60)' )
+    parser.add_argument ( '--repeat', type=int, default=3, help='runs per pipeline, the fastest is kept (default=3)' )
+    args = parser.parse_args ( )
+
+    pages = make_links ( args.pages, args.links )
+    num_links = sum ( len ( links ) for _, links in pages )
+
+    print ( "{0:<28}{1:>10}{2:>14}{3:>12}".format ( "pipeline", "seconds", "links/s", "urls kept" ) )
+    for name, normalize in (("former (urlsplit/urljoin)", normalize_former),
+                            ("canonicalizer, no memo", lambda pages: normalize_canonical ( pages, 0 )),
+                            ("canonicalizer, memo", lambda pages: normalize_canonical ( pages, 100000 ))):
+        best = float ( 'inf' )
+        for _ in range ( args.repeat ):
+            start = time.perf_counter ( )
+            urls = normalize ( pages )
+            best = min ( best, time.perf_counter ( ) - start )
+        print ( "{0:<28}{1:>10.3f}{2:>14,.0f}{3:>12}".format ( name, best, num_links / best, len ( urls ) ) )
+
+
+if __name__ == '__main__':
+    main ( )
@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+# Measures the memory held per url by the crawl bookkeeping (url nodes, sitemap links, visited and enqueued urls), \
+# with one Python object per url (former UrlNode) and with the interned UrlGraph.
+#
+# Usage (from the application home directory):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/bench_url_graph.py --urls 100000 1000000
+
+import argparse
+import logging
+import operator
+import tracemalloc
+
+from webcrawler.urlgraph import UrlGraph
+from webcrawler.urlparse import UrlNode
+
+
+class ObjectUrlNode:
+    """
+    UrlNode before UrlGraph: every url is an object holding a logger, the url and a set of its children
+    """
+    def __init__ ( self, url ):
+        self.logger = logging.getLogger ( __name__ )
+        self.url = url
+        self.child_urls = set ( )
+
+
+def get_url ( url_no, fan_out ):
+    """
+    :param url_no: int
+    :param fan_out: number of children of every url (int)
+    :return: url of a synthetic site (str)
+    """
+    return "https://www.example.com/section{0}/item-{1}.html".format ( url_no // fan_out % 100, url_no )
+
+
+def crawl_with_objects ( num_urls, fan_out ):
+    """
+    Bookkeeping of Crawler before UrlGraph: url_instance dict, visited set, frontier seen set and child sets.
+    :return: structures holding the urls (tuple)
+    """
+    url_instance = dict ( )
+    visited_urlnodes = set ( )
+    seen = set ( )
+    for url_no in range ( num_urls ):
+        url = get_url ( url_no, fan_out )
+        urlnode = ObjectUrlNode ( url )
+        url_instance[ url ] = urlnode
+        seen.add ( urlnode )
+        visited_urlnodes.add ( urlnode )
+        if url_no:
+            url_instance[ get_url ( (url_no - 1) // fan_out, fan_out ) ].child_urls.add ( urlnode )
+
+    return url_instance, visited_urlnodes, seen
+
+
+def crawl_with_graph ( num_urls, fan_out ):
+    """
+    Bookkeeping of Crawler with UrlGraph: interned urls, parent links, visited flags and frontier seen url ids.
+    :return: structures holding the urls (tuple)
+    """
+    url_graph = UrlGraph ( )
+    seen = set ( )
+    get_key = operator.attrgetter ( 'url_id' )
+    for url_no in range ( num_urls ):
+        urlnode = UrlNode ( get_url ( url_no, fan_out ), url_graph )
+        seen.add ( get_key ( urlnode ) )
+        url_graph.mark_visited ( urlnode.url_id )
+        if url_no:
+            parent = UrlNode ( get_url ( (url_no - 1) // fan_out, fan_out ), url_graph )
+            parent.add_child ( urlnode )
+
+    # the children index is built when the sitemap is written
+    url_graph.get_child_ids ( 0 )
+    return url_graph, seen
+
+
+def measure ( crawl, num_urls, fan_out ):
+    """
+    :return: bytes allocated per url by crawl (float)
+    """
+    tracemalloc.start ( )
+    start_size = tracemalloc.get_traced_memory ( )[ 0 ]
+    structures = crawl ( num_urls, fan_out )
+    size = tracemalloc.get_traced_memory ( )[ 0 ] - start_size
+    tracemalloc.stop ( )
+
+    del structures
+    return size / num_urls
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Memory per url: UrlNode objects vs UrlGraph' )
+    parser.add_argument ( '--urls', type=int, nargs='+', default=[ 100000, 1000000 ], help='sizes of the graphs' )
+    parser.add_argument ( '--fan-out', type=int, default=10, help='children per url (default=10)' )
+    args = parser.parse_args ( )
+
+    print ( "{0:>10}{1:>22}{2:>22}".format ( "urls", "objects (bytes/url)", "UrlGraph (bytes/url)" ) )
+    for num_urls in args.urls:
+        print ( "{0:>10}{1:>22.0f}{2:>22.0f}".format ( num_urls, measure ( crawl_with_objects, num_urls, args.fan_out ),
+                                                      measure ( crawl_with_graph, num_urls, args.fan_out ) ) )
+
+
+if __name__ == '__main__':
+    main ( )
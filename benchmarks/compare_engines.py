@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+# Compares the thread and the async crawl engines, and the multi-process mode, on the same synthetic site served \
+# from localhost.
+#
+# Usage (from the application home directory):
+#   $ export PYTHONPATH=$PWD
+#   $ python benchmarks/compare_engines.py --pages 1000 --latency 0.05
+
+import argparse
+import time
+
+import dflt_cfg
+from webcrawler.app_constant import *
+from webcrawler.async_crawler import AsyncCrawler
+from webcrawler.crawler import Crawler
+from webcrawler.process_crawler import ProcessCrawler
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+
+
+def count_tree_urls ( root ):
+    """
+    :param root: an instance of UrlNode
+    :return: number of distinct urls in the UrlNode tree hierarchy (int)
+    """
+    tree_urls = set ( )
+    pending_urlnodes = [ root ]
+    while pending_urlnodes:
+        url_node = pending_urlnodes.pop ( )
+        tree_urls.add ( url_node.url )
+        pending_urlnodes.extend ( url_node.child_urls )
+
+    return len ( tree_urls )
+
+
+def run_engine ( crawler_class ):
+    """
+    Crawls the configured domain with crawler_class and returns the elapsed time and the number of mapped urls.
+    :param crawler_class: Crawler or one of its subclasses
+    :return: a 2-tuple (seconds (float), urls (int))
+    """
+    start = time.perf_counter ( )
+    crwlr = crawler_class ( )
+    crwlr.start_url_parsing ( )
+    root = crwlr.release_urlparse_resources ( )
+    return time.perf_counter ( ) - start, count_tree_urls ( root )
+
+
+def main ( ):
+    parser = argparse.ArgumentParser ( description='Thread engine vs async engine on a local synthetic site' )
+    parser.add_argument ( '--pages', type=int, default=1000, help='pages in the synthetic site (default=1000)' )
+    parser.add_argument ( '--fan-out', type=int, default=10, help='links per page (default=10)' )
+    parser.add_argument ( '--latency', type=float, default=0.05, help='server latency in seconds (default=0.05)' )
+    parser.add_argument ( '--threads', type=int, nargs='+', default=[ 4, 16 ], help='thread engine pool sizes' )
+    parser.add_argument ( '--concurrency', type=int, nargs='+', default=[ 16, 100 ], help='async engine limits' )
+    parser.add_argument ( '--processes', type=int, nargs='*', default=[ 2, 4 ],
+                          help='numbers of crawl processes, each one with the first thread pool size' )
+    parser.add_argument ( '--padding', type=int, default=0, help='bytes of text added to every page (default=0)' )
+    args = parser.parse_args ( )
+
+    site = SyntheticSite ( num_pages=args.pages, fan_out=args.fan_out, latency=args.latency )
+    for path in site.pages:
+        site.pages[ path ] += b' ' * args.padding
+
+    server = LocalSiteServer ( site )
+    dflt_cfg.DFLT_CFG[ DOMAIN ] = server.start ( )
+    dflt_cfg.DFLT_CFG[ SYSTEM_PROXY ] = { }
+
+    print ( "{0:<24}{1:>10}{2:>10}{3:>12}".format ( "engine", "seconds", "urls", "urls/sec" ) )
+    try:
+        for n_threads in args.threads:
+            dflt_cfg.DFLT_CFG[ NUM_THREADS ] = n_threads
+            seconds, urls = run_engine ( Crawler )
+            print ( "{0:<24}{1:>10.2f}{2:>10}{3:>12.1f}".format ( "thread (nt={0})".format ( n_threads ),
+                                                                seconds, urls, urls / seconds ) )
+
+        for concurrency in args.concurrency:
+            dflt_cfg.DFLT_CFG[ MAX_CONCURRENCY ] = concurrency
+            seconds, urls = run_engine ( AsyncCrawler )
+            print ( "{0:<24}{1:>10.2f}{2:>10}{3:>12.1f}".format ( "async (c={0})".format ( concurrency ),
+                                                                seconds, urls, urls / seconds ) )
+
+        dflt_cfg.DFLT_CFG[ NUM_THREADS ] = args.threads[ 0 ]
+        for num_processes in args.processes:
+            seconds, urls = run_engine ( lambda: ProcessCrawler ( num_processes ) )
+            print ( "{0:<24}{1:>10.2f}{2:>10}{3:>12.1f}".format (
+                "process (p={0}, nt={1})".format ( num_processes, args.threads[ 0 ] ), seconds, urls, urls / seconds ) )
+    finally:
+        server.stop ( )
+
+
+if __name__ == '__main__':
+    main ( )
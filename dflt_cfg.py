@@ -10,12 +10,152 @@ DFLT_CFG = {
     # Location where sitemap will be stored
     OUTPUT_PATH: "./output/output.txt",
 
-    # Application timeout in seconds (must be >=0)
+    # Network timeout in seconds of a page request (must be >=0; 0 means no timeout)
     TIMEOUT: 10,
 
     # system proxy if applicable (Please read README file)
     SYSTEM_PROXY: None,
 
     # Set the level of logs which will be collected by this application. (0<=LOG_LEVEL<=5)
-    LOG_LEVEL : 2
+    LOG_LEVEL : 2,
+
+    # Crawl engine: "thread" (pool of blocking parse threads) or "async" (single event loop)
+    ENGINE: "thread",
+
+    # Maximum number of requests the async engine keeps in flight at once. (must be >=1)
+    MAX_CONCURRENCY: 100,
+
+    # Maximum number of idle keep-alive connections kept open per host for reuse. (must be >=1)
+    POOL_SIZE: 100,
+
+    # Seconds after which an idle keep-alive connection is closed instead of being reused. (must be >=0)
+    POOL_IDLE_TIMEOUT: 30,
+
+    # Order in which discovered urls are crawled: "bfs" (discovery order) or "priority" (fewest path segments first)
+    FRONTIER_ORDER: "bfs",
+
+    # Urls more than MAX_DEPTH clicks away from the domain root are not crawled. (must be >=0; None means no limit)
+    MAX_DEPTH: None,
+
+    # Maximum number of pages crawled, the sitemap is partial beyond it. (must be >=1; None means no limit)
+    MAX_PAGES: None,
+
+    # Seconds after which no more pages are crawled, the sitemap is partial beyond it. (must be >=0; None means no limit)
+    MAX_TIME: None,
+
+    # Maximum number of bytes downloaded of a html page, the rest of a bigger page is not parsed. (must be >=1)
+    MAX_BODY_SIZE: 10 * 1024 * 1024,
+
+    # Write a record for every url as soon as it is crawled, instead of writing the sitemap tree once the crawl is over
+    STREAM_SITEMAP: False,
+
+    # Format of the sitemap: "text" (indented tree), "xml" or "xml.gz" (sitemaps.org XML, gzipped for xml.gz)
+    SITEMAP_FORMAT: "text",
+
+    # Append-only log of the crawl progress, from which an interrupted crawl can be resumed (None means no checkpoints)
+    CHECKPOINT_PATH: None,
+
+    # Seconds between two flushes of the checkpoint log to disk. (must be >=0)
+    CHECKPOINT_INTERVAL: 30,
+
+    # Resume the crawl from CHECKPOINT_PATH instead of starting from the domain root
+    RESUME: False,
+
+    # Database of the validators and links of the pages, used to recrawl with conditional requests (None means no cache)
+    CACHE_PATH: None,
+
+    # Maximum size in bytes of the cached pages, the least recently used ones are evicted beyond it. (must be >=1)
+    CACHE_SIZE: 100 * 1024 * 1024,
+
+    # Number of crawl processes, which share out the urls of the domain (must be >=1; 1 means a single process)
+    PROCESSES: 1,
+
+    # (host, port) of the coordinator of a distributed crawl, whose frontier is crawled by this node (None means a local crawl)
+    FRONTIER_ADDRESS: None,
+
+    # (host, port) on which the coordinator of a distributed crawl listens for its nodes (None means no coordinator)
+    COORDINATOR_ADDRESS: None,
+
+    # Space out, throttle and retry the requests of every host (see HOST_RATE, HOST_CONCURRENCY and MAX_RETRIES)
+    POLITE: False,
+
+    # Maximum number of requests per second to a host of a polite crawl (must be >0; None means no limit)
+    HOST_RATE: None,
+
+    # Maximum number of requests at once to a host of a polite crawl, which adapts its concurrency up to it. (must be >=1)
+    HOST_CONCURRENCY: 8,
+
+    # Number of times a throttled (429 / 503) or failed request of a polite crawl is retried. (must be >=0)
+    MAX_RETRIES: 3,
+
+    # Do not crawl the urls disallowed by the robots.txt of the domain for the user agent of the crawler
+    ROBOTS: False,
+
+    # Seed the crawl with the urls of the XML sitemaps listed by the robots.txt of the domain (or its /sitemap.xml)
+    SEED_SITEMAPS: False,
+
+    # Seconds between two progress lines of the crawl in the log. (must be >=0; 0 means no progress lines)
+    PROGRESS_INTERVAL: 10,
+
+    # JSON file written at the end of the crawl with its statistics per stage and status code (None means no file)
+    STATS_PATH: None,
+
+    # Localhost port serving the statistics of the running crawl on /stats (JSON) and /metrics (None means no server)
+    METRICS_PORT: None,
+
+    # Text file listing the domains crawled in one process, one per line (None means the single DOMAIN)
+    DOMAINS_FILE: None,
+
+    # JSON file written at the end of the crawl with the status, redirects and referrers of every link, external
+    # links included (None means no link check)
+    LINK_REPORT_PATH: None,
+
+    # Trailing slash of the path of the crawled urls: 'keep' it, 'strip' it (/a/ -> /a) or 'add' it to the paths
+    # without a file extension (/a -> /a/), so that both spellings of a page are crawled once
+    URL_TRAILING_SLASH: 'keep',
+
+    # Sort the query parameters of the crawled urls by name, so that /a?x=1&y=2 and /a?y=2&x=1 are crawled once
+    URL_SORT_QUERY: False,
+
+    # Query parameters removed from the crawled urls ('*' matches any characters), e.g; tracking parameters
+    URL_IGNORED_PARAMS: [ 'utm_*', 'gclid', 'fbclid', 'mc_cid', 'mc_eid' ],
+
+    # Number of urls whose canonical url is memoized (least recently used ones are dropped). (must be >=0)
+    URL_MEMO_SIZE: 100000,
+
+    # Do not fetch the urls of crawler traps (see below) and do not follow the links of near-duplicate pages
+    TRAP_DETECTION: False,
+
+    # Maximum number of times a segment appears in the path of a url (e.g; /a/b/a/b/a/b/ is a trap). (must be >=1)
+    MAX_SEGMENT_REPEATS: 2,
+
+    # Maximum number of characters of the query of a url (e.g; a faceted search). (must be >=0)
+    MAX_QUERY_LENGTH: 256,
+
+    # Maximum number of pages crawled per path template, whose ids (numbers, long hexadecimal strings) and query
+    # values are ignored (e.g; /cal/2024/05?day=1). (must be >=1)
+    MAX_PAGES_PER_TEMPLATE: 10000,
+
+    # Maximum number of different bits between the 64-bit SimHash fingerprints of near-duplicate pages. (0 to 7)
+    NEAR_DUPLICATE_DISTANCE: 3,
+
+    # NumPy archive written at the end of the crawl with every link between the pages of the domain, to be analysed
+    # with analyze_graph.py (None means the links are not recorded). It needs numpy.
+    GRAPH_PATH: None,
+
+    # WARC archive (.warc.gz) to which every response of the crawl is appended, with the part of its body which has
+    # been read, and its index (<archive>.idx) (None means no archive)
+    ARCHIVE_PATH: None,
+
+    # WARC archive written with ARCHIVE_PATH from which the crawl reads its responses instead of the network, to
+    # replay a crawl offline (None means a live crawl)
+    REPLAY_PATH: None,
+
+    # bytes of memory taken by the urls of the crawl (url graph and frontier): the urls are held on disk, behind a
+    # Bloom filter and a cache of the most recently used ones, and the frontier spills to disk beyond its share of the
+    # budget (None means every url is held in memory)
+    MEMORY_BUDGET: None,
+
+    # directory of the files of a memory-bounded crawl (None means the directory of temporary files)
+    SPILL_DIR: None
 }
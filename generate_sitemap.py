@@ -2,24 +2,153 @@
 
 import logging.config
 
-from webcrawler.crawler import Crawler
+from webcrawler.api import create_crawler
+from webcrawler.app_constant import ARCHIVE_PATH, COORDINATOR_ADDRESS, DOMAIN, DOMAINS_FILE, FRONTIER_ADDRESS, \
+    GRAPH_PATH, LINK_REPORT_PATH, MEMORY_BUDGET, OUTPUT_PATH, REPLAY_PATH
+from webcrawler.batch import BatchCrawler
 from webcrawler.config_app import UserConfig
+from webcrawler.distributed import FrontierCoordinator
 from webcrawler.urlparse import UrlTree
 
-logging.config.fileConfig ( fname='.logging.conf', disable_existing_loggers=False )
 
-# First Configuring application as per need of user's command line arguments
-UserConfig.set_app_config()
+def write_sitemap ( urlnode_root, cfg ):
+    """
+    Writes the sitemap tree of the crawl in the output file, and tells the user where it is.
+    :param urlnode_root: root of the UrlNode tree hierarchy (an instance of UrlNode)
+    :param cfg: configuration of the application (dictionary)
+    :return:
+    """
+    if UrlTree ( urlnode_root, cfg ).write_sitemap ( ):
+        print ( "Sitemap for {0} is written in {1}.".format ( cfg[ DOMAIN ], cfg[ OUTPUT_PATH ] ) )
+        print ( "Logs (Broken or dead URLs along with application logs) for domain {0} are available in {1} "
+                "directory.".format ( cfg[ DOMAIN ], "./logs" ) )
 
-# Crawling domain
-crwlr = Crawler ( )
-crwlr.start_url_parsing()
-urlnode_root = crwlr.release_urlparse_resources()
 
-# Using tree hierarchy to produce result in output file
-url_parse_tree = UrlTree(urlnode_root)
-url_parse_tree.write_sitemap()
+def crawl_domains ( cfg ):
+    """
+    Crawls every domain of the domains file in one process, and reports the throughput over all of them.
+    :param cfg: configuration of the application (dictionary)
+    :return:
+    """
+    try:
+        domain_names = BatchCrawler.read_domains_file ( cfg[ DOMAINS_FILE ] )
+    except OSError as err:
+        print ( "Error {0} occurred. Domains file {1} cannot be read.".format ( err, cfg[ DOMAINS_FILE ] ) )
+        return
 
-print ( "-------------------------------------------------------------------" )
-print ( "<<Thank you for using Domain Crawler - Domain Mapping application>>" )
-print ( "-------------------------------------------------------------------" )
\ No newline at end of file
+    batch = BatchCrawler ( domain_names, cfg )
+    batch.start_url_parsing ( )
+    results = batch.release_urlparse_resources ( )
+
+    crawl_stats = batch.get_crawl_stats ( )
+    print ( "Crawled {0} pages of {1} domains in {2:.1f} seconds ({3:.1f} pages/sec, {4} responses).".format (
+        crawl_stats[ 'frontier' ][ 'claimed' ], crawl_stats[ 'domains' ][ 'total' ], crawl_stats[ 'elapsed_seconds' ],
+        crawl_stats[ 'pages_per_second' ], crawl_stats[ 'responses' ] ) )
+    for result in results:
+        if result[ 'error' ]:
+            print ( "{domain}: not crawled ({error}).".format ( **result ) )
+        else:
+            partial = " (partial: {0} ran out)".format ( result[ 'budget_exhausted' ] ) \
+                if result[ 'budget_exhausted' ] else ""
+            print ( "{domain}: {pages} pages in {seconds:.1f} seconds, written in {output_path}{0}.".format (
+                partial, **result ) )
+    print ( "Logs (Broken or dead URLs along with application logs) are available in {0} directory.".format (
+        "./logs" ) )
+
+
+def main ( ):
+    logging.config.fileConfig ( fname='.logging.conf', disable_existing_loggers=False )
+
+    # First Configuring application as per need of user's command line arguments
+    cfg = UserConfig.set_app_config ( )
+
+    if cfg[ DOMAINS_FILE ]:
+        # Crawling all the domains of the file with one pool of threads
+        crawl_domains ( cfg )
+    elif cfg[ COORDINATOR_ADDRESS ]:
+        # Coordinating the crawl of the nodes, then writing their merged sitemap
+        coordinator = FrontierCoordinator ( cfg=cfg )
+        print ( "Coordinating the crawl of {0}: start the nodes with --node {1}:{2}".format (
+            cfg[ DOMAIN ], *coordinator.start ( ) ) )
+        coordinator.wait ( )
+        urlnode_root = coordinator.stop ( )
+
+        frontier_stats = coordinator.frontier.get_stats ( )
+        print ( "Crawled {claimed} pages ({duplicates_suppressed} duplicate links suppressed).".format (
+            **frontier_stats ) )
+        if frontier_stats[ 'budget_exhausted' ]:
+            print ( "Crawl budget ({budget_exhausted}) ran out: the sitemap is partial.".format ( **frontier_stats ) )
+
+        write_sitemap ( urlnode_root, cfg )
+    else:
+        # Crawling domain
+        crwlr = create_crawler ( cfg )
+        crwlr.start_url_parsing()
+        urlnode_root = crwlr.release_urlparse_resources()
+
+        frontier_stats = crwlr.frontier.get_stats ( )
+        print ( "Crawled {claimed} pages ({duplicates_suppressed} duplicate links suppressed).".format (
+            **frontier_stats ) )
+        if frontier_stats[ 'budget_exhausted' ]:
+            print ( "Crawl budget ({budget_exhausted}) ran out: the sitemap is partial.".format ( **frontier_stats ) )
+
+        if cfg[ REPLAY_PATH ]:
+            print ( "Replayed {0} responses from {1} ({2} urls not archived).".format (
+                crwlr.fetcher.num_replayed, cfg[ REPLAY_PATH ], crwlr.fetcher.num_missing ) )
+        else:
+            connection_pool = crwlr.get_connection_pool ( )
+            print ( "Connection reuse ratio: {0:.1%} ({1} requests over {2} connections).".format (
+                connection_pool.get_reuse_ratio ( ), connection_pool.requests_sent,
+                connection_pool.connections_opened ) )
+
+        if crwlr.page_archive:
+            print ( "Archived {0} responses in {1}.".format ( crwlr.page_archive.num_records, cfg[ ARCHIVE_PATH ] ) )
+
+        if crwlr.is_memory_bounded:
+            print ( "Urls held on disk: {urls} urls ({size} bytes) within a memory budget of {0} bytes, {1} urlnodes "
+                    "spilled by the frontier.".format ( cfg[ MEMORY_BUDGET ], crwlr.frontier.spilled,
+                                                       **crwlr.url_graph.get_stats ( ) ) )
+
+        if crwlr.page_cache:
+            print ( "Page cache: {hits} unchanged pages reused, {misses} pages not cached, {updated} changed pages "
+                    "({evicted} evicted).".format ( **crwlr.page_cache.get_stats ( ) ) )
+
+        if crwlr.trap_detector:
+            trap_stats = crwlr.trap_detector.get_stats ( )
+            print ( "Crawler traps: {0} urls not fetched, {near_duplicates} near-duplicate pages not expanded, "
+                    "{fetches_avoided} fetches avoided.".format ( sum ( trap_stats[ key ] for key in (
+                        'repeated_segments', 'long_query', 'template_cap') ), **trap_stats ) )
+
+        if crwlr.link_checker:
+            print ( "Checked {links} links ({external} external): {broken} broken, {redirected} redirected. Report "
+                    "in {0}.".format ( cfg[ LINK_REPORT_PATH ], **crwlr.link_checker.get_report ( )[ 'summary' ] ) )
+
+        if crwlr.link_graph_size:
+            print ( "Link graph ({0} urls, {1} links) is written in {2}: analyse it with python analyze_graph.py "
+                    "{2}".format ( *crwlr.link_graph_size, cfg[ GRAPH_PATH ] ) )
+
+        # Using tree hierarchy to produce result in output file (a streamed or XML sitemap has already been written \
+        # while crawling)
+        if crwlr.xml_sitemap:
+            print ( "XML sitemap for {0} ({1} pages) is written in {2}.".format ( cfg[ DOMAIN ],
+                                                                                crwlr.xml_sitemap.num_urls,
+                                                                                crwlr.xml_sitemap.sitemap_path ) )
+        if crwlr.sitemap_stream:
+            print ( "Sitemap records for {0} are written in {1}.".format ( cfg[ DOMAIN ],
+                                                                            cfg[ OUTPUT_PATH ] ) )
+        if cfg[ FRONTIER_ADDRESS ]:
+            print ( "The sitemap of {0} is written by the coordinator {1}:{2}.".format (
+                cfg[ DOMAIN ], *cfg[ FRONTIER_ADDRESS ] ) )
+        elif crwlr.xml_sitemap or crwlr.sitemap_stream:
+            print ( "Logs (Broken or dead URLs along with application logs) for domain {0} are available in {1} "
+                    "directory.".format ( cfg[ DOMAIN ], "./logs" ) )
+        else:
+            write_sitemap ( urlnode_root, cfg )
+
+    print ( "-------------------------------------------------------------------" )
+    print ( "<<Thank you for using Domain Crawler - Domain Mapping application>>" )
+    print ( "-------------------------------------------------------------------" )
+
+
+if __name__ == '__main__':
+    main ( )
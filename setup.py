@@ -8,5 +8,6 @@ setup (
     license='MIT License',
     author='Mantosh Kumar',
     author_email='mantoshkumar1@gmail.com',
-    description='Domain Crawler - Domain Mapping'
+    description='Domain Crawler - Domain Mapping',
+    extras_require={ 'graph': [ 'numpy', 'scipy' ] }
 )
@@ -0,0 +1,111 @@
+import queue
+import threading
+
+import dflt_cfg
+from .app_constant import *
+from .async_crawler import AsyncCrawler
+from .crawler import Crawler
+from .distributed import NodeCrawler
+from .process_crawler import ProcessCrawler
+
+# number of urls linked by the crawl of iter_crawl which have not been read yet, beyond which the crawl waits
+MAX_PENDING_RECORDS = 10000
+
+
+def get_crawl_cfg ( domain_name, settings=None ):
+    """
+    Returns the configuration of a crawl of domain_name: a copy of the default settings, so that the crawl does \
+    not depend on (nor change) the configuration of the other crawls of the process.
+    :param domain_name: domain to crawl (str)
+    :param settings: settings overriding the default ones (dictionary keyed by app_constant / None)
+    :return: dictionary, see dflt_cfg.DFLT_CFG
+    """
+    cfg = dict ( dflt_cfg.DFLT_CFG )
+    cfg.update ( settings or { } )
+    cfg[ DOMAIN ] = domain_name
+    return cfg
+
+
+def create_crawler ( cfg, fetcher=None, on_record=None ):
+    """
+    Creates the crawler of the engine chosen by cfg: a node of a distributed crawl, crawl processes, the event \
+    loop or parse threads. A replayed crawl (REPLAY_PATH) runs on parse threads whatever the engine, as it does \
+    not wait for the network.
+    :param cfg: configuration of the crawl (dictionary, see get_crawl_cfg)
+    :param fetcher: Fetcher shared with other crawls (None for a Fetcher of this crawl), see Crawler
+    :param on_record: function called with (url_node, depth, parent_node) for every urlnode linked in the sitemap \
+                      (None for no calls), see Crawler
+    :return: an instance of Crawler
+    """
+    if cfg.get ( FRONTIER_ADDRESS ):
+        return NodeCrawler ( cfg=cfg, fetcher=fetcher, on_record=on_record )
+    if cfg.get ( PROCESSES, 1 ) > 1:
+        return ProcessCrawler ( cfg=cfg, fetcher=fetcher, on_record=on_record )
+    if cfg.get ( ENGINE ) == 'async' and not cfg.get ( REPLAY_PATH ):
+        return AsyncCrawler ( cfg=cfg, fetcher=fetcher, on_record=on_record )
+    return Crawler ( cfg=cfg, fetcher=fetcher, on_record=on_record )
+
+
+def crawl ( domain_name, settings=None, fetcher=None ):
+    """
+    Crawls domain_name and returns its sitemap. Several crawls can run at once in one process (e.g; one per \
+    thread), each one with its own settings, and share a fetcher along with its connection pool.
+    :param domain_name: domain to crawl (str)
+    :param settings: settings overriding the default ones (dictionary keyed by app_constant / None)
+    :param fetcher: Fetcher shared with other crawls, which is left open (None for a Fetcher of this crawl)
+    :return: the root of the UrlNode tree hierarchy (an instance of UrlNode), whose graph holds every link
+    """
+    crwlr = create_crawler ( get_crawl_cfg ( domain_name, settings ), fetcher )
+    crwlr.start_url_parsing ( )
+    return crwlr.release_urlparse_resources ( )
+
+
+def iter_crawl ( domain_name, settings=None, fetcher=None ):
+    """
+    Crawls domain_name and yields every url as soon as it is linked in the sitemap, while the crawl goes on in \
+    a background thread. An error of the crawl is raised once the urls linked before it have been yielded. \
+    The crawl waits while MAX_PENDING_RECORDS urls have not been read yet, and it stops as soon as the generator is \
+    closed (e.g; the caller breaks out of its loop): the pages being parsed are finished, but no other page is \
+    requested. With several crawl processes, the urls are only yielded once the processes have finished.
+    :param domain_name: domain to crawl (str)
+    :param settings: settings overriding the default ones (dictionary keyed by app_constant / None)
+    :param fetcher: Fetcher shared with other crawls, which is left open (None for a Fetcher of this crawl)
+    :return: generator of 3-tuples (url_node (UrlNode), depth (int), parent_node (UrlNode / None for the root))
+    """
+    # records of the urls linked by the crawl thread, then None once the crawl is over
+    records = queue.Queue ( maxsize=MAX_PENDING_RECORDS )
+    # the exception which has stopped the crawl, if any
+    crawl_end = [ ]
+
+    crwlr = create_crawler ( get_crawl_cfg ( domain_name, settings ), fetcher,
+                             on_record=lambda *record: records.put ( record ) )
+
+    def run_crawl ( ):
+        try:
+            crwlr.start_url_parsing ( )
+            crwlr.release_urlparse_resources ( )
+        except Exception as err:
+            crawl_end.append ( err )
+        finally:
+            records.put ( None )
+
+    crawl_thread = threading.Thread ( target=run_crawl, name="iter_crawl", daemon=True )
+    crawl_thread.start ( )
+
+    record = ( )
+    try:
+        while record is not None:
+            record = records.get ( )
+            if record is not None:
+                yield record
+    finally:
+        if record is not None:
+            # the caller has stopped reading: no other page is requested, and the records of the pages being \
+            # parsed are read (and dropped) so that the crawl thread does not wait for room in records
+            crwlr.frontier.stop ( )
+            while records.get ( ) is not None:
+                pass
+        crawl_thread.join ( )
+
+    if crawl_end:
+        raise crawl_end[ 0 ]
@@ -3,4 +3,48 @@ TIMEOUT = 2
 SYSTEM_PROXY = 3
 NUM_THREADS = 4
 DOMAIN = 5
-LOG_LEVEL = 6
\ No newline at end of file
+LOG_LEVEL = 6
+ENGINE = 7
+MAX_CONCURRENCY = 8
+POOL_SIZE = 9
+POOL_IDLE_TIMEOUT = 10
+FRONTIER_ORDER = 11
+MAX_DEPTH = 12
+MAX_PAGES = 13
+MAX_TIME = 14
+MAX_BODY_SIZE = 15
+STREAM_SITEMAP = 16
+SITEMAP_FORMAT = 17
+CHECKPOINT_PATH = 18
+CHECKPOINT_INTERVAL = 19
+RESUME = 20
+CACHE_PATH = 21
+CACHE_SIZE = 22
+PROCESSES = 23
+FRONTIER_ADDRESS = 24
+COORDINATOR_ADDRESS = 25
+POLITE = 26
+HOST_RATE = 27
+HOST_CONCURRENCY = 28
+MAX_RETRIES = 29
+ROBOTS = 30
+SEED_SITEMAPS = 31
+PROGRESS_INTERVAL = 32
+STATS_PATH = 33
+METRICS_PORT = 34
+DOMAINS_FILE = 35
+LINK_REPORT_PATH = 36
+URL_TRAILING_SLASH = 37
+URL_SORT_QUERY = 38
+URL_IGNORED_PARAMS = 39
+URL_MEMO_SIZE = 40
+TRAP_DETECTION = 41
+MAX_SEGMENT_REPEATS = 42
+MAX_QUERY_LENGTH = 43
+MAX_PAGES_PER_TEMPLATE = 44
+NEAR_DUPLICATE_DISTANCE = 45
+GRAPH_PATH = 46
+ARCHIVE_PATH = 47
+REPLAY_PATH = 48
+MEMORY_BUDGET = 49
+SPILL_DIR = 50
@@ -0,0 +1,262 @@
+# References:
+# 1. https://docs.python.org/3/library/asyncio-task.html#waiting-primitives
+
+import asyncio
+import http.client
+import logging
+import time
+
+import dflt_cfg
+
+from .app_constant import *
+from .async_http import AsyncHttpClient
+from .crawler import Crawler
+from .linkextract import LinkExtractor
+from .pagecache import PageCache
+
+
+class AsyncCrawler ( Crawler ):
+    """
+    This class crawls the user configured domain using a single asyncio event loop instead of a pool of parse threads. \
+    A request waiting for the network does not hold an OS thread, so hundreds of them can be in flight at the same \
+    time. It reuses all the url filtering of Crawler, and therefore builds the same UrlNode tree hierarchy.
+    """
+    # settings which are turned off, as the pages are downloaded by the http client of the event loop rather than \
+    # by a Fetcher (a replay runs on parse threads, see api.create_crawler)
+    UNSUPPORTED_SETTINGS = { ARCHIVE_PATH: None, REPLAY_PATH: None }
+
+    def __init__ ( self, cfg=None, fetcher=None, on_record=None ):
+        """
+        :param cfg: configuration of the crawl (dictionary / None for dflt_cfg.DFLT_CFG), see Crawler
+        :param fetcher: Fetcher shared with other crawls, only used for robots.txt and sitemaps, as the pages \
+                        are downloaded by the http client of the event loop (None for a Fetcher of this crawl)
+        :param on_record: see Crawler
+        """
+        cfg = dict ( cfg if cfg is not None else dflt_cfg.DFLT_CFG )
+        for setting, value in self.UNSUPPORTED_SETTINGS.items ( ):
+            if cfg.get ( setting, value ) != value:
+                logging.getLogger ( __name__ ).warning ( "Setting {0} is not supported by the async engine: it is "
+                                                         "turned off".format ( setting ) )
+                cfg[ setting ] = value
+
+        super ( ).__init__ ( cfg, fetcher, on_record )
+
+        # maximum number of page requests which can be in flight at the same time
+        self.max_concurrency = max ( 1, self.cfg[ MAX_CONCURRENCY ] )
+
+        # non-blocking http client used to download pages over persistent connections. Its connections belong \
+        # to the event loop of this crawl, so it cannot be shared with other crawls.
+        self.http_client = AsyncHttpClient ( timeout=self.cfg.get ( TIMEOUT ),
+                                             proxies=self.cfg.get ( SYSTEM_PROXY ),
+                                             pool_size=self.cfg[ POOL_SIZE ],
+                                             idle_timeout=self.cfg[ POOL_IDLE_TIMEOUT ],
+                                             stats=self.stats )
+
+    def start_url_parsing ( self ):
+        """
+        Initialize new_urls_queue with domain_name and crawl the whole domain on an event loop. \
+        This function returns once the domain has been completely crawled.
+        :return:
+        """
+        self.init_frontier ( )
+        self.start_monitor ( )
+
+        asyncio.run ( self.parse_site_urls_async ( ) )
+
+    def release_urlparse_resources ( self ):
+        """
+        The event loop has already finished in start_url_parsing, so there is nothing to wait for.
+        :return: the root of UrlNode tree hierarchy (an instance of UrlNode)
+        """
+        return self.release_crawl_resources ( )
+
+    def get_connection_pool ( self ):
+        """
+        :return: the http client of the event loop, which keeps its own persistent connections (AsyncHttpClient)
+        """
+        return self.http_client
+
+    async def parse_site_urls_async ( self ):
+        """
+        Keeps up to max_concurrency urlnodes of self.frontier being parsed concurrently. The crawl is \
+        finished when the frontier is empty and no page is being parsed anymore (nothing can enqueue new urlnodes then).
+        :return:
+        """
+        try:
+            await self.run_parse_tasks ( )
+        finally:
+            # idle connections have to be closed while the event loop is still running
+            self.http_client.close ( )
+
+    async def run_parse_tasks ( self ):
+        """
+        Starts a parse task for every new urlnode as long as less than max_concurrency tasks are running.
+        :return:
+        """
+        # asyncio tasks which are currently parsing a page
+        in_flight = set ( )
+
+        while True:
+            # start parsing as many new urlnodes as the concurrency limit allows
+            while len ( in_flight ) < self.max_concurrency:
+                frontier_entry = self.frontier.get_nowait ( )
+                if not frontier_entry: break
+
+                in_flight.add ( asyncio.ensure_future ( self.parse_urlnode_async ( *frontier_entry ) ) )
+
+            if self.frontier.is_finished ( ): break
+
+            # wait until at least one page is parsed, as it might have enqueued new urlnodes
+            _, in_flight = await asyncio.wait ( in_flight, return_when=asyncio.FIRST_COMPLETED )
+
+    async def parse_urlnode_async ( self, new_url_node, depth ):
+        """
+        Event loop counterpart of Crawler.parse_urlnode: unless new_url_node has already been visited, it links \
+        all the valid child urlnodes of its page as its children and puts them into self.frontier.
+        :param new_url_node: an instance of UrlNode fetched from self.frontier
+        :param depth: number of clicks between the domain root and new_url_node (int)
+        :return:
+        """
+        try:
+            if not self.update_visited_urlnodes_if_newurlnode ( new_url_node ): return
+
+            async for child_urlnode in self.find_valid_urlchildnodes_in_urlpage_async ( new_url_node.url ):
+                self.link_child_urlnode ( new_url_node, child_urlnode, depth + 1 )
+
+            self.record_parsed_urlnode ( new_url_node )
+        finally:
+            # children of new_url_node (if any) are in the frontier now
+            self.frontier.task_done ( )
+
+    async def fetch_page_async ( self, url, method='GET', headers=None ):
+        """
+        Event loop counterpart of Crawler.fetch_page.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: extra headers of the request (dictionary / None)
+        :return: an instance of AsyncFetchResponse (the last one if the request has been retried)
+        """
+        if not self.scheduler:
+            return await self.http_client.fetch ( url, method, headers )
+
+        attempt = 0
+        while True:
+            start = time.perf_counter ( )
+            host_key = await self.scheduler.acquire_async ( url )
+            self.stats.add_time ( 'polite_wait', time.perf_counter ( ) - start )
+            start = time.monotonic ( )
+            try:
+                response = await self.http_client.fetch ( url, method, headers )
+            except (http.client.HTTPException, OSError) as err:
+                if not self.scheduler.release ( host_key, None, time.monotonic ( ) - start, attempt=attempt ):
+                    raise
+                self.logger.warning ( "URL {0} cannot be open. Error: {1}. Retrying".format ( url, err ) )
+            except BaseException:
+                self.scheduler.cancel ( host_key )
+                raise
+            else:
+                if not self.scheduler.release ( host_key, response.getcode ( ), time.monotonic ( ) - start,
+                                                response.headers.get ( 'Retry-After' ), attempt ):
+                    return response
+                await response.close ( )
+                self.logger.warning ( "URL {0} is throttled. Response code: {1}. Retrying".format (
+                    url, response.getcode ( ) ) )
+
+            attempt += 1
+
+    async def find_valid_urlchildnodes_in_urlpage_async ( self, url ):
+        """
+        Event loop counterpart of Crawler.find_valid_urlchildnodes_in_urlpage.
+        :param url: str
+        :return: an async generator of instances of valid child UrlNodes for given url
+        """
+        if self.is_trap_url ( url ): return
+
+        method = self.get_request_method ( url )
+        cached_page = self.get_cached_page ( url, method )
+        try:
+            response = await self.fetch_page_async ( url, method, PageCache.get_conditional_headers ( cached_page ) )
+
+            if method == 'HEAD' and self.is_get_needed_after_head ( response ):
+                await response.close ( )
+                method = 'GET'
+                response = await self.fetch_page_async ( url )
+
+        except Exception as err:
+            self.stats.count_error ( err )
+            self.logger.error ( "URL {0} cannot be open. Error: {1}".format ( url, err ) )
+            self.record_link_result ( url, error=err, method=method )
+            return
+
+        self.record_link_result ( url, response, method=method )
+
+        if response.getcode ( ) == 304 and cached_page:  # page has not changed since it was cached
+            await response.close ( )
+            for child_urlnode in self.get_cached_urlnodes ( url, cached_page ):
+                yield child_urlnode
+            return
+
+        if response.getcode ( ) != 200:  # if response status is not Ok (e.g; asked url is dead or broken)
+            await response.close ( )
+            self.logger.error ( "URL {0} cannot be open. Response code: {1}".format ( url, response.getcode ( ) ) )
+            return
+
+        if not self.is_html_response ( response ):
+            # images, documents, ... are leaves of the sitemap: their body is not downloaded
+            await response.close ( )
+            self.count_skipped_body ( 'non_html' )
+            return
+
+        self.record_page ( url, response )
+
+        # links are resolved against the final url of the page (after redirects)
+        link_extractor = LinkExtractor ( response.url, response.headers.get_content_charset ( ) )
+
+        # all the links of the page, if they have to be cached (None otherwise)
+        page_links = [ ] if self.is_page_cacheable ( url, response ) else None
+
+        # the body and the links of the page, if it has to be compared with the pages already parsed (None otherwise)
+        held_page = ([ ], [ ]) if self.trap_detector else None
+
+        # seconds spent reading the body and extracting its links, recorded once per page
+        download_time = parse_time = 0.0
+        received_size = 0
+        try:
+            while True:
+                start = time.perf_counter ( )
+                chunk = await response.read ( min ( self.CHUNK_SIZE, self.max_body_size - received_size ) )
+                read_end = time.perf_counter ( )
+                download_time += read_end - start
+                if not chunk: break
+                links = link_extractor.feed ( chunk )
+                parse_time += time.perf_counter ( ) - read_end
+                if page_links is not None: page_links.extend ( links )
+                if held_page:
+                    held_page[ 0 ].append ( chunk )
+                    held_page[ 1 ].extend ( links )
+                else:
+                    for child_urlnode in self.get_acceptable_urlnodes ( links, url ):
+                        yield child_urlnode
+
+                received_size += len ( chunk )
+                if received_size >= self.max_body_size:
+                    self.log_truncated_body ( url )
+                    break
+        except Exception as err:
+            self.stats.count_error ( err )
+            self.logger.error ( "URL {0} cannot be read. Error: {1}".format ( url, err ) )
+            page_links = None  # the links of a page which has not been completely read are not cached
+        finally:
+            await response.close ( )
+
+        start = time.perf_counter ( )
+        links = link_extractor.close ( )
+        self.stats.add_time ( 'parse', parse_time + time.perf_counter ( ) - start )
+        self.stats.add_time ( 'download', download_time )
+        self.stats.add_bytes ( received_size )
+        if page_links is not None:
+            self.cache_page ( url, response, page_links + links )
+        if held_page:
+            links = self.get_expanded_links ( url, response, held_page[ 0 ], held_page[ 1 ] + links )
+        for child_urlnode in self.get_acceptable_urlnodes ( links, url ):
+            yield child_urlnode
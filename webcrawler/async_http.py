@@ -0,0 +1,566 @@
+# References:
+# 1. Hypertext Transfer Protocol (HTTP/1.1): Message Syntax and Routing: https://tools.ietf.org/html/rfc7230
+# 2. https://docs.python.org/3/library/asyncio-stream.html
+
+import asyncio
+import email.parser
+import http.client
+import socket
+import ssl
+import time
+from urllib.parse import urljoin, urlsplit
+
+from .fetcher import get_proxy
+
+
+class AsyncHttpResponse:
+    """
+    This class holds a completely downloaded HTTP response
+    """
+    def __init__ ( self, url, status, headers, body ):
+        """
+        :param url: final url of the response after following redirects (str)
+        :param status: HTTP status code (int)
+        :param headers: response headers (http.client.HTTPMessage)
+        :param body: response body (bytes)
+        """
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def getcode ( self ):
+        """
+        Returns the HTTP status code, the same way a urllib response does.
+        :return: int
+        """
+        return self.status
+
+
+class AsyncFetchResponse:
+    """
+    This class is a HTTP response whose body is read on demand; it is the event loop counterpart of \
+    fetcher.FetchResponse. Its connection goes back to the AsyncHttpClient as soon as the body has been \
+    completely read, or when the response is closed.
+    """
+    # unread body up to this size is drained on close, so that the connection can still be reused
+    MAX_DRAIN_SIZE = 64 * 1024
+
+    # size of the pieces in which read(amt=None) reads a whole body
+    READ_SIZE = 64 * 1024
+
+    def __init__ ( self, url, status, headers, client, host_key, connection, keep_alive, method='GET' ):
+        """
+        :param url: url of the response (str)
+        :param status: HTTP status code (int)
+        :param headers: response headers (http.client.HTTPMessage)
+        :param client: AsyncHttpClient which owns connection
+        :param host_key: (scheme, host, port) tuple of connection
+        :param connection: an instance of AsyncConnection whose response head has just been read
+        :param keep_alive: whether connection can be reused once the body has been read (bool)
+        :param method: method of the request; the response to a HEAD request has no body (str)
+        """
+        self.url = url
+        self.status = status
+        self.headers = headers
+
+        # urls which have redirected to this response, with their status codes (list of 2-tuples (str, int))
+        self.redirects = [ ]
+
+        self.client = client
+        self.host_key = host_key
+        self.connection = connection
+        self.keep_alive = keep_alive
+
+        # body framing: chunked transfer coding, known length (remaining bytes) or until the connection closes
+        self.is_chunked = 'chunked' in headers.get ( 'Transfer-Encoding', '' ).lower ( )
+        self.chunk_left = None
+        content_length = headers.get ( 'Content-Length' )
+        self.remaining = int ( content_length ) if content_length and not self.is_chunked else None
+
+        if status in (204, 304) or self.remaining == 0 or method == 'HEAD':
+            self.release_connection ( )
+
+    def getcode ( self ):
+        """
+        Returns the HTTP status code, the same way a urllib response does.
+        :return: int
+        """
+        return self.status
+
+    def is_complete ( self ):
+        """
+        :return: True once the whole body has been read or the response has been closed (bool)
+        """
+        return self.connection is None
+
+    async def read ( self, amt=None ):
+        """
+        Reads the bytes of the body which are available, up to amt bytes (whole remaining body if amt is None). \
+        It returns b'' at the end of the body.
+        :param amt: int / None
+        :return: bytes
+        """
+        if amt is not None:
+            return await asyncio.wait_for ( self.read_some ( amt ), timeout=self.client.timeout )
+
+        pieces = [ ]
+        while not self.is_complete ( ):
+            pieces.append ( await asyncio.wait_for ( self.read_some ( self.READ_SIZE ), timeout=self.client.timeout ) )
+        return b''.join ( pieces )
+
+    async def read_some ( self, amt ):
+        """
+        :param amt: maximum number of bytes to read (int)
+        :return: bytes
+        """
+        if self.is_complete ( ): return b''
+
+        reader = self.connection.reader
+        try:
+            if self.is_chunked:
+                data = await self.read_chunked ( reader, amt )
+            elif self.remaining is not None:
+                data = await reader.read ( min ( amt, self.remaining ) )
+                if not data:
+                    raise http.client.IncompleteRead ( b'', self.remaining )
+                self.remaining -= len ( data )
+                if not self.remaining: self.release_connection ( )
+            else:
+                # no framing information: body ends when the server closes the connection
+                data = await reader.read ( amt )
+                if not data: self.release_connection ( )
+        except BaseException:
+            self.abort ( )
+            raise
+
+        return data
+
+    async def read_chunked ( self, reader, amt ):
+        """
+        Reads the next piece of a body sent with the chunked transfer coding.
+        :param reader: asyncio.StreamReader
+        :param amt: maximum number of bytes to read (int)
+        :return: bytes
+        """
+        if not self.chunk_left:
+            size_line = await reader.readline ( )
+            if not size_line:
+                raise http.client.IncompleteRead ( b'' )
+            self.chunk_left = int ( size_line.split ( b';', 1 )[ 0 ].strip ( ) or b'0', 16 )
+
+            if not self.chunk_left:
+                # last chunk: skip optional trailer headers
+                while (await reader.readline ( )) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.release_connection ( )
+                return b''
+
+        data = await reader.read ( min ( amt, self.chunk_left ) )
+        if not data:
+            raise http.client.IncompleteRead ( b'', self.chunk_left )
+
+        self.chunk_left -= len ( data )
+        if not self.chunk_left:
+            await reader.readline ( )  # CRLF after each chunk
+
+        return data
+
+    async def close ( self ):
+        """
+        Closes the response. A small unread body is drained, so that the connection can be reused.
+        :return:
+        """
+        if self.is_complete ( ): return
+
+        if self.remaining is not None and self.remaining <= self.MAX_DRAIN_SIZE:
+            try:
+                await self.read ( )
+            except (http.client.HTTPException, OSError, asyncio.TimeoutError):
+                pass
+
+        self.abort ( )
+
+    def abort ( self ):
+        """
+        Closes the connection without reading the rest of the body.
+        :return:
+        """
+        if self.connection is None: return
+        self.connection.close ( )
+        self.connection = None
+
+    def release_connection ( self ):
+        """
+        Hands the connection back to the client if it can be reused, otherwise closes it.
+        :return:
+        """
+        if self.connection is None: return
+
+        if self.keep_alive:
+            self.client.put_idle_connection ( self.host_key, self.connection )
+        else:
+            self.connection.close ( )
+
+        self.connection = None
+
+
+class AsyncConnection:
+    """
+    This class holds the streams of an open (keep-alive) connection of AsyncHttpClient
+    """
+    def __init__ ( self, reader, writer ):
+        """
+        :param reader: asyncio.StreamReader
+        :param writer: asyncio.StreamWriter
+        """
+        self.reader = reader
+        self.writer = writer
+
+        # True when requests are sent to a http proxy, which expects absolute urls as request targets
+        self.is_http_proxy = False
+
+        # Proxy-Authorization header value sent along with the requests to a http proxy (str / None)
+        self.proxy_auth = None
+
+    def close ( self ):
+        self.writer.close ( )
+
+
+class AsyncHttpClient:
+    """
+    This class is a minimal HTTP/1.1 client built on top of asyncio streams. Unlike urllib, it never blocks \
+    the calling thread, which allows a single event loop to keep hundreds of requests in flight. Like \
+    fetcher.ConnectionPool, it keeps idle persistent connections per host to avoid repeated handshakes.
+    """
+    # Redirect status codes followed by the client (urllib follows the same ones)
+    REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+    # Same limit as urllib.request.HTTPRedirectHandler.max_redirections
+    MAX_REDIRECTS = 10
+
+    # Because of mod_security or some similar server security feature, server can block clients \
+    # based on the user agent (see fetcher.Fetcher).
+    USER_AGENT = "Mozilla/5.0"
+
+    def __init__ ( self, timeout=None, proxies=None, pool_size=10, idle_timeout=30, stats=None ):
+        """
+        :param timeout: network timeout in seconds for a complete request (int / None)
+        :param proxies: SYSTEM_PROXY setting (dictionary / None), see fetcher.get_proxy
+        :param pool_size: maximum number of idle connections kept per host (int)
+        :param idle_timeout: seconds after which an idle connection is not reused anymore (int)
+        :param stats: CrawlStats in which the requests are timed and their status codes counted (None for no stats)
+        """
+        # a timeout of 0 (or None) means wait as long as it takes
+        self.timeout = timeout or None
+        self.proxies = proxies
+        self.max_idle_per_host = pool_size
+        self.idle_timeout = idle_timeout
+        self.stats = stats
+
+        # urllib verifies server certificates by default; do the same
+        self.ssl_context = ssl.create_default_context ( )
+
+        # idle connections per host. Format is: {(scheme, host, port): [(AsyncConnection, released_at), ...]}
+        # No lock is needed as it is only used from the event loop thread.
+        self.idle_connections = dict ( )
+
+        # counters used to report the connection reuse ratio
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    async def get ( self, url ):
+        """
+        Downloads url (following redirects) and returns the complete response.
+        :param url: str
+        :return: an instance of AsyncHttpResponse
+        """
+        response = await self.fetch ( url )
+        try:
+            body = await response.read ( )
+        finally:
+            await response.close ( )
+
+        return AsyncHttpResponse ( response.url, response.status, response.headers, body )
+
+    async def fetch ( self, url, method='GET', headers=None ):
+        """
+        Sends a request for url (following redirects) and returns the response once its headers are received.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: extra headers of the request of url, they are not sent to the redirect targets (dictionary)
+        :return: an instance of AsyncFetchResponse
+        """
+        return await asyncio.wait_for ( self._fetch_following_redirects ( url, method, headers ),
+                                        timeout=self.timeout )
+
+    async def _fetch_following_redirects ( self, url, method, headers=None ):
+        """
+        Requests url and keeps following the Location header of redirect responses.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: extra headers of the request of url (dictionary / None)
+        :return: an instance of AsyncFetchResponse, whose redirects are the redirect chain which has led to it
+        """
+        redirects = [ ]
+        for _ in range ( self.MAX_REDIRECTS + 1 ):
+            response = await self.request ( url, method, headers )
+
+            location = response.headers.get ( 'Location' )
+            if response.status not in self.REDIRECT_CODES or not location:
+                response.redirects = redirects
+                return response
+
+            await response.close ( )
+            redirects.append ( (url, response.status) )
+            url = urljoin ( url, location )
+            headers = None
+
+        raise http.client.HTTPException ( "URL {0} exceeded {1} redirects".format ( url, self.MAX_REDIRECTS ) )
+
+    async def request ( self, url, method='GET', headers=None ):
+        """
+        Sends a single request for url and reads the response head. A request which fails on a reused \
+        connection (the server may have closed it in the meantime) is retried once on a new connection.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: extra headers of the request (dictionary / None)
+        :return: an instance of AsyncFetchResponse
+        """
+        split_url = urlsplit ( url )
+        if split_url.scheme not in ('http', 'https'):
+            raise ValueError ( "unsupported url scheme: {0}".format ( split_url.scheme ) )
+        host_key = (split_url.scheme, split_url.hostname, split_url.port)
+
+        self.requests_sent += 1
+        connection = self.get_idle_connection ( host_key )
+        is_reused = connection is not None
+        try:
+            if not connection:
+                connection = await self.new_connection ( url )
+            response_head = await self.send_request ( connection, url, method, headers )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            if connection: connection.close ( )
+            if not is_reused: raise
+
+            connection = await self.new_connection ( url )
+            try:
+                response_head = await self.send_request ( connection, url, method, headers )
+            except BaseException:
+                connection.close ( )
+                raise
+        except BaseException:
+            if connection: connection.close ( )
+            raise
+
+        status, headers, keep_alive = response_head
+        return AsyncFetchResponse ( url, status, headers, self, host_key, connection, keep_alive, method )
+
+    def get_idle_connection ( self, host_key ):
+        """
+        Returns an idle connection to host_key which has not expired, if there is one.
+        :param host_key: (scheme, host, port) tuple
+        :return: an instance of AsyncConnection / None
+        """
+        now = time.monotonic ( )
+        idle = self.idle_connections.get ( host_key )
+        while idle:
+            # the most recently used connection is the least likely to have been closed by the server
+            connection, released_at = idle.pop ( )
+            if now - released_at < self.idle_timeout and not connection.reader.at_eof ( ):
+                return connection
+            connection.close ( )
+
+        return None
+
+    def put_idle_connection ( self, host_key, connection ):
+        """
+        Keeps a connection whose response has been completely read, to be reused by a later request.
+        :param host_key: (scheme, host, port) tuple
+        :param connection: an instance of AsyncConnection
+        :return:
+        """
+        idle = self.idle_connections.setdefault ( host_key, [ ] )
+        if len ( idle ) < self.max_idle_per_host:
+            idle.append ( (connection, time.monotonic ( )) )
+        else:
+            connection.close ( )
+
+    async def new_connection ( self, url ):
+        """
+        Opens a new connection to the host of url, going through the configured proxy if any.
+        :param url: str
+        :return: an instance of AsyncConnection
+        """
+        split_url = urlsplit ( url )
+        is_https = split_url.scheme == 'https'
+        port = split_url.port or (443 if is_https else 80)
+
+        proxy = get_proxy ( url, self.proxies )
+        if not proxy:
+            reader, writer = await self.open_timed_connection ( split_url.hostname, port, is_https )
+            self.connections_opened += 1
+            return AsyncConnection ( reader, writer )
+
+        proxy_host, proxy_port, proxy_auth = proxy
+        reader, writer = await self.open_timed_connection ( proxy_host, proxy_port )
+        self.connections_opened += 1
+        connection = AsyncConnection ( reader, writer )
+
+        if not is_https:
+            connection.is_http_proxy = True
+            connection.proxy_auth = proxy_auth
+            return connection
+
+        # https goes through a CONNECT tunnel, TLS is then negotiated with the real host
+        try:
+            authority = "{0}:{1}".format ( split_url.hostname, port )
+            connect_head = "CONNECT {0} HTTP/1.1\r\nHost: {0}\r\n".format ( authority )
+            if proxy_auth:
+                connect_head += "Proxy-Authorization: {0}\r\n".format ( proxy_auth )
+            writer.write ( (connect_head + "\r\n").encode ( 'ascii' ) )
+            await writer.drain ( )
+
+            _, status, _ = await self.read_response_head ( reader )
+            if status != 200:
+                raise OSError ( "Tunnel connection failed: {0}".format ( status ) )
+
+            await writer.start_tls ( self.ssl_context, server_hostname=split_url.hostname )
+        except BaseException:
+            connection.close ( )
+            raise
+
+        return connection
+
+    async def open_timed_connection ( self, host, port, is_https=False ):
+        """
+        Same as asyncio.open_connection, but the addresses of the host are resolved first, so that the time of \
+        the DNS lookup is measured apart from the time to connect (TLS handshake included).
+        :param host: str
+        :param port: int
+        :param is_https: negotiate TLS with host once connected (bool)
+        :return: a 2-tuple (asyncio.StreamReader, asyncio.StreamWriter)
+        """
+        start = time.perf_counter ( )
+        addresses = await asyncio.get_running_loop ( ).getaddrinfo ( host, port, type=socket.SOCK_STREAM )
+        resolved = time.perf_counter ( )
+
+        error = OSError ( "getaddrinfo returns an empty list" )
+        for _, _, _, _, socket_address in addresses:
+            try:
+                streams = await asyncio.open_connection ( socket_address[ 0 ], port,
+                                                          ssl=self.ssl_context if is_https else None,
+                                                          server_hostname=host if is_https else None )
+                break
+            except OSError as err:
+                error = err
+        else:
+            raise error
+
+        if self.stats:
+            self.stats.add_time ( 'dns', resolved - start )
+            self.stats.add_time ( 'connect', time.perf_counter ( ) - resolved )
+        return streams
+
+    async def send_request ( self, connection, url, method='GET', headers=None ):
+        """
+        Sends a request for url over connection and reads the response head.
+        :param connection: an instance of AsyncConnection
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: headers sent on top of the default ones (dictionary / None)
+        :return: a 3-tuple (status code (int), headers (http.client.HTTPMessage), \
+                 whether the connection can be reused once the body is read (bool))
+        """
+        split_url = urlsplit ( url )
+        if connection.is_http_proxy:
+            target = url
+            extra_headers = "Proxy-Authorization: {0}\r\n".format ( connection.proxy_auth ) \
+                if connection.proxy_auth else ""
+        else:
+            target = (split_url.path or '/') + ('?' + split_url.query if split_url.query else '')
+            extra_headers = ""
+
+        if headers:
+            extra_headers += "".join ( "{0}: {1}\r\n".format ( name, value ) for name, value in headers.items ( ) )
+
+        request_head = "{0} {1} HTTP/1.1\r\nHost: {2}\r\nUser-Agent: {3}\r\n" \
+                       "Accept-Encoding: identity\r\n{4}\r\n".format ( method, target, split_url.netloc,
+                                                                       self.USER_AGENT, extra_headers )
+        start = time.perf_counter ( )
+        connection.writer.write ( request_head.encode ( 'ascii' ) )
+        await connection.writer.drain ( )
+
+        version, status, headers = await self.read_response_head ( connection.reader )
+        if self.stats:
+            self.stats.add_time ( 'ttfb', time.perf_counter ( ) - start )
+            self.stats.count_response ( status )
+
+        connection_header = headers.get ( 'Connection', '' ).lower ( )
+        keep_alive = 'close' not in connection_header and \
+                     (version == 'HTTP/1.1' or 'keep-alive' in connection_header) and \
+                     (method == 'HEAD' or self.is_body_delimited ( status, headers ))
+
+        return status, headers, keep_alive
+
+    def get_reuse_ratio ( self ):
+        """
+        Returns the share of requests which have been sent over an already open connection.
+        :return: float (0.0 <= ratio <= 1.0)
+        """
+        if not self.requests_sent: return 0.0
+        return max ( 0.0, 1.0 - self.connections_opened / self.requests_sent )
+
+    def close ( self ):
+        """
+        Closes all the idle connections. It has to be called before the event loop stops.
+        :return:
+        """
+        for idle in self.idle_connections.values ( ):
+            for connection, _ in idle:
+                connection.close ( )
+        self.idle_connections.clear ( )
+
+    @staticmethod
+    def is_body_delimited ( status, headers ):
+        """
+        Returns True if the end of the body is known without the server closing the connection.
+        :param status: HTTP status code (int)
+        :param headers: response headers (http.client.HTTPMessage)
+        :return: bool
+        """
+        return status in (204, 304) or 'Content-Length' in headers or \
+               'chunked' in headers.get ( 'Transfer-Encoding', '' ).lower ( )
+
+    @staticmethod
+    async def read_response_head ( reader ):
+        """
+        Reads the status line and the headers of a response.
+        :param reader: asyncio.StreamReader
+        :return: a 3-tuple (HTTP version (str), status code (int), headers (http.client.HTTPMessage))
+        """
+        while True:
+            status_line = await reader.readline ( )
+            if not status_line:
+                raise http.client.RemoteDisconnected ( "Remote end closed connection without response" )
+
+            try:
+                version, status, _ = (status_line.decode ( 'iso-8859-1' ).rstrip ( '\r\n' ) + ' ').split ( ' ', 2 )
+                status = int ( status )
+            except ValueError:
+                raise http.client.BadStatusLine ( status_line )
+
+            header_lines = [ ]
+            while True:
+                line = await reader.readline ( )
+                if line in (b'\r\n', b'\n', b''): break
+                header_lines.append ( line )
+
+            # informational (1xx) responses are followed by the real response
+            if status >= 200: break
+
+        # same header parsing as http.client.parse_headers
+        header_text = b''.join ( header_lines ).decode ( 'iso-8859-1' )
+        headers = email.parser.Parser ( _class=http.client.HTTPMessage ).parsestr ( header_text )
+
+        return version, status, headers
@@ -0,0 +1,403 @@
+import collections
+import itertools
+import json
+import logging
+import operator
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import dflt_cfg
+from .app_constant import *
+from .crawler import Crawler
+from .crawlstats import CrawlMonitor, CrawlStats
+from .fetcher import Fetcher
+from .frontier import Frontier
+from .urlparse import UrlTree
+
+
+class DomainCrawler ( Crawler ):
+    """
+    This class crawls one domain of a BatchCrawler: it is created and its pages are parsed by the worker threads \
+    of the batch, its frontier shares the condition of the batch, and its statistics are the ones of the batch.
+    """
+
+    def __init__ ( self, batch, cfg ):
+        """
+        :param batch: the BatchCrawler crawling this domain
+        :param cfg: configuration of the crawl of this domain (dictionary), see Crawler
+        """
+        # the frontier and the statistics are opened by Crawler.__init__, with the condition and the statistics of \
+        # the batch
+        self.batch = batch
+        super ( ).__init__ ( cfg, batch.fetcher )
+
+        # sequence number of the last urlnode handed out to a worker thread of the batch (see BatchCrawler)
+        self.last_claim = 0
+
+        # time at which the crawl of the domain has started (see time.monotonic)
+        self.start = time.monotonic ( )
+
+        # outcome of the crawl of the domain, set by the batch (dict, see BatchCrawler.results)
+        self.result = None
+
+    def open_frontier ( self ):
+        """
+        Creates the frontier of the domain, which wakes up the worker threads of the batch.
+        :return: an instance of Frontier
+        """
+        return Frontier ( order=self.cfg[ FRONTIER_ORDER ],
+                          max_depth=self.cfg[ MAX_DEPTH ],
+                          max_pages=self.cfg[ MAX_PAGES ],
+                          max_time=self.cfg[ MAX_TIME ],
+                          key=operator.attrgetter ( 'url_id' ),
+                          condition=self.batch.condition )
+
+    def open_crawl_stats ( self ):
+        """
+        The requests of the domain (robots.txt included) are counted in the statistics of the batch.
+        :return: an instance of CrawlStats
+        """
+        return self.batch.stats
+
+    def close_crawl_stats ( self ):
+        """
+        The statistics of the batch are closed once all of its domains have been crawled.
+        :return:
+        """
+
+
+class BatchCrawler:
+    """
+    This class crawls many domains in one process, with one pool of worker threads and one Fetcher (and so one \
+    pool of persistent connections) for all of them. NUM_THREADS is the number of pages parsed at once over all \
+    the domains. The domains are started by the worker threads too (their robots.txt and XML sitemaps are read \
+    then), before any page is handed out, so that a domain whose host does not answer only holds one worker. \
+    A worker thread always takes the next urlnode of the domain which has the fewest pages being \
+    parsed (the one served least recently among equals), so that every domain gets its share of the workers \
+    while no worker stays idle as long as a domain has urls left. A domain is finished as soon as its frontier \
+    is; its sitemap is written in its own output file right away and its urlnodes are freed.
+    """
+    # settings which are not supported with several domains, and the values which turn them off
+    UNSUPPORTED_SETTINGS = { CHECKPOINT_PATH: None, CACHE_PATH: None, ENGINE: 'thread', PROCESSES: 1,
+                             FRONTIER_ADDRESS: None, LINK_REPORT_PATH: None, GRAPH_PATH: None,
+                             ARCHIVE_PATH: None, MEMORY_BUDGET: None }
+
+    def __init__ ( self, domain_names, cfg=None, fetcher=None ):
+        """
+        :param domain_names: domains to crawl (list of str)
+        :param cfg: configuration of the crawls (dictionary / None for dflt_cfg.DFLT_CFG): the output file of a \
+                    domain is named after its host, next to OUTPUT_PATH
+        :param fetcher: Fetcher shared with other crawls, which is not closed at the end of the batch \
+                        (None for a Fetcher of the batch)
+        """
+        self.logger = logging.getLogger ( __name__ )
+
+        cfg = dict ( cfg if cfg is not None else dflt_cfg.DFLT_CFG )
+        for setting, value in self.UNSUPPORTED_SETTINGS.items ( ):
+            if cfg.get ( setting, value ) != value:
+                self.logger.warning ( "Setting {0} is not supported with several domains: it is turned off".format (
+                    setting ) )
+                cfg[ setting ] = value
+        self.cfg = cfg
+
+        # it guards the list of the domains being crawled and the counters below, and it is the condition of all \
+        # their frontiers: a worker thread waiting for a urlnode wakes up whenever any of them changes
+        self.condition = threading.Condition ( threading.RLock ( ) )
+
+        # number of worker threads parsing pages, over all the domains
+        self.NUM_PARSE_THREADS = self.cfg[ NUM_THREADS ]
+        self.parse_th_list = [ ]
+
+        # times every stage of the crawls of all the domains and counts their responses per status code
+        self.stats = CrawlStats ( )
+        self.monitor = None
+
+        self.is_fetcher_owned = fetcher is None
+        self.fetcher = fetcher if fetcher is not None else Fetcher ( timeout=self.cfg.get ( TIMEOUT ),
+                                                                     proxies=self.cfg.get ( SYSTEM_PROXY ),
+                                                                     pool_size=self.cfg[ POOL_SIZE ],
+                                                                     idle_timeout=self.cfg[ POOL_IDLE_TIMEOUT ],
+                                                                     stats=self.stats )
+
+        # sequence numbers of the urlnodes handed out to the worker threads
+        self.claims = itertools.count ( 1 )
+
+        # counters of the frontiers of the domains which are finished
+        self.finished_frontier = Frontier ( )
+
+        # outcome of the crawl of every domain, in the order of domain_names. Format is: {'domain': str, \
+        # 'output_path': str, 'pages': int, 'seconds': float, 'budget_exhausted': str / None, 'error': str / None}
+        self.results = [ ]
+
+        # domains waiting to be started by a worker thread (see start_domain), in the order of domain_names. \
+        # Format is: deque([(domain_str, output_path_str, result_dict), ...])
+        self.pending_domains = collections.deque ( )
+
+        # number of domains being started by the worker threads
+        self.num_starting = 0
+
+        # domains being crawled (DomainCrawler each)
+        self.crawlers = [ ]
+        domain_roots, used_names = set ( ), set ( )
+        for domain_name in domain_names:
+            domain_root = Crawler.get_domain_name ( domain_name )
+            if domain_root in domain_roots: continue
+            domain_roots.add ( domain_root )
+
+            output_path = self.get_domain_output_path ( self.cfg[ OUTPUT_PATH ], domain_root, used_names )
+            result = { 'domain': domain_root, 'output_path': output_path, 'pages': 0, 'seconds': 0.0,
+                       'budget_exhausted': None, 'error': None }
+            self.results.append ( result )
+            self.pending_domains.append ( (domain_root, output_path, result) )
+
+    @staticmethod
+    def read_domains_file ( domains_path ):
+        """
+        Reads the domains to crawl from a text file: one domain per line; blank lines and lines starting with \
+        '#' are ignored.
+        :param domains_path: path of the file (str)
+        :return: list of str
+        :raises OSError: if the file cannot be read
+        """
+        with open ( domains_path ) as domains_file:
+            lines = [ line.strip ( ) for line in domains_file ]
+        return [ line for line in lines if line and not line.startswith ( '#' ) ]
+
+    @staticmethod
+    def get_domain_output_path ( output_path, domain_name, used_names ):
+        """
+        Returns the output file of a domain: its host (and port) as file name, with the extension of output_path, \
+        in the directory of output_path.
+        :param output_path: OUTPUT_PATH setting (str)
+        :param domain_name: root url of the domain (str)
+        :param used_names: file names already given to other domains, to which the file name is added (set of str)
+        :return: str
+        """
+        directory, file_name = os.path.split ( output_path )
+        extension = os.path.splitext ( file_name )[ 1 ] or ".txt"
+
+        name = re.sub ( r'[^\w.-]', '_', urlsplit ( domain_name ).netloc ) or "domain"
+        unique_name = name
+        for name_no in itertools.count ( 2 ):
+            if unique_name not in used_names: break
+            unique_name = "{0}_{1}".format ( name, name_no )
+        used_names.add ( unique_name )
+
+        return os.path.join ( directory, unique_name + extension )
+
+    def get_domain_cfg ( self, domain_name, output_path ):
+        """
+        :param domain_name: root url of the domain (str)
+        :param output_path: output file of the domain (str)
+        :return: the configuration of the crawl of a domain (dictionary)
+        """
+        domain_cfg = dict ( self.cfg )
+        domain_cfg.update ( { DOMAIN: domain_name, OUTPUT_PATH: output_path, NUM_THREADS: 0, PROGRESS_INTERVAL: 0,
+                              METRICS_PORT: None, STATS_PATH: None } )
+        return domain_cfg
+
+    def start_domain ( self, domain_name, output_path, result ):
+        """
+        Creates the crawler of a domain, which reads its robots.txt if needed, and initializes its frontier, which \
+        reads its XML sitemaps if needed.
+        :param domain_name: root url of the domain (str)
+        :param output_path: output file of the domain (str)
+        :param result: outcome of the crawl of the domain (dict, see self.results)
+        :return: an instance of DomainCrawler / None if the domain cannot be crawled
+        """
+        try:
+            crawler = DomainCrawler ( self, self.get_domain_cfg ( domain_name, output_path ) )
+            crawler.result = result
+            crawler.init_frontier ( )
+        except Exception as err:
+            self.logger.error ( "Error {0} occurred. Domain {1} cannot be crawled".format ( err, domain_name ) )
+            result[ 'error' ] = str ( err )
+            return None
+        return crawler
+
+    def start_url_parsing ( self ):
+        """
+        Starts the worker threads, which start the domains and then crawl them.
+        :return:
+        """
+        self.monitor = CrawlMonitor ( self.stats, self.get_crawl_stats,
+                                      interval=self.cfg.get ( PROGRESS_INTERVAL ),
+                                      port=self.cfg.get ( METRICS_PORT ) )
+        self.monitor.start ( )
+
+        # if num threads = 0 then do not create any thread and so directly call parse_batch_urls
+        if not self.NUM_PARSE_THREADS:
+            self.parse_batch_urls ( )
+            return
+
+        for _ in range ( self.NUM_PARSE_THREADS ):
+            th = threading.Thread ( target=self.parse_batch_urls )
+            self.parse_th_list.append ( th )
+            th.start ( )
+
+    def release_urlparse_resources ( self ):
+        """
+        Waits for the worker threads, then releases the resources of the batch.
+        :return: the outcome of the crawl of every domain (list of dict, see self.results)
+        """
+        for th in self.parse_th_list:
+            th.join ( )
+
+        if self.is_fetcher_owned:
+            self.fetcher.close ( )
+
+        self.close_crawl_stats ( )
+        return self.results
+
+    def parse_batch_urls ( self ):
+        """
+        Used by the worker threads: starts the next domain waiting to be started, or takes the next urlnode of the \
+        domains (see claim_urlnode) and parses it, and finishes the domains whose crawl is over, until all the \
+        domains are finished.
+        :return:
+        """
+        while True:
+            start = time.perf_counter ( )
+            with self.condition:
+                finished_crawlers, pending_domain, batch_entry = self.get_next_work ( )
+            self.stats.add_time ( 'queue_wait', time.perf_counter ( ) - start )
+
+            for crawler in finished_crawlers:
+                self.finish_domain ( crawler )
+
+            if pending_domain:
+                crawler = self.start_domain ( *pending_domain )
+                with self.condition:
+                    self.num_starting -= 1
+                    if crawler:
+                        self.crawlers.append ( crawler )
+                    # the other worker threads may wait for the urlnodes of this domain, or for the end of the batch
+                    self.condition.notify_all ( )
+                continue
+
+            if batch_entry is None:
+                # thread exits once all the domains are finished
+                if not finished_crawlers: break
+                continue
+
+            crawler, (new_url_node, depth) = batch_entry
+            try:
+                crawler.parse_urlnode ( new_url_node, depth )
+            finally:
+                crawler.frontier.task_done ( )
+
+    def get_next_work ( self ):
+        """
+        Waits until a domain can be started, a urlnode can be handed out or a domain is finished. It has to be \
+        called with self.condition held.
+        :return: a 3-tuple (the domains which are finished, removed from self.crawlers (list of DomainCrawler), \
+                 a domain to start, removed from self.pending_domains (see start_domain) / None, \
+                 (DomainCrawler, (UrlNode, depth)) / None) - all are empty once all the domains are finished
+        """
+        while self.crawlers or self.pending_domains or self.num_starting:
+            finished_crawlers = [ crawler for crawler in self.crawlers
+                                  if crawler.frontier.is_idle ( ) and not crawler.frontier.holds ]
+            if finished_crawlers:
+                self.crawlers = [ crawler for crawler in self.crawlers if crawler not in finished_crawlers ]
+                return finished_crawlers, None, None
+
+            if self.pending_domains:
+                self.num_starting += 1
+                return [ ], self.pending_domains.popleft ( ), None
+
+            batch_entry = self.claim_urlnode ( )
+            if batch_entry:
+                return [ ], None, batch_entry
+
+            # the pages being parsed may discover new urlnodes, and the domains being started add theirs: task_done \
+            # and the threads which have started a domain wake up this thread
+            self.condition.wait ( )
+
+        return [ ], None, None
+
+    def claim_urlnode ( self ):
+        """
+        Hands out a urlnode of the domain which has the fewest pages being parsed, and among them the one which \
+        has been served least recently. It has to be called with self.condition held.
+        :return: a 2-tuple (DomainCrawler, (UrlNode, depth)) / None if no domain has a urlnode left
+        """
+        candidates = [ crawler for crawler in self.crawlers
+                       if crawler.frontier.urlnodes and not crawler.frontier.is_budget_exhausted ( ) ]
+        if not candidates: return None
+
+        crawler = min ( candidates, key=lambda candidate: (candidate.frontier.in_flight, candidate.last_claim) )
+        crawler.last_claim = next ( self.claims )
+        return crawler, crawler.frontier.claim ( )
+
+    def finish_domain ( self, crawler ):
+        """
+        Releases the resources of a domain which is finished, and writes its sitemap tree in its output file \
+        (unless it has been streamed or written as an XML sitemap).
+        :param crawler: an instance of DomainCrawler
+        :return:
+        """
+        urlnode_root = crawler.release_urlparse_resources ( )
+        if not crawler.sitemap_stream and not crawler.xml_sitemap:
+            UrlTree ( urlnode_root, crawler.cfg ).write_sitemap ( )
+
+        frontier_stats = crawler.frontier.get_stats ( )
+        with self.condition:
+            self.finished_frontier.add_stats ( frontier_stats )
+            crawler.result.update ( { 'pages': frontier_stats[ 'claimed' ],
+                                      'seconds': round ( time.monotonic ( ) - crawler.start, 3 ),
+                                      'budget_exhausted': frontier_stats[ 'budget_exhausted' ] } )
+
+    def get_crawl_stats ( self ):
+        """
+        Returns the statistics of the batch so far: the timings per stage and the counters of self.stats, the \
+        counters of the frontiers of all the domains, and the number of domains and pages per second.
+        :return: dict
+        """
+        crawl_stats = self.stats.get_snapshot ( )
+        with self.condition:
+            frontier = Frontier ( )
+            frontier.add_stats ( self.finished_frontier.get_stats ( ) )
+            for crawler in self.crawlers:
+                frontier.add_stats ( crawler.frontier.get_stats ( ) )
+
+            crawl_stats[ 'frontier' ] = frontier.get_stats ( )
+            crawl_stats[ 'domains' ] = {
+                'total': len ( self.results ),
+                'active': len ( self.crawlers ),
+                'failed': sum ( 1 for result in self.results if result[ 'error' ] ),
+            }
+
+        elapsed = crawl_stats[ 'elapsed_seconds' ]
+        crawl_stats[ 'pages_per_second' ] = round ( crawl_stats[ 'frontier' ][ 'claimed' ] / elapsed, 3 ) \
+            if elapsed > 0 else 0.0
+        return crawl_stats
+
+    def close_crawl_stats ( self ):
+        """
+        Stops the monitor of the batch, logs a summary of its statistics, and writes them to a JSON file if the \
+        user asked for it.
+        :return:
+        """
+        if self.monitor:
+            self.monitor.stop ( )
+
+        crawl_stats = self.get_crawl_stats ( )
+        self.logger.info ( "Batch: {0} domains ({1} failed), {2} pages in {3} seconds ({4}/s), {5} responses, status "
+                           "codes: {6}, errors: {7}".format ( crawl_stats[ 'domains' ][ 'total' ],
+                                                              crawl_stats[ 'domains' ][ 'failed' ],
+                                                              crawl_stats[ 'frontier' ][ 'claimed' ],
+                                                              crawl_stats[ 'elapsed_seconds' ],
+                                                              crawl_stats[ 'pages_per_second' ],
+                                                              crawl_stats[ 'responses' ], crawl_stats[ 'status_codes' ],
+                                                              crawl_stats[ 'errors' ] ) )
+
+        stats_path = self.cfg.get ( STATS_PATH )
+        if not stats_path: return
+        try:
+            with open ( stats_path, 'w' ) as stats_file:
+                json.dump ( dict ( crawl_stats, results=self.results ), stats_file, indent=2 )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Statistics {1} cannot be written".format ( err, stats_path ) )
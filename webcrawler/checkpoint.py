@@ -0,0 +1,175 @@
+# References:
+# 1. https://docs.python.org/3/library/os.html#os.fsync
+
+import logging
+import os
+import threading
+import time
+
+
+class CrawlCheckpoint:
+    """
+    This class keeps the progress of a crawl on disk, so that an interrupted crawl can be resumed instead of being \
+    restarted from zero. It is an append-only log of tab separated records, one line per event of the crawl:
+
+    * "E<TAB>depth<TAB>url<TAB>parent url": url has been enqueued in the frontier and linked under parent url in the \
+      sitemap (the parent url of the domain root is empty)
+    * "P<TAB>url<TAB>lastmod": url is a html page of the XML sitemap (lastmod may be empty)
+    * "D<TAB>url": the page of url has been completely parsed (all its E records have been written before)
+
+    Records are buffered and the log is flushed to disk (fsync) at most every interval seconds, so checkpoints cost \
+    a buffered write per url. A crash loses the records of the last interval at most: what is on disk is always a \
+    prefix of the log, which is a consistent state of the crawl (pages without D record are parsed again). \
+    It is thread safe.
+    """
+    # size of the buffer of the log file
+    BUFFER_SIZE = 1024 * 1024
+
+    # kinds of records
+    ENQUEUED = 'E'
+    PAGE = 'P'
+    PARSED = 'D'
+
+    # number of fields of every kind of record
+    RECORD_FIELDS = { ENQUEUED: 4, PAGE: 3, PARSED: 2 }
+
+    def __init__ ( self, path, interval=30, resume=False ):
+        """
+        :param path: path of the log file (str)
+        :param interval: seconds between two flushes of the log to disk (int / float)
+        :param resume: append to the log of a previous crawl instead of starting a new one (bool)
+        """
+        self.logger = logging.getLogger ( __name__ )
+        self.mutex = threading.Lock ( )
+
+        self.path = path
+        self.interval = interval
+
+        # the records of a previous crawl are kept, less a record cut by the crash
+        if resume:
+            self.truncate_incomplete_record ( )
+        self.log_fd = open ( file=path, mode='a' if resume else 'w', encoding='utf-8', newline='\n',
+                             buffering=self.BUFFER_SIZE )
+
+        self.next_checkpoint = time.monotonic ( ) + interval
+
+        # counters
+        self.num_records = 0
+        self.num_checkpoints = 0
+
+    def truncate_incomplete_record ( self ):
+        """
+        Removes the last line of the log if it is incomplete (no trailing newline), so that new records are not \
+        appended to it.
+        :return:
+        """
+        try:
+            log_fd = open ( self.path, 'rb+' )
+        except FileNotFoundError:
+            return
+
+        with log_fd:
+            log_size = log_fd.seek ( 0, os.SEEK_END )
+            end = log_size
+            while end:
+                start = max ( 0, end - self.BUFFER_SIZE )
+                log_fd.seek ( start )
+                newline_pos = log_fd.read ( end - start ).rfind ( b'\n' )
+                if newline_pos >= 0:
+                    end = start + newline_pos + 1
+                    break
+                end = start
+
+            if end != log_size:
+                log_fd.truncate ( end )
+                self.logger.warning ( "Checkpoint {0}: incomplete last record dropped".format ( self.path ) )
+
+    def write ( self, *fields ):
+        """
+        Appends a record to the log and flushes the log to disk if the last checkpoint is older than interval.
+        :param fields: kind of the record, then its values (str)
+        :return:
+        """
+        record = "\t".join ( fields ) + "\n"
+        with self.mutex:
+            self.log_fd.write ( record )
+            self.num_records += 1
+
+            if time.monotonic ( ) >= self.next_checkpoint:
+                self.checkpoint ( )
+
+    def write_enqueued ( self, url_node, depth, parent_node=None ):
+        """
+        :param url_node: an instance of UrlNode which has just been enqueued and linked in the sitemap
+        :param depth: number of clicks between the domain root and url_node (int)
+        :param parent_node: the UrlNode under which url_node is linked (None for the domain root)
+        :return:
+        """
+        self.write ( self.ENQUEUED, str ( depth ), url_node.url, parent_node.url if parent_node else "" )
+
+    def write_page ( self, url, lastmod=None ):
+        """
+        :param url: url of a html page written in the XML sitemap (str)
+        :param lastmod: last modification date of the page (str / None)
+        :return:
+        """
+        self.write ( self.PAGE, url, lastmod or "" )
+
+    def write_parsed ( self, url_node ):
+        """
+        :param url_node: an instance of UrlNode whose page has been completely parsed
+        :return:
+        """
+        self.write ( self.PARSED, url_node.url )
+
+    def checkpoint ( self ):
+        """
+        Flushes the buffered records to disk. It has to be called with self.mutex held.
+        :return:
+        """
+        self.log_fd.flush ( )
+        os.fsync ( self.log_fd.fileno ( ) )
+        self.num_checkpoints += 1
+        self.next_checkpoint = time.monotonic ( ) + self.interval
+
+    @classmethod
+    def read_root_url ( cls, path ):
+        """
+        Returns the url of the domain root of the crawl logged in path (its first record), e.g; to check that a \
+        crawl is resumed from a checkpoint of the same domain.
+        :param path: path of the log file (str)
+        :return: str / None if there is no such log or it has no complete first record
+        """
+        try:
+            with open ( path, encoding='utf-8', newline='\n' ) as log_fd:
+                line = log_fd.readline ( )
+        except (OSError, UnicodeDecodeError):
+            return None
+
+        record = line.rstrip ( "\n" ).split ( "\t" )
+        if not line.endswith ( "\n" ) or record[ 0 ] != cls.ENQUEUED or len ( record ) != cls.RECORD_FIELDS[ cls.ENQUEUED ]:
+            return None
+        return record[ 2 ]
+
+    def read_records ( self ):
+        """
+        Reads the records of the log written so far (by a previous crawl when resuming). Malformed lines are skipped.
+        :return: a generator of records (list of str, the first one being the kind of the record)
+        """
+        with open ( self.path, encoding='utf-8', newline='\n' ) as log_fd:
+            for line_no, line in enumerate ( log_fd, 1 ):
+                record = line.rstrip ( "\n" ).split ( "\t" )
+                if not line.endswith ( "\n" ) or len ( record ) != self.RECORD_FIELDS.get ( record[ 0 ] ):
+                    self.logger.warning ( "Checkpoint {0}: malformed record at line {1}".format ( self.path, line_no ) )
+                    continue
+
+                yield record
+
+    def close ( self ):
+        """
+        Writes the last checkpoint and closes the log.
+        :return:
+        """
+        with self.mutex:
+            self.checkpoint ( )
+            self.log_fd.close ( )
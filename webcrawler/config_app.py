@@ -15,13 +15,14 @@ class UserConfig:
         self.logger = logging.getLogger ( __name__ )
 
     @staticmethod
-    def set_app_config ( ):
+    def set_app_config ( cfg=None ):
         """
         Enable and configure user and application settings
-        :return:
+        :param cfg: configuration to update (dictionary / None for dflt_cfg.DFLT_CFG)
+        :return: the configuration of the application (dictionary)
         """
         user_args = UserConfig.get_cmdline_args ( )
-        UserConfig.verify_update_cfg ( user_args )
+        return UserConfig.verify_update_cfg ( user_args, cfg )
 
     @staticmethod
     def get_cmdline_args ( test_args=[ ] ):
@@ -41,66 +42,370 @@ class UserConfig:
                               default=2, type=int, help='log level (0<=L<=5: default=2)' )
 
         parser.add_argument ( '-t', '--timeout', dest='timeout', required=False, metavar='T',
-                              default=10, type=int, help='timeout in seconds (T>=0: default=10)' )
+                              default=10, type=int, help='network timeout in seconds (T>=0: default=10)' )
 
         parser.add_argument ( '-f', '--file', dest='op_f_name', required=False, metavar="File_Name",
                               default="output.txt", type=str, help='name of the output file (default=output.txt): ' +
                                                                    'stored in the output directory' )
 
+        parser.add_argument ( '-e', '--engine', dest='engine', required=False, metavar='E',
+                              default='thread', type=str, help='crawl engine: thread or async (default=thread)' )
+
+        parser.add_argument ( '-c', '--concurrency', dest='concurrency', required=False, metavar='C',
+                              default=100, type=int, help='max requests in flight for the async engine ' +
+                                                          '(C>=1: default=100)' )
+
+        parser.add_argument ( '-o', '--order', dest='order', required=False, metavar='O',
+                              default='bfs', type=str, help='crawl order: bfs or priority (default=bfs)' )
+
+        parser.add_argument ( '--max-depth', dest='max_depth', required=False, metavar='D',
+                              default=None, type=int, help='max clicks from the domain root (D>=0: default=no limit)' )
+
+        parser.add_argument ( '--max-pages', dest='max_pages', required=False, metavar='P',
+                              default=None, type=int, help='max pages crawled (P>=1: default=no limit)' )
+
+        parser.add_argument ( '--max-time', dest='max_time', required=False, metavar='S',
+                              default=None, type=int, help='max crawl time in seconds (S>=0: default=no limit)' )
+
+        parser.add_argument ( '--max-body-size', dest='max_body_size', required=False, metavar='B',
+                              default=10485760, type=int, help='max bytes downloaded of a html page ' +
+                                                               '(B>=1: default=10485760)' )
+
+        parser.add_argument ( '-s', '--stream', dest='stream', required=False, action='store_true',
+                              help='write a record for every url while crawling instead of writing the sitemap tree ' +
+                                   'at the end' )
+
+        parser.add_argument ( '--format', dest='format', required=False, metavar='F',
+                              default='text', type=str, help='sitemap format: text, xml or xml.gz (default=text)' )
+
+        parser.add_argument ( '--checkpoint', dest='checkpoint', required=False, action='store_true',
+                              help='log the crawl progress to <output file>.checkpoint, so that it can be resumed' )
+
+        parser.add_argument ( '--checkpoint-interval', dest='checkpoint_interval', required=False, metavar='S',
+                              default=30, type=int, help='seconds between two checkpoints (S>=0: default=30)' )
+
+        parser.add_argument ( '--resume', dest='resume', required=False, action='store_true',
+                              help='resume an interrupted crawl from its checkpoint (implies --checkpoint)' )
+
+        parser.add_argument ( '--cache', dest='cache', required=False, action='store_true',
+                              help='recrawl unchanged pages with conditional requests, using the page cache stored ' +
+                                   'in the output directory' )
+
+        parser.add_argument ( '--cache-size', dest='cache_size', required=False, metavar='B',
+                              default=104857600, type=int, help='max bytes of the page cache (B>=1: default=104857600)' )
+
+        parser.add_argument ( '-p', '--processes', dest='processes', required=False, metavar='N',
+                              default=1, type=int, help='number of crawl processes sharing out the urls, each one ' +
+                                                        'with its own parse threads (N>=1: default=1)' )
+
+        parser.add_argument ( '--coordinator', dest='coordinator', required=False, metavar='HOST:PORT',
+                              default=None, type=str, help='coordinate a crawl distributed over several nodes, ' +
+                                                           'listening for them on HOST:PORT' )
+
+        parser.add_argument ( '--node', dest='node', required=False, metavar='HOST:PORT',
+                              default=None, type=str, help='crawl as a node of the distributed crawl coordinated ' +
+                                                           'on HOST:PORT' )
+
+        parser.add_argument ( '--polite', dest='polite', required=False, action='store_true',
+                              help='honour the Crawl-delay of robots.txt, adapt the concurrency per host to its ' +
+                                   'latency and errors, and retry throttled requests after a backoff' )
+
+        parser.add_argument ( '--host-rate', dest='host_rate', required=False, metavar='R',
+                              default=None, type=float, help='max requests per second to a host of a polite crawl ' +
+                                                             '(R>0: default=no limit)' )
+
+        parser.add_argument ( '--host-concurrency', dest='host_concurrency', required=False, metavar='N',
+                              default=8, type=int, help='max requests at once to a host of a polite crawl ' +
+                                                        '(N>=1: default=8)' )
+
+        parser.add_argument ( '--retries', dest='retries', required=False, metavar='N',
+                              default=3, type=int, help='retries of a throttled or failed request of a polite ' +
+                                                        'crawl (N>=0: default=3)' )
+
+        parser.add_argument ( '--robots', dest='robots', required=False, action='store_true',
+                              help='do not crawl the urls disallowed by the robots.txt of the domain' )
+
+        parser.add_argument ( '--seed-sitemaps', dest='seed_sitemaps', required=False, action='store_true',
+                              help='seed the crawl with the urls of the XML sitemaps listed by the robots.txt of ' +
+                                   'the domain (or its /sitemap.xml)' )
+
+        parser.add_argument ( '--progress-interval', dest='progress_interval', required=False, metavar='S',
+                              default=10, type=int, help='seconds between two progress lines of the crawl ' +
+                                                         '(S>=0: default=10, 0=no progress lines)' )
+
+        parser.add_argument ( '--stats', dest='stats', required=False, action='store_true',
+                              help='write the statistics of the crawl per stage and status code to ' +
+                                   '<output file>.stats.json' )
+
+        parser.add_argument ( '--metrics-port', dest='metrics_port', required=False, metavar='N',
+                              default=None, type=int, help='serve the statistics of the running crawl on ' +
+                                                           'http://127.0.0.1:N/stats and /metrics' )
+
+        parser.add_argument ( '--domains-file', dest='domains_file', required=False, metavar='File_Name',
+                              default=None, type=str, help='crawl every domain listed in File_Name (one per line) ' +
+                                                           'in one process, writing one output file per domain ' +
+                                                           'next to the output file' )
+
+        parser.add_argument ( '--check-links', dest='check_links', required=False, action='store_true',
+                              help='check every link of the pages, external links included, with HEAD requests ' +
+                                   'and write their status, redirects and referrers to <output file>.links.json' )
+
+        parser.add_argument ( '--trailing-slash', dest='trailing_slash', required=False, metavar='R',
+                              default='keep', type=str, help='trailing slash of the crawled urls: keep, strip or add ' +
+                                                             '(default=keep)' )
+
+        parser.add_argument ( '--sort-query', dest='sort_query', required=False, action='store_true',
+                              help='sort the query parameters of the crawled urls, so that their orders are crawled ' +
+                                   'once' )
+
+        parser.add_argument ( '--detect-traps', dest='detect_traps', required=False, action='store_true',
+                              help='do not fetch the urls of crawler traps (repeated path segments, long queries, ' +
+                                   'too many pages of a path template) nor follow the links of near-duplicate pages' )
+
+        parser.add_argument ( '--template-cap', dest='template_cap', required=False, metavar='N',
+                              default=None, type=int, help='max pages crawled per path template with --detect-traps ' +
+                                                           '(N>=1: default=10000)' )
+
+        parser.add_argument ( '--graph', dest='graph', required=False, action='store_true',
+                              help='record every link between the pages and write the link graph to ' +
+                                   '<output file>.graph.npz, to be analysed with analyze_graph.py (needs numpy)' )
+
+        parser.add_argument ( '--archive', dest='archive', required=False, action='store_true',
+                              help='append every response (status, headers and body) to the WARC archive ' +
+                                   '<output file>.warc.gz and its index <output file>.warc.gz.idx' )
+
+        parser.add_argument ( '--replay', dest='replay_path', required=False, metavar='Archive',
+                              default=None, type=str, help='crawl from the responses of the WARC archive written ' +
+                                                           'by --archive instead of the network' )
+
+        parser.add_argument ( '--max-memory', dest='max_memory', required=False, metavar='B',
+                              default=None, type=int, help='hold the urls of the crawl on disk, using at most B ' +
+                                                           'bytes of memory for them (B>=1048576)' )
+
+        parser.add_argument ( '--spill-dir', dest='spill_dir', required=False, metavar='Dir',
+                              default=None, type=str, help='directory of the files of the urls held on disk with ' +
+                                                           '--max-memory (default: the temporary directory)' )
+
         required = parser.add_argument_group ( 'required arguments' )
 
-        required.add_argument ( '-d', '--domain', dest='domain_name', required=True, metavar="Domain",
-                                type=str, help='name of the domain' )
+        required.add_argument ( '-d', '--domain', dest='domain_name', required=False, metavar="Domain",
+                                type=str, help='name of the domain (unless --domains-file is given)' )
 
         if test_args:
             args = parser.parse_args ( test_args )
         else:
             args = parser.parse_args ( )
 
+        if not args.domain_name and not args.domains_file:
+            parser.error ( "the following arguments are required: -d/--domain (or --domains-file)" )
+
         return args
 
     @staticmethod
-    def verify_update_cfg ( args ):
+    def verify_update_cfg ( args, cfg=None ):
         """
         Verify the argparse value entered by user. If the values provided by user \
-        are valid, then they also overwrite control options in dflt_cfg; otherwise dflt_cfg \
+        are valid, then they also overwrite control options in cfg; otherwise cfg \
         values remains active.
         :param args: argparse value entered by user (type: <class 'argparse.Namespace'>)
-        :return:
+        :param cfg: configuration to update (dictionary / None for dflt_cfg.DFLT_CFG)
+        :return: the updated configuration (dictionary)
         """
+        if cfg is None:
+            cfg = dflt_cfg.DFLT_CFG
+
         n_threads = args.n_thread
         # verification of number of threads entered by user
         if n_threads >= 0:
             # storing value of number of threads in cfg for future use
-            dflt_cfg.DFLT_CFG[ NUM_THREADS ] = n_threads
+            cfg[ NUM_THREADS ] = n_threads
 
         usr_log_lvl = args.log_lvl
         # verify and set the log level value entered by user
-        UserConfig.set_verify_log_level ( usr_log_lvl )
+        UserConfig.set_verify_log_level ( usr_log_lvl, cfg )
 
         app_timeout = args.timeout
-        # verify and set the application timeout value entered by user
+        # verify and set the network timeout value entered by user
         if app_timeout < 0:
             app_timeout = 10  # seconds
-        dflt_cfg.DFLT_CFG[ TIMEOUT ] = app_timeout
+        cfg[ TIMEOUT ] = app_timeout
 
         # config output file path
         op_file_name = args.op_f_name
-        dflt_cfg.DFLT_CFG[ OUTPUT_PATH ] = "./output/" + op_file_name
+        cfg[ OUTPUT_PATH ] = "./output/" + op_file_name
 
         # config domain name in dflt_cfg
         domain_name = args.domain_name
-        dflt_cfg.DFLT_CFG[ DOMAIN ] = domain_name
+        cfg[ DOMAIN ] = domain_name
+
+        # verification of crawl engine entered by user
+        if args.engine in ('thread', 'async'):
+            cfg[ ENGINE ] = args.engine
+
+        # verification of async engine concurrency entered by user
+        if args.concurrency >= 1:
+            cfg[ MAX_CONCURRENCY ] = args.concurrency
+
+        # verification of crawl order entered by user
+        if args.order in ('bfs', 'priority'):
+            cfg[ FRONTIER_ORDER ] = args.order
+
+        # verification of crawl budgets entered by user (a budget which is not given means no limit)
+        if args.max_depth is not None and args.max_depth >= 0:
+            cfg[ MAX_DEPTH ] = args.max_depth
+
+        if args.max_pages is not None and args.max_pages >= 1:
+            cfg[ MAX_PAGES ] = args.max_pages
+
+        if args.max_time is not None and args.max_time >= 0:
+            cfg[ MAX_TIME ] = args.max_time
+
+        # verification of maximum body size entered by user
+        if args.max_body_size >= 1:
+            cfg[ MAX_BODY_SIZE ] = args.max_body_size
+
+        # sitemap is streamed only if user asks for it
+        if args.stream:
+            cfg[ STREAM_SITEMAP ] = True
+
+        # verification of sitemap format entered by user
+        if args.format in ('text', 'xml', 'xml.gz'):
+            cfg[ SITEMAP_FORMAT ] = args.format
+
+        # the crawl progress is logged next to the output file only if user asks for it (resuming logs it too)
+        if args.checkpoint or args.resume:
+            cfg[ CHECKPOINT_PATH ] = cfg[ OUTPUT_PATH ] + ".checkpoint"
+            cfg[ RESUME ] = args.resume
+
+        # verification of checkpoint interval entered by user
+        if args.checkpoint_interval >= 0:
+            cfg[ CHECKPOINT_INTERVAL ] = args.checkpoint_interval
+
+        # the page cache is used only if user asks for it
+        if args.cache:
+            cfg[ CACHE_PATH ] = "./output/page_cache.sqlite3"
+
+        # verification of page cache size entered by user
+        if args.cache_size >= 1:
+            cfg[ CACHE_SIZE ] = args.cache_size
+
+        # verification of number of crawl processes entered by user
+        if args.processes >= 1:
+            cfg[ PROCESSES ] = args.processes
+
+        # the crawl is polite only if user asks for it
+        if args.polite:
+            cfg[ POLITE ] = True
+
+        # verification of the politeness limits entered by user
+        if args.host_rate is not None and args.host_rate > 0:
+            cfg[ HOST_RATE ] = args.host_rate
+
+        if args.host_concurrency >= 1:
+            cfg[ HOST_CONCURRENCY ] = args.host_concurrency
+
+        if args.retries >= 0:
+            cfg[ MAX_RETRIES ] = args.retries
+
+        # robots.txt is obeyed and sitemaps are seeded only if user asks for it
+        if args.robots:
+            cfg[ ROBOTS ] = True
+
+        if args.seed_sitemaps:
+            cfg[ SEED_SITEMAPS ] = True
+
+        # verification of progress interval entered by user
+        if args.progress_interval >= 0:
+            cfg[ PROGRESS_INTERVAL ] = args.progress_interval
+
+        # the statistics are written next to the output file only if user asks for it
+        if args.stats:
+            cfg[ STATS_PATH ] = cfg[ OUTPUT_PATH ] + ".stats.json"
+
+        # verification of metrics port entered by user
+        if args.metrics_port is not None and 0 <= args.metrics_port <= 65535:
+            cfg[ METRICS_PORT ] = args.metrics_port
+
+        # the links are checked only if user asks for it
+        if args.check_links:
+            cfg[ LINK_REPORT_PATH ] = cfg[ OUTPUT_PATH ] + ".links.json"
+
+        # verification of trailing slash rule entered by user
+        if args.trailing_slash in ('keep', 'strip', 'add'):
+            cfg[ URL_TRAILING_SLASH ] = args.trailing_slash
+
+        # the query parameters are sorted only if user asks for it
+        if args.sort_query:
+            cfg[ URL_SORT_QUERY ] = True
+
+        # the crawler traps are detected only if user asks for it
+        if args.detect_traps:
+            cfg[ TRAP_DETECTION ] = True
+
+        # verification of the cap of pages per path template entered by user
+        if args.template_cap is not None and args.template_cap >= 1:
+            cfg[ MAX_PAGES_PER_TEMPLATE ] = args.template_cap
+
+        # the link graph is recorded only if user asks for it
+        if args.graph:
+            cfg[ GRAPH_PATH ] = cfg[ OUTPUT_PATH ] + ".graph.npz"
+
+        # the responses are archived only if user asks for it
+        if args.archive:
+            cfg[ ARCHIVE_PATH ] = cfg[ OUTPUT_PATH ] + ".warc.gz"
+
+        # the crawl is replayed from an archive only if user asks for it
+        if args.replay_path:
+            cfg[ REPLAY_PATH ] = args.replay_path
+
+        # verification of the memory budget of the urls entered by user (the urls are held on disk only if user \
+        # asks for it)
+        if args.max_memory is not None and args.max_memory >= 1024 * 1024:
+            cfg[ MEMORY_BUDGET ] = args.max_memory
+
+        if args.spill_dir:
+            cfg[ SPILL_DIR ] = args.spill_dir
+
+        # the domains listed in a file are crawled in one process only if user asks for it
+        if args.domains_file:
+            cfg[ DOMAINS_FILE ] = args.domains_file
+
+        # verification of the addresses of a distributed crawl entered by user
+        for address, setting in ((args.coordinator, COORDINATOR_ADDRESS), (args.node, FRONTIER_ADDRESS)):
+            if address is None: continue
+            try:
+                cfg[ setting ] = UserConfig.parse_address ( address )
+            except ValueError as err:
+                logging.getLogger ( __name__ ).error ( err )
+
+        return cfg
 
     @staticmethod
-    def set_verify_log_level ( user_log_level ):
+    def parse_address ( address ):
+        """
+        Parses a network address entered by user.
+        :param address: "host:port" (str)
+        :return: a 2-tuple (host (str), port (int))
+        :raises ValueError: if address is not "host:port" or port is not a valid port number
+        """
+        host, separator, port = address.rpartition ( ':' )
+        if not separator or not port.isdigit ( ) or int ( port ) > 65535:
+            raise ValueError ( "Invalid address {0!r}: host:port expected".format ( address ) )
+        return host, int ( port )
+
+    @staticmethod
+    def set_verify_log_level ( user_log_level, cfg=None ):
         """
         This function verifies and set the log level of this application using the log level provided by \
         user as args through cmdline. if the cmdline provided log level is invalid, then \
         by default, application chooses INFO level logging.
         :param user_log_level: log level provided by user as args through cmd line (int)
+        :param cfg: configuration in which the log level is stored (dictionary / None for dflt_cfg.DFLT_CFG)
         :return:
         """
+        if cfg is None:
+            cfg = dflt_cfg.DFLT_CFG
+
         # Reference: https://docs.python.org/2/howto/logging.html#logging-levels
         std_logging_levels = {
             0: logging.NOTSET,  # lowest priority
@@ -116,8 +421,8 @@ class UserConfig:
             user_log_level = 2
             mapped_log_level = std_logging_levels[ user_log_level ]
 
-        # storing log level in dflt_cfg
-        dflt_cfg.DFLT_CFG[ LOG_LEVEL ] = user_log_level
+        # storing log level in cfg
+        cfg[ LOG_LEVEL ] = user_log_level
 
         # setting log level of application
         logging.getLogger ( ).setLevel ( mapped_log_level )
@@ -2,77 +2,356 @@
 # 1. https://pymotw.com/3/urllib.parse/#parsing
 # 2. Uniform Resource Identifiers (URI): Generic Syntax: https://tools.ietf.org/html/rfc2396.html
 
+import collections
+import functools
+import http.client
+import json
 import logging
-import queue
-import re
-import socket
+import operator
+import sqlite3
 import threading
-import urllib.request
+import time
 from urllib.parse import urlparse, urljoin, urlsplit, urlunsplit
 
 import dflt_cfg
 from .app_constant import *
-from .urlparse import UrlNode
-
-
-class AppURLopener ( urllib.request.FancyURLopener ):
-    # This class is used as a mean to hack permission error due to use of urllib.
-    version = "Mozilla/5.0"
+from .checkpoint import CrawlCheckpoint
+from .crawlstats import CrawlMonitor, CrawlStats
+from .diskgraph import DiskUrlGraph
+from .fetcher import Fetcher
+from .frontier import Frontier
+from .linkcheck import LinkChecker
+from .linkextract import LinkExtractor
+from .linkgraph import write_link_graph
+from .pagearchive import ArchivingResponse, PageArchive, PageArchiveReader, ReplayFetcher
+from .pagecache import PageCache
+from .politeness import PolitenessScheduler
+from .robots import RobotsRules
+from .sitemapxml import SitemapReader, XmlSitemapWriter, get_lastmod
+from .traps import TrapDetector
+from .urlcanon import UrlCanonicalizer, get_canonical_netloc
+from .urlgraph import UrlGraph
+from .urlparse import SitemapStream, UrlNode
 
 
 class Crawler:
     """
     This class crawls every url of the user configured domain and build a tree hierarchy of UrlNode linking domain urls
     """
-    def __init__ ( self ):
+    # size of the pieces in which pages are read and given to the link extractor
+    CHUNK_SIZE = 64 * 1024
+
+    # extensions of urls which are most likely not html pages (images, media, documents, archives, ...). They are \
+    # requested with HEAD, so that they are checked and recorded in the sitemap without downloading their body.
+    ASSET_EXTENSIONS = frozenset ( (
+        'jpg', 'jpeg', 'png', 'gif', 'bmp', 'ico', 'svg', 'webp', 'tif', 'tiff',
+        'mp3', 'mp4', 'm4a', 'wav', 'ogg', 'avi', 'mov', 'mkv', 'webm', 'flv', 'wmv',
+        'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'odt', 'ods', 'odp',
+        'zip', 'gz', 'tgz', 'bz2', 'xz', '7z', 'rar', 'tar', 'exe', 'dmg', 'iso', 'apk', 'msi',
+        'css', 'js', 'woff', 'woff2', 'ttf', 'otf', 'eot',
+    ) )
+
+    # content types of the responses whose links are extracted; any other response is a leaf of the sitemap
+    HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+    # status codes of a server which does not support HEAD requests
+    HEAD_NOT_ALLOWED_CODES = (405, 501)
+
+    # maximum number of bytes read of a robots.txt (Google reads up to 500KB)
+    MAX_ROBOTS_SIZE = 512 * 1024
+
+    # settings which hold data of every url or page in memory, which are turned off in a memory-bounded crawl
+    MEMORY_UNBOUNDED_SETTINGS = { LINK_REPORT_PATH: None, TRAP_DETECTION: False, GRAPH_PATH: None }
+
+    def __init__ ( self, cfg=None, fetcher=None, on_record=None ):
+        """
+        :param cfg: configuration of the crawl (dictionary, see dflt_cfg.DFLT_CFG), which is copied \
+                    (None for dflt_cfg.DFLT_CFG)
+        :param fetcher: Fetcher shared with other crawls, which is not closed at the end of this one \
+                        (None for a Fetcher of this crawl)
+        :param on_record: function called with (url_node, depth, parent_node) whenever a urlnode is linked in \
+                          the sitemap, from the parse threads (None for no calls)
+        """
         self.logger = logging.getLogger ( __name__ )
 
-        # this is used by parse threads to get a lock over get_create_urlnode function to ensure \
-        # that only one urlnode gets created per unique url.
+        # the crawl is configured by its own copy of the settings, so that several crawls can run in one process
+        self.cfg = dict ( cfg if cfg is not None else dflt_cfg.DFLT_CFG )
+        self.on_record = on_record
+
+        if self.cfg.get ( MEMORY_BUDGET ):
+            for setting, value in self.MEMORY_UNBOUNDED_SETTINGS.items ( ):
+                if self.cfg.get ( setting, value ) != value:
+                    self.logger.warning ( "Setting {0} is not supported by a memory-bounded crawl: it is turned "
+                                          "off".format ( setting ) )
+                    self.cfg[ setting ] = value
+
+        # this is used by parse threads to update the counters of the crawler (e.g; skipped_bodies)
         self.mutex = threading.Lock ( )
 
         # num of parse threads
-        self.NUM_PARSE_THREADS = dflt_cfg.DFLT_CFG[NUM_THREADS]
+        self.NUM_PARSE_THREADS = self.cfg[NUM_THREADS]
 
         # parse_th_list is actually redundant because as per the design of the application - parse threads \
         # always terminate. Keeping it for possible future enhancement.
         self.parse_th_list = [ ]
 
-        # it contains references to urlnode objects for every url. It is used as a way to avoid \
-        # creating dup urlnode for the same url. Format is: {url_str: urlnode_obj)
-        self.url_instance = dict()
+        # it interns every discovered url once (UrlNodes are thin views over it), and holds the links of the \
+        # sitemap between urls as well as the urls which have already been visited. It is held on disk if the \
+        # crawl is memory-bounded.
+        self.url_graph = self.open_url_graph ( )
+
+        # True if the urls of the crawl are held on disk, within the memory budget of the user
+        self.is_memory_bounded = isinstance ( self.url_graph, DiskUrlGraph )
 
         # stores domain name of website (str)
-        self.domain_name = self.get_simple_url ( self.get_domain_name ( dflt_cfg.DFLT_CFG[DOMAIN] ) )
+        self.domain_name = self.get_simple_url ( self.get_domain_name ( self.cfg[DOMAIN] ) )
+
+        # turns the spellings of a url into one canonical url, so that every page is crawled once
+        self.url_canonicalizer = UrlCanonicalizer ( trailing_slash=self.cfg.get ( URL_TRAILING_SLASH, 'keep' ),
+                                                    sort_query=self.cfg.get ( URL_SORT_QUERY, False ),
+                                                    ignored_params=self.cfg.get ( URL_IGNORED_PARAMS ) or ( ),
+                                                    memo_size=self.cfg.get ( URL_MEMO_SIZE, 100000 ) )
 
         # this will be used to determine whether any discovered link belongs to same domain or not
         self.host = urlparse ( self.domain_name ).netloc
 
-        # contains already visited url nodes (Object of UrlNode each)
-        # it will be thread safe as all the threads will only add into it.
-        self.visited_urlnodes = set ( )
-
         # contains currently discovered url nodes (UrlNode each), which will be consumed by parse threads.\
-        # Queue is thread safe thanks to GIL.
-        self.new_urlnodes_queue = queue.Queue ( )
+        # It enqueues every url node only once, enforces the crawl budgets and counts the url nodes being \
+        # parsed, so that parse threads know when the crawl is finished.
+        self.frontier = self.open_frontier ( )
 
         # it holds the root of urlNodes tree hierarchy
         self.urlnode_parse_root = None
 
-    def start_url_parsing( self ):
+        # maximum number of bytes downloaded of a page, the rest of a bigger page is not parsed
+        self.max_body_size = self.cfg[ MAX_BODY_SIZE ]
+
+        # number of responses whose body has not been (completely) downloaded, updated under self.mutex. \
+        # Format is: {'non_html': count, 'truncated': count}
+        self.skipped_bodies = collections.Counter ( )
+
+        # writes the sitemap records while crawling, if the user asked for a streamed sitemap (else None)
+        self.sitemap_stream = self.open_sitemap_stream ( ) if self.cfg.get ( STREAM_SITEMAP ) else None
+
+        # writes the pages into a sitemaps.org XML sitemap while crawling, if the user asked for it (else None)
+        self.xml_sitemap = self.open_xml_sitemap ( ) if self.cfg.get ( SITEMAP_FORMAT, 'text' ) != 'text' \
+            else None
+
+        # True if the crawl goes on from the checkpoint of an interrupted crawl of the same domain
+        self.is_resumed = False
+
+        # logs the progress of the crawl, so that it can be resumed if it is interrupted (None if not asked for)
+        self.checkpoint = self.open_checkpoint ( ) if self.cfg.get ( CHECKPOINT_PATH ) else None
+
+        # validators and links of the pages of previous crawls, to request them conditionally (None if not asked for)
+        self.page_cache = self.open_page_cache ( ) if self.cfg.get ( CACHE_PATH ) else None
+
+        # times every stage of the crawl and counts its responses per status code
+        self.stats = self.open_crawl_stats ( )
+
+        # logs the progress of the crawl and serves its statistics while it runs (started by start_monitor)
+        self.monitor = None
+
+        # downloads pages over persistent connections, which are shared by all the parse threads (and by other \
+        # crawls, if the fetcher has been given). It is closed at the end of the crawl only if it is its own. \
+        # A replayed crawl reads its pages from its archive instead, with a fetcher of its own.
+        is_replayed = bool ( self.cfg.get ( REPLAY_PATH ) )
+        self.is_fetcher_owned = fetcher is None or is_replayed
+        if is_replayed:
+            self.fetcher = self.open_replay_fetcher ( )
+        else:
+            self.fetcher = fetcher if fetcher is not None else Fetcher ( timeout=self.cfg.get ( TIMEOUT ),
+                                                                         proxies=self.cfg.get ( SYSTEM_PROXY ),
+                                                                         pool_size=self.cfg[ POOL_SIZE ],
+                                                                         idle_timeout=self.cfg[ POOL_IDLE_TIMEOUT ],
+                                                                         stats=self.stats )
+
+        # archives every response of the crawl, if the user asked for it (else None)
+        self.page_archive = self.open_page_archive ( ) if self.cfg.get ( ARCHIVE_PATH ) else None
+
+        # rules of the robots.txt of the domain, read once if any of them is used (else None)
+        self.robots_rules = self.read_robots_txt ( ) if self.cfg.get ( ROBOTS ) or \
+            self.cfg.get ( SEED_SITEMAPS ) or self.cfg.get ( POLITE ) else None
+
+        # True if the urls disallowed by the robots.txt of the domain are not crawled
+        self.is_robots_obeyed = bool ( self.cfg.get ( ROBOTS ) )
+
+        # number of links left out because the robots.txt disallows them, updated under self.mutex
+        self.num_disallowed = 0
+
+        # spaces out and retries the requests of every host, if the user asked for a polite crawl (else None)
+        self.scheduler = self.open_scheduler ( ) if self.cfg.get ( POLITE ) else None
+
+        # spots the urls of crawler traps and the near-duplicate pages, which are not expanded, if the user asked \
+        # for it (else None)
+        self.trap_detector = TrapDetector ( max_segment_repeats=self.cfg.get ( MAX_SEGMENT_REPEATS, 2 ),
+                                            max_query_length=self.cfg.get ( MAX_QUERY_LENGTH, 256 ),
+                                            max_pages_per_template=self.cfg.get ( MAX_PAGES_PER_TEMPLATE, 10000 ),
+                                            max_distance=self.cfg.get ( NEAR_DUPLICATE_DISTANCE, 3 ) ) \
+            if self.cfg.get ( TRAP_DETECTION ) else None
+
+        # checks every link of the pages, external links included, if the user asked for a link report (else None)
+        self.link_checker = LinkChecker ( self.fetch_page, num_threads=max ( 1, self.NUM_PARSE_THREADS ) ) \
+            if self.cfg.get ( LINK_REPORT_PATH ) else None
+
+        # True if every link between the pages of the domain is recorded, to export the link graph of the crawl
+        self.is_link_graph_recorded = bool ( self.cfg.get ( GRAPH_PATH ) )
+
+        # number of urls and links of the link graph once it has been written (else None)
+        self.link_graph_size = None
+
+    def open_url_graph ( self ):
         """
-        Setup system proxy and initialize new_urls_queue with domain_name. Then it creates and starts urlparse threads.
+        Creates the url graph of the crawl: in memory, or on disk with three quarters of the memory budget if the \
+        user has given one (the frontier takes the last quarter, see open_frontier).
+        :return: an instance of UrlGraph or DiskUrlGraph
+        """
+        memory_budget = self.cfg.get ( MEMORY_BUDGET )
+        if not memory_budget: return UrlGraph ( )
+
+        try:
+            return DiskUrlGraph ( memory_budget * 3 // 4, self.cfg.get ( SPILL_DIR ) )
+        except (OSError, sqlite3.Error) as err:
+            self.logger.error ( "Error {0} occurred. Url graph cannot be created in {1}: the urls are held in "
+                                "memory".format ( err, self.cfg.get ( SPILL_DIR ) or "the temporary directory" ) )
+            return UrlGraph ( )
+
+    def open_crawl_stats ( self ):
+        """
+        Creates the statistics of the crawl, before any request is sent (e.g; the one of robots.txt).
+        :return: an instance of CrawlStats
+        """
+        return CrawlStats ( )
+
+    def open_replay_fetcher ( self ):
+        """
+        Opens the archive from which the crawl is replayed. A crawl whose archive cannot be opened does not \
+        fall back to the network: every url fails.
+        :return: an instance of ReplayFetcher
+        """
+        try:
+            archive = PageArchiveReader ( self.cfg[ REPLAY_PATH ] )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Page archive {1} cannot be opened".format (
+                err, self.cfg[ REPLAY_PATH ] ) )
+            archive = None
+        else:
+            self.logger.info ( "Replaying page archive {0}: {1} urls".format ( archive.path, len ( archive ) ) )
+
+        return ReplayFetcher ( archive, stats=self.stats )
+
+    def open_page_archive ( self ):
+        """
+        Opens the archive to which the responses of the crawl are appended.
+        :return: an instance of PageArchive / None if the archive cannot be opened
+        """
+        try:
+            return PageArchive ( self.cfg[ ARCHIVE_PATH ] )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Page archive {1} cannot be opened".format (
+                err, self.cfg[ ARCHIVE_PATH ] ) )
+            return None
+
+    def get_archiving_response ( self, response, method='GET' ):
+        """
+        :param response: response of a request of the crawl
+        :param method: method of the request (str)
+        :return: response, which is written into the page archive once it is closed, if the user asked for it
+        """
+        return ArchivingResponse ( response, self.page_archive, method ) if self.page_archive else response
+
+    def close_page_archive ( self ):
+        """
+        Closes the page archive, if any, and the archive replayed, if any.
         :return:
         """
-        # setting system proxies
-        self.config_urllib_proxy ( )
+        if isinstance ( self.fetcher, ReplayFetcher ):
+            self.logger.info ( "Page archive replayed: {0} responses, {1} urls not archived".format (
+                self.fetcher.num_replayed, self.fetcher.num_missing ) )
 
-        # initializing url parse tree object (it holds the root of all urlNodes tree nodes; aka domain urlnode root)
-        self.urlnode_parse_root = self.get_create_urlnode ( self.domain_name )
+        if not self.page_archive: return
 
-        # initialize new_urls_queue with domain_name urlnode instance
-        self.insert_urlnodes_into_new_urls_queue ( self.urlnode_parse_root )
+        try:
+            self.page_archive.close ( )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred while closing page archive {1}".format (
+                err, self.page_archive.path ) )
+            return
+
+        self.logger.info ( "Page archive: {0} responses ({1} bytes) appended to {2}".format (
+            self.page_archive.num_records, self.page_archive.size, self.page_archive.path ) )
+
+    def open_scheduler ( self ):
+        """
+        Creates the politeness scheduler of the crawl, which honours the Crawl-delay of the robots.txt of the domain.
+        :return: an instance of PolitenessScheduler
+        """
+        scheduler = PolitenessScheduler ( rate=self.cfg[ HOST_RATE ],
+                                          max_concurrency=self.cfg[ HOST_CONCURRENCY ],
+                                          max_retries=self.cfg[ MAX_RETRIES ] )
+
+        crawl_delay = self.robots_rules.crawl_delay
+        if crawl_delay:
+            scheduler.set_crawl_delay ( self.domain_name, crawl_delay )
+            self.logger.info ( "Crawl-delay of {0}: {1} seconds".format ( self.domain_name, crawl_delay ) )
+
+        return scheduler
+
+    def read_robots_txt ( self ):
+        """
+        Downloads and parses the robots.txt of the domain, once for the whole crawl. A domain whose robots.txt \
+        cannot be downloaded is crawled as if it had none.
+        :return: an instance of RobotsRules, for the user agent of the crawler
+        """
+        robots_url = urljoin ( self.domain_name, "/robots.txt" )
+        try:
+            response = self.get_archiving_response ( self.fetcher.fetch ( robots_url, stats=self.stats ) )
+            try:
+                robots_txt = response.read ( self.MAX_ROBOTS_SIZE ) if response.getcode ( ) == 200 else b''
+            finally:
+                response.close ( )
+        except (http.client.HTTPException, OSError, ValueError) as err:
+            self.logger.warning ( "URL {0} cannot be open. Error: {1}".format ( robots_url, err ) )
+            robots_txt = b''
+
+        return RobotsRules ( robots_txt.decode ( 'utf-8', 'replace' ), Fetcher.USER_AGENT )
+
+    def open_frontier ( self ):
+        """
+        Creates the frontier of the crawl. This is the in-process frontier; a crawler may use any other backend \
+        (e.g; a frontier shared by several machines, see distributed.RemoteFrontier) which has the put, get, \
+        task_done and get_stats methods of Frontier.
+        A memory-bounded crawl keeps the enqueued urls in its url graph, and spills the urlnodes beyond a quarter \
+        of the memory budget to disk.
+        :return: an instance of Frontier
+        """
+        spill_args = dict ( seen=self.url_graph.get_flag_set ( DiskUrlGraph.ENQUEUED ),
+                            max_queued=self.cfg[ MEMORY_BUDGET ] // 4 // Frontier.QUEUED_URLNODE_SIZE,
+                            spill_dir=self.cfg.get ( SPILL_DIR ),
+                            load=functools.partial ( UrlNode, None, self.url_graph ) ) \
+            if self.is_memory_bounded else { }
+
+        return Frontier ( order=self.cfg[ FRONTIER_ORDER ],
+                          max_depth=self.cfg[ MAX_DEPTH ],
+                          max_pages=self.cfg[ MAX_PAGES ],
+                          max_time=self.cfg[ MAX_TIME ],
+                          key=operator.attrgetter ( 'url_id' ),
+                          **spill_args )
+
+    def start_url_parsing( self ):
+        """
+        Initialize new_urls_queue with domain_name. Then it creates and starts urlparse threads.
+        :return:
+        """
+        self.init_frontier ( )
+        self.start_monitor ( )
+        self.start_parse_threads ( )
 
+    def start_parse_threads ( self ):
+        """
+        Creates and starts the urlparse threads, which crawl the urlnodes of self.frontier.
+        :return:
+        """
         # if num threads = 0 then do not create any thread and so directly call parse_site_urls
         if not self.NUM_PARSE_THREADS:
             self.parse_site_urls()
@@ -94,152 +373,837 @@ class Crawler:
         for i in range ( self.NUM_PARSE_THREADS ):
             self.parse_th_list[i].join( )
 
+        return self.release_crawl_resources ( )
+
+    def release_crawl_resources ( self ):
+        """
+        Releases the resources of the crawl once its pages have all been parsed, whatever the engine which has \
+        parsed them (see release_urlparse_resources).
+        :return: the root of UrlNode tree hierarchy (an instance of UrlNode)
+        """
+        self.close_link_checker ( )
+        self.export_link_graph ( )
+        self.close_page_archive ( )
+
+        # closing the idle persistent connections, unless they are shared with other crawls
+        if self.is_fetcher_owned:
+            self.fetcher.close ( )
+
+        self.close_sitemap_stream ( )
+        self.close_checkpoint ( )
+        self.close_page_cache ( )
+        self.log_frontier_stats ( )
+        self.close_crawl_stats ( )
+
+        # the url graph is left open, as the sitemap is written from it
+        if self.is_memory_bounded:
+            self.frontier.close ( )
+
         return self.urlnode_parse_root
 
+    def init_frontier ( self ):
+        """
+        Creates the root of the UrlNode tree hierarchy and puts it into self.frontier, unless the crawl is resumed: \
+        then the frontier, the visited urls and the sitemap links are restored from self.checkpoint instead.
+        :return:
+        """
+        # initializing url parse tree object (it holds the root of all urlNodes tree nodes; aka domain urlnode root)
+        self.urlnode_parse_root = self.get_create_urlnode ( self.domain_name )
+
+        if self.is_resumed:
+            self.restore_checkpoint ( )
+            return
+
+        # initialize new_urls_queue with domain_name urlnode instance
+        self.insert_urlnodes_into_new_urls_queue ( self.urlnode_parse_root )
+        self.record_urlnode ( self.urlnode_parse_root, 0 )
+
+        if self.cfg.get ( SEED_SITEMAPS ):
+            self.seed_frontier_from_sitemaps ( )
+
+    def seed_frontier_from_sitemaps ( self ):
+        """
+        Puts the urls listed by the XML sitemaps of the domain into self.frontier, linked under the domain root: \
+        the sitemaps of the Sitemap entries of its robots.txt, or its /sitemap.xml if there are none. So, pages \
+        deep in the site, or linked from nowhere, are crawled too.
+        :return:
+        """
+        sitemap_urls = self.robots_rules.sitemaps or [ urljoin ( self.domain_name, "/sitemap.xml" ) ]
+        sitemap_reader = SitemapReader ( self.fetch_page )
+
+        num_seeded = 0
+        for url_node in self.get_acceptable_urlnodes ( sitemap_reader.read_urls ( sitemap_urls ) ):
+            if url_node.url_id == self.urlnode_parse_root.url_id: continue
+            self.link_child_urlnode ( self.urlnode_parse_root, url_node, 1 )
+            num_seeded += 1
+
+        self.logger.info ( "Sitemaps: {0} urls in {1} sitemaps, {2} of them seeded".format (
+            sitemap_reader.num_urls, sitemap_reader.num_sitemaps, num_seeded ) )
+
+    def open_checkpoint ( self ):
+        """
+        Opens the checkpoint log of the crawl. If the user asked to resume and the log holds a crawl of this \
+        domain, new records are appended to it (see restore_checkpoint); otherwise a new log is started.
+        :return: an instance of CrawlCheckpoint / None if the log file cannot be opened
+        """
+        checkpoint_path = self.cfg[ CHECKPOINT_PATH ]
+        if self.cfg.get ( RESUME ):
+            self.is_resumed = CrawlCheckpoint.read_root_url ( checkpoint_path ) == self.domain_name
+            if not self.is_resumed:
+                self.logger.warning ( "No checkpoint of {0} in {1}: starting a new crawl".format (
+                    self.domain_name, checkpoint_path ) )
+
+        try:
+            return CrawlCheckpoint ( checkpoint_path, self.cfg[ CHECKPOINT_INTERVAL ], resume=self.is_resumed )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Checkpoint {1} cannot be opened".format ( err, checkpoint_path ) )
+            self.is_resumed = False
+            return None
+
+    def restore_checkpoint ( self ):
+        """
+        Replays the records of self.checkpoint: every logged url is linked back in the sitemap, the parsed pages \
+        are marked as visited (they are not downloaded again) and the other logged urls are put back into \
+        self.frontier in their discovery order. The streamed and XML sitemaps get the records of the replayed urls.
+        :return:
+        """
+        # urls enqueued but not parsed yet, and the XML sitemap dates of the pages being parsed. \
+        # Format is: {url_id: (UrlNode, depth)} and {url_str: lastmod_str}
+        pending_urlnodes = dict ( )
+        page_lastmods = dict ( )
+        num_parsed = 0
+
+        for record in self.checkpoint.read_records ( ):
+            if record[ 0 ] == CrawlCheckpoint.ENQUEUED:
+                _, depth, url, parent_url = record
+                url_node, parent_node = UrlNode ( url, self.url_graph ), None
+                if parent_url:
+                    parent_node = UrlNode ( parent_url, self.url_graph )
+                    parent_node.add_child ( url_node )
+                pending_urlnodes[ url_node.url_id ] = (url_node, int ( depth ))
+
+                if self.sitemap_stream:
+                    self.sitemap_stream.write_record ( url_node, int ( depth ), parent_node )
+
+            elif record[ 0 ] == CrawlCheckpoint.PAGE:
+                page_lastmods[ record[ 1 ] ] = record[ 2 ] or None
+
+            else:
+                url_node = UrlNode ( record[ 1 ], self.url_graph )
+                pending_urlnodes.pop ( url_node.url_id, None )
+                self.url_graph.mark_visited ( url_node.url_id )
+                self.frontier.add_seen ( url_node )
+                num_parsed += 1
+
+                if record[ 1 ] in page_lastmods and self.xml_sitemap:
+                    self.xml_sitemap.write_url ( record[ 1 ], page_lastmods.pop ( record[ 1 ] ) )
+
+        for url_node, depth in pending_urlnodes.values ( ):
+            self.insert_urlnodes_into_new_urls_queue ( url_node, depth )
+
+        self.logger.info ( "Crawl resumed from checkpoint {0}: {1} urls, {2} pages already parsed, {3} to "
+                           "crawl".format ( self.checkpoint.path, len ( self.url_graph ), num_parsed,
+                                            len ( pending_urlnodes ) ) )
+
+    def open_page_cache ( self ):
+        """
+        Opens the page cache, which is kept from one crawl to the next.
+        :return: an instance of PageCache / None if the cache cannot be opened
+        """
+        try:
+            return PageCache ( self.cfg[ CACHE_PATH ], self.cfg[ CACHE_SIZE ] )
+        except (OSError, sqlite3.Error) as err:
+            self.logger.error ( "Error {0} occurred. Page cache {1} cannot be opened".format (
+                err, self.cfg[ CACHE_PATH ] ) )
+            return None
+
+    def get_cached_page ( self, url, method ):
+        """
+        Returns the cached validators and links of a page which is requested with GET, if the page cache is used.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :return: a 3-tuple (see PageCache.get) / None if the page is not cached
+        """
+        if not self.page_cache or method != 'GET': return None
+
+        try:
+            return self.page_cache.get ( url )
+        except sqlite3.Error as err:
+            self.logger.error ( "Error {0} occurred while reading URL {1} from page cache".format ( err, url ) )
+            return None
+
+    def get_cached_urlnodes ( self, url, cached_page ):
+        """
+        Yields the urlnodes of the cached links of a page which has not changed since it was cached (the server \
+        answered 304 to its conditional request).
+        :param url: str
+        :param cached_page: a 3-tuple returned by PageCache.get
+        :return: a generator of instances of valid child UrlNodes for given url
+        """
+        etag, last_modified, links = cached_page
+        try:
+            self.page_cache.mark_hit ( url )
+        except sqlite3.Error as err:
+            self.logger.error ( "Error {0} occurred while updating URL {1} in page cache".format ( err, url ) )
+
+        self.write_sitemap_page ( url, get_lastmod ( last_modified ) )
+        yield from self.get_acceptable_urlnodes ( links, url )
+
+    def is_page_cacheable ( self, url, response ):
+        """
+        Tells whether the links of a page have to be cached: the page cache is used, the page has not been \
+        reached through a redirect and its response has a validator to request it conditionally next time.
+        :param url: requested url (str)
+        :param response: response of url, whose headers have been received
+        :return: bool
+        """
+        return self.page_cache is not None and response.url == url and \
+               ('ETag' in response.headers or 'Last-Modified' in response.headers)
+
+    def cache_page ( self, url, response, links ):
+        """
+        :param url: requested url (str)
+        :param response: response of url, whose headers have been received
+        :param links: all the absolute links extracted from the page (list of str)
+        :return:
+        """
+        try:
+            self.page_cache.put ( url, response.headers.get ( 'ETag' ), response.headers.get ( 'Last-Modified' ), links )
+        except sqlite3.Error as err:
+            self.logger.error ( "Error {0} occurred while writing URL {1} to page cache".format ( err, url ) )
+
+    def close_page_cache ( self ):
+        """
+        Closes the page cache, if any, and logs its hits and misses.
+        :return:
+        """
+        if not self.page_cache: return
+
+        try:
+            self.page_cache.close ( )
+        except sqlite3.Error as err:
+            self.logger.error ( "Error {0} occurred while closing page cache {1}".format ( err, self.page_cache.path ) )
+
+        self.logger.info ( "Page cache: {hits} unchanged pages, {misses} pages not cached, {updated} changed pages, "
+                           "{evicted} evicted; {pages} pages ({size} bytes) cached".format (
+                               **self.page_cache.get_stats ( ) ) )
+
+    def close_checkpoint ( self ):
+        """
+        Writes the last checkpoint of the crawl, if any.
+        :return:
+        """
+        if not self.checkpoint: return
+
+        try:
+            self.checkpoint.close ( )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred while writing checkpoint {1}".format ( err, self.checkpoint.path ) )
+        else:
+            self.logger.info ( "Checkpoint {0}: {1} records, {2} flushes".format (
+                self.checkpoint.path, self.checkpoint.num_records, self.checkpoint.num_checkpoints ) )
+
+    def open_sitemap_stream ( self ):
+        """
+        Opens the output file in which the sitemap records are written while crawling.
+        :return: an instance of SitemapStream / None if the output file cannot be created
+        """
+        try:
+            return SitemapStream ( self.cfg[ OUTPUT_PATH ] )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Output file {1} cannot be created".format (
+                err, self.cfg[ OUTPUT_PATH ] ) )
+            return None
+
+    def record_urlnode ( self, url_node, depth, parent_node=None ):
+        """
+        Writes the sitemap record of a urlnode which has just been linked in the sitemap, if the sitemap is streamed.
+        :param url_node: an instance of UrlNode
+        :param depth: number of clicks between the domain root and url_node (int)
+        :param parent_node: the UrlNode under which url_node is linked (None for the domain root)
+        :return:
+        """
+        if self.sitemap_stream:
+            self.sitemap_stream.write_record ( url_node, depth, parent_node )
+
+        if self.checkpoint:
+            self.checkpoint.write_enqueued ( url_node, depth, parent_node )
+
+        if self.on_record:
+            self.on_record ( url_node, depth, parent_node )
+
+    def record_parsed_urlnode ( self, url_node ):
+        """
+        Logs a urlnode whose page has been completely parsed (all its children are linked), if the crawl is \
+        checkpointed: it is not parsed again if the crawl is resumed.
+        :param url_node: an instance of UrlNode
+        :return:
+        """
+        if self.checkpoint:
+            self.checkpoint.write_parsed ( url_node )
+
+    def open_xml_sitemap ( self ):
+        """
+        Opens the XML sitemap (next to OUTPUT_PATH) in which the pages are written while crawling.
+        :return: an instance of XmlSitemapWriter / None if the output file cannot be created
+        """
+        try:
+            return XmlSitemapWriter ( self.cfg[ OUTPUT_PATH ], self.domain_name,
+                                      compress=self.cfg[ SITEMAP_FORMAT ] == 'xml.gz' )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. XML sitemap next to {1} cannot be created".format (
+                err, self.cfg[ OUTPUT_PATH ] ) )
+            return None
+
+    def record_page ( self, url, response ):
+        """
+        Writes a successfully downloaded html page into the XML sitemap, if any. A page reached through a redirect \
+        is not written, as a sitemap lists canonical urls only.
+        :param url: requested url (str)
+        :param response: response of url, whose headers have been received
+        :return:
+        """
+        if self.xml_sitemap and response.url == url:
+            self.write_sitemap_page ( url, get_lastmod ( response.headers.get ( 'Last-Modified' ) ) )
+
+    def write_sitemap_page ( self, url, lastmod ):
+        """
+        Writes a html page into the XML sitemap, if any (and logs it if the crawl is checkpointed).
+        :param url: str
+        :param lastmod: last modification date of the page in W3C Datetime format (str / None)
+        :return:
+        """
+        if not self.xml_sitemap: return
+
+        self.xml_sitemap.write_url ( url, lastmod )
+        if self.checkpoint:
+            self.checkpoint.write_page ( url, lastmod )
+
+    def close_sitemap_stream ( self ):
+        """
+        Flushes and closes the streamed sitemap and the XML sitemap, if any.
+        :return:
+        """
+        if self.sitemap_stream:
+            self.sitemap_stream.close ( )
+
+        if self.xml_sitemap:
+            try:
+                sitemap_paths = self.xml_sitemap.close ( )
+            except OSError as err:
+                self.logger.error ( "Error {0} occurred while writing XML sitemap {1}".format (
+                    err, self.xml_sitemap.sitemap_path ) )
+            else:
+                self.logger.info ( "XML sitemap: {0} urls in {1}".format ( self.xml_sitemap.num_urls,
+                                                                          ", ".join ( sitemap_paths ) ) )
+
+    def link_child_urlnode ( self, url_node, child_urlnode, depth ):
+        """
+        Puts a child urlnode found on the page of url_node into self.frontier. It is linked under url_node only if \
+        this page is the first one to discover it, so every url appears once in the sitemap.
+        :param url_node: an instance of UrlNode being parsed
+        :param child_urlnode: an instance of UrlNode found on the page of url_node
+        :param depth: number of clicks between the domain root and child_urlnode (int)
+        :return:
+        """
+        if self.insert_urlnodes_into_new_urls_queue ( child_urlnode, depth ):
+            url_node.add_child ( child_urlnode )
+            self.record_urlnode ( child_urlnode, depth, url_node )
+
+    def log_frontier_stats ( self ):
+        """
+        Logs the counters of the frontier, and warns if a crawl budget has cut the sitemap short.
+        :return:
+        """
+        frontier_stats = self.frontier.get_stats ( )
+        self.logger.info ( "Frontier: {enqueued} urls enqueued, {claimed} parsed, {duplicates_suppressed} duplicates "
+                           "suppressed, {depth_limited} links beyond max depth".format ( **frontier_stats ) )
+
+        if frontier_stats[ 'budget_exhausted' ]:
+            self.logger.warning ( "Crawl budget ({0}) ran out: the sitemap is partial, {1} discovered urls have not "
+                                  "been parsed".format ( frontier_stats[ 'budget_exhausted' ],
+                                                         frontier_stats[ 'pending' ] ) )
+
+        self.logger.info ( "Bodies not downloaded: {0} non-html urls, {1} pages cut at {2} bytes".format (
+            self.skipped_bodies[ 'non_html' ], self.skipped_bodies[ 'truncated' ], self.max_body_size ) )
+
+        if self.is_robots_obeyed:
+            self.logger.info ( "Robots.txt: {0} links disallowed".format ( self.num_disallowed ) )
+
+        if self.is_memory_bounded:
+            self.logger.info ( "Url graph on disk: {urls} urls ({size} bytes), {cached_rows} cached; lookups: "
+                               "{cache_hits} cached, {bloom_negatives} new urls known by the Bloom filter, {reads} "
+                               "reads; {written} rows written; {0} urlnodes spilled by the frontier".format (
+                                   self.frontier.spilled, **self.url_graph.get_stats ( ) ) )
+
+        if self.trap_detector:
+            self.logger.info ( "Traps: {repeated_segments} urls with repeated segments, {long_query} with long "
+                               "queries and {template_cap} beyond their template cap not fetched, {near_duplicates} "
+                               "near-duplicate pages not expanded, {fetches_avoided} fetches avoided".format (
+                                   **self.trap_detector.get_stats ( ) ) )
+
+        if self.scheduler:
+            self.logger.info ( "Politeness: {throttled} throttled responses, {errors} failed requests, {retries} "
+                               "retries, {decreases} decreases of concurrency, concurrency per host at the end: "
+                               "{concurrency}".format ( **self.scheduler.get_stats ( ) ) )
+
+    def get_crawl_stats ( self ):
+        """
+        Returns the statistics of the crawl so far: the timings per stage and the counters of self.stats, along \
+        with the counters of the frontier (and of the politeness scheduler, if any).
+        :return: dict
+        """
+        crawl_stats = self.stats.get_snapshot ( )
+        crawl_stats[ 'frontier' ] = self.frontier.get_stats ( )
+        if self.scheduler:
+            crawl_stats[ 'politeness' ] = self.scheduler.get_stats ( )
+        if self.trap_detector:
+            crawl_stats[ 'traps' ] = self.trap_detector.get_stats ( )
+        return crawl_stats
+
+    def start_monitor ( self ):
+        """
+        Starts logging the progress of the crawl and serving its statistics on localhost, as configured.
+        :return:
+        """
+        self.monitor = CrawlMonitor ( self.stats, self.get_crawl_stats,
+                                      interval=self.cfg.get ( PROGRESS_INTERVAL ),
+                                      port=self.cfg.get ( METRICS_PORT ) )
+        self.monitor.start ( )
+
+    def close_crawl_stats ( self ):
+        """
+        Stops the monitor of the crawl, logs a summary of its statistics, and writes them to a JSON file if the \
+        user asked for it.
+        :return:
+        """
+        if self.monitor:
+            self.monitor.stop ( )
+
+        crawl_stats = self.get_crawl_stats ( )
+        self.logger.info ( "Stats: {0} responses in {1} seconds ({2}/s), {3} bytes downloaded, status codes: {4}, "
+                           "errors: {5}".format ( crawl_stats[ 'responses' ], crawl_stats[ 'elapsed_seconds' ],
+                                                  crawl_stats[ 'responses_per_second' ],
+                                                  crawl_stats[ 'bytes_downloaded' ], crawl_stats[ 'status_codes' ],
+                                                  crawl_stats[ 'errors' ] ) )
+
+        stats_path = self.cfg.get ( STATS_PATH )
+        if not stats_path: return
+        try:
+            with open ( stats_path, 'w' ) as stats_file:
+                json.dump ( crawl_stats, stats_file, indent=2 )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Statistics {1} cannot be written".format ( err, stats_path ) )
+
+    def get_connection_pool ( self ):
+        """
+        Returns the pool of persistent connections used to download pages. It is used to report how \
+        many requests have reused an already open connection (get_reuse_ratio).
+        :return: an instance of ConnectionPool
+        """
+        return self.fetcher.pool
+
     def parse_site_urls ( self ):
         """
-        Used by threads to parse site urls. A thread fetches a urlnode instance from self.new_urlnodes_queue (if it can't fetch \
-        a urlnode within user specified timeout seconds, then it exits). If this urlnode has already been visited, then it does \
-        nothing and goes into next loop and redo the same operation.
+        Used by threads to parse site urls. A thread fetches a urlnode instance from self.frontier (if the frontier is empty \
+        and no other thread is parsing a page anymore, the crawl is finished and it exits). If this urlnode has already been \
+        visited, then it does nothing and goes into next loop and redo the same operation.
 
-        However, if the fetched urlnode has not been earlier visited, then first it adds this urlnode into self.visited_urlnodes \
+        However, if the fetched urlnode has not been earlier visited, then first it marks this urlnode as visited in self.url_graph \
         and find all urlnodes of the child urls of the current url (urlnode.url). All the child urlnodes are linked as \
         the children of urlnode of current url and all the child urlnodes that have not been visited earlier are added \
-        into self.new_urlnodes_queue.
+        into self.frontier.
         :return:
         """
         while True:
-            new_url_node = self.fetch_urlnode_from_new_urls_queue ( )
+            start = time.perf_counter ( )
+            frontier_entry = self.fetch_urlnode_from_new_urls_queue ( )
+            self.stats.add_time ( 'queue_wait', time.perf_counter ( ) - start )
 
-            # thread exits now if new_url_node is None (timeout has been expired!)
-            if not new_url_node: break
+            # thread exits now if frontier_entry is None (crawl is finished!)
+            if not frontier_entry: break
 
-            # attempting to add new_url_node into self.visited_urlnodes
-            # if new_url_node is added into visited_urlnodes, returns True  else False (False means already existing)
-            is_visited_urlnodes_updated = self.update_visited_urlnodes_if_newurlnode ( new_url_node )
+            new_url_node, depth = frontier_entry
+            try:
+                self.parse_urlnode ( new_url_node, depth )
+            finally:
+                # children of new_url_node (if any) are in the frontier now
+                self.frontier.task_done ( )
 
-            # it is a new node that has not been visited previously and has been added to self.visited_urlnodes
-            if is_visited_urlnodes_updated:
-                new_url = new_url_node.url  # str
-                valid_page_child_urlnodes = self.find_valid_urlchildnodes_in_urlpage ( new_url )
+    def parse_urlnode ( self, new_url_node, depth ):
+        """
+        Parses the page of a urlnode fetched from self.frontier, unless it has already been visited.
+        :param new_url_node: an instance of UrlNode
+        :param depth: number of clicks between the domain root and new_url_node (int)
+        :return:
+        """
+        # attempting to mark new_url_node as visited in self.url_graph
+        # if new_url_node is marked now, returns True  else False (False means already visited)
+        is_visited_urlnodes_updated = self.update_visited_urlnodes_if_newurlnode ( new_url_node )
+
+        # it is a new node that has not been visited previously and has been marked as visited
+        if is_visited_urlnodes_updated:
+            new_url = new_url_node.url  # str
+
+            # put the children of new_url_node into self.frontier as soon as they are found on the page
+            for child_urlnode in self.find_valid_urlchildnodes_in_urlpage ( new_url ):
+                self.link_child_urlnode ( new_url_node, child_urlnode, depth + 1 )
 
-                if valid_page_child_urlnodes:
-                    # update the children of new_url_node and also put them into self.new_urlnodes_queue
-                    for child_urlnode in valid_page_child_urlnodes:
-                        new_url_node.child_urls.add ( child_urlnode )
-                        self.insert_urlnodes_into_new_urls_queue ( child_urlnode )
+            self.record_parsed_urlnode ( new_url_node )
 
     def find_valid_urlchildnodes_in_urlpage ( self, url ):
         """
         Finds all the valid urls listed on the url web page and creates urlnodes for those child urls (only those child urlnodes \
-        which have not been created earlier) but returns all the child urlnodes for this url.
+        which have not been created earlier). The page is read in chunks and the child urlnodes are yielded as soon as the \
+        chunk containing their link has been received, so they can be crawled before the download of this page finishes.
         :param url: str
-        :return: a set which contains instances of valid child UrlNodes for given url
+        :return: a generator of instances of valid child UrlNodes for given url
         """
-        # contains urlnode instances (using set to avoid dup)
-        found_valid_urlnodes = set ( )
+        if self.is_trap_url ( url ): return
 
+        method = self.get_request_method ( url )
+        cached_page = self.get_cached_page ( url, method )
         try:
-            # response = urllib.request.urlopen ( url, timeout=cfg.CFG[TIMEOUT] )
-            # Because of mod_security or some similar server security feature, server can \
-            # easily block urllib.request.urlopen(),  as it is based on the user agent.
-            # Hack: https://stackoverflow.com/a/31758803/4336040
-            opener = AppURLopener ( )
-            response = opener.open ( url )
+            # the response comes over a persistent connection of self.fetcher, which is handed back to \
+            # the pool once the body has been read. A cached page is requested conditionally.
+            response = self.fetch_page ( url, method, PageCache.get_conditional_headers ( cached_page ) )
+
+            if method == 'HEAD' and self.is_get_needed_after_head ( response ):
+                response.close ( )
+                method = 'GET'
+                response = self.fetch_page ( url )
 
         # Handling errors: https://stackoverflow.com/questions/8763451/how-to-handle-urllibs-timeout-in-python-3
-        except (urllib.error.HTTPError, socket.timeout, urllib.error.URLError,) as err:
+        except (http.client.HTTPException, OSError, ValueError) as err:
+            self.stats.count_error ( err )
             self.logger.error ( "URL {0} cannot be open. Error: {1}".format ( url, err ) )
-            return found_valid_urlnodes
+            self.record_link_result ( url, error=err, method=method )
+            return
 
         except Exception as err:
+            self.stats.count_error ( err )
             self.logger.error ( "URL {0} cannot be open. Error: {1}".format ( url, err ) )
-            return found_valid_urlnodes
+            self.record_link_result ( url, error=err, method=method )
+            return
+
+        self.record_link_result ( url, response, method=method )
+
+        if response.getcode ( ) == 304 and cached_page:  # page has not changed since it was cached
+            response.close ( )
+            yield from self.get_cached_urlnodes ( url, cached_page )
+            return
 
         if response.getcode() != 200: # if response status is not Ok (e.g; asked url is dead or broken)
+            response.close ( )
             self.logger.error ( "URL {0} cannot be open. Response code: {1}".format ( url, response.getcode() ) )
-            return found_valid_urlnodes
+            return
+
+        if not self.is_html_response ( response ):
+            # images, documents, ... are leaves of the sitemap: their body is not downloaded
+            response.close ( )
+            self.count_skipped_body ( 'non_html' )
+            return
+
+        self.record_page ( url, response )
 
-        html_page = str ( response.read ( ) )
-        pattern = '<a [^>]*href=[\'|"](.*?)[\'"].*?>'
+        # links are resolved against the final url of the page (after redirects)
+        link_extractor = LinkExtractor ( response.url, response.headers.get_content_charset ( ) )
 
-        # list of child urls (content type: str)
-        found_all_urls = re.findall ( pattern, html_page )
+        # all the links of the page, if they have to be cached (None otherwise)
+        page_links = [ ] if self.is_page_cacheable ( url, response ) else None
 
-        # adding all the valid links in found_all_links into found_valid_urlnodes as urlnode
-        for link in found_all_urls:
-            url_node = self.get_acceptable_urlnode ( link )
+        # the body and the links of the page are held until it has been read, if it has to be compared with the \
+        # pages already parsed (None otherwise)
+        held_page = ([ ], [ ]) if self.trap_detector else None
+
+        # seconds spent reading the body and extracting its links, recorded once per page
+        download_time = parse_time = 0.0
+        received_size = 0
+        try:
+            while True:
+                start = time.perf_counter ( )
+                chunk = response.read1 ( min ( self.CHUNK_SIZE, self.max_body_size - received_size ) )
+                read_end = time.perf_counter ( )
+                download_time += read_end - start
+                if not chunk: break
+                links = link_extractor.feed ( chunk )
+                parse_time += time.perf_counter ( ) - read_end
+                if page_links is not None: page_links.extend ( links )
+                if held_page:
+                    held_page[ 0 ].append ( chunk )
+                    held_page[ 1 ].extend ( links )
+                else:
+                    yield from self.get_acceptable_urlnodes ( links, url )
+
+                received_size += len ( chunk )
+                if received_size >= self.max_body_size:
+                    self.log_truncated_body ( url )
+                    break
+        except (http.client.HTTPException, OSError) as err:
+            self.stats.count_error ( err )
+            self.logger.error ( "URL {0} cannot be read. Error: {1}".format ( url, err ) )
+            page_links = None  # the links of a page which has not been completely read are not cached
+        finally:
+            response.close ( )
+
+        start = time.perf_counter ( )
+        links = link_extractor.close ( )
+        self.stats.add_time ( 'parse', parse_time + time.perf_counter ( ) - start )
+        self.stats.add_time ( 'download', download_time )
+        self.stats.add_bytes ( received_size )
+        if page_links is not None:
+            self.cache_page ( url, response, page_links + links )
+        if held_page:
+            links = self.get_expanded_links ( url, response, held_page[ 0 ], held_page[ 1 ] + links )
+        yield from self.get_acceptable_urlnodes ( links, url )
+
+    def is_trap_url ( self, url ):
+        """
+        Tells whether url is a crawler trap (see TrapDetector.get_trap), which is linked in the sitemap but is \
+        not fetched, if the user asked for trap detection.
+        :param url: str
+        :return: bool
+        """
+        if not self.trap_detector: return False
+
+        trap = self.trap_detector.get_trap ( url )
+        if trap is None: return False
+
+        self.logger.info ( "URL {0} is not fetched: crawler trap ({1})".format ( url, trap ) )
+        if self.link_checker:
+            self.link_checker.set_skipped ( url, "trap: " + trap )
+        return True
+
+    def get_expanded_links ( self, url, response, body_chunks, links ):
+        """
+        Returns the links of a page, or no links if it is a near-duplicate of a page already parsed (see \
+        TrapDetector.get_near_duplicate): its links are not followed.
+        :param url: str
+        :param response: response of url, whose body has been read
+        :param body_chunks: body of the page (list of bytes)
+        :param links: absolute links of the page (list of str)
+        :return: list of str
+        """
+        try:
+            body = b''.join ( body_chunks ).decode ( response.headers.get_content_charset ( ) or 'utf-8', 'replace' )
+        except LookupError:  # unknown charset
+            body = b''.join ( body_chunks ).decode ( 'utf-8', 'replace' )
+
+        original_url = self.trap_detector.get_near_duplicate ( url, self.trap_detector.get_fingerprint ( body, links ) )
+        if original_url is None: return links
+
+        # the urls of the domain which only this page has linked so far are not fetched
+        link_urls = (self.url_canonicalizer.canonicalize ( link, url ) for link in links)
+        new_urls = { link_url for link_url in link_urls if link_url and self.is_internal_url ( link_url )
+                     and self.url_graph.find_url ( link_url ) is None }
+        self.trap_detector.count_avoided_fetches ( len ( new_urls ) )
+        self.logger.info ( "URL {0} is not expanded: near-duplicate of {1}".format ( url, original_url ) )
+        return [ ]
+
+    def fetch_page ( self, url, method='GET', headers=None ):
+        """
+        Sends a request for url with self.fetcher. If the crawl is polite, the request waits for its turn \
+        (see PolitenessScheduler), and a request which is throttled or fails is retried after a backoff.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: extra headers of the request (dictionary / None)
+        :return: an instance of FetchResponse (the last one if the request has been retried)
+        """
+        if not self.scheduler:
+            return self.get_archiving_response ( self.fetcher.fetch ( url, method, headers, self.stats ), method )
+
+        attempt = 0
+        while True:
+            start = time.perf_counter ( )
+            host_key = self.scheduler.acquire ( url )
+            self.stats.add_time ( 'polite_wait', time.perf_counter ( ) - start )
+            start = time.monotonic ( )
+            try:
+                response = self.fetcher.fetch ( url, method, headers, self.stats )
+            except (http.client.HTTPException, OSError) as err:
+                if not self.scheduler.release ( host_key, None, time.monotonic ( ) - start, attempt=attempt ):
+                    raise
+                self.logger.warning ( "URL {0} cannot be open. Error: {1}. Retrying".format ( url, err ) )
+            except BaseException:
+                self.scheduler.cancel ( host_key )
+                raise
+            else:
+                if not self.scheduler.release ( host_key, response.getcode ( ), time.monotonic ( ) - start,
+                                                response.headers.get ( 'Retry-After' ), attempt ):
+                    return self.get_archiving_response ( response, method )
+                response.close ( )
+                self.logger.warning ( "URL {0} is throttled. Response code: {1}. Retrying".format (
+                    url, response.getcode ( ) ) )
+
+            attempt += 1
+
+    def get_request_method ( self, url ):
+        """
+        Returns the HTTP method with which url is requested: HEAD if its extension is the one of an asset \
+        (see ASSET_EXTENSIONS), GET otherwise.
+        :param url: str
+        :return: 'GET' or 'HEAD' (str)
+        """
+        last_segment = urlsplit ( url ).path.rsplit ( '/', 1 )[ -1 ]
+        if '.' not in last_segment: return 'GET'
+
+        return 'HEAD' if last_segment.rsplit ( '.', 1 )[ 1 ].lower ( ) in self.ASSET_EXTENSIONS else 'GET'
+
+    def is_get_needed_after_head ( self, response ):
+        """
+        Tells whether a url requested with HEAD has to be requested again with GET: either the server does not \
+        support HEAD, or the url is a html page after all.
+        :param response: response of the HEAD request
+        :return: bool
+        """
+        return response.getcode ( ) in self.HEAD_NOT_ALLOWED_CODES or \
+               (response.getcode ( ) == 200 and self.is_html_response ( response ))
+
+    def is_html_response ( self, response ):
+        """
+        Tells from its Content-Type header whether a response is a html page. A response without Content-Type \
+        is assumed to be a page.
+        :param response: response whose headers have been received
+        :return: bool
+        """
+        if 'Content-Type' not in response.headers: return True
+        return response.headers.get_content_type ( ) in self.HTML_CONTENT_TYPES
+
+    def count_skipped_body ( self, reason ):
+        """
+        :param reason: 'non_html' or 'truncated' (str)
+        :return:
+        """
+        with self.mutex:
+            self.skipped_bodies[ reason ] += 1
+
+    def log_truncated_body ( self, url ):
+        """
+        :param url: url of a page larger than max_body_size (str)
+        :return:
+        """
+        self.count_skipped_body ( 'truncated' )
+        self.logger.warning ( "URL {0} is larger than {1} bytes: the rest of the page is not parsed".format (
+            url, self.max_body_size ) )
+
+    def get_acceptable_urlnodes ( self, links, referrer=None ):
+        """
+        Yields the urlnodes of the acceptable links (see get_acceptable_urlnode). It is shared by every crawl engine, \
+        so that all of them build the same UrlNode tree.
+        :param links: iterable of absolute links (str)
+        :param referrer: url of the page on which the links have been found, against which relative links are \
+                         resolved and which the link checker reports (str / None)
+        :return: a generator of instances of UrlNode
+        """
+        if self.link_checker and referrer:
+            self.add_checked_links ( links, referrer )
+
+        # the page has been interned when it was linked, or it is the domain root
+        referrer_id = self.url_graph.find_url ( referrer ) if self.is_link_graph_recorded and referrer else None
+
+        for link in links:
+            url_node = self.get_acceptable_urlnode ( link, referrer, referrer_id )
             if url_node:  # this urlnode is acceptable
-                found_valid_urlnodes.add ( url_node )
+                yield url_node
+
+    def add_checked_links ( self, links, referrer ):
+        """
+        Hands the links found on a page to the link checker: the urls of the domain are checked by the crawl \
+        itself, the external ones by the link checker.
+        :param links: iterable of absolute links (str)
+        :param referrer: url of the page on which the links have been found (str)
+        :return:
+        """
+        for link in links:
+            url = self.url_canonicalizer.canonicalize ( link, referrer )
+            if url is None: continue
 
-        return found_valid_urlnodes
+            self.link_checker.add_link ( url, referrer, not self.is_internal_url ( url ) )
 
-    @staticmethod
-    def config_urllib_proxy ( ):
+    def record_link_result ( self, url, response=None, error=None, method=None ):
         """
-        Configuring system proxy for the application.
+        Hands the outcome of the request of a crawled url to the link checker, if any.
+        :param url: str
+        :param response: response of url (None if the request has failed)
+        :param error: error which has failed the request (Exception / None)
+        :param method: method of the request (str)
         :return:
         """
+        if self.link_checker:
+            self.link_checker.set_result ( url, response, error, method )
 
-        # we need auth otherwise reported error we faced was:
-        # urllib.error.URLError: <urlopen error [SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed (_ssl.c:645)>
-        # Solution: https://stackoverflow.com/a/36214206/4336040
-        # Another possible approach (Didn't explore though): https://docs.python.org/3/library/ssl.html#ssl.create_default_context
-        authinfo = urllib.request.HTTPBasicAuthHandler ( )
+    def close_link_checker ( self ):
+        """
+        Checks the urls of the domain which have been left out of the crawl (e.g; by a crawl budget), waits for \
+        the link checker to finish, and writes its report.
+        :return:
+        """
+        if not self.link_checker: return
+
+        self.link_checker.check_unchecked_urls (
+            lambda url: not self.is_robots_obeyed or self.robots_rules.can_fetch ( url ) )
+        self.link_checker.close ( )
+
+        report_path = self.cfg[ LINK_REPORT_PATH ]
+        try:
+            summary = self.link_checker.write_report ( report_path )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Link report {1} cannot be written".format ( err, report_path ) )
+            return
 
-        # Reference: https://docs.python.org/3/library/urllib.request.html#examples
-        proxy_support = urllib.request.ProxyHandler ( dflt_cfg.DFLT_CFG.get ( SYSTEM_PROXY ) )
+        self.logger.info ( "Links: {links} urls ({external} external), {broken} broken, {redirected} redirected, "
+                           "{unchecked} unchecked, {skipped} skipped; report in {0}".format ( report_path, **summary ) )
+
+    def export_link_graph ( self ):
+        """
+        Writes the link graph of the crawl (see linkgraph.write_link_graph), if the user asked for it.
+        :return:
+        """
+        if not self.is_link_graph_recorded or self.urlnode_parse_root is None: return
 
-        # build a new opener that adds authentication and caching FTP handlers
-        opener = urllib.request.build_opener ( proxy_support, authinfo )
+        graph_path = self.cfg[ GRAPH_PATH ]
+        try:
+            num_urls, num_links = write_link_graph ( graph_path, self.url_graph, self.urlnode_parse_root.url_id )
+        except (ImportError, OSError) as err:
+            self.logger.error ( "Error {0} occurred. Link graph {1} cannot be written".format ( err, graph_path ) )
+            return
 
-        # installing opening globally so that it will be used everywhere with urlrequest
-        urllib.request.install_opener ( opener )
+        self.link_graph_size = (num_urls, num_links)
+        self.logger.info ( "Link graph: {0} urls, {1} links; written in {2}".format ( num_urls, num_links,
+                                                                                   graph_path ) )
 
     def update_visited_urlnodes_if_newurlnode ( self, new_url_node ):
         """
-        If a new visited urlnode is already in visited_urls set then return False and exit. \
-        Otherwise insert new_url_node into visited_urls and return True
+        If a new visited urlnode has already been visited then return False and exit. \
+        Otherwise mark new_url_node as visited and return True
         :param new_url_node: object of UrlNode
         :return: bool
         """
-        if self.is_url_already_visited ( new_url_node ): return False
+        # checking and marking is atomic, otherwise two threads could both visit new_url_node
+        return self.url_graph.mark_visited ( new_url_node.url_id )
 
-        # insert into visited_urls
-        self.visited_urlnodes.add ( new_url_node )
-        return True
-
-    def insert_urlnodes_into_new_urls_queue ( self, url_node ):
+    def insert_urlnodes_into_new_urls_queue ( self, url_node, depth=0 ):
         """
-        Put a new discovered url_node into new_urls_queue if it has never been visited.
+        Put a new discovered url_node into the frontier if it has never been visited nor enqueued.
         :param url_node: an instance of UrlNode
-        :return:
+        :param depth: number of clicks between the domain root and url_node (int)
+        :return: True if url_node has been enqueued by this call (bool)
         """
         # again checking as if another thread has already processed this url_node, then just return.
-        if self.is_url_already_visited ( url_node ): return
+        if self.is_url_already_visited ( url_node ): return False
 
-        # Updating the full url of url_node by constructing a full (“absolute”) URL by combining \
-        # a “base URL” (base) with another URL (url).
-        # Reference: https://docs.python.org/2/library/urlparse.html#urlparse.urljoin
-        url_node.url = urljoin ( self.domain_name, url_node.url )
-
-        # no need to specify timeout as new_urls_queue can contain infinite urls
-        self.new_urlnodes_queue.put ( item=url_node, block=True )
+        return self.frontier.put ( url_node, depth )
 
     def fetch_urlnode_from_new_urls_queue ( self ):
         """
-        Removes and returns an UrlNode from new_urlnodes_queue. \
-        If an url node can't be fetched within timeout, it sends None to thread (consequently the \
-        calling thread will use it as an exit point and terminate itself). Otherwise this function \
-        returns the retrieved urlnode to the calling thread.
-        :return: instance of UrlNode (object) / None
+        Removes and returns an UrlNode from the frontier, waiting while other threads are still parsing pages. \
+        If the frontier is empty and no page is being parsed (or a crawl budget has run out), the crawl is finished \
+        and it sends None to thread (consequently the calling thread will use it as an exit point and terminate itself). \
+        Otherwise this function returns the retrieved urlnode and its depth to the calling thread, which has to call \
+        self.frontier.task_done once done.
+        :return: a 2-tuple (instance of UrlNode (object), depth (int)) / None
         """
-        try:
-            # means all is okay signal for thread
-            return self.new_urlnodes_queue.get ( block=True, timeout=dflt_cfg.DFLT_CFG.get ( TIMEOUT ) )
-        except queue.Empty:
-            # signal for thread to exit
-            return None
+        return self.frontier.get ( )
 
     @staticmethod
     def get_simple_url ( url ):
@@ -272,32 +1236,44 @@ class Crawler:
         scheme, netloc, path, query, fragment = urlsplit ( url )
         return urlunsplit ( (scheme, netloc, path, query, fragment) )
 
-    def get_acceptable_urlnode ( self, url ):
+    def get_acceptable_urlnode ( self, url, base_url=None, referrer_id=None ):
         """
-        Returns a urlnode (creates one if it has never been visited earlier) for an url if it satisfies \
-        these three conditions: \
+        Returns a urlnode (creates one if it has never been visited earlier) for the canonical url of url \
+        (see UrlCanonicalizer) if it satisfies these four conditions: \
             1. url belongs to either http or https scheme, \
-            2. url belongs to the same domain, and \
-            3. url has never been visited.
+            2. url belongs to the same domain, \
+            3. url has never been visited, and \
+            4. url is not disallowed by the robots.txt of the domain (if the user asked to obey it).
 
         Otherwise, this function returns None.
 
         :param url: str
+        :param base_url: url of the page linking to url, against which a relative url is resolved (str / None for \
+                         the domain root)
+        :param referrer_id: url id of the page linking to url, whose link to url is recorded in the url graph \
+                            whether url is acceptable or not (int / None not to record it)
         :return: an instance of UrlNode / None
         """
-        url = self.get_simple_url(url)
-
-        # If url scheme is not http or https, reject this url
-        if not self.is_http_url ( url ): return None
+        # canonicalizing the url in one pass, which rejects the urls whose scheme is not http or https
+        url = self.url_canonicalizer.canonicalize ( url, base_url or self.domain_name )
+        if url is None: return None
 
         # If url is from external domain, reject this url
         if not self.is_internal_url ( url ): return None
 
-        urlnode = self.get_create_urlnode(url)
+        urlnode = UrlNode ( url, self.url_graph )
+        if referrer_id is not None:
+            self.url_graph.add_edge ( referrer_id, urlnode.url_id )
 
         # If url is already visited, reject this url
         if self.is_url_already_visited ( urlnode ): return None
 
+        # If url is disallowed by robots.txt, reject this url
+        if self.is_robots_obeyed and not self.robots_rules.can_fetch ( urlnode.url ):
+            with self.mutex:
+                self.num_disallowed += 1
+            return None
+
         return urlnode
 
     def get_create_urlnode( self, url ):
@@ -307,19 +1283,12 @@ class Crawler:
         :param url: str
         :return: an instance of UrlNode
         """
-        url = self.get_simple_url(url)
-
-        self.mutex.acquire ( )
-        # here only one thread at a time will be there.
-        # we are ensuring that when two/more threads create only instance of urlnode for the same url
-        urlnode = self.url_instance.get ( url )
-        if not urlnode:
-            urlnode = UrlNode ( url )
-            self.url_instance[ url ] = urlnode
+        # Constructing a full (“absolute”) canonical URL by combining a “base URL” (the domain root) with another \
+        # URL (url), as the url graph only holds absolute urls.
+        url = self.url_canonicalizer.canonicalize ( url, self.domain_name ) or url
 
-        self.mutex.release( )
-
-        return urlnode
+        # url_graph interns url atomically, so two/more threads get the same url id (and equal urlnodes) for the same url
+        return UrlNode ( url, self.url_graph )
 
     @staticmethod
     def is_http_url ( url ):
@@ -340,14 +1309,11 @@ class Crawler:
     def is_internal_url ( self, url ):
         """
         If url belongs to same domain returns True; else False
-        :param url: str
+        :param url: canonical url, see UrlCanonicalizer (str)
         :return: bool
         """
-        host = urlparse ( url ).netloc
-        if host == self.host or host == '':
-            return True
-
-        return False
+        # a canonical url always is "scheme://netloc/..." with a lowercase host
+        return url.split ( '/', 3 )[ 2 ] == self.host
 
     def is_url_already_visited ( self, urlnode ):
         """
@@ -355,8 +1321,7 @@ class Crawler:
         :param urlnode: an instance of UrlNode
         :return: bool
         """
-        if urlnode in self.visited_urlnodes: return True
-        return False
+        return self.url_graph.is_visited ( urlnode.url_id )
 
     @staticmethod
     def get_domain_name ( domain_name ):
@@ -371,7 +1336,8 @@ class Crawler:
         :return: real domain name (str)
         """
         parsed_uri = urlparse ( domain_name )
-        domain = '{uri.scheme}://{uri.netloc}/'.format ( uri=parsed_uri )
+        domain = '{0}://{1}/'.format ( parsed_uri.scheme,
+                                       get_canonical_netloc ( parsed_uri.scheme, parsed_uri.netloc ) )
 
         return domain
 
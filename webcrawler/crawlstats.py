@@ -0,0 +1,345 @@
+# References:
+# 1. Prometheus text exposition format: https://prometheus.io/docs/instrumenting/exposition_formats/
+# 2. https://docs.python.org/3/library/http.server.html
+
+import bisect
+import collections
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StageTimer:
+    """
+    This class holds the durations measured for one stage of the crawl: their count, sum and maximum, and a \
+    histogram from which percentiles are estimated without keeping every duration.
+    """
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__ ( self, num_buckets ):
+        """
+        :param num_buckets: number of buckets of the histogram (int)
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [ 0 ] * num_buckets
+
+
+class CrawlStats:
+    """
+    This class measures where the time of a crawl goes, stage by stage: waiting for a url to crawl (queue_wait, \
+    thread engine), waiting for the politeness scheduler (polite_wait), resolving a host (dns), opening a \
+    connection and its TLS handshake (connect), from sending a request to receiving its response head (ttfb), \
+    reading a page body (download) and extracting its links (parse). It also counts the responses per status \
+    code, the errors per type and the bytes of the pages downloaded. Recording a duration takes a lock and a few \
+    additions, so it is always on. It is thread safe.
+    """
+    STAGES = ('queue_wait', 'polite_wait', 'dns', 'connect', 'ttfb', 'download', 'parse')
+
+    # upper bounds in seconds of the histogram buckets of every stage: 1ms, 2ms, 4ms, ... 65s, then the last \
+    # bucket holds anything longer
+    BUCKET_BOUNDS = tuple ( 0.001 * 2 ** bucket_no for bucket_no in range ( 17 ) )
+
+    def __init__ ( self ):
+        # it guards all the attributes below
+        self.mutex = threading.Lock ( )
+
+        # wall clock time at which the crawl has started, and monotonic clock for its elapsed time
+        self.start_time = time.time ( )
+        self.start = time.monotonic ( )
+
+        # Format is: {stage_str: StageTimer}
+        self.timers = { stage: StageTimer ( len ( self.BUCKET_BOUNDS ) + 1 ) for stage in self.STAGES }
+
+        # Format is: {status_code_int: count} and {error_type_str: count}
+        self.status_codes = collections.Counter ( )
+        self.errors = collections.Counter ( )
+
+        self.bytes_downloaded = 0
+
+    def add_time ( self, stage, seconds ):
+        """
+        :param stage: one of STAGES (str)
+        :param seconds: duration of the stage (float)
+        :return:
+        """
+        bucket_no = bisect.bisect_left ( self.BUCKET_BOUNDS, seconds )
+        with self.mutex:
+            timer = self.timers[ stage ]
+            timer.count += 1
+            timer.total += seconds
+            if seconds > timer.max: timer.max = seconds
+            timer.buckets[ bucket_no ] += 1
+
+    def count_response ( self, status ):
+        """
+        :param status: status code of a response (int)
+        :return:
+        """
+        with self.mutex:
+            self.status_codes[ status ] += 1
+
+    def count_error ( self, err ):
+        """
+        :param err: exception raised by a request or while reading a response
+        :return:
+        """
+        with self.mutex:
+            self.errors[ type ( err ).__name__ ] += 1
+
+    def add_bytes ( self, num_bytes ):
+        """
+        :param num_bytes: size of a downloaded page body (int)
+        :return:
+        """
+        with self.mutex:
+            self.bytes_downloaded += num_bytes
+
+    def get_counters ( self ):
+        """
+        Returns all the raw counters, e.g; to send them to another process which adds them with add_counters.
+        :return: dict
+        """
+        with self.mutex:
+            return {
+                'timers': { stage: (timer.count, timer.total, timer.max, list ( timer.buckets ))
+                            for stage, timer in self.timers.items ( ) },
+                'status_codes': dict ( self.status_codes ),
+                'errors': dict ( self.errors ),
+                'bytes_downloaded': self.bytes_downloaded,
+            }
+
+    def add_counters ( self, counters ):
+        """
+        Adds the counters of another CrawlStats (e.g; the one of a crawl process), as returned by its get_counters.
+        :param counters: dict
+        :return:
+        """
+        with self.mutex:
+            for stage, (count, total, max_time, buckets) in counters[ 'timers' ].items ( ):
+                timer = self.timers[ stage ]
+                timer.count += count
+                timer.total += total
+                timer.max = max ( timer.max, max_time )
+                timer.buckets = [ bucket + other for bucket, other in zip ( timer.buckets, buckets ) ]
+            self.status_codes.update ( counters[ 'status_codes' ] )
+            self.errors.update ( counters[ 'errors' ] )
+            self.bytes_downloaded += counters[ 'bytes_downloaded' ]
+
+    def get_percentile ( self, timer, fraction ):
+        """
+        Estimates a percentile of the durations of a stage: the upper bound of the histogram bucket in which it falls.
+        :param timer: an instance of StageTimer
+        :param fraction: e.g; 0.95 for the 95th percentile (float)
+        :return: seconds (float) / None if no duration has been measured
+        """
+        if not timer.count: return None
+
+        rank = fraction * timer.count
+        cumulated = 0
+        for bucket_no, bucket in enumerate ( timer.buckets ):
+            cumulated += bucket
+            if cumulated >= rank:
+                return self.BUCKET_BOUNDS[ bucket_no ] if bucket_no < len ( self.BUCKET_BOUNDS ) else timer.max
+        return timer.max
+
+    def get_snapshot ( self ):
+        """
+        Returns the counters of the crawl so far, with the rate of responses and the count, mean, estimated \
+        50th / 95th percentiles and maximum of the durations of every stage (in milliseconds).
+        :return: dict
+        """
+        with self.mutex:
+            elapsed = time.monotonic ( ) - self.start
+            responses = sum ( self.status_codes.values ( ) )
+
+            stages = dict ( )
+            for stage, timer in self.timers.items ( ):
+                p50, p95 = self.get_percentile ( timer, 0.5 ), self.get_percentile ( timer, 0.95 )
+                stages[ stage ] = {
+                    'count': timer.count,
+                    'total_seconds': round ( timer.total, 3 ),
+                    'mean_ms': round ( 1000 * timer.total / timer.count, 3 ) if timer.count else None,
+                    'p50_ms': round ( 1000 * p50, 3 ) if p50 is not None else None,
+                    'p95_ms': round ( 1000 * p95, 3 ) if p95 is not None else None,
+                    'max_ms': round ( 1000 * timer.max, 3 ),
+                }
+
+            return {
+                'start_time': self.start_time,
+                'elapsed_seconds': round ( elapsed, 3 ),
+                'responses': responses,
+                'responses_per_second': round ( responses / elapsed, 3 ) if elapsed > 0 else 0.0,
+                'bytes_downloaded': self.bytes_downloaded,
+                'status_codes': { str ( status ): count for status, count in sorted ( self.status_codes.items ( ) ) },
+                'errors': dict ( self.errors ),
+                'stages': stages,
+            }
+
+    def get_prometheus_text ( self, gauges=None ):
+        """
+        Returns the counters in the Prometheus text exposition format.
+        :param gauges: extra gauges, e.g; the number of urls pending in the frontier. Format is: {name_str: number}
+        :return: str
+        """
+        lines = [ ]
+        with self.mutex:
+            lines.append ( "# TYPE webcrawler_responses_total counter" )
+            for status, count in sorted ( self.status_codes.items ( ) ):
+                lines.append ( 'webcrawler_responses_total{{code="{0}"}} {1}'.format ( status, count ) )
+
+            lines.append ( "# TYPE webcrawler_errors_total counter" )
+            for error, count in sorted ( self.errors.items ( ) ):
+                lines.append ( 'webcrawler_errors_total{{error="{0}"}} {1}'.format ( error, count ) )
+
+            lines.append ( "# TYPE webcrawler_bytes_downloaded_total counter" )
+            lines.append ( "webcrawler_bytes_downloaded_total {0}".format ( self.bytes_downloaded ) )
+
+            lines.append ( "# TYPE webcrawler_stage_seconds histogram" )
+            for stage, timer in self.timers.items ( ):
+                cumulated = 0
+                for bound, bucket in zip ( self.BUCKET_BOUNDS, timer.buckets ):
+                    cumulated += bucket
+                    lines.append ( 'webcrawler_stage_seconds_bucket{{stage="{0}",le="{1:g}"}} {2}'.format (
+                        stage, bound, cumulated ) )
+                lines.append ( 'webcrawler_stage_seconds_bucket{{stage="{0}",le="+Inf"}} {1}'.format ( stage,
+                                                                                                      timer.count ) )
+                lines.append ( 'webcrawler_stage_seconds_sum{{stage="{0}"}} {1}'.format ( stage, timer.total ) )
+                lines.append ( 'webcrawler_stage_seconds_count{{stage="{0}"}} {1}'.format ( stage, timer.count ) )
+
+        for name, value in (gauges or { }).items ( ):
+            lines.append ( "# TYPE webcrawler_{0} gauge".format ( name ) )
+            lines.append ( "webcrawler_{0} {1}".format ( name, value ) )
+
+        return "\n".join ( lines ) + "\n"
+
+
+class CrawlMonitor:
+    """
+    This class reports the progress of a crawl while it runs: it logs a progress line every interval seconds, \
+    and if a port is given, it serves the statistics of the crawl on localhost: GET /stats returns them as JSON, \
+    GET /metrics in the Prometheus text format.
+    """
+
+    def __init__ ( self, stats, get_crawl_stats, interval=None, port=None ):
+        """
+        :param stats: an instance of CrawlStats
+        :param get_crawl_stats: function returning the statistics of the crawl (dict, see Crawler.get_crawl_stats)
+        :param interval: seconds between two progress lines (float / None or 0 for no progress lines)
+        :param port: localhost port of the statistics server (int / None for no server; 0 for any free port)
+        """
+        self.logger = logging.getLogger ( __name__ )
+        self.stats = stats
+        self.get_crawl_stats = get_crawl_stats
+        self.interval = interval
+        self.port = port
+
+        # set to stop the progress thread
+        self.stopped = threading.Event ( )
+        self.progress_th = None
+
+        self.httpd = None
+        self.server_th = None
+
+        # number of responses and time of the last progress line, to log the current rate
+        self.last_responses = 0
+        self.last_time = time.monotonic ( )
+
+    def start ( self ):
+        """
+        Starts the progress thread and the statistics server, as configured.
+        :return: (host, port) of the statistics server (2-tuple) / None if there is no server
+        """
+        if self.interval:
+            self.progress_th = threading.Thread ( target=self.log_progress_periodically, daemon=True )
+            self.progress_th.start ( )
+
+        if self.port is None: return None
+
+        monitor = self
+
+        class StatsRequestHandler ( BaseHTTPRequestHandler ):
+            def do_GET ( self ):
+                if self.path == '/stats':
+                    body = json.dumps ( monitor.get_crawl_stats ( ), indent=2 ).encode ( 'utf-8' )
+                    content_type = "application/json"
+                elif self.path == '/metrics':
+                    body = monitor.get_prometheus_text ( ).encode ( 'utf-8' )
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error ( 404 )
+                    return
+
+                self.send_response ( 200 )
+                self.send_header ( "Content-Type", content_type )
+                self.send_header ( "Content-Length", str ( len ( body ) ) )
+                self.end_headers ( )
+                self.wfile.write ( body )
+
+            def log_message ( self, *args ):
+                pass  # requests for statistics are not crawl logs
+
+        try:
+            self.httpd = ThreadingHTTPServer ( ('127.0.0.1', self.port), StatsRequestHandler )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Statistics cannot be served on port {1}".format ( err, self.port ) )
+            return None
+        self.httpd.daemon_threads = True
+
+        self.server_th = threading.Thread ( target=self.httpd.serve_forever, daemon=True )
+        self.server_th.start ( )
+
+        address = self.httpd.server_address[ :2 ]
+        self.logger.info ( "Crawl statistics served on http://{0}:{1}/stats and /metrics".format ( *address ) )
+        return address
+
+    def stop ( self ):
+        """
+        Stops the progress thread and the statistics server.
+        :return:
+        """
+        self.stopped.set ( )
+        if self.progress_th:
+            self.progress_th.join ( )
+
+        if self.httpd:
+            self.httpd.shutdown ( )
+            self.httpd.server_close ( )
+            self.server_th.join ( )
+
+    def log_progress_periodically ( self ):
+        """
+        Used by the progress thread: logs a progress line every self.interval seconds until stop is called.
+        :return:
+        """
+        while not self.stopped.wait ( self.interval ):
+            self.log_progress ( )
+
+    def log_progress ( self ):
+        """
+        Logs the number of responses so far and their current rate, the urls of the frontier, and the mean \
+        duration of the main stages.
+        :return:
+        """
+        crawl_stats = self.get_crawl_stats ( )
+        now = time.monotonic ( )
+        current_rate = (crawl_stats[ 'responses' ] - self.last_responses) / max ( now - self.last_time, 1e-9 )
+        self.last_responses, self.last_time = crawl_stats[ 'responses' ], now
+
+        stages = crawl_stats[ 'stages' ]
+        self.logger.info ( "Progress: {0} responses ({1:.1f}/s, {2:.1f}/s now), {3} urls pending, {4} parsed; mean "
+                           "ms: ttfb {5}, download {6}, parse {7}, queue wait {8}".format (
+                               crawl_stats[ 'responses' ], crawl_stats[ 'responses_per_second' ], current_rate,
+                               crawl_stats[ 'frontier' ][ 'pending' ], crawl_stats[ 'frontier' ][ 'claimed' ],
+                               *(stages[ stage ][ 'mean_ms' ] for stage in ('ttfb', 'download', 'parse', 'queue_wait')) ) )
+
+    def get_prometheus_text ( self ):
+        """
+        :return: the statistics of the crawl in the Prometheus text exposition format (str)
+        """
+        frontier_stats = self.get_crawl_stats ( )[ 'frontier' ]
+        return self.stats.get_prometheus_text ( { 'frontier_pending': frontier_stats[ 'pending' ],
+                                                  'frontier_parsed': frontier_stats[ 'claimed' ] } )
@@ -0,0 +1,451 @@
+# References:
+# 1. Bloom filter: https://en.wikipedia.org/wiki/Bloom_filter
+# 2. Less hashing, same performance (double hashing): https://www.eecs.harvard.edu/~michaelm/postscripts/rsa2008.pdf
+# 3. https://docs.python.org/3/library/sqlite3.html
+# 4. https://www.sqlite.org/pragma.html
+
+import collections
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+
+
+class BloomFilter:
+    """
+    This class is a Bloom filter: a bit array of fixed size in which every added item sets num_hashes bits. An item \
+    which has not been added is reported as absent, unless all its bits have been set by other items (a false \
+    positive, which gets more likely as the filter fills up). Items are given as their digest (see get_digest), \
+    from which all their bits are derived (double hashing). It is not thread safe.
+    """
+    def __init__ ( self, num_bits, num_hashes=7 ):
+        """
+        :param num_bits: size of the bit array (int)
+        :param num_hashes: number of bits set per item (int); 7 gives about 1% of false positives at 10 bits per item
+        """
+        self.num_bits = max ( 8, num_bits )
+        self.num_hashes = num_hashes
+        self.bits = bytearray ( (self.num_bits + 7) // 8 )
+
+        # number of items added
+        self.num_items = 0
+
+    @staticmethod
+    def get_digest ( text ):
+        """
+        :param text: str
+        :return: 16 bytes digest of text (bytes)
+        """
+        return hashlib.blake2b ( text.encode ( 'utf-8', 'surrogatepass' ), digest_size=16 ).digest ( )
+
+    def get_positions ( self, digest ):
+        """
+        :param digest: digest of an item (bytes)
+        :return: positions of the bits of the item (list of int)
+        """
+        first_hash = int.from_bytes ( digest[ :8 ], 'little' )
+        second_hash = int.from_bytes ( digest[ 8: ], 'little' ) | 1
+        return [ (first_hash + hash_no * second_hash) % self.num_bits for hash_no in range ( self.num_hashes ) ]
+
+    def add ( self, digest ):
+        """
+        :param digest: digest of an item (bytes)
+        :return:
+        """
+        for position in self.get_positions ( digest ):
+            self.bits[ position >> 3 ] |= 1 << (position & 7)
+        self.num_items += 1
+
+    def __contains__ ( self, digest ):
+        bits = self.bits
+        return all ( bits[ position >> 3 ] & (1 << (position & 7)) for position in self.get_positions ( digest ) )
+
+
+class UrlFlagSet:
+    """
+    This class is a set of url ids backed by a flag of the rows of a DiskUrlGraph, e.g; the urls which have been \
+    enqueued in the frontier (see Frontier, seen), so that it does not take memory per url.
+    """
+    def __init__ ( self, graph, flag ):
+        """
+        :param graph: an instance of DiskUrlGraph
+        :param flag: flag of the urls of the set (DiskUrlGraph.VISITED or DiskUrlGraph.ENQUEUED)
+        """
+        self.graph = graph
+        self.flag = flag
+
+    def add ( self, url_id ):
+        """
+        :param url_id: int
+        :return:
+        """
+        self.graph.set_flag ( url_id, self.flag )
+
+    def __contains__ ( self, url_id ):
+        return self.graph.has_flag ( url_id, self.flag )
+
+
+class DiskUrlGraph:
+    """
+    This class holds the urls discovered by a crawl and the links of the sitemap like UrlGraph, with the same \
+    methods, but in a SQLite database on disk, so that the memory it takes does not grow with the number of urls. \
+    Every url is a row (id, 64-bit hash of the url, url, parent id in the sitemap, visited and enqueued flags). \
+    The rows of the most recently used urls are cached in memory, and the rows which have been added or changed \
+    are written when they are evicted from the cache, a batch at a time. Before reading the database for an url \
+    which is not cached, a Bloom filter of all the urls is checked: most new urls are known to be new without \
+    reading the disk. The database is a temporary file, which is deleted when the graph is closed (or garbage \
+    collected). It is thread safe.
+    """
+    # parent id of an url which is not linked under any page (e.g; the domain root)
+    NO_PARENT = -1
+
+    # flags of the state of an url
+    VISITED = 1
+    ENQUEUED = 2
+
+    # states of a cached row: as it is in the database, changed since it has been read, not in the database yet
+    ROW_CLEAN = 0
+    ROW_CHANGED = 1
+    ROW_NEW = 2
+
+    # bytes of memory taken by a cached row of an url of about 80 characters (the row, its url and its id)
+    CACHED_ROW_SIZE = 400
+
+    # fraction of the cached rows evicted at once, when the cache is full
+    EVICTION_FRACTION = 0.125
+
+    def __init__ ( self, memory_budget, directory=None ):
+        """
+        :param memory_budget: bytes of memory taken by the graph, shared equally by the Bloom filter, the cached \
+                              rows and the page cache of SQLite (int)
+        :param directory: directory of the database file (str / None for the directory of temporary files)
+        """
+        self.mutex = threading.Lock ( )
+
+        self.bloom_filter = BloomFilter ( 8 * (memory_budget // 3) )
+
+        # most recently used rows, and the ids of their urls. Format is: {url_id: [url_str, parent_id, flags, state]} \
+        # (least recently used first) and {url_str: url_id}
+        self.rows = collections.OrderedDict ( )
+        self.cached_ids = dict ( )
+        self.max_cached_rows = max ( 64, memory_budget // 3 // self.CACHED_ROW_SIZE )
+
+        # False once a cached row has been added or changed, until the cached rows are written (see flush)
+        self.is_flushed = True
+
+        file_descriptor, self.path = tempfile.mkstemp ( prefix='urlgraph-', suffix='.sqlite3', dir=directory )
+        os.close ( file_descriptor )
+
+        # the database is scratch space of this crawl: it needs neither a journal nor to be synced to disk
+        self.connection = sqlite3.connect ( self.path, check_same_thread=False )
+        self.finalizer = weakref.finalize ( self, self.remove_database, self.connection, self.path )
+        self.connection.execute ( "PRAGMA journal_mode=OFF" )
+        self.connection.execute ( "PRAGMA synchronous=OFF" )
+        self.connection.execute ( "PRAGMA cache_size=-{0}".format ( max ( 64, memory_budget // 3 // 1024 ) ) )
+        self.connection.execute ( "CREATE TABLE urls (id INTEGER PRIMARY KEY, hash INTEGER NOT NULL, "
+                                  "url TEXT NOT NULL, parent INTEGER NOT NULL, flags INTEGER NOT NULL)" )
+        self.connection.execute ( "CREATE INDEX urls_hash ON urls (hash)" )
+
+        # the children of an url are read with an index of the parent ids, which is created the first time they are
+        self.is_parent_indexed = False
+
+        # number of urls, of links (urls with a parent) and of visited urls
+        self.num_urls = 0
+        self.num_links = 0
+        self.num_visited = 0
+
+        # Format is: {'cache_hits': count, 'bloom_negatives': count, 'reads': count, 'written': count}
+        self.stats = collections.Counter ( )
+
+    @staticmethod
+    def remove_database ( connection, path ):
+        """
+        :param connection: connection to the database (sqlite3.Connection)
+        :param path: path of the database file (str)
+        :return:
+        """
+        connection.close ( )
+        try:
+            os.remove ( path )
+        except OSError:
+            pass
+
+    @staticmethod
+    def get_url_hash ( digest ):
+        """
+        :param digest: digest of an url (see BloomFilter.get_digest)
+        :return: signed 64-bit hash of the url, stored in the database (int)
+        """
+        return int.from_bytes ( digest[ :8 ], 'little', signed=True )
+
+    def intern_url ( self, url ):
+        """
+        Returns the id of url, adding url to the graph if it is not there yet.
+        :param url: absolute url (str)
+        :return: url id (int)
+        """
+        with self.mutex:
+            url_id = self.get_url_id ( url )
+            if url_id is not None: return url_id
+
+            url_id = self.num_urls
+            self.num_urls += 1
+            self.bloom_filter.add ( BloomFilter.get_digest ( url ) )
+            self.cache_row ( url_id, [ url, self.NO_PARENT, 0, self.ROW_NEW ] )
+            self.is_flushed = False
+            return url_id
+
+    def find_url ( self, url ):
+        """
+        :param url: absolute url (str)
+        :return: url id (int) / None if url is not in the graph
+        """
+        with self.mutex:
+            return self.get_url_id ( url )
+
+    def get_url_id ( self, url ):
+        """
+        Looks url up in the cached rows, then in the Bloom filter and the database. It has to be called with \
+        self.mutex held.
+        :param url: absolute url (str)
+        :return: url id (int) / None if url is not in the graph
+        """
+        url_id = self.cached_ids.get ( url )
+        if url_id is not None:
+            self.rows.move_to_end ( url_id )
+            self.stats[ 'cache_hits' ] += 1
+            return url_id
+
+        digest = BloomFilter.get_digest ( url )
+        if digest not in self.bloom_filter:
+            self.stats[ 'bloom_negatives' ] += 1
+            return None
+
+        self.stats[ 'reads' ] += 1
+        for url_id, row_url, parent_id, flags in self.connection.execute (
+                "SELECT id, url, parent, flags FROM urls WHERE hash = ?", (self.get_url_hash ( digest ),) ):
+            if row_url == url:
+                self.cache_row ( url_id, [ url, parent_id, flags, self.ROW_CLEAN ] )
+                return url_id
+
+        return None
+
+    def get_row ( self, url_id ):
+        """
+        Returns the row of url_id, reading it from the database if it is not cached. It has to be called with \
+        self.mutex held.
+        :param url_id: int
+        :return: [url_str, parent_id, flags, state] (list)
+        """
+        row = self.rows.get ( url_id )
+        if row is not None:
+            self.rows.move_to_end ( url_id )
+            self.stats[ 'cache_hits' ] += 1
+            return row
+
+        self.stats[ 'reads' ] += 1
+        db_row = self.connection.execute ( "SELECT url, parent, flags FROM urls WHERE id = ?", (url_id,) ).fetchone ( )
+        if db_row is None:
+            raise IndexError ( "url id {0} is not in the graph".format ( url_id ) )
+
+        row = list ( db_row ) + [ self.ROW_CLEAN ]
+        self.cache_row ( url_id, row )
+        return row
+
+    def cache_row ( self, url_id, row ):
+        """
+        Caches a row, evicting the least recently used rows if the cache is full. It has to be called with \
+        self.mutex held.
+        :param url_id: int
+        :param row: [url_str, parent_id, flags, state] (list)
+        :return:
+        """
+        self.rows[ url_id ] = row
+        self.cached_ids[ row[ 0 ] ] = url_id
+        if len ( self.rows ) > self.max_cached_rows:
+            self.evict_rows ( max ( 1, int ( self.max_cached_rows * self.EVICTION_FRACTION ) ) )
+
+    def evict_rows ( self, num_rows ):
+        """
+        Removes the num_rows least recently used rows from the cache, writing the new and changed ones into the \
+        database. It has to be called with self.mutex held.
+        :param num_rows: int
+        :return:
+        """
+        evicted = [ ]
+        for _ in range ( num_rows ):
+            url_id, row = self.rows.popitem ( last=False )
+            del self.cached_ids[ row[ 0 ] ]
+            evicted.append ( (url_id, row) )
+
+        self.write_rows ( evicted )
+
+    def write_rows ( self, rows ):
+        """
+        Writes the new and changed rows into the database. It has to be called with self.mutex held.
+        :param rows: iterable of 2-tuples (url_id, [url_str, parent_id, flags, state])
+        :return:
+        """
+        new_rows, changed_rows = [ ], [ ]
+        for url_id, (url, parent_id, flags, state) in rows:
+            if state == self.ROW_NEW:
+                new_rows.append ( (url_id, self.get_url_hash ( BloomFilter.get_digest ( url ) ), url, parent_id,
+                                   flags) )
+            elif state == self.ROW_CHANGED:
+                changed_rows.append ( (parent_id, flags, url_id) )
+
+        if not new_rows and not changed_rows: return
+
+        self.connection.executemany ( "INSERT INTO urls (id, hash, url, parent, flags) VALUES (?, ?, ?, ?, ?)",
+                                      new_rows )
+        self.connection.executemany ( "UPDATE urls SET parent = ?, flags = ? WHERE id = ?", changed_rows )
+        self.connection.commit ( )
+        self.stats[ 'written' ] += len ( new_rows ) + len ( changed_rows )
+
+    def flush ( self ):
+        """
+        Writes the new and changed cached rows into the database, keeping them cached. It has to be called with \
+        self.mutex held.
+        :return:
+        """
+        if self.is_flushed: return
+
+        self.write_rows ( self.rows.items ( ) )
+        for row in self.rows.values ( ):
+            row[ 3 ] = self.ROW_CLEAN
+        self.is_flushed = True
+
+    def get_url ( self, url_id ):
+        """
+        :param url_id: int
+        :return: url (str)
+        """
+        with self.mutex:
+            return self.get_row ( url_id )[ 0 ]
+
+    def link ( self, parent_id, child_id ):
+        """
+        Links child_id under parent_id in the sitemap, unless child_id is already linked under a page.
+        :param parent_id: int
+        :param child_id: int
+        :return: True if the link has been added (bool)
+        """
+        with self.mutex:
+            row = self.get_row ( child_id )
+            if row[ 1 ] != self.NO_PARENT: return False
+            row[ 1 ] = parent_id
+            row[ 3 ] = row[ 3 ] or self.ROW_CHANGED
+            self.is_flushed = False
+            self.num_links += 1
+            return True
+
+    def get_child_ids ( self, url_id ):
+        """
+        Returns the ids of the children of url_id in the sitemap, in discovery order.
+        :param url_id: int
+        :return: list of int
+        """
+        with self.mutex:
+            self.flush ( )
+            if not self.is_parent_indexed:
+                self.connection.execute ( "CREATE INDEX urls_parent ON urls (parent)" )
+                self.is_parent_indexed = True
+
+            return [ child_id for child_id, in self.connection.execute (
+                "SELECT id FROM urls WHERE parent = ? ORDER BY id", (url_id,) ) ]
+
+    def get_children_lookup ( self ):
+        """
+        :return: function returning the ids of the children of an url id, to walk the whole sitemap (see \
+                 get_child_ids)
+        """
+        return self.get_child_ids
+
+    def set_flag ( self, url_id, flag ):
+        """
+        :param url_id: int
+        :param flag: VISITED or ENQUEUED
+        :return: True if the flag of url_id had not been set yet (bool)
+        """
+        with self.mutex:
+            row = self.get_row ( url_id )
+            if row[ 2 ] & flag: return False
+            row[ 2 ] |= flag
+            row[ 3 ] = row[ 3 ] or self.ROW_CHANGED
+            self.is_flushed = False
+            if flag == self.VISITED:
+                self.num_visited += 1
+            return True
+
+    def has_flag ( self, url_id, flag ):
+        """
+        :param url_id: int
+        :param flag: VISITED or ENQUEUED
+        :return: bool
+        """
+        with self.mutex:
+            return bool ( self.get_row ( url_id )[ 2 ] & flag )
+
+    def get_flag_set ( self, flag ):
+        """
+        :param flag: VISITED or ENQUEUED
+        :return: an instance of UrlFlagSet of the url ids whose flag is set
+        """
+        return UrlFlagSet ( self, flag )
+
+    def mark_visited ( self, url_id ):
+        """
+        Marks url_id as visited. Checking and marking is atomic, so that only one caller gets True for an url.
+        :param url_id: int
+        :return: True if url_id had not been visited yet (bool)
+        """
+        return self.set_flag ( url_id, self.VISITED )
+
+    def is_visited ( self, url_id ):
+        """
+        :param url_id: int
+        :return: bool
+        """
+        return self.has_flag ( url_id, self.VISITED )
+
+    def get_visited_count ( self ):
+        """
+        :return: number of visited urls (int)
+        """
+        with self.mutex:
+            return self.num_visited
+
+    def get_stats ( self ):
+        """
+        Returns the counters of the graph: the number of urls, how many are cached, and how the urls and rows \
+        which have been looked up have been found (in the cached rows, known to be new by the Bloom filter, or \
+        read from the database), the number of rows written and the size of the database file.
+        :return: dict
+        """
+        with self.mutex:
+            stats = {
+                'urls': self.num_urls,
+                'cached_rows': len ( self.rows ),
+                'cache_hits': self.stats[ 'cache_hits' ],
+                'bloom_negatives': self.stats[ 'bloom_negatives' ],
+                'reads': self.stats[ 'reads' ],
+                'written': self.stats[ 'written' ],
+            }
+        try:
+            stats[ 'size' ] = os.path.getsize ( self.path )
+        except OSError:
+            stats[ 'size' ] = 0
+        return stats
+
+    def close ( self ):
+        """
+        Closes and deletes the database.
+        :return:
+        """
+        with self.mutex:
+            self.finalizer ( )
+
+    def __len__ ( self ):
+        return self.num_urls
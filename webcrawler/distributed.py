@@ -0,0 +1,423 @@
+# References:
+# 1. https://docs.python.org/3/library/socketserver.html
+# 2. JSON Lines: https://jsonlines.org/
+
+import collections
+import json
+import logging
+import operator
+import socket
+import socketserver
+import threading
+
+import dflt_cfg
+from .app_constant import *
+from .crawler import Crawler
+from .frontier import Frontier
+from .urlgraph import UrlGraph
+from .urlparse import UrlNode
+
+
+class CoordinatorRequestHandler ( socketserver.StreamRequestHandler ):
+    """
+    This class serves the connection of one parse thread of a crawler node (see RemoteFrontier). The protocol is \
+    a request and a response per line, both JSON objects:
+
+    * {"op": "put", "links": [[url, parent url, depth], ...]} -> {"enqueued": count, "depth_limited": count}
+    * {"op": "get"} -> {"url": url, "depth": depth} / {"url": null, "budget_exhausted": name or null} once the \
+      crawl is finished
+    * {"op": "done", "links": [[url, parent url, depth], ...]}: puts the links found on the page of the last url \
+      got, then marks this page as completely parsed -> same response as put
+    """
+    # responses are small and awaited by the node: they are sent at once
+    disable_nagle_algorithm = True
+
+    def setup ( self ):
+        super ( ).setup ( )
+
+        # number of urls got by this connection which have not been done yet
+        self.num_claimed = 0
+
+    def handle ( self ):
+        coordinator = self.server.coordinator
+        try:
+            for line in self.rfile:
+                request = json.loads ( line )
+                if request[ 'op' ] == 'get':
+                    response = coordinator.get ( )
+                    self.num_claimed += response[ 'url' ] is not None
+                elif request[ 'op' ] == 'done' and self.num_claimed:
+                    response = coordinator.put_links ( request[ 'links' ] )
+                    self.num_claimed -= 1
+                    coordinator.frontier.task_done ( )
+                else:
+                    response = coordinator.put_links ( request[ 'links' ] )
+
+                self.wfile.write ( json.dumps ( response ).encode ( 'utf-8' ) + b'\n' )
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            coordinator.logger.error ( "Error {0} occurred on the connection of node {1}".format (
+                err, self.client_address ) )
+
+    def finish ( self ):
+        # the pages of a node which has gone away are not parsed: they must not keep the crawl going forever
+        if self.num_claimed:
+            self.server.coordinator.logger.warning ( "Node {0} has disconnected while parsing {1} pages: they are "
+                                                     "missing from the sitemap".format ( self.client_address,
+                                                                                         self.num_claimed ) )
+            for _ in range ( self.num_claimed ):
+                self.server.coordinator.frontier.task_done ( )
+            self.num_claimed = 0
+
+        try:
+            super ( ).finish ( )
+        except OSError:
+            pass
+
+
+class CoordinatorServer ( socketserver.ThreadingTCPServer ):
+    """
+    TCP server of a FrontierCoordinator, with a thread per connection.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__ ( self, address, coordinator ):
+        """
+        :param address: a 2-tuple (host (str), port (int)) on which the server listens
+        :param coordinator: an instance of FrontierCoordinator
+        """
+        self.coordinator = coordinator
+        super ( ).__init__ ( address, CoordinatorRequestHandler )
+
+
+class FrontierCoordinator:
+    """
+    This class holds the frontier and the enqueued urls of a crawl shared by several crawler nodes, e.g; on \
+    several machines (see NodeCrawler), and serves them over TCP (see CoordinatorRequestHandler). Every url is \
+    handed out to one node only; the nodes send back the links they find on the page, which are enqueued the \
+    first time they are seen and linked in one merged sitemap. The crawl is finished when the frontier is empty \
+    and no node is parsing a page anymore.
+    """
+
+    def __init__ ( self, address=None, cfg=None ):
+        """
+        :param address: a 2-tuple (host (str), port (int)) on which the coordinator listens \
+                        (None for the COORDINATOR_ADDRESS setting; port 0 picks a free port)
+        :param cfg: configuration of the crawl (dictionary / None for dflt_cfg.DFLT_CFG)
+        """
+        self.logger = logging.getLogger ( __name__ )
+        cfg = cfg if cfg is not None else dflt_cfg.DFLT_CFG
+
+        self.domain_name = Crawler.get_simple_url ( Crawler.get_domain_name ( cfg[ DOMAIN ] ) )
+
+        # the urls enqueued by all the nodes and the links of the merged sitemap between them
+        self.url_graph = UrlGraph ( )
+
+        self.frontier = Frontier ( order=cfg[ FRONTIER_ORDER ],
+                                   max_depth=cfg[ MAX_DEPTH ],
+                                   max_pages=cfg[ MAX_PAGES ],
+                                   max_time=cfg[ MAX_TIME ],
+                                   key=operator.attrgetter ( 'url_id' ) )
+
+        # the domain root is enqueued from the start, so that the crawl is not finished before a node has connected
+        self.urlnode_parse_root = UrlNode ( self.domain_name, self.url_graph )
+        self.frontier.put ( self.urlnode_parse_root )
+
+        self.server = CoordinatorServer ( address or cfg[ COORDINATOR_ADDRESS ], self )
+        self.server_th = None
+
+    def start ( self ):
+        """
+        Starts serving the nodes in a background thread.
+        :return: the address on which the coordinator listens (a 2-tuple (host (str), port (int)))
+        """
+        self.server_th = threading.Thread ( target=self.server.serve_forever )
+        self.server_th.start ( )
+        self.logger.info ( "Frontier coordinator of {0} listening on {1}:{2}".format (
+            self.domain_name, *self.server.server_address[ :2 ] ) )
+        return self.server.server_address[ :2 ]
+
+    def wait ( self, timeout=None ):
+        """
+        Waits until the crawl of all the nodes is finished.
+        :param timeout: maximum number of seconds to wait (float / None to wait as long as needed)
+        :return: True if the crawl is finished (bool)
+        """
+        return self.frontier.wait_finished ( timeout )
+
+    def stop ( self ):
+        """
+        Stops serving the nodes: the nodes which are still connected see the crawl as finished.
+        :return: the root of the merged UrlNode tree hierarchy (an instance of UrlNode)
+        """
+        self.server.shutdown ( )
+        self.server.server_close ( )
+        self.server_th.join ( )
+
+        frontier_stats = self.frontier.get_stats ( )
+        self.logger.info ( "Frontier coordinator: {enqueued} urls enqueued, {claimed} parsed, {duplicates_suppressed} "
+                           "duplicates suppressed, {depth_limited} links beyond max depth".format ( **frontier_stats ) )
+        return self.urlnode_parse_root
+
+    def get ( self ):
+        """
+        Hands out a url of the frontier, waiting while the frontier is empty but some pages are still being parsed.
+        :return: response of a get request (dictionary)
+        """
+        frontier_entry = self.frontier.get ( )
+        if not frontier_entry:
+            return { 'url': None, 'budget_exhausted': self.frontier.get_stats ( )[ 'budget_exhausted' ] }
+
+        url_node, depth = frontier_entry
+        return { 'url': url_node.url, 'depth': depth }
+
+    def put_links ( self, links ):
+        """
+        Enqueues the urls of links which have never been enqueued, and links them under their parent url in the \
+        merged sitemap.
+        :param links: list of [url (str), parent url (str, empty for none), depth (int)]
+        :return: response of a put request (dictionary)
+        """
+        counters = collections.Counter ( )
+        for url, parent_url, depth in links:
+            url_node = UrlNode ( url, self.url_graph )
+            if self.frontier.put ( url_node, depth ):
+                counters[ 'enqueued' ] += 1
+                if parent_url:
+                    UrlNode ( parent_url, self.url_graph ).add_child ( url_node )
+            elif self.frontier.max_depth is not None and depth > self.frontier.max_depth:
+                counters[ 'depth_limited' ] += 1
+
+        return { 'enqueued': counters[ 'enqueued' ], 'depth_limited': counters[ 'depth_limited' ] }
+
+
+class RemoteFrontier:
+    """
+    This class is the frontier of a crawler node: it has the interface of Frontier, but the urlnodes are enqueued \
+    and handed out by a FrontierCoordinator, which may run on another machine. Every parse thread has its own \
+    connection to the coordinator. The links found on a page are sent together once the page is done \
+    (task_done), along with the url of the page as their parent in the merged sitemap; a link is sent once only \
+    by a node, unless it is found again closer to the domain root. It is thread safe.
+    """
+
+    def __init__ ( self, address, url_graph ):
+        """
+        :param address: a 2-tuple (host (str), port (int)) of the coordinator
+        :param url_graph: the UrlGraph of the urlnodes handed out by get
+        """
+        self.logger = logging.getLogger ( __name__ )
+        self.mutex = threading.Lock ( )
+
+        self.address = address
+        self.url_graph = url_graph
+
+        # connection, page being parsed and links found on it, of every parse thread
+        self.thread_state = threading.local ( )
+
+        # connections of all the parse threads. Format is: [(socket, reader of the socket)]
+        self.connections = [ ]
+
+        # smallest depth at which every url has been sent to the coordinator. Format is: {url_id: depth}
+        self.sent_depths = dict ( )
+
+        # set once the coordinator cannot be reached anymore: the crawl of this node is over
+        self.is_disconnected = False
+
+        # name of the budget which stopped the coordinator from handing out urlnodes, or the reason given to \
+        # stop (str / None)
+        self.budget_exhausted = None
+
+        # set by stop: this node does not ask the coordinator for urlnodes anymore
+        self.is_stopped = False
+
+        # counters
+        self.enqueued = 0
+        self.claimed = 0
+        self.duplicates_suppressed = 0
+        self.depth_limited = 0
+
+    def request ( self, request ):
+        """
+        Sends a request to the coordinator on the connection of the calling thread, and returns its response.
+        :param request: dictionary
+        :return: dictionary / None if the coordinator cannot be reached
+        """
+        if self.is_disconnected: return None
+
+        thread_state = self.thread_state
+        try:
+            if not getattr ( thread_state, 'connection', None ):
+                thread_state.connection = socket.create_connection ( self.address )
+                thread_state.connection.setsockopt ( socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 )
+                thread_state.reader = thread_state.connection.makefile ( 'rb' )
+                with self.mutex:
+                    self.connections.append ( (thread_state.connection, thread_state.reader) )
+
+            thread_state.connection.sendall ( json.dumps ( request ).encode ( 'utf-8' ) + b'\n' )
+            line = thread_state.reader.readline ( )
+            if not line:
+                raise ConnectionError ( "connection closed by the coordinator" )
+            return json.loads ( line )
+        except (OSError, ValueError) as err:
+            if not self.is_disconnected:
+                self.is_disconnected = True
+                self.logger.error ( "Error {0} occurred. Frontier coordinator {1}:{2} cannot be reached".format (
+                    err, *self.address ) )
+            return None
+
+    def put ( self, urlnode, depth=0 ):
+        """
+        Sends urlnode to the coordinator, with the page being parsed by the calling thread as its parent: at once \
+        if the thread is not parsing a page, otherwise with the other links of the page when it is done.
+        :param urlnode: an instance of UrlNode (its url has to be absolute)
+        :param depth: number of clicks between the domain root and urlnode (int)
+        :return: True if urlnode is sent to the coordinator (bool); it is not enqueued if another node has \
+                 already sent it
+        """
+        with self.mutex:
+            sent_depth = self.sent_depths.get ( urlnode.url_id )
+            if sent_depth is not None and sent_depth <= depth:
+                self.duplicates_suppressed += 1
+                return False
+            self.sent_depths[ urlnode.url_id ] = depth
+
+        parent_urlnode = getattr ( self.thread_state, 'claimed', None )
+        if parent_urlnode is not None:
+            self.thread_state.links.append ( (urlnode.url, parent_urlnode.url, depth) )
+            return True
+
+        return self.put_links ( 'put', [ (urlnode.url, "", depth) ] ) > 0
+
+    def put_links ( self, op, links ):
+        """
+        :param op: 'put' or 'done' (str)
+        :param links: list of (url (str), parent url (str, empty for none), depth (int))
+        :return: number of links enqueued by the coordinator (int)
+        """
+        response = self.request ( { 'op': op, 'links': links } )
+        if response is None: return 0
+
+        with self.mutex:
+            self.enqueued += response[ 'enqueued' ]
+            self.depth_limited += response[ 'depth_limited' ]
+            self.duplicates_suppressed += len ( links ) - response[ 'enqueued' ] - response[ 'depth_limited' ]
+        return response[ 'enqueued' ]
+
+    def get ( self ):
+        """
+        Gets a urlnode from the coordinator, waiting while its frontier is empty but some pages are still being \
+        parsed by any node. Returns None once the crawl is finished or the coordinator cannot be reached. Every \
+        urlnode returned has to be followed by a call to task_done.
+        :return: a 2-tuple (an instance of UrlNode, depth (int)) / None
+        """
+        if self.is_stopped: return None
+
+        response = self.request ( { 'op': 'get' } )
+        if response is None: return None
+
+        if response[ 'url' ] is None:
+            self.budget_exhausted = response[ 'budget_exhausted' ]
+            return None
+
+        with self.mutex:
+            self.claimed += 1
+
+        urlnode = UrlNode ( response[ 'url' ], self.url_graph )
+        self.thread_state.claimed = urlnode
+        self.thread_state.links = [ ]
+        return urlnode, response[ 'depth' ]
+
+    def task_done ( self ):
+        """
+        Sends the links found on the page of the urlnode returned by the last get of the calling thread, and marks \
+        this page as completely parsed.
+        :return:
+        """
+        links = self.thread_state.links
+        self.thread_state.claimed = None
+        self.thread_state.links = None
+        self.put_links ( 'done', links )
+
+    def stop ( self, reason='cancelled' ):
+        """
+        Stops this node from asking the coordinator for urlnodes (see Frontier.stop); the other nodes go on.
+        :param reason: recorded as the budget which has run out (str)
+        :return:
+        """
+        with self.mutex:
+            self.is_stopped = True
+            self.budget_exhausted = self.budget_exhausted or reason
+
+    def get_stats ( self ):
+        """
+        Returns the counters of this node (see Frontier.get_stats): the urls it has enqueued and parsed, and the \
+        links it has sent which were duplicates or beyond max depth. The urls pending are only known by the \
+        coordinator.
+        :return: dict
+        """
+        with self.mutex:
+            return {
+                'enqueued': self.enqueued,
+                'claimed': self.claimed,
+                'pending': 0,
+                'duplicates_suppressed': self.duplicates_suppressed,
+                'depth_limited': self.depth_limited,
+                'budget_exhausted': self.budget_exhausted,
+            }
+
+    def close ( self ):
+        """
+        Closes the connections to the coordinator.
+        :return:
+        """
+        with self.mutex:
+            for connection, reader in self.connections:
+                reader.close ( )
+                connection.close ( )
+            self.connections = [ ]
+
+
+class NodeCrawler ( Crawler ):
+    """
+    This class crawls the user configured domain as one of several crawler nodes sharing the frontier of a \
+    FrontierCoordinator (see RemoteFrontier), e.g; to crawl a very large domain with several machines. A node \
+    parses the pages handed out by the coordinator; the merged sitemap is written by the coordinator.
+    """
+    # settings which are not supported by a node: they are turned off, with their value when turned off. \
+    # Seeds sent by a node outside of a page would not be linked in the merged sitemap.
+    UNSUPPORTED_SETTINGS = { STREAM_SITEMAP: False, SITEMAP_FORMAT: 'text', CHECKPOINT_PATH: None,
+                             SEED_SITEMAPS: False, LINK_REPORT_PATH: None, TRAP_DETECTION: False,
+                             GRAPH_PATH: None, ARCHIVE_PATH: None, MEMORY_BUDGET: None }
+
+    def __init__ ( self, address=None, cfg=None, fetcher=None, on_record=None ):
+        """
+        :param address: a 2-tuple (host (str), port (int)) of the coordinator (None for the FRONTIER_ADDRESS setting)
+        :param cfg: configuration of the crawl (dictionary / None for dflt_cfg.DFLT_CFG), see Crawler
+        :param fetcher: see Crawler
+        :param on_record: see Crawler
+        """
+        cfg = dict ( cfg if cfg is not None else dflt_cfg.DFLT_CFG )
+        self.address = address or cfg[ FRONTIER_ADDRESS ]
+
+        for setting, value in self.UNSUPPORTED_SETTINGS.items ( ):
+            if cfg.get ( setting, value ) != value:
+                logging.getLogger ( __name__ ).warning ( "Setting {0} is not supported by a crawler node: it is "
+                                                         "turned off".format ( setting ) )
+                cfg[ setting ] = value
+
+        super ( ).__init__ ( cfg, fetcher, on_record )
+
+    def open_frontier ( self ):
+        """
+        :return: an instance of RemoteFrontier connected to the coordinator
+        """
+        return RemoteFrontier ( self.address, self.url_graph )
+
+    def release_urlparse_resources ( self ):
+        """
+        Waits for the parse threads, then closes the connections to the coordinator.
+        :return: the root of the UrlNode tree hierarchy of the pages parsed by this node (an instance of UrlNode)
+        """
+        root = super ( ).release_urlparse_resources ( )
+        self.frontier.close ( )
+        return root
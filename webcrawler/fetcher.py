@@ -0,0 +1,446 @@
+# References:
+# 1. https://docs.python.org/3/library/http.client.html
+# 2. Hypertext Transfer Protocol (HTTP/1.1): Message Syntax and Routing (Persistence): https://tools.ietf.org/html/rfc7230#section-6.3
+
+import base64
+import http.client
+import socket
+import threading
+import time
+import urllib.request
+from urllib.parse import unquote, urljoin, urlsplit
+
+
+def get_proxy ( url, proxies ):
+    """
+    Returns the proxy through which url has to be requested, using the same rules as urllib.request.ProxyHandler: \
+    a dictionary maps a scheme to the url of its proxy, None means auto-detect the proxies from the environment \
+    variables and an empty dictionary disables proxies.
+    :param url: str
+    :param proxies: SYSTEM_PROXY setting (dictionary / None)
+    :return: a 3-tuple (proxy host (str), proxy port (int), Proxy-Authorization header value (str / None)) / None
+    """
+    split_url = urlsplit ( url )
+    if proxies is None:
+        proxies = urllib.request.getproxies ( )
+        if proxies and urllib.request.proxy_bypass ( split_url.hostname or '' ):
+            return None
+
+    proxy_url = proxies.get ( split_url.scheme )
+    if not proxy_url:
+        return None
+
+    if '://' not in proxy_url:
+        proxy_url = 'http://' + proxy_url
+    split_proxy = urlsplit ( proxy_url )
+
+    proxy_auth = None
+    if split_proxy.username:
+        user_pass = "{0}:{1}".format ( unquote ( split_proxy.username ), unquote ( split_proxy.password or '' ) )
+        proxy_auth = "Basic " + base64.b64encode ( user_pass.encode ( ) ).decode ( 'ascii' )
+
+    return split_proxy.hostname, split_proxy.port or 80, proxy_auth
+
+
+class PooledConnectionMixin:
+    """
+    This mixin lets the ConnectionPool of a http.client connection count every TCP connection it opens \
+    (and so every TLS handshake for https).
+    """
+    def __init__ ( self, pool, *args, **kwargs ):
+        super ( ).__init__ ( *args, **kwargs )
+        self.pool = pool
+
+        # True when requests are sent to a http proxy, which expects absolute urls as request targets
+        self.is_http_proxy = False
+
+        # Proxy-Authorization header value sent along with the requests to a http proxy (str / None)
+        self.proxy_auth = None
+
+        # the TCP connection is opened by create_timed_connection, which times the DNS lookup on its own. \
+        # connect_time is the time spent opening the connection (DNS lookup included) by the last request, \
+        # which is recorded in the CrawlStats of that request (stats, None for no timing).
+        self._create_connection = self.create_timed_connection
+        self.dns_time = 0.0
+        self.connect_time = 0.0
+        self.stats = pool.stats
+
+    def connect ( self ):
+        start = time.perf_counter ( )
+        super ( ).connect ( )
+        self.pool.count_new_connection ( )
+
+        # TCP connection and TLS handshake
+        self.connect_time = time.perf_counter ( ) - start
+        if self.stats:
+            self.stats.add_time ( 'connect', self.connect_time - self.dns_time )
+
+    def create_timed_connection ( self, address, timeout, source_address=None ):
+        """
+        Same as socket.create_connection, but the addresses of the host are resolved first, so that the time of \
+        the DNS lookup is measured apart from the time to connect.
+        :param address: a 2-tuple (host (str), port (int))
+        :param timeout: see socket.create_connection
+        :param source_address: see socket.create_connection
+        :return: a connected socket
+        """
+        host, port = address
+        start = time.perf_counter ( )
+        addresses = socket.getaddrinfo ( host, port, 0, socket.SOCK_STREAM )
+        self.dns_time = time.perf_counter ( ) - start
+        if self.stats:
+            self.stats.add_time ( 'dns', self.dns_time )
+
+        error = OSError ( "getaddrinfo returns an empty list" )
+        for _, _, _, _, socket_address in addresses:
+            try:
+                return socket.create_connection ( socket_address[ :2 ], timeout, source_address )
+            except OSError as err:
+                error = err
+        raise error
+
+
+class PooledHTTPConnection ( PooledConnectionMixin, http.client.HTTPConnection ):
+    pass
+
+
+class PooledHTTPSConnection ( PooledConnectionMixin, http.client.HTTPSConnection ):
+    pass
+
+
+class ConnectionPool:
+    """
+    This class keeps idle persistent (keep-alive) connections per host, so that consecutive requests to the \
+    same host do not pay for a new TCP and TLS handshake every time. It is thread safe.
+    """
+    def __init__ ( self, max_idle_per_host=10, idle_timeout=30, timeout=None, proxies=None, stats=None ):
+        """
+        :param max_idle_per_host: maximum number of idle connections kept per host (int)
+        :param idle_timeout: seconds after which an idle connection is not reused anymore (int)
+        :param timeout: network timeout in seconds of every connection (int / None)
+        :param proxies: SYSTEM_PROXY setting (dictionary / None), see get_proxy
+        :param stats: CrawlStats in which the DNS lookups and connections are timed (None for no timing)
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout or None
+        self.proxies = proxies
+        self.stats = stats
+
+        self.mutex = threading.Lock ( )
+
+        # idle connections per host. Format is: {(scheme, host, port): [(connection, released_at), ...]}
+        self.idle_connections = dict ( )
+
+        # counters used to report the connection reuse ratio
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    def get_connection ( self, url ):
+        """
+        Returns an idle connection to the host of url if there is one which has not expired, or a new connection.
+        :param url: str
+        :return: a 3-tuple (host key (tuple), connection (PooledHTTPConnection / PooledHTTPSConnection), \
+                 is_reused (bool))
+        """
+        split_url = urlsplit ( url )
+        host_key = (split_url.scheme, split_url.hostname, split_url.port)
+
+        now = time.monotonic ( )
+        with self.mutex:
+            self.requests_sent += 1
+            idle = self.idle_connections.get ( host_key )
+            while idle:
+                # the most recently used connection is the least likely to have been closed by the server
+                connection, released_at = idle.pop ( )
+                if now - released_at < self.idle_timeout:
+                    return host_key, connection, True
+                connection.close ( )
+
+        return host_key, self.new_connection ( url ), False
+
+    def new_connection ( self, url ):
+        """
+        Creates a (not yet connected) connection to the host of url, going through the configured proxy if any.
+        :param url: str
+        :return: PooledHTTPConnection / PooledHTTPSConnection
+        """
+        split_url = urlsplit ( url )
+        is_https = split_url.scheme == 'https'
+        connection_class = PooledHTTPSConnection if is_https else PooledHTTPConnection
+
+        proxy = get_proxy ( url, self.proxies )
+        if not proxy:
+            return connection_class ( self, split_url.hostname, split_url.port, timeout=self.timeout )
+
+        proxy_host, proxy_port, proxy_auth = proxy
+        connection = connection_class ( self, proxy_host, proxy_port, timeout=self.timeout )
+        if is_https:
+            # https goes through a CONNECT tunnel, TLS is then negotiated with the real host
+            tunnel_headers = { 'Proxy-Authorization': proxy_auth } if proxy_auth else None
+            connection.set_tunnel ( split_url.hostname, split_url.port, headers=tunnel_headers )
+        else:
+            connection.is_http_proxy = True
+            connection.proxy_auth = proxy_auth
+
+        return connection
+
+    def put_connection ( self, host_key, connection ):
+        """
+        Gives back a connection whose response has been completely read, to be reused by a later request.
+        :param host_key: host key returned by get_connection (tuple)
+        :param connection: PooledHTTPConnection / PooledHTTPSConnection
+        :return:
+        """
+        with self.mutex:
+            idle = self.idle_connections.setdefault ( host_key, [ ] )
+            if len ( idle ) < self.max_idle_per_host:
+                idle.append ( (connection, time.monotonic ( )) )
+                return
+
+        # pool of this host is full
+        connection.close ( )
+
+    def count_new_connection ( self ):
+        """
+        Called by the pooled connections every time they open a TCP connection.
+        :return:
+        """
+        with self.mutex:
+            self.connections_opened += 1
+
+    def get_reuse_ratio ( self ):
+        """
+        Returns the share of requests which have been sent over an already open connection.
+        :return: float (0.0 <= ratio <= 1.0)
+        """
+        if not self.requests_sent: return 0.0
+        return max ( 0.0, 1.0 - self.connections_opened / self.requests_sent )
+
+    def close ( self ):
+        """
+        Closes all the idle connections.
+        :return:
+        """
+        with self.mutex:
+            for idle in self.idle_connections.values ( ):
+                for connection, _ in idle:
+                    connection.close ( )
+            self.idle_connections.clear ( )
+
+
+class FetchResponse:
+    """
+    This class is a HTTP response whose body is read on demand. Its connection goes back to the ConnectionPool \
+    as soon as the body has been completely read, or when the response is closed.
+    """
+    # unread body up to this size is drained on close, so that the connection can still be reused
+    MAX_DRAIN_SIZE = 64 * 1024
+
+    def __init__ ( self, url, http_response, pool, host_key, connection ):
+        """
+        :param url: url of the response (str)
+        :param http_response: http.client.HTTPResponse
+        :param pool: ConnectionPool which created connection
+        :param host_key: host key of connection (tuple)
+        :param connection: connection which has received http_response
+        """
+        self.url = url
+        self.status = http_response.status
+        self.headers = http_response.headers
+
+        # urls which have redirected to this response, with their status codes (list of 2-tuples (str, int))
+        self.redirects = [ ]
+
+        self.http_response = http_response
+        self.pool = pool
+        self.host_key = host_key
+        self.connection = connection
+
+    def getcode ( self ):
+        """
+        Returns the HTTP status code, the same way a urllib response does.
+        :return: int
+        """
+        return self.status
+
+    def read ( self, amt=None ):
+        """
+        Reads up to amt bytes of the body (whole remaining body if amt is None).
+        :param amt: int / None
+        :return: bytes
+        """
+        data = self.http_response.read ( amt )
+        if self.http_response.isclosed ( ):
+            self.release_connection ( )
+        return data
+
+    def read1 ( self, amt ):
+        """
+        Reads the bytes of the body which are available without waiting for more, up to amt bytes. \
+        It returns b'' at the end of the body.
+        :param amt: int
+        :return: bytes
+        """
+        data = self.http_response.read1 ( amt )
+        if self.http_response.isclosed ( ):
+            self.release_connection ( )
+        return data
+
+    def close ( self, drain=True ):
+        """
+        Closes the response. A small unread body is drained, so that the connection can be reused.
+        :param drain: False closes the connection of a response with an unread body instead of draining it (bool)
+        :return:
+        """
+        if self.connection is None: return
+
+        try:
+            length = self.http_response.length
+            if drain and length is not None and length <= self.MAX_DRAIN_SIZE:
+                self.http_response.read ( )
+        except (http.client.HTTPException, OSError):
+            pass
+
+        self.release_connection ( )
+
+    def release_connection ( self ):
+        """
+        Hands the connection back to the pool if it can be reused, otherwise closes it.
+        :return:
+        """
+        if self.connection is None: return
+
+        if self.http_response.isclosed ( ) and not self.http_response.will_close:
+            self.pool.put_connection ( self.host_key, self.connection )
+        else:
+            self.connection.close ( )
+
+        self.connection = None
+
+
+class Fetcher:
+    """
+    This class downloads urls over the persistent connections of a ConnectionPool and follows redirects
+    """
+    # Redirect status codes followed by the fetcher (urllib follows the same ones)
+    REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+    # Same limit as urllib.request.HTTPRedirectHandler.max_redirections
+    MAX_REDIRECTS = 10
+
+    # Because of mod_security or some similar server security feature, server can \
+    # easily block clients based on the user agent.
+    # Hack: https://stackoverflow.com/a/31758803/4336040
+    USER_AGENT = "Mozilla/5.0"
+
+    def __init__ ( self, timeout=None, proxies=None, pool_size=10, idle_timeout=30, stats=None ):
+        """
+        :param timeout: network timeout in seconds (int / None)
+        :param proxies: SYSTEM_PROXY setting (dictionary / None), see get_proxy
+        :param pool_size: maximum number of idle connections kept per host (int)
+        :param idle_timeout: seconds after which an idle connection is not reused anymore (int)
+        :param stats: CrawlStats in which the requests are timed and their status codes counted (None for no stats)
+        """
+        self.pool = ConnectionPool ( max_idle_per_host=pool_size, idle_timeout=idle_timeout,
+                                     timeout=timeout, proxies=proxies, stats=stats )
+        self.stats = stats
+
+    def fetch ( self, url, method='GET', headers=None, stats=None ):
+        """
+        Sends a request for url (following redirects) and returns the response once its headers are received.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: extra headers of the request of url, they are not sent to the redirect targets (dictionary)
+        :param stats: CrawlStats in which the requests are timed, e.g; the one of the crawl when the fetcher is \
+                      shared by several crawls (None for self.stats)
+        :return: an instance of FetchResponse, whose redirects are the redirect chain which has led to it
+        """
+        redirects = [ ]
+        for _ in range ( self.MAX_REDIRECTS + 1 ):
+            response = self.request ( url, method, headers, stats )
+
+            location = response.headers.get ( 'Location' )
+            if response.status not in self.REDIRECT_CODES or not location:
+                response.redirects = redirects
+                return response
+
+            response.close ( )
+            redirects.append ( (url, response.status) )
+            url = urljoin ( url, location )
+            headers = None
+
+        raise http.client.HTTPException ( "URL {0} exceeded {1} redirects".format ( url, self.MAX_REDIRECTS ) )
+
+    def request ( self, url, method='GET', headers=None, stats=None ):
+        """
+        Sends a single request for url. A request which fails on a reused connection (the server may have \
+        closed it in the meantime) is retried once on a new connection.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: extra headers of the request (dictionary / None)
+        :param stats: CrawlStats in which the request is timed (None for self.stats)
+        :return: an instance of FetchResponse
+        """
+        split_url = urlsplit ( url )
+        if split_url.scheme not in ('http', 'https'):
+            raise ValueError ( "unsupported url scheme: {0}".format ( split_url.scheme ) )
+        stats = stats if stats is not None else self.stats
+
+        host_key, connection, is_reused = self.pool.get_connection ( url )
+        connection.connect_time = 0.0
+        connection.stats = stats
+        start = time.perf_counter ( )
+        try:
+            http_response = self.send_request ( connection, url, method, headers )
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            connection.close ( )
+            if not is_reused: raise
+
+            connection = self.pool.new_connection ( url )
+            connection.stats = stats
+            try:
+                http_response = self.send_request ( connection, url, method, headers )
+            except BaseException:
+                connection.close ( )
+                raise
+        except BaseException:
+            connection.close ( )
+            raise
+
+        # from sending the request to receiving the response head, without opening the connection
+        if stats:
+            stats.add_time ( 'ttfb', time.perf_counter ( ) - start - connection.connect_time )
+            stats.count_response ( http_response.status )
+
+        return FetchResponse ( url, http_response, self.pool, host_key, connection )
+
+    def send_request ( self, connection, url, method, extra_headers=None ):
+        """
+        :param connection: PooledHTTPConnection / PooledHTTPSConnection
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param extra_headers: headers sent on top of the default ones (dictionary / None)
+        :return: http.client.HTTPResponse
+        """
+        split_url = urlsplit ( url )
+        headers = { 'User-Agent': self.USER_AGENT, 'Accept-Encoding': 'identity' }
+        if extra_headers:
+            headers.update ( extra_headers )
+
+        if connection.is_http_proxy:
+            target = url
+            if connection.proxy_auth:
+                headers[ 'Proxy-Authorization' ] = connection.proxy_auth
+        else:
+            target = (split_url.path or '/') + ('?' + split_url.query if split_url.query else '')
+
+        connection.request ( method, target, headers=headers )
+        return connection.getresponse ( )
+
+    def close ( self ):
+        """
+        Closes all the idle connections of the pool.
+        :return:
+        """
+        self.pool.close ( )
@@ -0,0 +1,528 @@
+import collections
+import heapq
+import itertools
+import struct
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class SpillFile:
+    """
+    This class appends runs of records of a fixed size (e.g; urlnodes of the frontier sorted in the order in which \
+    they are handed out) to a temporary file, and reads every run back in order, a batch at a time. The file is \
+    deleted when it is closed (or garbage collected). It is not thread safe.
+    """
+    def __init__ ( self, record_format, directory=None ):
+        """
+        :param record_format: format of a record (see struct) (str)
+        :param directory: directory of the file (str / None for the directory of temporary files)
+        """
+        self.record_struct = struct.Struct ( record_format )
+        self.file = tempfile.TemporaryFile ( prefix='frontier-', dir=directory )
+
+        # size of the file and number of records which have not been read back
+        self.size = 0
+        self.num_records = 0
+
+    def write_run ( self, records ):
+        """
+        :param records: records of the run, in the order in which they are read back (list of tuples)
+        :return: the run, read by read_run (list [offset of its next record, number of records left])
+        """
+        run = [ self.size, len ( records ) ]
+        self.file.seek ( self.size )
+        self.file.write ( b''.join ( self.record_struct.pack ( *record ) for record in records ) )
+        self.size += len ( records ) * self.record_struct.size
+        self.num_records += len ( records )
+        return run
+
+    def read_run ( self, run, max_records ):
+        """
+        Reads the next records of a run. Once every record of the file has been read, the file is emptied.
+        :param run: a run returned by write_run, which is moved past the records read
+        :param max_records: maximum number of records read (int)
+        :return: list of tuples
+        """
+        num_records = min ( run[ 1 ], max_records )
+        self.file.seek ( run[ 0 ] )
+        data = self.file.read ( num_records * self.record_struct.size )
+        run[ 0 ] += len ( data )
+        run[ 1 ] -= num_records
+        self.num_records -= num_records
+        if not self.num_records:
+            self.file.truncate ( 0 )
+            self.size = 0
+        return list ( self.record_struct.iter_unpack ( data ) )
+
+    def close ( self ):
+        """
+        Closes and deletes the file.
+        :return:
+        """
+        self.file.close ( )
+
+
+class Frontier:
+    """
+    This class holds the discovered urlnodes which still have to be parsed, along with the number of urlnodes \
+    which are currently being parsed (in-flight). A page which is being parsed can still discover new urlnodes, \
+    so the crawl is finished only when the frontier is empty AND nothing is in-flight. Knowing that, parse \
+    threads exit as soon as the crawl is finished instead of waiting for an idle timeout.
+
+    A urlnode is enqueued only the first time it is put (enqueue-once), and so it is handed out to exactly one \
+    parse thread (claim-once). Every urlnode carries its depth (number of clicks from the domain root), which is \
+    used for the max_depth limit and the ordering. Once the max_pages or max_time budget runs out, no more \
+    urlnodes are handed out and the crawl finishes with the urlnodes discovered so far.
+
+    If max_queued is given, at most about max_queued urlnodes are held in memory: the others are spilled to a \
+    temporary file (see SpillFile) as their keys, in runs sorted in the order in which they are handed out, and are \
+    loaded back (see load) when the urlnodes held in memory run out. It is thread safe.
+    """
+    # Supported orders in which urlnodes are handed out
+    ORDER_BFS = 'bfs'
+    ORDER_PRIORITY = 'priority'
+
+    # bytes of memory taken by a urlnode waiting in the frontier (the urlnode, its entry and its depth)
+    QUEUED_URLNODE_SIZE = 160
+
+    # formats of the spilled records: (key, depth) for ORDER_BFS, (path segments, depth, sequence no, key) \
+    # for ORDER_PRIORITY
+    BFS_RECORD_FORMAT = '<II'
+    PRIORITY_RECORD_FORMAT = '<IIQI'
+
+    # number of records read at once from a run of ORDER_PRIORITY, which are held in memory for every run
+    RUN_READ_SIZE = 64
+
+    def __init__ ( self, order=ORDER_BFS, max_depth=None, max_pages=None, max_time=None, key=None, condition=None,
+                   seen=None, max_queued=None, spill_dir=None, load=None ):
+        """
+        :param order: ORDER_BFS hands out urlnodes in discovery order (breadth first), ORDER_PRIORITY hands out \
+                      the urlnodes with the fewest path segments first (str)
+        :param max_depth: urlnodes deeper than max_depth are not enqueued (int / None for no limit)
+        :param max_pages: maximum number of urlnodes handed out (int / None for no limit)
+        :param max_time: seconds after which no more urlnodes are handed out (int / None for no limit)
+        :param key: function returning the value by which urlnodes are de-duplicated, e.g; a small id which is \
+                    cheaper to keep for every urlnode than the urlnode itself (None for the urlnode itself)
+        :param condition: condition shared with other frontiers, so that threads handing out the urlnodes of \
+                          several frontiers wake up when any of them changes; it has to be built on a threading.RLock \
+                          (None for a condition of its own)
+        :param seen: set-like container (add and in) of the keys of the urlnodes which have ever been enqueued, e.g; \
+                     one which is not held in memory (None for a set)
+        :param max_queued: number of urlnodes held in memory beyond which they are spilled to disk; it needs key to \
+                           return an int and load (int >= 2 / None to hold every urlnode in memory)
+        :param spill_dir: directory of the file of the spilled urlnodes (str / None for the directory of temporary \
+                          files)
+        :param load: function returning the urlnode of a key, for the spilled urlnodes (None if nothing is spilled)
+        """
+        # it guards all the attributes below, and wakes up threads waiting for a urlnode
+        self.condition = condition if condition is not None else threading.Condition ( )
+
+        self.order = order
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.deadline = time.monotonic ( ) + max_time if max_time is not None else None
+
+        # discovered urlnodes waiting to be parsed: a deque of (urlnode, depth) for ORDER_BFS, \
+        # a heap of (priority, sequence no, urlnode, depth) for ORDER_PRIORITY
+        self.urlnodes = collections.deque ( ) if order == self.ORDER_BFS else [ ]
+
+        # sequence number keeping the heap stable for urlnodes of the same priority
+        self.sequence = itertools.count ( )
+
+        # key of every urlnode which has ever been enqueued; it makes put enqueue a urlnode only once
+        self.key = key
+        self.seen = seen if seen is not None else set ( )
+
+        # urlnodes spilled to disk (created by the first spill), and the number of urlnodes which are waiting there. \
+        # For ORDER_BFS, the runs are read oldest first and the urlnodes put after the first spill are buffered \
+        # (as records) until a run is written, so that they are handed out in discovery order. For ORDER_PRIORITY, \
+        # the runs are merged: the next record of every run is in the heap run_heads, as (record, run no).
+        self.max_queued = max ( 2, max_queued ) if max_queued is not None else None
+        self.spill_dir = spill_dir
+        self.load = load
+        self.spill_file = None
+        self.num_spilled = 0
+        self.runs = collections.deque ( ) if order == self.ORDER_BFS else [ ]
+        self.spill_buffer = [ ]
+        self.run_heads = [ ]
+        self.run_records = [ ]
+
+        # number of urlnodes handed out by get/get_nowait for which task_done has not been called yet
+        self.in_flight = 0
+
+        # number of holds (see hold): while the frontier is held, get waits for new urlnodes even if it is idle
+        self.holds = 0
+
+        # urlnodes left in other frontiers whose counters have been added by add_stats
+        self.merged_pending = 0
+
+        # name of the budget which stopped handing out urlnodes (str / None)
+        self.budget_exhausted = None
+
+        # counters
+        self.enqueued = 0
+        self.claimed = 0
+        self.duplicates_suppressed = 0
+        self.depth_limited = 0
+
+        # number of urlnodes which have been spilled to disk
+        self.spilled = 0
+
+    def put ( self, urlnode, depth=0 ):
+        """
+        Enqueues urlnode unless it has already been enqueued or it is deeper than max_depth.
+        :param urlnode: an instance of UrlNode (its url has to be absolute)
+        :param depth: number of clicks between the domain root and urlnode (int)
+        :return: True if urlnode has been enqueued by this call (bool)
+        """
+        urlnode_key = self.key ( urlnode ) if self.key else urlnode
+        with self.condition:
+            if urlnode_key in self.seen:
+                self.duplicates_suppressed += 1
+                return False
+
+            if self.max_depth is not None and depth > self.max_depth:
+                self.depth_limited += 1
+                return False
+
+            self.seen.add ( urlnode_key )
+            self.enqueued += 1
+
+            if self.order == self.ORDER_BFS:
+                if self.max_queued is not None and (self.num_spilled or len ( self.urlnodes ) >= self.max_queued):
+                    self.spill_bfs ( urlnode_key, depth )
+                else:
+                    self.urlnodes.append ( (urlnode, depth) )
+            else:
+                priority = (self.get_priority ( urlnode ), depth)
+                heapq.heappush ( self.urlnodes, (priority, next ( self.sequence ), urlnode, depth) )
+                if self.max_queued is not None and len ( self.urlnodes ) > self.max_queued:
+                    self.spill_priority ( )
+
+            self.condition.notify ( )
+            return True
+
+    def get_spill_file ( self ):
+        """
+        :return: the file of the spilled urlnodes, created the first time it is needed (an instance of SpillFile)
+        """
+        if self.spill_file is None:
+            self.spill_file = SpillFile ( self.BFS_RECORD_FORMAT if self.order == self.ORDER_BFS else
+                                          self.PRIORITY_RECORD_FORMAT, self.spill_dir )
+        return self.spill_file
+
+    def spill_bfs ( self, urlnode_key, depth ):
+        """
+        Spills a urlnode put while max_queued urlnodes are held in memory (or while urlnodes are spilled, which \
+        are handed out first): it is buffered, and the buffer is written as a run once it holds half of max_queued \
+        urlnodes. It has to be called with self.condition held.
+        :param urlnode_key: key of the urlnode (int)
+        :param depth: int
+        :return:
+        """
+        self.spill_buffer.append ( (urlnode_key, depth) )
+        self.num_spilled += 1
+        self.spilled += 1
+        if len ( self.spill_buffer ) >= self.max_queued // 2:
+            self.runs.append ( self.get_spill_file ( ).write_run ( self.spill_buffer ) )
+            self.spill_buffer = [ ]
+
+    def spill_priority ( self ):
+        """
+        Spills the half of the urlnodes held in memory which would be handed out last, as a sorted run. It has to \
+        be called with self.condition held.
+        :return:
+        """
+        # a sorted list is a heap
+        entries = sorted ( self.urlnodes )
+        self.urlnodes = entries[ :len ( entries ) // 2 ]
+        records = [ (priority[ 0 ], priority[ 1 ], sequence_no, self.key ( urlnode ))
+                    for priority, sequence_no, urlnode, _ in entries[ len ( entries ) // 2: ] ]
+        self.num_spilled += len ( records )
+        self.spilled += len ( records )
+
+        run = self.get_spill_file ( ).write_run ( records )
+        self.runs.append ( run )
+        self.run_records.append ( collections.deque ( ) )
+        self.push_run_head ( len ( self.runs ) - 1 )
+
+    def push_run_head ( self, run_no ):
+        """
+        Pushes the next record of a run of ORDER_PRIORITY (if any) into self.run_heads, reading the run if its \
+        records held in memory have run out. It has to be called with self.condition held.
+        :param run_no: index of the run in self.runs (int)
+        :return:
+        """
+        run_records = self.run_records[ run_no ]
+        if not run_records:
+            if not self.runs[ run_no ][ 1 ]: return
+            run_records.extend ( self.spill_file.read_run ( self.runs[ run_no ], self.RUN_READ_SIZE ) )
+        heapq.heappush ( self.run_heads, (run_records.popleft ( ), run_no) )
+
+    def pop_spilled ( self ):
+        """
+        Removes the next spilled urlnode of ORDER_PRIORITY. It has to be called with self.condition held.
+        :return: an entry of the heap of urlnodes (priority, sequence no, urlnode, depth)
+        """
+        (segments, depth, sequence_no, urlnode_key), run_no = heapq.heappop ( self.run_heads )
+        self.push_run_head ( run_no )
+        self.num_spilled -= 1
+        if not self.num_spilled:
+            self.runs, self.run_records = [ ], [ ]
+        return (segments, depth), sequence_no, self.load ( urlnode_key ), depth
+
+    def load_spilled ( self ):
+        """
+        Loads spilled urlnodes back in memory, once the urlnodes held in memory have run out: the oldest run (or the \
+        buffer, if every run has been read) for ORDER_BFS, the next half of max_queued urlnodes of the runs for \
+        ORDER_PRIORITY. It has to be called with self.condition held.
+        :return:
+        """
+        if self.order == self.ORDER_BFS:
+            if self.runs:
+                run = self.runs.popleft ( )
+                records = self.spill_file.read_run ( run, run[ 1 ] )
+            else:
+                records, self.spill_buffer = self.spill_buffer, [ ]
+            self.num_spilled -= len ( records )
+            self.urlnodes.extend ( (self.load ( urlnode_key ), depth) for urlnode_key, depth in records )
+        else:
+            # the entries are popped in order, so the list is a heap
+            self.urlnodes = [ self.pop_spilled ( ) for _ in range ( min ( self.num_spilled,
+                                                                           self.max_queued // 2 ) ) ]
+
+    def add_seen ( self, urlnode ):
+        """
+        Records urlnode as enqueued without enqueuing it, so that put ignores it from now on (e.g; a urlnode which \
+        has been parsed before the crawl was resumed).
+        :param urlnode: an instance of UrlNode
+        :return:
+        """
+        urlnode_key = self.key ( urlnode ) if self.key else urlnode
+        with self.condition:
+            self.seen.add ( urlnode_key )
+
+    @staticmethod
+    def get_priority ( urlnode ):
+        """
+        Priority of a urlnode for ORDER_PRIORITY (lower is handed out first): the number of path segments of its \
+        url, so that section index pages are crawled before the pages deep inside them.
+        :param urlnode: an instance of UrlNode
+        :return: int
+        """
+        split_url = urlsplit ( urlnode.url )
+        return len ( [ segment for segment in split_url.path.split ( '/' ) if segment ] ) + bool ( split_url.query )
+
+    def get ( self ):
+        """
+        Removes and returns a urlnode from the frontier, waiting while the frontier is empty but some urlnodes \
+        are still in-flight (they may discover new urlnodes). Returns None once the crawl is finished or a \
+        budget has run out. Every urlnode returned has to be followed by a call to task_done.
+        :return: a 2-tuple (an instance of UrlNode, depth (int)) / None
+        """
+        with self.condition:
+            while True:
+                if self.is_budget_exhausted ( ):
+                    return None
+
+                if self.urlnodes:
+                    return self.claim ( )
+
+                if not self.in_flight and not self.holds:
+                    # crawl is finished: wake up all the other waiting threads so that they exit as well
+                    self.condition.notify_all ( )
+                    return None
+
+                # wake up at the deadline at the latest, as max_time may run out while waiting
+                self.condition.wait ( timeout=self.get_time_left ( ) )
+
+    def get_nowait ( self ):
+        """
+        Removes and returns a urlnode from the frontier without waiting. Every urlnode returned has to be \
+        followed by a call to task_done.
+        :return: a 2-tuple (an instance of UrlNode, depth (int)) / None (if the frontier is empty or a budget \
+                 has run out)
+        """
+        with self.condition:
+            if not self.urlnodes or self.is_budget_exhausted ( ): return None
+            return self.claim ( )
+
+    def claim ( self ):
+        """
+        Pops the next urlnode and counts it as in-flight. It has to be called with self.condition held.
+        :return: a 2-tuple (an instance of UrlNode, depth (int))
+        """
+        self.in_flight += 1
+        self.claimed += 1
+
+        if self.order == self.ORDER_BFS:
+            urlnode, depth = self.urlnodes.popleft ( )
+        elif self.run_heads and self.run_heads[ 0 ][ 0 ][ :3 ] < (*self.urlnodes[ 0 ][ 0 ], self.urlnodes[ 0 ][ 1 ]):
+            _, _, urlnode, depth = self.pop_spilled ( )
+        else:
+            _, _, urlnode, depth = heapq.heappop ( self.urlnodes )
+
+        # urlnodes are held in memory as long as any is left, so that the frontier is empty only if they are
+        if not self.urlnodes and self.num_spilled:
+            self.load_spilled ( )
+
+        return urlnode, depth
+
+    def task_done ( self ):
+        """
+        Marks a urlnode returned by get/get_nowait as completely parsed (all its child urlnodes have already \
+        been put into the frontier).
+        :return:
+        """
+        with self.condition:
+            self.in_flight -= 1
+            if self.is_idle ( ) and not self.holds:
+                # crawl is finished: release the threads waiting in get
+                self.condition.notify_all ( )
+
+    def hold ( self ):
+        """
+        Keeps the crawl going even when the frontier is idle (nothing in-flight and no urlnode left): get waits \
+        instead of returning None, e.g; while urlnodes can still be put by another source than the parse threads. \
+        Every hold has to be followed by a call to release.
+        :return:
+        """
+        with self.condition:
+            self.holds += 1
+
+    def release ( self ):
+        """
+        Releases a hold (see hold).
+        :return:
+        """
+        with self.condition:
+            self.holds -= 1
+            if self.is_idle ( ) and not self.holds:
+                # crawl is finished: release the threads waiting in get
+                self.condition.notify_all ( )
+
+    def is_idle ( self ):
+        """
+        Returns True if no urlnode is in-flight and no more urlnodes can be handed out (the frontier is empty or \
+        a budget has run out), whether the frontier is held or not. It has to be called with self.condition held.
+        :return: bool
+        """
+        return not self.in_flight and (not self.urlnodes or self.is_budget_exhausted ( ))
+
+    def is_budget_exhausted ( self ):
+        """
+        Returns True once max_pages urlnodes have been handed out or max_time has elapsed. It has to be called \
+        with self.condition held.
+        :return: bool
+        """
+        if self.budget_exhausted: return True
+
+        if self.max_pages is not None and self.claimed >= self.max_pages:
+            self.budget_exhausted = 'max pages'
+        elif self.deadline is not None and time.monotonic ( ) >= self.deadline:
+            self.budget_exhausted = 'max time'
+
+        if self.budget_exhausted:
+            # threads waiting for a urlnode have to stop waiting
+            self.condition.notify_all ( )
+
+        return bool ( self.budget_exhausted )
+
+    def stop ( self, reason='cancelled' ):
+        """
+        Stops handing out urlnodes, as if a budget had run out: the urlnodes in-flight are still parsed, then the \
+        crawl is finished. It can be called from any thread.
+        :param reason: recorded as the budget which has run out (str)
+        :return:
+        """
+        with self.condition:
+            if not self.budget_exhausted:
+                self.budget_exhausted = reason
+            # threads waiting for a urlnode have to stop waiting
+            self.condition.notify_all ( )
+
+    def get_time_left ( self ):
+        """
+        :return: seconds left before max_time runs out (float / None for no limit)
+        """
+        if self.deadline is None: return None
+        return max ( 0.0, self.deadline - time.monotonic ( ) )
+
+    def is_finished ( self ):
+        """
+        :return: True if no urlnode is in-flight, no more urlnodes will be handed out and the frontier is not held (bool)
+        """
+        with self.condition:
+            return self.is_idle ( ) and not self.holds
+
+    def wait_finished ( self, timeout=None ):
+        """
+        Waits until the crawl is finished (see is_finished), e.g; in a thread which hands out the urlnodes of the \
+        frontier to parse threads running somewhere else.
+        :param timeout: maximum number of seconds to wait (float / None to wait as long as needed)
+        :return: True if the crawl is finished (bool)
+        """
+        end = time.monotonic ( ) + timeout if timeout is not None else None
+        with self.condition:
+            while not (self.is_idle ( ) and not self.holds):
+                wait_time = self.get_time_left ( )
+                if end is not None:
+                    time_left = end - time.monotonic ( )
+                    if time_left <= 0: return False
+                    wait_time = time_left if wait_time is None else min ( wait_time, time_left )
+
+                self.condition.wait ( timeout=wait_time )
+
+            return True
+
+    def is_idle_now ( self ):
+        """
+        Thread safe version of is_idle.
+        :return: bool
+        """
+        with self.condition:
+            return self.is_idle ( )
+
+    def get_stats ( self ):
+        """
+        Returns the counters of the frontier.
+        :return: dict
+        """
+        with self.condition:
+            return {
+                'enqueued': self.enqueued,
+                'claimed': self.claimed,
+                'pending': len ( self.urlnodes ) + self.num_spilled + self.merged_pending,
+                'duplicates_suppressed': self.duplicates_suppressed,
+                'depth_limited': self.depth_limited,
+                'budget_exhausted': self.budget_exhausted,
+            }
+
+    def add_stats ( self, stats ):
+        """
+        Adds the counters of another frontier (e.g; the frontier of a crawl process), as returned by its get_stats.
+        :param stats: dict
+        :return:
+        """
+        with self.condition:
+            self.enqueued += stats[ 'enqueued' ]
+            self.claimed += stats[ 'claimed' ]
+            self.duplicates_suppressed += stats[ 'duplicates_suppressed' ]
+            self.depth_limited += stats[ 'depth_limited' ]
+            self.merged_pending += stats[ 'pending' ]
+            self.budget_exhausted = self.budget_exhausted or stats[ 'budget_exhausted' ]
+
+    def close ( self ):
+        """
+        Deletes the file of the spilled urlnodes, if any.
+        :return:
+        """
+        with self.condition:
+            if self.spill_file:
+                self.spill_file.close ( )
+
+    def __len__ ( self ):
+        with self.condition:
+            return len ( self.urlnodes ) + self.num_spilled
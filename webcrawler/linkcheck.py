@@ -0,0 +1,226 @@
+import json
+import logging
+import queue
+import threading
+
+
+class LinkChecker:
+    """
+    This class checks the links found on the pages of a crawl, and reports every url with its status, its redirect \
+    chain and the pages linking to it. A url is checked only once, however many pages link to it. The urls of the \
+    domain which are crawled are checked by the crawl itself, which hands the response it got to set_result. The \
+    other urls (external links, and the urls of the domain left out of the crawl, see check_unchecked_urls) are \
+    checked by the threads of the checker with a HEAD request, or with a GET request for the first byte of the url \
+    if the server fails the HEAD request (some servers do not support HEAD); their bodies are never downloaded. \
+    It is thread safe.
+    """
+    # the GET request of a url whose HEAD request has failed asks for its first byte only
+    RANGE_HEADERS = { 'Range': 'bytes=0-0' }
+
+    # maximum number of referrers listed per url (all of them are counted)
+    MAX_REFERRERS = 20
+
+    def __init__ ( self, fetch_page, num_threads=4 ):
+        """
+        :param fetch_page: function (url, method, headers) returning the response of url once its headers are \
+                           received, following redirects (e.g; Crawler.fetch_page)
+        :param num_threads: number of threads checking urls (int)
+        """
+        self.logger = logging.getLogger ( __name__ )
+        self.fetch_page = fetch_page
+        self.num_threads = max ( 1, num_threads )
+
+        # it guards self.records and self.check_th_list
+        self.mutex = threading.Lock ( )
+
+        # Format is: {url: {'url': str, 'is_external': bool, 'status': int / None, 'error': str / None, \
+        # 'method': 'HEAD' / 'GET' / None, 'final_url': str / None, 'redirects': [[url, status], ...], \
+        # 'referrers': [url, ...], 'num_referrers': int, 'skipped': str / None}}
+        self.records = dict ( )
+
+        # urls waiting to be checked by the threads, then None once per thread to stop them
+        self.pending_urls = queue.Queue ( )
+
+        # threads checking urls, started with the first url to check
+        self.check_th_list = [ ]
+
+    def add_link ( self, url, referrer, is_external ):
+        """
+        Records a link from the page referrer to url. An external url is checked the first time it is linked.
+        :param url: absolute url (str)
+        :param referrer: url of the page on which the link has been found (str)
+        :param is_external: True if url is not crawled, so it has to be checked by the checker (bool)
+        :return:
+        """
+        with self.mutex:
+            record = self.records.get ( url )
+            if record is None:
+                record = self.records[ url ] = self.new_record ( url, is_external )
+                if is_external:
+                    self.queue_url ( url )
+
+            record[ 'num_referrers' ] += 1
+            if len ( record[ 'referrers' ] ) < self.MAX_REFERRERS and referrer not in record[ 'referrers' ]:
+                record[ 'referrers' ].append ( referrer )
+
+    @staticmethod
+    def new_record ( url, is_external ):
+        """
+        :param url: absolute url (str)
+        :param is_external: bool
+        :return: the record of a url which has not been checked yet (dict, see self.records)
+        """
+        return { 'url': url, 'is_external': is_external, 'status': None, 'error': None, 'method': None,
+                 'final_url': None, 'redirects': [ ], 'referrers': [ ], 'num_referrers': 0, 'skipped': None }
+
+    def set_result ( self, url, response=None, error=None, method=None ):
+        """
+        Records the outcome of the request of url.
+        :param url: absolute url (str)
+        :param response: response of url, whose redirects have been followed (None if the request has failed)
+        :param error: error which has failed the request (Exception / None)
+        :param method: method of the request (str)
+        :return:
+        """
+        with self.mutex:
+            record = self.records.get ( url )
+            if record is None:
+                record = self.records[ url ] = self.new_record ( url, False )
+
+            record[ 'method' ] = method
+            if response is not None:
+                record.update ( { 'status': response.getcode ( ), 'final_url': response.url,
+                                  'redirects': [ list ( redirect ) for redirect in response.redirects ] } )
+            else:
+                record[ 'error' ] = str ( error ) or type ( error ).__name__
+
+    def set_skipped ( self, url, reason ):
+        """
+        Records that url is deliberately not requested (e.g; it is a crawler trap), so that it is not checked after \
+        the crawl either.
+        :param url: absolute url (str)
+        :param reason: why url is not requested (str)
+        :return:
+        """
+        with self.mutex:
+            record = self.records.get ( url )
+            if record is None:
+                record = self.records[ url ] = self.new_record ( url, False )
+            record[ 'skipped' ] = reason
+
+    def check_unchecked_urls ( self, can_check ):
+        """
+        Checks the urls of the domain which have been linked but not crawled (e.g; the ones left out by a crawl \
+        budget), like external urls. It has to be called once, after the crawl.
+        :param can_check: function telling whether a url may be requested (e.g; allowed by robots.txt) (bool)
+        :return:
+        """
+        with self.mutex:
+            for url, record in self.records.items ( ):
+                if record[ 'status' ] is None and record[ 'error' ] is None and not record[ 'is_external' ] \
+                        and record[ 'skipped' ] is None and can_check ( url ):
+                    self.queue_url ( url )
+
+    def queue_url ( self, url ):
+        """
+        Hands url to the threads of the checker, starting them if needed. It has to be called with self.mutex held.
+        :param url: absolute url (str)
+        :return:
+        """
+        if not self.check_th_list:
+            for _ in range ( self.num_threads ):
+                th = threading.Thread ( target=self.check_pending_urls, daemon=True )
+                self.check_th_list.append ( th )
+                th.start ( )
+
+        self.pending_urls.put ( url )
+
+    def check_pending_urls ( self ):
+        """
+        Used by the threads of the checker: checks the urls of self.pending_urls until it gets None.
+        :return:
+        """
+        while True:
+            url = self.pending_urls.get ( )
+            if url is None: break
+            self.check_url ( url )
+
+    def check_url ( self, url ):
+        """
+        Requests url with HEAD, or with a GET request for its first byte if the HEAD request fails, without \
+        reading its body, and records the outcome.
+        :param url: absolute url (str)
+        :return:
+        """
+        method = 'HEAD'
+        try:
+            response = self.fetch_page ( url, method )
+            if response.getcode ( ) >= 400:
+                response.close ( )
+                method = 'GET'
+                response = self.fetch_page ( url, method, self.RANGE_HEADERS )
+        except Exception as err:
+            # e.g; http.client.HTTPException, OSError, or ValueError for an invalid url
+            self.set_result ( url, error=err, method=method )
+            return
+
+        # the connection is reused only if there is no body left to download
+        response.close ( drain=method == 'HEAD' or response.getcode ( ) == 206 )
+        self.set_result ( url, response, method=method )
+
+    def close ( self ):
+        """
+        Waits until all the urls handed to the checker have been checked, and stops its threads.
+        :return:
+        """
+        with self.mutex:
+            check_th_list, self.check_th_list = self.check_th_list, [ ]
+
+        for _ in check_th_list:
+            self.pending_urls.put ( None )
+        for th in check_th_list:
+            th.join ( )
+
+    @staticmethod
+    def is_broken ( record ):
+        """
+        :param record: record of a url (dict, see self.records)
+        :return: True if the request of the url has failed or its status code is an error (bool)
+        """
+        return record[ 'error' ] is not None or (record[ 'status' ] is not None and record[ 'status' ] >= 400)
+
+    def get_report ( self ):
+        """
+        Returns the records of all the urls, broken ones first, along with a summary.
+        :return: {'summary': {'links': int, 'external': int, 'broken': int, 'redirected': int, 'unchecked': int, \
+                 'skipped': int}, 'links': [record, ...]} (dict)
+        """
+        with self.mutex:
+            records = [ dict ( record, redirects=list ( record[ 'redirects' ] ),
+                               referrers=list ( record[ 'referrers' ] ) ) for record in self.records.values ( ) ]
+        records.sort ( key=lambda record: (not self.is_broken ( record ), record[ 'url' ]) )
+
+        return {
+            'summary': {
+                'links': len ( records ),
+                'external': sum ( 1 for record in records if record[ 'is_external' ] ),
+                'broken': sum ( 1 for record in records if self.is_broken ( record ) ),
+                'redirected': sum ( 1 for record in records if record[ 'redirects' ] ),
+                'unchecked': sum ( 1 for record in records if record[ 'status' ] is None
+                                   and record[ 'error' ] is None and record[ 'skipped' ] is None ),
+                'skipped': sum ( 1 for record in records if record[ 'skipped' ] is not None ),
+            },
+            'links': records,
+        }
+
+    def write_report ( self, report_path ):
+        """
+        Writes the report (see get_report) to a JSON file.
+        :param report_path: str
+        :return: the summary of the report (dict)
+        :raises OSError: if the file cannot be written
+        """
+        report = self.get_report ( )
+        with open ( report_path, 'w' ) as report_file:
+            json.dump ( report, report_file, indent=2 )
+        return report[ 'summary' ]
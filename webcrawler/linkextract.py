@@ -0,0 +1,250 @@
+# References:
+# 1. HTML Standard - Determining the character set of a page: https://html.spec.whatwg.org/multipage/parsing.html#determining-the-character-encoding
+# 2. HTML Standard - The base element: https://html.spec.whatwg.org/multipage/semantics.html#the-base-element
+# 3. https://docs.python.org/3/library/codecs.html#incremental-encoding-and-decoding
+
+import codecs
+import html
+import re
+from urllib.parse import urljoin, urlsplit
+
+# start of every construct the extractor cares about: comments and script/style elements (whose content \
+# is skipped) and the tags which carry links or change how links are resolved/decoded
+CONSTRUCT_START = re.compile ( r'<!--|<(script|style|a|area|link|base|meta)\b', re.IGNORECASE )
+
+# end of a tag, ignoring '>' inside quoted attribute values
+TAG_END = re.compile ( r'(?:[^>"\']|"[^"]*"|\'[^\']*\')*>' )
+
+# one attribute of a tag: name and optional (double/single/un-quoted) value
+TAG_ATTRIBUTE = re.compile ( r'([^\s"\'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?' )
+
+# end of the raw text of script and style elements
+RAW_TEXT_END = {
+    'script': re.compile ( r'</script\s*>', re.IGNORECASE ),
+    'style': re.compile ( r'</style\s*>', re.IGNORECASE ),
+}
+
+# charset declared by a meta tag: <meta charset="x"> or <meta http-equiv="Content-Type" content="text/html; charset=x">
+META_CHARSET = re.compile ( br'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_:.-]+)', re.IGNORECASE )
+
+# byte order marks, which take precedence over any declared charset
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# rel values of <link> which point to hosts to connect to rather than to documents
+NON_DOCUMENT_LINK_RELS = { 'dns-prefetch', 'preconnect' }
+
+
+class LinkExtractor:
+    """
+    This class extracts the links of a html page incrementally, while the page is being downloaded. Every chunk of \
+    bytes given to feed is decoded (with the charset of the Content-Type header, or else of a <meta> tag in the first \
+    1024 bytes, or else utf-8) and the links completed by that chunk are returned straight away, resolved against \
+    the page url or its <base href>. Links of <a>, <area> and <link> tags are extracted, except rel="nofollow" ones. \
+    Comments and the content of <script> and <style> elements are skipped.
+    """
+    # number of bytes scanned for a <meta> charset before decoding starts (same as the HTML standard prescan)
+    PRESCAN_SIZE = 1024
+
+    # a tag longer than this without a valid end (e.g; an unbalanced quote) ends at its first '>'
+    MAX_TAG_SIZE = 16 * 1024
+
+    # default charset if neither the header nor the page declares one
+    DEFAULT_CHARSET = 'utf-8'
+
+    def __init__ ( self, page_url, charset=None ):
+        """
+        :param page_url: url of the page, against which relative links are resolved (str)
+        :param charset: charset of the Content-Type header of the page (str / None)
+        """
+        # url against which relative links are resolved; <base href> replaces it
+        self.page_url = page_url
+        self.set_base_url ( page_url )
+        self.is_base_set = False
+
+        # decoder of the page; it is created once the charset is known
+        self.encoding = self.get_valid_encoding ( charset )
+        self.decoder = None
+
+        # bytes received before the charset is known
+        self.prescan_bytes = b''
+
+        # decoded text which has not been scanned yet because it ends in the middle of a construct
+        self.text = ''
+
+        # number of links skipped because of rel="nofollow"
+        self.nofollow_links = 0
+
+    @staticmethod
+    def get_valid_encoding ( charset ):
+        """
+        :param charset: name of a charset (str / None)
+        :return: the name of charset if Python knows it, else None
+        """
+        if not charset: return None
+        try:
+            return codecs.lookup ( charset.strip ( ) ).name
+        except LookupError:
+            return None
+
+    def feed ( self, chunk ):
+        """
+        Adds the next chunk of the page and returns the links which it completes.
+        :param chunk: bytes
+        :return: list of absolute links (str)
+        """
+        if self.decoder is None:
+            self.prescan_bytes += chunk
+            if len ( self.prescan_bytes ) < self.PRESCAN_SIZE:
+                return [ ]
+            chunk = self.start_decoding ( )
+
+        self.text += self.decoder.decode ( chunk )
+        return self.scan ( is_final=False )
+
+    def close ( self ):
+        """
+        Ends the page and returns the links which have not been returned by feed yet.
+        :return: list of absolute links (str)
+        """
+        chunk = self.start_decoding ( ) if self.decoder is None else b''
+        self.text += self.decoder.decode ( chunk, final=True )
+        return self.scan ( is_final=True )
+
+    def start_decoding ( self ):
+        """
+        Chooses the charset of the page from its byte order mark, header or <meta> tag and creates the decoder.
+        :return: the bytes received so far, which have to be decoded (bytes)
+        """
+        for bom, bom_encoding in BOM_ENCODINGS:
+            if self.prescan_bytes.startswith ( bom ):
+                self.encoding = bom_encoding
+                break
+        else:
+            if not self.encoding:
+                meta_charset = META_CHARSET.search ( self.prescan_bytes[ :self.PRESCAN_SIZE ] )
+                if meta_charset:
+                    self.encoding = self.get_valid_encoding ( meta_charset.group ( 1 ).decode ( 'ascii' ) )
+
+        self.encoding = self.encoding or self.DEFAULT_CHARSET
+        self.decoder = codecs.getincrementaldecoder ( self.encoding ) ( errors='replace' )
+
+        received_bytes, self.prescan_bytes = self.prescan_bytes, b''
+        return received_bytes
+
+    def scan ( self, is_final ):
+        """
+        Scans self.text for links. A construct which is not complete yet is kept in self.text for the next call, \
+        unless is_final is True.
+        :param is_final: True if no more text will be received (bool)
+        :return: list of absolute links (str)
+        """
+        text = self.text
+        found_links = [ ]
+        pos = 0
+
+        while True:
+            construct = CONSTRUCT_START.search ( text, pos )
+            if not construct:
+                # keep a trailing '<' as it may be the start of a construct completed by the next chunk
+                last_open = text.rfind ( '<', max ( pos, len ( text ) - 8 ) )
+                pos = len ( text ) if is_final or last_open < 0 else last_open
+                break
+
+            start = construct.start ( )
+            tag_name = construct.group ( 1 )
+
+            if tag_name is None:  # comment
+                end = text.find ( '-->', construct.end ( ) )
+                if end < 0:
+                    pos = len ( text ) if is_final else start
+                    break
+                pos = end + 3
+                continue
+
+            tag_end = TAG_END.match ( text, construct.end ( ) )
+            if tag_end:
+                end = tag_end.end ( )
+            else:
+                # unbalanced quote: fall back on the first '>' once the tag cannot be incomplete anymore
+                end = text.find ( '>', construct.end ( ) ) + 1
+                if not end or not is_final and len ( text ) - start < self.MAX_TAG_SIZE:
+                    pos = len ( text ) if is_final else start
+                    break
+
+            tag_name = tag_name.lower ( )
+            if tag_name in RAW_TEXT_END:
+                raw_text_end = RAW_TEXT_END[ tag_name ].search ( text, end )
+                if not raw_text_end:
+                    pos = len ( text ) if is_final else start
+                    break
+                pos = raw_text_end.end ( )
+                continue
+
+            link = self.handle_tag ( tag_name, text[ construct.end ( ):end - 1 ] )
+            if link: found_links.append ( link )
+            pos = end
+
+        self.text = text[ pos: ]
+        return found_links
+
+    def handle_tag ( self, tag_name, attributes_text ):
+        """
+        Returns the absolute link carried by a tag, if any. A <base href> tag changes the url against which \
+        the following links are resolved.
+        :param tag_name: lower case name of the tag (str)
+        :param attributes_text: text between the tag name and the closing '>' (str)
+        :return: absolute link (str) / None
+        """
+        if tag_name == 'meta': return None  # only used for the charset prescan
+
+        attributes = { }
+        for name, double_quoted, single_quoted, unquoted in TAG_ATTRIBUTE.findall ( attributes_text ):
+            name = name.lower ( )
+            if name not in attributes:
+                attributes[ name ] = html.unescape ( double_quoted or single_quoted or unquoted )
+
+        href = attributes.get ( 'href', '' ).strip ( )
+        if not href: return None
+
+        if tag_name == 'base':
+            # only the first <base href> of a page counts
+            if not self.is_base_set:
+                self.set_base_url ( urljoin ( self.page_url, href ) )
+                self.is_base_set = True
+            return None
+
+        rel = attributes.get ( 'rel', '' ).lower ( ).split ( )
+        if 'nofollow' in rel:
+            self.nofollow_links += 1
+            return None
+
+        if tag_name == 'link' and NON_DOCUMENT_LINK_RELS.intersection ( rel ):
+            return None
+
+        return self.get_absolute_link ( href )
+
+    def set_base_url ( self, base_url ):
+        """
+        :param base_url: absolute url against which the following links are resolved (str)
+        :return:
+        """
+        self.base_url = base_url
+        split_url = urlsplit ( base_url )
+        self.base_origin = "{0}://{1}".format ( split_url.scheme, split_url.netloc ) if split_url.netloc else None
+
+    def get_absolute_link ( self, href ):
+        """
+        Resolves href against the base url. Most links of a site are absolute paths ('/a/b.html'), which only \
+        need the scheme and host of the base url, so they do not go through urljoin (which accounts for most of \
+        the extraction time otherwise).
+        :param href: link as written in the page (str)
+        :return: absolute link (str)
+        """
+        if self.base_origin and href.startswith ( '/' ) and not href.startswith ( '//' ) and '/.' not in href \
+                and href[ -1 ] not in '?#':
+            return self.base_origin + href
+        return urljoin ( self.base_url, href )
@@ -0,0 +1,312 @@
+# References:
+# 1. https://numpy.org/doc/stable/reference/generated/numpy.savez_compressed.html
+# 2. https://docs.scipy.org/doc/scipy/reference/generated/scipy.sparse.csgraph.connected_components.html
+# 3. Page, Brin, Motwani, Winograd, The PageRank Citation Ranking: http://ilpubs.stanford.edu:8090/422/
+# 4. Tarjan, Depth-First Search and Linear Graph Algorithms: https://doi.org/10.1137/0201010
+
+# numpy (and scipy, for the strongly connected components of large graphs) are optional dependencies, only needed \
+# to export and analyse the link graph: pip install numpy scipy
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    csr_matrix = connected_components = None
+
+
+def check_numpy ( ):
+    """
+    :return:
+    :raises ImportError: if numpy is not installed
+    """
+    if numpy is None:
+        raise ImportError ( "The link graph needs numpy: pip install numpy" )
+
+
+def write_link_graph ( graph_path, url_graph, root_id ):
+    """
+    Writes the links recorded in url_graph (see UrlGraph.add_edge) as a compressed NumPy archive holding: \
+        1. indptr and indices, the compressed sparse row arrays of the links: the pages linked by url id i are \
+           indices[indptr[i]:indptr[i + 1]], without duplicate links nor links of a page to itself, \
+        2. urls, the UTF-8 bytes of the urls indexed by id, separated by newlines, \
+        3. visited, the crawled flag of every url, and root, the id of the domain root.
+    :param graph_path: path of the archive (str)
+    :param url_graph: an instance of UrlGraph
+    :param root_id: url id of the domain root (int)
+    :return: a 2-tuple (number of urls (int), number of links (int))
+    :raises ImportError: if numpy is not installed
+    :raises OSError: if the archive cannot be written
+    """
+    check_numpy ( )
+    urls = url_graph.get_urls ( )
+    num_urls = len ( urls )
+    with url_graph.mutex:
+        sources = numpy.array ( url_graph.edge_sources, dtype=numpy.int64 )
+        targets = numpy.array ( url_graph.edge_targets, dtype=numpy.int64 )
+        visited = numpy.frombuffer ( bytes ( url_graph.visited[ :num_urls ] ), dtype=numpy.uint8 ).astype ( bool )
+
+    # sorting the links by source then target, and dropping the duplicate ones, at once on one key per link
+    is_kept = sources != targets
+    keys = sources[ is_kept ] * num_urls + targets[ is_kept ]
+    keys.sort ( )
+    keys = keys[ numpy.concatenate ( ([ True ], keys[ 1: ] != keys[ :-1 ]) ) ] if len ( keys ) else keys
+    sources, targets = numpy.divmod ( keys, num_urls ) if num_urls else (keys, keys)
+
+    indptr = numpy.zeros ( num_urls + 1, dtype=numpy.int64 )
+    numpy.cumsum ( numpy.bincount ( sources, minlength=num_urls ), out=indptr[ 1: ] )
+    numpy.savez_compressed ( graph_path, indptr=indptr, indices=targets.astype ( numpy.int32 ),
+                             urls=numpy.frombuffer ( '\n'.join ( urls ).encode ( 'utf-8' ), dtype=numpy.uint8 ),
+                             visited=visited, root=numpy.int64 ( root_id ) )
+    return num_urls, len ( targets )
+
+
+class LinkGraph:
+    """
+    This class analyses the link graph of a crawl (see write_link_graph) with vectorized operations over its \
+    compressed sparse row arrays, so that graphs of millions of pages are analysed in seconds: click depth of \
+    every page from the domain root, number of links to every page (in-degree), orphan and near-orphan pages, \
+    strongly connected components and PageRank.
+    """
+    def __init__ ( self, indptr, indices, urls, visited=None, root_id=0 ):
+        """
+        :param indptr: offsets of the links of every url in indices (array of num_urls + 1 ints)
+        :param indices: url ids of the linked pages (array of int)
+        :param urls: urls indexed by id (list of str)
+        :param visited: crawled flag of every url (array of bool / None if every url has been crawled)
+        :param root_id: url id of the domain root (int)
+        :raises ImportError: if numpy is not installed
+        """
+        check_numpy ( )
+        self.indptr = numpy.asarray ( indptr, dtype=numpy.int64 )
+        self.indices = numpy.asarray ( indices, dtype=numpy.int32 )
+        self.urls = urls
+        self.num_urls = len ( self.indptr ) - 1
+        self.num_links = len ( self.indices )
+        self.visited = numpy.ones ( self.num_urls, dtype=bool ) if visited is None else numpy.asarray ( visited )
+        self.root_id = root_id
+
+    @classmethod
+    def load ( cls, graph_path ):
+        """
+        :param graph_path: path of an archive written by write_link_graph (str)
+        :return: an instance of LinkGraph
+        :raises ImportError: if numpy is not installed
+        :raises OSError: if the archive cannot be read
+        :raises ValueError: if the file is not a link graph
+        """
+        check_numpy ( )
+        with numpy.load ( graph_path ) as archive:
+            try:
+                url_bytes = archive[ 'urls' ].tobytes ( )
+                return cls ( archive[ 'indptr' ], archive[ 'indices' ],
+                             url_bytes.decode ( 'utf-8' ).split ( '\n' ) if url_bytes else [ ],
+                             archive[ 'visited' ], int ( archive[ 'root' ] ) )
+            except KeyError as err:
+                raise ValueError ( "{0} is not a link graph: {1} is missing".format ( graph_path, err ) )
+
+    def get_out_degrees ( self ):
+        """
+        :return: number of links of every url (array of int)
+        """
+        return numpy.diff ( self.indptr )
+
+    def get_in_degrees ( self ):
+        """
+        :return: number of pages linking to every url (array of int)
+        """
+        return numpy.bincount ( self.indices, minlength=self.num_urls )
+
+    def get_click_depths ( self ):
+        """
+        Breadth first search from the domain root, a whole level at a time: the links of every page of the level \
+        are gathered at once from the CSR arrays.
+        :return: least number of clicks from the domain root to every url, -1 if it cannot be reached (array of int)
+        """
+        depths = numpy.full ( self.num_urls, -1, dtype=numpy.int32 )
+        if not self.num_urls: return depths
+
+        depths[ self.root_id ] = 0
+        frontier = numpy.array ( [ self.root_id ], dtype=numpy.int64 )
+        depth = 0
+        while len ( frontier ):
+            depth += 1
+            starts = self.indptr[ frontier ]
+            counts = self.indptr[ frontier + 1 ] - starts
+            # positions of the links of the frontier in indices: starts[i], starts[i] + 1, ... for every page i
+            positions = numpy.repeat ( starts - numpy.cumsum ( counts ) + counts, counts ) + \
+                numpy.arange ( counts.sum ( ) )
+            linked = self.indices[ positions ]
+            frontier = numpy.unique ( linked[ depths[ linked ] < 0 ] ).astype ( numpy.int64 )
+            depths[ frontier ] = depth
+
+        return depths
+
+    def get_orphans ( self, in_degrees=None ):
+        """
+        :param in_degrees: see get_in_degrees (None to compute them)
+        :return: ids of the urls no page links to, the domain root excepted (e.g; urls only listed by a sitemap) \
+                 (array of int)
+        """
+        in_degrees = self.get_in_degrees ( ) if in_degrees is None else in_degrees
+        is_orphan = in_degrees == 0
+        if self.num_urls: is_orphan[ self.root_id ] = False
+        return numpy.flatnonzero ( is_orphan )
+
+    def get_near_orphans ( self, in_degrees=None, max_links=1 ):
+        """
+        :param in_degrees: see get_in_degrees (None to compute them)
+        :param max_links: maximum number of pages linking to a near-orphan url (int >= 1)
+        :return: ids of the urls linked by 1 to max_links pages, the domain root excepted (array of int)
+        """
+        in_degrees = self.get_in_degrees ( ) if in_degrees is None else in_degrees
+        is_near_orphan = (in_degrees >= 1) & (in_degrees <= max_links)
+        if self.num_urls: is_near_orphan[ self.root_id ] = False
+        return numpy.flatnonzero ( is_near_orphan )
+
+    def get_strong_components ( self ):
+        """
+        Finds the strongly connected components of the graph: the sets of pages which can all be reached from one \
+        another by following links. It uses scipy if it is installed, else an iterative Tarjan's algorithm.
+        :return: a 2-tuple (number of components (int), component of every url (array of int))
+        """
+        if connected_components is not None:
+            matrix = csr_matrix ( (numpy.ones ( self.num_links, dtype=numpy.int8 ), self.indices, self.indptr),
+                                  shape=(self.num_urls, self.num_urls) )
+            return connected_components ( matrix, directed=True, connection='strong' )
+
+        return self.get_strong_components_tarjan ( )
+
+    def get_strong_components_tarjan ( self ):
+        """
+        :return: see get_strong_components
+        """
+        indptr, indices = self.indptr.tolist ( ), self.indices.tolist ( )
+        order = [ -1 ] * self.num_urls  # order in which every url has been reached
+        low = [ 0 ] * self.num_urls  # lowest order reachable from the url through the urls of the stack
+        labels = [ -1 ] * self.num_urls
+        on_stack = bytearray ( self.num_urls )
+        stack = [ ]
+        num_reached = num_components = 0
+
+        for start_id in range ( self.num_urls ):
+            if order[ start_id ] >= 0: continue
+
+            order[ start_id ] = low[ start_id ] = num_reached
+            num_reached += 1
+            stack.append ( start_id )
+            on_stack[ start_id ] = 1
+            # depth first path, with the position of the next link to follow of every url
+            path = [ [ start_id, indptr[ start_id ] ] ]
+            while path:
+                url_id, position = path[ -1 ]
+                next_id = None
+                while position < indptr[ url_id + 1 ]:
+                    linked_id = indices[ position ]
+                    position += 1
+                    if order[ linked_id ] < 0:
+                        next_id = linked_id
+                        break
+                    if on_stack[ linked_id ] and order[ linked_id ] < low[ url_id ]:
+                        low[ url_id ] = order[ linked_id ]
+                path[ -1 ][ 1 ] = position
+
+                if next_id is not None:
+                    order[ next_id ] = low[ next_id ] = num_reached
+                    num_reached += 1
+                    stack.append ( next_id )
+                    on_stack[ next_id ] = 1
+                    path.append ( [ next_id, indptr[ next_id ] ] )
+                    continue
+
+                # every link of url_id has been followed
+                path.pop ( )
+                if path and low[ url_id ] < low[ path[ -1 ][ 0 ] ]:
+                    low[ path[ -1 ][ 0 ] ] = low[ url_id ]
+                if low[ url_id ] == order[ url_id ]:
+                    while True:
+                        member_id = stack.pop ( )
+                        on_stack[ member_id ] = 0
+                        labels[ member_id ] = num_components
+                        if member_id == url_id: break
+                    num_components += 1
+
+        return num_components, numpy.array ( labels, dtype=numpy.int32 )
+
+    def get_pagerank ( self, damping=0.85, tolerance=1e-6, max_iterations=100 ):
+        """
+        Computes the PageRank of every url by power iteration: every iteration spreads the rank of every page over \
+        its links at once (numpy.bincount), and the rank of the pages without links over every page.
+        :param damping: probability of following a link rather than jumping to any page (0 <= float < 1)
+        :param tolerance: sum of the rank changes under which the iterations stop (float)
+        :param max_iterations: int
+        :return: PageRank of every url, whose sum is 1 (array of float)
+        """
+        if not self.num_urls: return numpy.zeros ( 0 )
+
+        out_degrees = self.get_out_degrees ( )
+        sources = numpy.repeat ( numpy.arange ( self.num_urls ), out_degrees )
+        is_dangling = out_degrees == 0
+        rank = numpy.full ( self.num_urls, 1.0 / self.num_urls )
+        for _ in range ( max_iterations ):
+            shares = rank / numpy.maximum ( out_degrees, 1 )
+            new_rank = numpy.bincount ( self.indices, weights=shares[ sources ], minlength=self.num_urls )
+            new_rank = damping * (new_rank + rank[ is_dangling ].sum ( ) / self.num_urls) + \
+                (1.0 - damping) / self.num_urls
+            change = numpy.abs ( new_rank - rank ).sum ( )
+            rank = new_rank
+            if change < tolerance: break
+
+        return rank
+
+    def get_metrics ( self, max_near_orphan_links=1 ):
+        """
+        :param max_near_orphan_links: see get_near_orphans (int)
+        :return: per url metrics (dict of arrays indexed by url id): {'depth', 'in_degree', 'out_degree', \
+                 'component', 'pagerank', 'is_orphan', 'is_near_orphan'}
+        """
+        in_degrees = self.get_in_degrees ( )
+        is_orphan = numpy.zeros ( self.num_urls, dtype=bool )
+        is_orphan[ self.get_orphans ( in_degrees ) ] = True
+        is_near_orphan = numpy.zeros ( self.num_urls, dtype=bool )
+        is_near_orphan[ self.get_near_orphans ( in_degrees, max_near_orphan_links ) ] = True
+        return { 'depth': self.get_click_depths ( ), 'in_degree': in_degrees, 'out_degree': self.get_out_degrees ( ),
+                 'component': self.get_strong_components ( )[ 1 ], 'pagerank': self.get_pagerank ( ),
+                 'is_orphan': is_orphan, 'is_near_orphan': is_near_orphan }
+
+    def get_summary ( self, metrics, top=10 ):
+        """
+        :param metrics: see get_metrics
+        :param top: number of urls listed per ranking (int)
+        :return: {'urls': int, 'links': int, 'crawled': int, 'depths': {depth: count}, 'unreachable': int, \
+                 'orphans': int, 'near_orphans': int, 'components': int, 'largest_component': int, \
+                 'root_component': int, 'top_pagerank': [[url, float], ...], 'top_in_degree': [[url, int], ...], \
+                 'deepest': [[url, int], ...], 'orphan_urls': [url, ...], 'near_orphan_urls': [url, ...]} (dict)
+        """
+        depths = metrics[ 'depth' ]
+        reached_depths = numpy.bincount ( depths[ depths >= 0 ] ) if self.num_urls else numpy.zeros ( 0 )
+        components = metrics[ 'component' ]
+        component_sizes = numpy.bincount ( components ) if self.num_urls else numpy.zeros ( 1, dtype=int )
+
+        def get_top ( values, is_kept=None ):
+            url_ids = numpy.flatnonzero ( is_kept ) if is_kept is not None else numpy.arange ( self.num_urls )
+            url_ids = url_ids[ numpy.argsort ( -values[ url_ids ], kind='stable' )[ :top ] ]
+            return [ [ self.urls[ url_id ], values[ url_id ].item ( ) ] for url_id in url_ids ]
+
+        return { 'urls': self.num_urls, 'links': self.num_links, 'crawled': int ( self.visited.sum ( ) ),
+                 'depths': { depth: int ( count ) for depth, count in enumerate ( reached_depths ) },
+                 'unreachable': int ( (depths < 0).sum ( ) ),
+                 'orphans': int ( metrics[ 'is_orphan' ].sum ( ) ),
+                 'near_orphans': int ( metrics[ 'is_near_orphan' ].sum ( ) ),
+                 'components': len ( component_sizes ) if self.num_urls else 0,
+                 'largest_component': int ( component_sizes.max ( ) ),
+                 'root_component': int ( component_sizes[ components[ self.root_id ] ] ) if self.num_urls else 0,
+                 'top_pagerank': get_top ( metrics[ 'pagerank' ] ),
+                 'top_in_degree': get_top ( metrics[ 'in_degree' ] ),
+                 'deepest': get_top ( depths ),
+                 'orphan_urls': [ self.urls[ url_id ] for url_id in
+                                  numpy.flatnonzero ( metrics[ 'is_orphan' ] )[ :top ] ],
+                 'near_orphan_urls': [ url for url, _ in get_top ( depths, metrics[ 'is_near_orphan' ] ) ] }
@@ -0,0 +1,351 @@
+# References:
+# 1. The WARC File Format 1.0 (ISO 28500): https://iipc.github.io/warc-specifications/specifications/warc-format/warc-1.0/
+# 2. https://docs.python.org/3/library/zlib.html#zlib.compressobj
+# 3. https://docs.python.org/3/library/mmap.html
+
+import datetime
+import http.client
+import io
+import logging
+import mmap
+import os
+import threading
+import time
+import uuid
+import zlib
+
+from .fetcher import Fetcher
+
+# wbits of zlib for the gzip format
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def get_record_fields ( warc_head ):
+    """
+    :param warc_head: head of a WARC record, without its blank line (bytes)
+    :return: named fields of the record (dictionary)
+    """
+    fields = dict ( )
+    for line in warc_head.decode ( 'utf-8', 'replace' ).split ( '\r\n' )[ 1: ]:
+        name, _, value = line.partition ( ':' )
+        fields[ name.strip ( ) ] = value.strip ( )
+    return fields
+
+
+class PageArchive:
+    """
+    This class writes the responses of a crawl into an append-only WARC archive: every response (its status line, \
+    its headers and the part of its body which has been read) is a WARC response record compressed on its own as \
+    a gzip member, the way wget and Heritrix write .warc.gz files, so that any record can be read without the \
+    others. An index file next to the archive (<archive>.idx) gets a line per record with its offset, size, \
+    request method and url, so that a replay (see PageArchiveReader) reads the record of a url at once. Records \
+    are appended, so that several crawls can be archived in the same file. It is thread safe.
+    """
+    # suffix of the index file of an archive
+    INDEX_SUFFIX = '.idx'
+
+    # zlib compression level of the records (1 is the fastest, 9 the smallest)
+    COMPRESSION_LEVEL = 6
+
+    def __init__ ( self, path ):
+        """
+        :param path: path of the archive, which is created if it does not exist (str)
+        """
+        self.mutex = threading.Lock ( )
+
+        self.path = path
+        self.archive_file = open ( path, 'ab' )
+        self.index_file = open ( path + self.INDEX_SUFFIX, 'a', encoding='utf-8' )
+
+        # number of records and of compressed bytes written by this crawl
+        self.num_records = 0
+        self.size = 0
+
+    def write_response ( self, url, method, status, headers, body, is_truncated=False ):
+        """
+        Appends a response record to the archive and its line to the index.
+        :param url: requested url (str)
+        :param method: method of the request (str)
+        :param status: HTTP status code (int)
+        :param headers: response headers (iterable of 2-tuples (name (str), value (str)), e.g; HTTPMessage.items())
+        :param body: the part of the body which has been read (bytes)
+        :param is_truncated: True if the body has not been completely read (bool)
+        :return:
+        """
+        # the body is stored as it has been received, without its transfer encoding
+        http_head = "HTTP/1.1 {0} {1}\r\n{2}\r\n".format (
+            status, http.client.responses.get ( status, '' ),
+            ''.join ( "{0}: {1}\r\n".format ( name, value ) for name, value in headers
+                      if name.lower ( ) != 'transfer-encoding' ) ).encode ( 'iso-8859-1', 'replace' )
+        warc_date = datetime.datetime.now ( datetime.timezone.utc ).strftime ( '%Y-%m-%dT%H:%M:%SZ' )
+        warc_head = "WARC/1.0\r\nWARC-Type: response\r\nWARC-Record-ID: <urn:uuid:{0}>\r\nWARC-Date: {1}\r\n" \
+                    "WARC-Target-URI: {2}\r\nContent-Type: application/http;msgtype=response\r\n{3}" \
+                    "Content-Length: {4}\r\n\r\n".format (
+                        uuid.uuid4 ( ), warc_date, url, "WARC-Truncated: length\r\n" if is_truncated else '',
+                        len ( http_head ) + len ( body ) )
+
+        compressor = zlib.compressobj ( self.COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS )
+        record = b''.join ( (compressor.compress ( warc_head.encode ( 'utf-8' ) ), compressor.compress ( http_head ),
+                             compressor.compress ( body ), compressor.compress ( b'\r\n\r\n' ), compressor.flush ( )) )
+
+        with self.mutex:
+            offset = self.archive_file.tell ( )
+            self.archive_file.write ( record )
+            self.index_file.write ( "{0} {1} {2} {3}\n".format ( offset, len ( record ), method, url ) )
+            self.num_records += 1
+            self.size += len ( record )
+
+    def close ( self ):
+        """
+        :return:
+        """
+        with self.mutex:
+            self.archive_file.close ( )
+            self.index_file.close ( )
+
+
+class PageArchiveReader:
+    """
+    This class reads the responses of a PageArchive by url, through its index: the archive is memory-mapped, and \
+    the record of a url is decompressed from its offset, so that a replay reads the pages as fast as the disk \
+    allows. When a url has several records, the last GET record is read (the HEAD records have no body). It is \
+    thread safe.
+    """
+    def __init__ ( self, path ):
+        """
+        :param path: path of an archive written by PageArchive (str)
+        :raises OSError: if the archive or its index cannot be read
+        """
+        self.path = path
+
+        # offset, size and method of the record of every url. Format is: {url: (offset, size, method)}
+        self.records = dict ( )
+
+        self.archive_file = open ( path, 'rb' )
+        archive_size = os.fstat ( self.archive_file.fileno ( ) ).st_size
+        self.archive_map = mmap.mmap ( self.archive_file.fileno ( ), 0, access=mmap.ACCESS_READ ) \
+            if archive_size else b''
+
+        with open ( path + PageArchive.INDEX_SUFFIX, encoding='utf-8' ) as index_file:
+            for line in index_file:
+                try:
+                    offset, size, method, url = line.rstrip ( '\n' ).split ( ' ', 3 )
+                    offset, size = int ( offset ), int ( size )
+                except ValueError:
+                    continue  # e.g; the last line of an interrupted crawl
+
+                # the record of an interrupted crawl may not have been completely written
+                if offset + size > archive_size: continue
+                if method == 'HEAD' and self.records.get ( url, (0, 0, 'HEAD') )[ 2 ] != 'HEAD': continue
+                self.records[ url ] = (offset, size, method)
+
+    def get ( self, url ):
+        """
+        :param url: requested url (str)
+        :return: a 3-tuple (status (int), headers (http.client.HTTPMessage), body (bytes)) / None if url is not \
+                 in the archive
+        :raises ValueError: if the record of url is not a valid response record
+        """
+        record_location = self.records.get ( url )
+        if record_location is None: return None
+
+        offset, size, _ = record_location
+        try:
+            record = zlib.decompress ( self.archive_map[ offset:offset + size ], GZIP_WBITS )
+        except zlib.error as err:
+            raise ValueError ( "record of URL {0} cannot be decompressed: {1}".format ( url, err ) )
+
+        warc_head_end = record.find ( b'\r\n\r\n' )
+        http_head_end = record.find ( b'\r\n\r\n', warc_head_end + 4 )
+        if warc_head_end < 0 or http_head_end < 0:
+            raise ValueError ( "record of URL {0} is not a response record".format ( url ) )
+
+        status_line, _, header_lines = record[ warc_head_end + 4:http_head_end + 4 ].partition ( b'\r\n' )
+        headers = http.client.parse_headers ( io.BytesIO ( header_lines ) )
+        block_size = int ( get_record_fields ( record[ :warc_head_end ] ).get ( 'Content-Length', 0 ) )
+        return int ( status_line.split ( )[ 1 ] ), headers, record[ http_head_end + 4:warc_head_end + 4 + block_size ]
+
+    def __len__ ( self ):
+        return len ( self.records )
+
+    def close ( self ):
+        """
+        :return:
+        """
+        if self.archive_map:
+            self.archive_map.close ( )
+        self.archive_file.close ( )
+
+
+class ArchivingResponse:
+    """
+    This class wraps a response of a Fetcher and writes it into a PageArchive once it is closed, with the part of \
+    its body which has been read, after a record per redirect which has led to it.
+    """
+    def __init__ ( self, response, archive, method='GET' ):
+        """
+        :param response: an instance of FetchResponse
+        :param archive: an instance of PageArchive
+        :param method: method of the request of the response (str)
+        """
+        self.response = response
+        self.archive = archive
+        self.method = method
+
+        # the body read so far, and True once it has been completely read (a HEAD response has no body)
+        self.body_chunks = [ ]
+        self.is_complete = method == 'HEAD'
+
+    def __getattr__ ( self, name ):
+        # url, status, headers, redirects, getcode, ... are the ones of the wrapped response
+        return getattr ( self.response, name )
+
+    def read ( self, amt=None ):
+        """
+        :param amt: see FetchResponse.read
+        :return: bytes
+        """
+        data = self.response.read ( amt )
+        self.body_chunks.append ( data )
+        if amt is None or not data: self.is_complete = True
+        return data
+
+    def read1 ( self, amt ):
+        """
+        :param amt: see FetchResponse.read1
+        :return: bytes
+        """
+        data = self.response.read1 ( amt )
+        self.body_chunks.append ( data )
+        if not data: self.is_complete = True
+        return data
+
+    def close ( self, drain=True ):
+        """
+        Closes the wrapped response, and writes it into the archive the first time.
+        :param drain: see FetchResponse.close
+        :return:
+        """
+        self.response.close ( drain )
+        if self.archive is None: return
+
+        archive, self.archive = self.archive, None
+        try:
+            # every redirect is archived as a response whose Location is the next url of the chain
+            hop_urls = [ url for url, _ in self.response.redirects ] + [ self.response.url ]
+            for (url, status), location in zip ( self.response.redirects, hop_urls[ 1: ] ):
+                archive.write_response ( url, self.method, status, [ ('Location', location) ], b'' )
+            archive.write_response ( self.response.url, self.method, self.response.status,
+                                     self.response.headers.items ( ), b''.join ( self.body_chunks ),
+                                     not self.is_complete )
+        except (OSError, ValueError) as err:
+            logging.getLogger ( __name__ ).error ( "Error {0} occurred while archiving URL {1}".format (
+                err, self.response.url ) )
+        self.body_chunks = None
+
+
+class ArchivedResponse:
+    """
+    This class is a response read from a PageArchive, with the interface of FetchResponse.
+    """
+    def __init__ ( self, url, status, headers, body ):
+        """
+        :param url: url of the response (str)
+        :param status: HTTP status code (int)
+        :param headers: response headers (http.client.HTTPMessage)
+        :param body: archived body (bytes)
+        """
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = io.BytesIO ( body )
+
+        # urls which have redirected to this response, with their status codes (list of 2-tuples (str, int))
+        self.redirects = [ ]
+
+    def getcode ( self ):
+        """
+        :return: HTTP status code (int)
+        """
+        return self.status
+
+    def read ( self, amt=None ):
+        """
+        :param amt: int / None for the whole remaining body
+        :return: bytes
+        """
+        return self.body.read ( amt )
+
+    def read1 ( self, amt ):
+        """
+        :param amt: int
+        :return: bytes
+        """
+        return self.body.read1 ( amt )
+
+    def close ( self, drain=True ):
+        """
+        :param drain: unused, see FetchResponse.close
+        :return:
+        """
+        self.body.close ( )
+
+
+class ReplayFetcher ( Fetcher ):
+    """
+    This class is a Fetcher which reads the responses from a PageArchive instead of the network, so that a crawl \
+    can be replayed offline, e.g; to evaluate a change of the link extraction or to benchmark the CPU-bound \
+    stages of the crawl. The redirects are followed like live ones. A url which is not in the archive fails \
+    like a url which cannot be opened.
+    """
+    def __init__ ( self, archive, stats=None ):
+        """
+        :param archive: an instance of PageArchiveReader (None if the archive cannot be read: every url fails)
+        :param stats: see Fetcher
+        """
+        super ( ).__init__ ( stats=stats )
+        self.archive = archive
+
+        self.mutex = threading.Lock ( )
+
+        # number of responses replayed and of urls which were not in the archive
+        self.num_replayed = 0
+        self.num_missing = 0
+
+    def request ( self, url, method='GET', headers=None, stats=None ):
+        """
+        Reads the response of url from the archive.
+        :param url: str
+        :param method: 'GET' or 'HEAD' (str)
+        :param headers: ignored, as the archived response is returned whatever the request headers (e.g; the \
+                        conditional headers of the page cache)
+        :param stats: see Fetcher.request
+        :return: an instance of ArchivedResponse
+        :raises OSError: if url is not in the archive
+        """
+        stats = stats if stats is not None else self.stats
+        start = time.perf_counter ( )
+        archived = self.archive.get ( url ) if self.archive else None
+        with self.mutex:
+            if archived is None:
+                self.num_missing += 1
+            else:
+                self.num_replayed += 1
+        if archived is None:
+            raise FileNotFoundError ( "URL {0} is not in the page archive".format ( url ) )
+
+        status, response_headers, body = archived
+        if stats:
+            stats.add_time ( 'ttfb', time.perf_counter ( ) - start )
+            stats.count_response ( status )
+
+        return ArchivedResponse ( url, status, response_headers, b'' if method == 'HEAD' else body )
+
+    def close ( self ):
+        """
+        Closes the archive.
+        :return:
+        """
+        super ( ).close ( )
+        if self.archive:
+            self.archive.close ( )
@@ -0,0 +1,172 @@
+# References:
+# 1. Conditional requests: https://tools.ietf.org/html/rfc7232
+# 2. https://docs.python.org/3/library/sqlite3.html
+# 3. Write-ahead logging: https://www.sqlite.org/wal.html
+
+import collections
+import sqlite3
+import threading
+import time
+
+
+class PageCache:
+    """
+    This class keeps, from one crawl to the next, the validators (ETag, Last-Modified) and the links of the pages \
+    of a domain in a SQLite database, keyed by url. A recrawl sends them as a conditional request \
+    (If-None-Match / If-Modified-Since): if the page has not changed, the server answers 304 without a body and \
+    the links of the page are taken from the cache instead. Once the cached pages take more than max_size \
+    bytes, the least recently used ones are evicted. It is thread safe.
+    """
+    # number of writes after which they are committed to the database
+    COMMIT_INTERVAL = 1000
+
+    # after an eviction, the cache takes at most this fraction of max_size, so that it does not evict on every put
+    EVICTION_TARGET = 0.9
+
+    def __init__ ( self, path, max_size=100 * 1024 * 1024 ):
+        """
+        :param path: path of the database file (str)
+        :param max_size: maximum size in bytes of the cached pages (urls, validators and links) (int)
+        """
+        self.mutex = threading.Lock ( )
+
+        self.path = path
+        self.max_size = max_size
+
+        # the connection is shared by all the parse threads, every access is done with self.mutex held
+        self.connection = sqlite3.connect ( path, check_same_thread=False )
+        self.connection.execute ( "PRAGMA journal_mode=WAL" )
+        self.connection.execute ( "PRAGMA synchronous=NORMAL" )
+        self.connection.execute ( "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, etag TEXT, "
+                                  "last_modified TEXT, links TEXT, size INTEGER, last_used REAL)" )
+        self.connection.execute ( "CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)" )
+
+        # number and size in bytes of the cached pages, and number of writes which have not been committed yet
+        self.num_pages, self.size = self.connection.execute (
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages" ).fetchone ( )
+        self.uncommitted = 0
+
+        # Format is: {'hits': count, 'misses': count, 'updated': count, 'stored': count, 'evicted': count}
+        self.stats = collections.Counter ( )
+
+    @staticmethod
+    def get_conditional_headers ( cached_page ):
+        """
+        :param cached_page: a 3-tuple returned by get (None if the page is not cached)
+        :return: headers which make the request of the page conditional (dictionary)
+        """
+        if not cached_page: return { }
+
+        etag, last_modified, _ = cached_page
+        headers = { }
+        if etag: headers[ 'If-None-Match' ] = etag
+        if last_modified: headers[ 'If-Modified-Since' ] = last_modified
+        return headers
+
+    def get ( self, url ):
+        """
+        :param url: str
+        :return: a 3-tuple (ETag (str / None), Last-Modified (str / None), links of the page (list of str)) / \
+                 None if the page is not cached
+        """
+        with self.mutex:
+            row = self.connection.execute ( "SELECT etag, last_modified, links FROM pages WHERE url = ?",
+                                            (url,) ).fetchone ( )
+            if not row:
+                self.stats[ 'misses' ] += 1
+                return None
+
+        etag, last_modified, links = row
+        return etag, last_modified, links.split ( "\n" ) if links else [ ]
+
+    def mark_hit ( self, url ):
+        """
+        Counts a page which has not changed since it was cached (its cached links are reused), and marks it as \
+        recently used.
+        :param url: str
+        :return:
+        """
+        with self.mutex:
+            self.stats[ 'hits' ] += 1
+            self.connection.execute ( "UPDATE pages SET last_used = ? WHERE url = ?", (time.time ( ), url) )
+            self.count_write ( )
+
+    def put ( self, url, etag, last_modified, links ):
+        """
+        Caches (or replaces) a downloaded page, evicting the least recently used pages if the cache gets too big.
+        :param url: str
+        :param etag: value of the ETag header of the page (str / None)
+        :param last_modified: value of the Last-Modified header of the page (str / None)
+        :param links: absolute links of the page (list of str)
+        :return:
+        """
+        links = "\n".join ( links )
+        size = len ( url ) + len ( etag or "" ) + len ( last_modified or "" ) + len ( links )
+        with self.mutex:
+            row = self.connection.execute ( "SELECT size FROM pages WHERE url = ?", (url,) ).fetchone ( )
+            if row:
+                self.size -= row[ 0 ]
+                self.stats[ 'updated' ] += 1
+            else:
+                self.num_pages += 1
+
+            self.connection.execute ( "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                                      (url, etag, last_modified, links, size, time.time ( )) )
+            self.size += size
+            self.stats[ 'stored' ] += 1
+            self.count_write ( )
+
+            if self.size > self.max_size:
+                self.evict ( )
+
+    def evict ( self ):
+        """
+        Deletes the least recently used pages until the cache takes at most EVICTION_TARGET of max_size. \
+        It has to be called with self.mutex held.
+        :return:
+        """
+        target_size = self.max_size * self.EVICTION_TARGET
+        evicted_urls = [ ]
+        cursor = self.connection.execute ( "SELECT url, size FROM pages ORDER BY last_used" )
+        for url, size in cursor:
+            if self.size <= target_size: break
+            evicted_urls.append ( (url,) )
+            self.size -= size
+        cursor.close ( )
+
+        self.num_pages -= len ( evicted_urls )
+        self.connection.executemany ( "DELETE FROM pages WHERE url = ?", evicted_urls )
+        self.stats[ 'evicted' ] += len ( evicted_urls )
+        self.connection.commit ( )
+        self.uncommitted = 0
+
+    def count_write ( self ):
+        """
+        Commits the writes once COMMIT_INTERVAL of them are pending. It has to be called with self.mutex held.
+        :return:
+        """
+        self.uncommitted += 1
+        if self.uncommitted >= self.COMMIT_INTERVAL:
+            self.connection.commit ( )
+            self.uncommitted = 0
+
+    def get_stats ( self ):
+        """
+        Returns the counters of the cache: hits (unchanged pages), misses (pages not cached), updated (cached \
+        pages which have changed), stored, evicted, along with the number and size of the cached pages.
+        :return: dict
+        """
+        with self.mutex:
+            stats = { counter: self.stats[ counter ] for counter in ('hits', 'misses', 'updated', 'stored', 'evicted') }
+            stats[ 'pages' ] = self.num_pages
+            stats[ 'size' ] = self.size
+            return stats
+
+    def close ( self ):
+        """
+        Commits the pending writes and closes the database.
+        :return:
+        """
+        with self.mutex:
+            self.connection.commit ( )
+            self.connection.close ( )
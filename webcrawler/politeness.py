@@ -0,0 +1,317 @@
+# References:
+# 1. Additive increase/multiplicative decrease: https://en.wikipedia.org/wiki/Additive_increase/multiplicative_decrease
+# 2. Retry-After: https://tools.ietf.org/html/rfc7231#section-7.1.3
+# 3. Exponential backoff and jitter: https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+# 4. Crawl-delay: https://en.wikipedia.org/wiki/Robots.txt#Crawl-delay_directive
+
+import asyncio
+import collections
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class HostState:
+    """
+    This class holds the politeness state of one host: how many requests it may get at once, how many it is \
+    getting, and when the next one may start.
+    """
+    __slots__ = ('concurrency', 'in_flight', 'interval', 'next_start', 'backoff_until', 'errors', 'latency',
+                 'min_latency', 'last_decrease', 'ceiling', 'ceiling_until')
+
+    def __init__ ( self, concurrency, interval ):
+        """
+        :param concurrency: number of requests the host may get at once, at first (float)
+        :param interval: minimum seconds between the starts of two requests to the host (float)
+        """
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.interval = interval
+        self.next_start = 0.0
+
+        # no request starts before backoff_until, after the host has throttled or failed errors times in a row
+        self.backoff_until = 0.0
+        self.errors = 0
+
+        # smoothed and lowest latency of the responses of the host (seconds / None before the first response)
+        self.latency = None
+        self.min_latency = None
+
+        # the concurrency is decreased at most once per latency, as a decrease takes that long to show
+        self.last_decrease = 0.0
+
+        # after the host has throttled, its concurrency does not grow beyond ceiling until ceiling_until
+        self.ceiling = None
+        self.ceiling_until = 0.0
+
+
+class PolitenessScheduler:
+    """
+    This class sits between the frontier and the fetchers, and decides when a request may be sent to a host. \
+    Every host gets at most one request every interval seconds (the rate limit of the crawl, or the Crawl-delay \
+    of its robots.txt if it is longer) and at most concurrency requests at once. The concurrency of a host is \
+    adjusted from its responses (AIMD): it grows by one every concurrency responses as long as their latency stays \
+    close to the lowest latency seen, and it is halved when the host throttles (429, 503), fails or slows down. \
+    A host which has throttled is not given as many requests at once again for a while (see CEILING_TIME). \
+    After a throttled or failed request, the host is left alone for the time asked by its Retry-After header, \
+    or for an exponential backoff with jitter, and the request is retried. It is thread safe; the async engine \
+    uses acquire_async instead of acquire.
+    """
+    # status codes of a host asking to slow down: the request is retried after a backoff
+    RETRY_CODES = (429, 503)
+
+    # concurrency of a host before any response, and factor applied to it when it is decreased
+    INITIAL_CONCURRENCY = 1.0
+    DECREASE_FACTOR = 0.5
+
+    # the concurrency of a host stops growing and is decreased once its smoothed latency is more than \
+    # LATENCY_FACTOR times its lowest latency plus LATENCY_TOLERANCE seconds (so that the jitter of a host which \
+    # answers in a few milliseconds does not count); LATENCY_SMOOTHING is the weight of a new response in the \
+    # smoothed latency
+    LATENCY_FACTOR = 2.0
+    LATENCY_TOLERANCE = 0.05
+    LATENCY_SMOOTHING = 0.2
+
+    # backoff after n throttled or failed requests in a row: BACKOFF_BASE * 2^(n-1) seconds, at most MAX_BACKOFF, \
+    # with a random jitter of up to half of it. A longer Retry-After is honoured up to MAX_RETRY_AFTER seconds.
+    BACKOFF_BASE = 0.5
+    MAX_BACKOFF = 60.0
+    MAX_RETRY_AFTER = 300.0
+
+    # seconds during which the concurrency of a host stays below the number of requests at once at which it has \
+    # throttled, before it is probed again
+    CEILING_TIME = 30.0
+
+    # seconds between two checks of the async engine for a free slot of a host
+    POLL_INTERVAL = 0.01
+
+    def __init__ ( self, rate=None, max_concurrency=8, max_retries=3 ):
+        """
+        :param rate: maximum number of requests per second to a host (float / None for no limit)
+        :param max_concurrency: maximum number of requests to a host at once (int)
+        :param max_retries: number of times a throttled or failed request is retried (int)
+        """
+        # it guards the hosts and the counters, and wakes up threads waiting for a host
+        self.condition = threading.Condition ( )
+
+        self.interval = 1.0 / rate if rate else 0.0
+        self.max_concurrency = max ( 1, max_concurrency )
+        self.max_retries = max_retries
+
+        # Format is: {"scheme://host[:port]": HostState}
+        self.hosts = dict ( )
+
+        # Format is: {'throttled': count, 'errors': count, 'retries': count, 'decreases': count}
+        self.stats = collections.Counter ( )
+
+    @staticmethod
+    def get_host_key ( url ):
+        """
+        :param url: absolute url (str)
+        :return: "scheme://host[:port]" (str)
+        """
+        split_url = urlsplit ( url )
+        return "{0}://{1}".format ( split_url.scheme, split_url.netloc.lower ( ) )
+
+    def get_host ( self, host_key ):
+        """
+        Returns the state of a host, creating it if needed. It has to be called with self.condition held.
+        :param host_key: str
+        :return: an instance of HostState
+        """
+        host = self.hosts.get ( host_key )
+        if host is None:
+            host = self.hosts[ host_key ] = HostState ( min ( self.INITIAL_CONCURRENCY, self.max_concurrency ),
+                                                        self.interval )
+        return host
+
+    def set_crawl_delay ( self, url, crawl_delay ):
+        """
+        Makes the requests to the host of url at least crawl_delay seconds apart (e.g; the Crawl-delay of its \
+        robots.txt), unless the rate limit is already stricter.
+        :param url: absolute url (str)
+        :param crawl_delay: seconds (float)
+        :return:
+        """
+        with self.condition:
+            host = self.get_host ( self.get_host_key ( url ) )
+            host.interval = max ( self.interval, crawl_delay )
+
+    def try_acquire ( self, url ):
+        """
+        Takes a request slot of the host of url if the host may get a request now. It has to be followed by \
+        a call to release once the response (or the error) has been received.
+        :param url: absolute url (str)
+        :return: a 2-tuple (host key (str), 0 if the slot has been taken, else the seconds to wait before trying \
+                 again (float) / None to wait until a request of the host is released)
+        """
+        host_key = self.get_host_key ( url )
+        with self.condition:
+            host = self.get_host ( host_key )
+            now = time.monotonic ( )
+
+            start = max ( host.next_start, host.backoff_until )
+            if start > now:
+                return host_key, start - now
+
+            if host.in_flight >= int ( host.concurrency ):
+                return host_key, None
+
+            host.in_flight += 1
+            host.next_start = now + host.interval
+            return host_key, 0
+
+    def acquire ( self, url ):
+        """
+        Waits until the host of url may get a request, and takes a request slot of the host.
+        :param url: absolute url (str)
+        :return: host key to pass to release (str)
+        """
+        # the condition is held from the check to the wait, so that a release in between is not missed
+        with self.condition:
+            while True:
+                host_key, wait_time = self.try_acquire ( url )
+                if wait_time == 0: return host_key
+
+                self.condition.wait ( timeout=wait_time )
+
+    async def acquire_async ( self, url ):
+        """
+        Event loop counterpart of acquire.
+        :param url: absolute url (str)
+        :return: host key to pass to release (str)
+        """
+        while True:
+            host_key, wait_time = self.try_acquire ( url )
+            if wait_time == 0: return host_key
+
+            await asyncio.sleep ( self.POLL_INTERVAL if wait_time is None else wait_time )
+
+    def release ( self, host_key, status, latency, retry_after=None, attempt=0 ):
+        """
+        Gives back the request slot taken by acquire, and adjusts the concurrency of the host from the outcome \
+        of the request.
+        :param host_key: returned by acquire (str)
+        :param status: status code of the response (int / None if the request has failed)
+        :param latency: seconds between the start of the request and its response (float)
+        :param retry_after: value of the Retry-After header of the response (str / None)
+        :param attempt: number of times the request has already been retried (int)
+        :return: True if the request has to be retried (bool)
+        """
+        is_failed = status is None or status in self.RETRY_CODES
+        with self.condition:
+            host = self.hosts[ host_key ]
+            host.in_flight -= 1
+            now = time.monotonic ( )
+
+            if is_failed:
+                if status is not None:
+                    # the host has throttled with host.in_flight + 1 requests at once
+                    ceiling = max ( 1, host.in_flight )
+                    host.ceiling = min ( ceiling, host.ceiling ) if now < host.ceiling_until else ceiling
+                    host.ceiling_until = now + self.CEILING_TIME
+
+                self.stats[ 'errors' if status is None else 'throttled' ] += 1
+                host.errors += 1
+                self.decrease_concurrency ( host, now )
+                host.backoff_until = max ( host.backoff_until, now + self.get_backoff ( host.errors, retry_after ) )
+            else:
+                host.errors = 0
+                self.update_latency ( host, latency, now )
+
+            is_retried = is_failed and attempt < self.max_retries
+            if is_retried:
+                self.stats[ 'retries' ] += 1
+
+            self.condition.notify_all ( )
+            return is_retried
+
+    def cancel ( self, host_key ):
+        """
+        Gives back the request slot taken by acquire for a request which has not been sent, without any outcome.
+        :param host_key: returned by acquire (str)
+        :return:
+        """
+        with self.condition:
+            self.hosts[ host_key ].in_flight -= 1
+            self.condition.notify_all ( )
+
+    def update_latency ( self, host, latency, now ):
+        """
+        Adds the latency of a successful response of host, then grows its concurrency if it keeps up, or \
+        decreases it if its latency has gone up. It has to be called with self.condition held.
+        :param host: an instance of HostState
+        :param latency: seconds (float)
+        :param now: time.monotonic ( ) (float)
+        :return:
+        """
+        if host.latency is None:
+            host.latency = host.min_latency = latency
+        else:
+            host.latency += self.LATENCY_SMOOTHING * (latency - host.latency)
+            host.min_latency = min ( host.min_latency, latency )
+
+        if host.latency > self.LATENCY_FACTOR * host.min_latency + self.LATENCY_TOLERANCE:
+            self.decrease_concurrency ( host, now )
+        else:
+            max_concurrency = host.ceiling if now < host.ceiling_until else self.max_concurrency
+            host.concurrency = min ( max_concurrency, host.concurrency + 1.0 / host.concurrency )
+
+    def decrease_concurrency ( self, host, now ):
+        """
+        Halves the concurrency of host, unless it has already been decreased within its latency. It has to be \
+        called with self.condition held.
+        :param host: an instance of HostState
+        :param now: time.monotonic ( ) (float)
+        :return:
+        """
+        if now - host.last_decrease < (host.latency or 0.0): return
+
+        host.concurrency = max ( 1.0, host.concurrency * self.DECREASE_FACTOR )
+        host.last_decrease = now
+        self.stats[ 'decreases' ] += 1
+
+    def get_backoff ( self, errors, retry_after=None ):
+        """
+        :param errors: number of throttled or failed requests in a row (int)
+        :param retry_after: value of a Retry-After header (str / None)
+        :return: seconds to wait before the next request to the host (float)
+        """
+        retry_after_delay = self.parse_retry_after ( retry_after )
+        if retry_after_delay is not None:
+            return min ( retry_after_delay, self.MAX_RETRY_AFTER )
+
+        backoff = min ( self.MAX_BACKOFF, self.BACKOFF_BASE * 2 ** (errors - 1) )
+        return backoff * random.uniform ( 0.5, 1.0 )
+
+    @staticmethod
+    def parse_retry_after ( retry_after ):
+        """
+        :param retry_after: value of a Retry-After header: seconds or a HTTP date (str / None)
+        :return: seconds to wait (float) / None if there is no valid value
+        """
+        if not retry_after: return None
+
+        retry_after = retry_after.strip ( )
+        if retry_after.isdigit ( ):
+            return float ( retry_after )
+
+        try:
+            retry_date = email.utils.parsedate_to_datetime ( retry_after )
+        except (TypeError, ValueError):
+            return None
+        if retry_date is None or retry_date.tzinfo is None: return None
+        return max ( 0.0, retry_date.timestamp ( ) - time.time ( ) )
+
+    def get_stats ( self ):
+        """
+        Returns the counters of the scheduler: throttled responses, failed requests, retries and decreases of \
+        concurrency, along with the current concurrency of every host.
+        :return: dict
+        """
+        with self.condition:
+            stats = { counter: self.stats[ counter ] for counter in ('throttled', 'errors', 'retries', 'decreases') }
+            stats[ 'concurrency' ] = { host_key: int ( host.concurrency ) for host_key, host in self.hosts.items ( ) }
+            return stats
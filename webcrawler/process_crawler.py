@@ -0,0 +1,382 @@
+# References:
+# 1. https://docs.python.org/3/library/multiprocessing.html
+# 2. Termination detection of a distributed computation (counting the outstanding work): \
+#    https://en.wikipedia.org/wiki/Termination_analysis
+
+import logging
+import math
+import multiprocessing
+import queue
+import threading
+import time
+import zlib
+
+import dflt_cfg
+from .app_constant import *
+from .crawler import Crawler
+from .urlparse import UrlNode
+
+
+def get_shard_no ( url, num_shards ):
+    """
+    Returns the number of the crawl process which owns url. It is a hash of the url which is the same in every \
+    process (unlike hash of str, which is randomized per process).
+    :param url: canonical url (str)
+    :param num_shards: number of crawl processes (int)
+    :return: int
+    """
+    return zlib.crc32 ( url.encode ( 'utf-8' ) ) % num_shards
+
+
+class ShardCrawler ( Crawler ):
+    """
+    This class crawls the slice of the domain urls owned by one crawl process (see ProcessCrawler): only the urls \
+    whose get_shard_no is shard_no are enqueued and parsed here. The links to urls owned by other processes are \
+    sent to them in batches through their inbox, and the links sent by other processes are received from the inbox \
+    of this process by a router thread.
+
+    The processes know that the crawl is finished through a counter of outstanding work shared by all of them: \
+    it counts the batches which have been sent but not received yet, plus one for every process which is busy \
+    (its frontier is not idle or it has links to send). A process holds its frontier (its parse threads keep \
+    waiting for urlnodes) until that counter drops to zero.
+    """
+    # number of links to a process after which they are sent, and seconds after which links are sent anyway
+    BATCH_SIZE = 256
+    FLUSH_INTERVAL = 0.05
+
+    def __init__ ( self, shard_no, inboxes, outstanding, cfg=None ):
+        """
+        :param shard_no: number of this crawl process (int)
+        :param inboxes: inbox of every crawl process, where it receives the batches of links it owns \
+                        (list of multiprocessing.Queue)
+        :param outstanding: counter of outstanding work shared by all the crawl processes (multiprocessing.Value)
+        :param cfg: configuration of the crawl (dictionary / None for dflt_cfg.DFLT_CFG)
+        """
+        super ( ).__init__ ( cfg )
+
+        self.shard_no = shard_no
+        self.inboxes = inboxes
+        self.outstanding = outstanding
+
+        # links to the urls owned by the other processes, waiting to be sent. Format is: \
+        # [[(url_str, parent_url_str, depth_int), ...] for every process]
+        self.outboxes = [ [ ] for _ in inboxes ]
+        self.outbox_mutex = threading.Lock ( )
+        self.last_flush = time.monotonic ( )
+
+        # ids of the urls of the other processes which have already been sent (a url is sent only once)
+        self.routed_url_ids = set ( )
+
+        # whether this process is counted in self.outstanding, only updated by the router thread
+        self.is_busy = False
+
+        # urls enqueued by this process, in their enqueue order. Format is: [(url_str, parent_url_str, depth_int)]
+        self.shard_records = [ ]
+
+        self.router_th = None
+
+    def start_url_parsing ( self ):
+        """
+        Puts the domain root (and the urls of the sitemaps of the domain, if asked for) into the frontier if this \
+        process owns it, then starts the router thread and the parse threads. The frontier is held until all the \
+        processes have finished crawling.
+        :return:
+        """
+        self.frontier.hold ( )
+
+        self.urlnode_parse_root = self.get_create_urlnode ( self.domain_name )
+        if self.is_owned ( self.urlnode_parse_root.url ):
+            # ProcessCrawler counts the owner of the domain root as busy from the start
+            self.is_busy = True
+            self.insert_urlnodes_into_new_urls_queue ( self.urlnode_parse_root )
+            self.record_urlnode ( self.urlnode_parse_root, 0 )
+
+            # the seeds owned by other processes are sent to them as soon as the router thread starts
+            if self.cfg.get ( SEED_SITEMAPS ):
+                self.seed_frontier_from_sitemaps ( )
+
+        self.router_th = threading.Thread ( target=self.route_links )
+        self.router_th.start ( )
+
+        self.start_monitor ( )
+        self.start_parse_threads ( )
+
+    def release_urlparse_resources ( self ):
+        """
+        Waits for the parse threads and the router thread.
+        :return: the root of UrlNode tree hierarchy (an instance of UrlNode)
+        """
+        root = super ( ).release_urlparse_resources ( )
+        self.router_th.join ( )
+        return root
+
+    def is_owned ( self, url ):
+        """
+        :param url: canonical url (str)
+        :return: True if url is crawled by this process (bool)
+        """
+        return get_shard_no ( url, len ( self.inboxes ) ) == self.shard_no
+
+    def record_urlnode ( self, url_node, depth, parent_node=None ):
+        """
+        Keeps the sitemap record of a urlnode enqueued by this process, so that ProcessCrawler can merge it.
+        :param url_node: an instance of UrlNode
+        :param depth: number of clicks between the domain root and url_node (int)
+        :param parent_node: the UrlNode under which url_node is linked (None for the domain root)
+        :return:
+        """
+        self.shard_records.append ( (url_node.url, parent_node.url if parent_node else "", depth) )
+
+    def link_child_urlnode ( self, url_node, child_urlnode, depth ):
+        """
+        Enqueues a child urlnode owned by this process, or puts it into the outbox of its owner.
+        :param url_node: an instance of UrlNode being parsed
+        :param child_urlnode: an instance of UrlNode found on the page of url_node
+        :param depth: number of clicks between the domain root and child_urlnode (int)
+        :return:
+        """
+        child_url = child_urlnode.url
+        if self.is_owned ( child_url ):
+            super ( ).link_child_urlnode ( url_node, child_urlnode, depth )
+            return
+
+        shard_no = get_shard_no ( child_url, len ( self.inboxes ) )
+        with self.outbox_mutex:
+            if child_urlnode.url_id in self.routed_url_ids: return
+            self.routed_url_ids.add ( child_urlnode.url_id )
+
+            self.outboxes[ shard_no ].append ( (child_url, url_node.url, depth) )
+            if len ( self.outboxes[ shard_no ] ) >= self.BATCH_SIZE:
+                self.send_batch ( shard_no )
+
+    def send_batch ( self, shard_no ):
+        """
+        Sends the outbox of a process to its inbox. It has to be called with self.outbox_mutex held.
+        :param shard_no: int
+        :return:
+        """
+        batch, self.outboxes[ shard_no ] = self.outboxes[ shard_no ], [ ]
+
+        # counted before it is sent, so that the counter never misses a batch in transit
+        with self.outstanding.get_lock ( ):
+            self.outstanding.value += 1
+        self.inboxes[ shard_no ].put ( batch )
+
+    def flush_batches ( self ):
+        """
+        Sends all the outboxes which are not empty.
+        :return:
+        """
+        with self.outbox_mutex:
+            for shard_no, outbox in enumerate ( self.outboxes ):
+                if outbox: self.send_batch ( shard_no )
+            self.last_flush = time.monotonic ( )
+
+    def accept_batch ( self, batch ):
+        """
+        Enqueues the links of a batch received from another process, the first link to a url being the one \
+        under which the url is linked in the sitemap.
+        :param batch: list of (url_str, parent_url_str, depth_int)
+        :return:
+        """
+        # this process is busy from now on (before enqueuing), and the batch is not in transit anymore (after)
+        if not self.is_busy:
+            self.is_busy = True
+            with self.outstanding.get_lock ( ):
+                self.outstanding.value += 1
+
+        for url, parent_url, depth in batch:
+            url_node = UrlNode ( url, self.url_graph )
+            if self.insert_urlnodes_into_new_urls_queue ( url_node, depth ):
+                parent_node = UrlNode ( parent_url, self.url_graph )
+                parent_node.add_child ( url_node )
+                self.record_urlnode ( url_node, depth, parent_node )
+
+        with self.outstanding.get_lock ( ):
+            self.outstanding.value -= 1
+
+    def route_links ( self ):
+        """
+        Used by the router thread: it receives the batches of links sent by the other processes, sends the \
+        outboxes of this process, and releases the frontier once the crawl of all the processes is finished.
+        :return:
+        """
+        inbox = self.inboxes[ self.shard_no ]
+        while True:
+            try:
+                self.accept_batch ( inbox.get ( timeout=self.FLUSH_INTERVAL ) )
+            except queue.Empty:
+                pass
+
+            if time.monotonic ( ) - self.last_flush >= self.FLUSH_INTERVAL:
+                self.flush_batches ( )
+
+            # once the parse threads are done with the frontier, nothing can be added to the outboxes anymore
+            if self.is_busy and self.frontier.is_idle_now ( ):
+                self.flush_batches ( )
+                self.is_busy = False
+                with self.outstanding.get_lock ( ):
+                    self.outstanding.value -= 1
+
+            if not self.is_busy and not self.outstanding.value: break
+
+        self.frontier.release ( )
+
+    def get_shard_result ( self ):
+        """
+        :return: the sitemap records and the counters of this process, sent to ProcessCrawler (dict)
+        """
+        connection_pool = self.get_connection_pool ( )
+        return {
+            'shard_no': self.shard_no,
+            'records': self.shard_records,
+            'frontier': self.frontier.get_stats ( ),
+            'skipped_bodies': dict ( self.skipped_bodies ),
+            'requests_sent': connection_pool.requests_sent,
+            'connections_opened': connection_pool.connections_opened,
+            'crawl_stats': self.stats.get_counters ( ),
+        }
+
+
+def crawl_shard ( shard_no, inboxes, outstanding, results, cfg ):
+    """
+    Entry point of a crawl process: it crawls the urls of its shard and puts its result into results.
+    :param shard_no: number of this crawl process (int)
+    :param inboxes: inbox of every crawl process (list of multiprocessing.Queue)
+    :param outstanding: counter of outstanding work shared by all the crawl processes (multiprocessing.Value)
+    :param results: queue receiving the result of every crawl process (multiprocessing.Queue)
+    :param cfg: configuration of the crawl (dictionary, see dflt_cfg.DFLT_CFG)
+    :return:
+    """
+    crwlr = ShardCrawler ( shard_no, inboxes, outstanding, cfg )
+    crwlr.start_url_parsing ( )
+    crwlr.release_urlparse_resources ( )
+    results.put ( crwlr.get_shard_result ( ) )
+
+
+class ProcessCrawler ( Crawler ):
+    """
+    This class crawls the user configured domain with several processes, so that link extraction and url filtering, \
+    which are pure Python, run on several cores instead of one (the GIL lets the parse threads of a process use one \
+    core only). The urls are partitioned across the processes by a hash of the url (see get_shard_no): every \
+    process crawls its urls with its own parse threads and visited urls (see ShardCrawler), and sends the links \
+    it finds to the other urls to their owner in batches. The sitemap records of all the processes are merged \
+    into one UrlNode tree hierarchy at the end.
+    """
+    # seconds between two checks that the crawl processes are still alive while waiting for their results
+    RESULT_WAIT = 1.0
+
+    # settings which are not supported in multi-process mode: they are turned off, with their value when turned off
+    UNSUPPORTED_SETTINGS = { STREAM_SITEMAP: False, SITEMAP_FORMAT: 'text', CHECKPOINT_PATH: None, CACHE_PATH: None,
+                             METRICS_PORT: None, LINK_REPORT_PATH: None, TRAP_DETECTION: False,
+                             GRAPH_PATH: None, ARCHIVE_PATH: None, MEMORY_BUDGET: None }
+
+    def __init__ ( self, num_processes=None, cfg=None, fetcher=None, on_record=None ):
+        """
+        :param num_processes: number of crawl processes (int / None for the PROCESSES setting)
+        :param cfg: configuration of the crawl (dictionary / None for dflt_cfg.DFLT_CFG), see Crawler
+        :param fetcher: Fetcher shared with other crawls, only used for robots.txt and sitemaps, as the pages \
+                        are downloaded by the crawl processes (None for a Fetcher of this crawl)
+        :param on_record: see Crawler. It is called once the crawl processes have finished, for every merged url.
+        """
+        cfg = dict ( cfg if cfg is not None else dflt_cfg.DFLT_CFG )
+        for setting, value in self.UNSUPPORTED_SETTINGS.items ( ):
+            if cfg.get ( setting, value ) != value:
+                logging.getLogger ( __name__ ).warning ( "Setting {0} is not supported with several crawl "
+                                                         "processes: it is turned off".format ( setting ) )
+                cfg[ setting ] = value
+
+        super ( ).__init__ ( cfg, fetcher, on_record )
+
+        self.num_processes = max ( 1, num_processes or self.cfg[ PROCESSES ] )
+
+    def start_url_parsing ( self ):
+        """
+        Starts the crawl processes and waits for their results, which are merged once they have all finished.
+        :return:
+        """
+        self.urlnode_parse_root = self.get_create_urlnode ( self.domain_name )
+
+        # the crawl processes are forked (where it is available) rather than spawned, which would import the \
+        # application again in every one of them
+        mp_context = multiprocessing.get_context ( 'fork' if 'fork' in multiprocessing.get_all_start_methods ( )
+                                                   else None )
+
+        # the owner of the domain root is busy from the start
+        outstanding = mp_context.Value ( 'q', 1 )
+        inboxes = [ mp_context.Queue ( ) for _ in range ( self.num_processes ) ]
+        results = mp_context.Queue ( )
+
+        # the budget of pages is shared out between the processes
+        shard_cfg = dict ( self.cfg )
+        if shard_cfg[ MAX_PAGES ] is not None:
+            shard_cfg[ MAX_PAGES ] = math.ceil ( shard_cfg[ MAX_PAGES ] / self.num_processes )
+
+        # every process logs its own progress, and this process writes the statistics of all of them
+        shard_cfg[ STATS_PATH ] = None
+
+        processes = [ mp_context.Process ( target=crawl_shard,
+                                          args=(shard_no, inboxes, outstanding, results, shard_cfg) )
+                      for shard_no in range ( self.num_processes ) ]
+        for process in processes:
+            process.start ( )
+
+        # results have to be received before joining the processes, which cannot exit while their result is queued
+        shard_results = [ ]
+        has_failed = False
+        while len ( shard_results ) < self.num_processes:
+            try:
+                shard_results.append ( results.get ( timeout=self.RESULT_WAIT ) )
+            except queue.Empty:
+                if any ( process.exitcode not in (None, 0) for process in processes ):
+                    self.logger.error ( "A crawl process has failed: the sitemap is partial" )
+                    has_failed = True
+                    break
+
+        # a process which failed leaves the others waiting for its links forever, so they are stopped instead of \
+        # being waited for
+        for process in processes:
+            if has_failed and process.is_alive ( ):
+                process.terminate ( )
+            process.join ( )
+
+        self.merge_shard_results ( shard_results )
+
+    def merge_shard_results ( self, shard_results ):
+        """
+        Links the sitemap records of all the crawl processes in self.url_graph, shallowest urls first, and adds \
+        up their counters.
+        :param shard_results: results of the crawl processes (list of dictionaries, see ShardCrawler.get_shard_result)
+        :return:
+        """
+        shard_results.sort ( key=lambda shard_result: shard_result[ 'shard_no' ] )
+
+        records = [ record for shard_result in shard_results for record in shard_result[ 'records' ] ]
+        records.sort ( key=lambda record: record[ 2 ] )
+        for url, parent_url, depth in records:
+            url_node = UrlNode ( url, self.url_graph )
+            parent_node = UrlNode ( parent_url, self.url_graph ) if parent_url else None
+            if parent_node:
+                parent_node.add_child ( url_node )
+            self.record_urlnode ( url_node, depth, parent_node )
+
+        connection_pool = self.get_connection_pool ( )
+        for shard_result in shard_results:
+            self.frontier.add_stats ( shard_result[ 'frontier' ] )
+            self.skipped_bodies.update ( shard_result[ 'skipped_bodies' ] )
+            connection_pool.requests_sent += shard_result[ 'requests_sent' ]
+            connection_pool.connections_opened += shard_result[ 'connections_opened' ]
+            self.stats.add_counters ( shard_result[ 'crawl_stats' ] )
+
+        self.logger.info ( "{0} crawl processes: {1} urls merged".format ( self.num_processes, len ( records ) ) )
+
+    def release_urlparse_resources ( self ):
+        """
+        The crawl processes have already finished in start_url_parsing, so there is nothing to wait for.
+        :return: the root of UrlNode tree hierarchy (an instance of UrlNode)
+        """
+        if self.is_fetcher_owned:
+            self.fetcher.close ( )
+        self.log_frontier_stats ( )
+        self.close_crawl_stats ( )
+        return self.urlnode_parse_root
@@ -0,0 +1,143 @@
+# References:
+# 1. Robots Exclusion Protocol: https://www.rfc-editor.org/rfc/rfc9309.html
+# 2. Crawl-delay and Sitemap extensions: https://en.wikipedia.org/wiki/Robots.txt#Nonstandard_extensions
+
+import re
+from urllib.parse import quote, unquote, urlsplit
+
+
+class RobotsRules:
+    """
+    This class holds the rules of a robots.txt which apply to one user agent, parsed once: the allowed and \
+    disallowed paths (with the * and $ wildcards), the Crawl-delay / Request-rate, and the Sitemap entries. \
+    As in RFC 9309, the groups naming the product token of the user agent (compared case-insensitively) are used \
+    if there are any, even without rules (else the groups of *), the longest matching rule wins and an Allow rule \
+    wins over a Disallow rule of the same length.
+    """
+
+    def __init__ ( self, robots_txt="", user_agent="*" ):
+        """
+        :param robots_txt: content of the robots.txt (str, empty for a site without robots.txt)
+        :param user_agent: User-Agent header of the crawler (str), whose product token is matched
+        """
+        # product token of the user agent, e.g; "Mozilla" for "Mozilla/5.0"
+        self.user_agent = user_agent.split ( '/' )[ 0 ].strip ( ).lower ( )
+
+        # rules of the user agent, longest pattern first. Format is: [(length_int, is_allowed_bool, compiled_regex)]
+        self.rules = [ ]
+
+        # seconds between two requests asked by the robots.txt (float / None), and urls of its sitemaps (list of str)
+        self.crawl_delay = None
+        self.sitemaps = [ ]
+
+        self.parse ( robots_txt )
+
+    def parse ( self, robots_txt ):
+        """
+        :param robots_txt: content of the robots.txt (str)
+        :return:
+        """
+        # rules and delays of the groups of this user agent and of the groups of *. \
+        # Format is: {'agent': [rules, delays], '*': [rules, delays]}
+        groups = { 'agent': ([ ], [ ]), '*': ([ ], [ ]) }
+
+        # whether a group names this user agent: its groups apply even if they have no rule (e.g; an empty Disallow)
+        is_agent_matched = False
+
+        # groups (keys of groups) to which the rules being read apply, and whether the current group has rules yet
+        current_groups = set ( )
+        is_group_started = False
+
+        for line in robots_txt.splitlines ( ):
+            line = line.split ( '#', 1 )[ 0 ].strip ( )
+            if ':' not in line: continue
+
+            field, value = line.split ( ':', 1 )
+            field, value = field.strip ( ).lower ( ), value.strip ( )
+
+            if field == 'user-agent':
+                # user-agent lines which follow rules start a new group
+                if is_group_started:
+                    current_groups, is_group_started = set ( ), False
+                agent = value.split ( '/' )[ 0 ].strip ( ).lower ( )
+                if agent == '*':
+                    current_groups.add ( '*' )
+                elif agent == self.user_agent:
+                    current_groups.add ( 'agent' )
+                    is_agent_matched = True
+
+            elif field in ('allow', 'disallow'):
+                is_group_started = True
+                # an empty Disallow allows everything
+                if not value: continue
+                for group in current_groups:
+                    groups[ group ][ 0 ].append ( (value, field == 'allow') )
+
+            elif field in ('crawl-delay', 'request-rate'):
+                is_group_started = True
+                delay = self.parse_delay ( field, value )
+                if delay is None: continue
+                for group in current_groups:
+                    groups[ group ][ 1 ].append ( delay )
+
+            elif field == 'sitemap':
+                # sitemaps do not belong to any group
+                if value: self.sitemaps.append ( value )
+
+        rules, delays = groups[ 'agent' ] if is_agent_matched else groups[ '*' ]
+        self.rules = sorted ( ((len ( pattern ), is_allowed, self.compile_pattern ( pattern ))
+                               for pattern, is_allowed in rules), key=lambda rule: (-rule[ 0 ], not rule[ 1 ]) )
+        self.crawl_delay = max ( delays ) if delays else None
+
+    @staticmethod
+    def parse_delay ( field, value ):
+        """
+        :param field: 'crawl-delay' (value is seconds) or 'request-rate' (value is "requests/seconds") (str)
+        :param value: str
+        :return: seconds between two requests (float) / None if value is not valid
+        """
+        try:
+            if field == 'crawl-delay':
+                delay = float ( value )
+            else:
+                requests, seconds = value.split ( '/' )
+                delay = float ( seconds.strip ( ).rstrip ( 's' ) ) / int ( requests )
+        except (ValueError, ZeroDivisionError):
+            return None
+        return delay if delay >= 0 else None
+
+    @staticmethod
+    def compile_pattern ( pattern ):
+        """
+        :param pattern: path pattern of an Allow / Disallow rule, where * matches any characters and a trailing $ \
+                        anchors the end of the path (str)
+        :return: compiled regular expression matching the paths of the rule
+        """
+        is_anchored = pattern.endswith ( '$' )
+        if is_anchored: pattern = pattern[ :-1 ]
+
+        regex = '.*'.join ( re.escape ( RobotsRules.normalize_path ( part ) ) for part in pattern.split ( '*' ) )
+        return re.compile ( regex + ('$' if is_anchored else '') )
+
+    @staticmethod
+    def normalize_path ( path ):
+        """
+        Percent-encodes a path the same way in the rules and in the urls, so that they can be compared.
+        :param path: str
+        :return: str
+        """
+        return quote ( unquote ( path ), safe="/?=&;:@!$'()*+,~%" )
+
+    def can_fetch ( self, url ):
+        """
+        :param url: absolute url (str)
+        :return: True if the robots.txt allows the user agent to crawl url (bool)
+        """
+        if not self.rules: return True
+
+        split_url = urlsplit ( url )
+        path = self.normalize_path ( (split_url.path or '/') + ('?' + split_url.query if split_url.query else '') )
+        for _, is_allowed, regex in self.rules:
+            if regex.match ( path ):
+                return is_allowed
+        return True
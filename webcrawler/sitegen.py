@@ -0,0 +1,358 @@
+# References:
+# 1. https://docs.python.org/3/library/http.server.html
+
+import mimetypes
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SyntheticSite:
+    """
+    This class generates an in-memory website of interlinked html pages. It is used to crawl a local \
+    site (see LocalSiteServer) for testing and comparing the crawl engines without hitting a real domain. \
+    The pages form a tree (every page links to its fan_out children) with one random cross link per page, and \
+    may also link to assets (images, documents, ...) and answer errors. The site is the same for the same \
+    arguments, and get_reachable_urls gives the urls which a crawl of it has to map.
+    """
+    # extensions of the assets of the site, given in turn
+    ASSET_EXTENSIONS = ('jpg', 'png', 'pdf', 'css', 'js')
+
+    # text repeated to pad the pages and the assets up to page_size bytes
+    FILLER = "lorem ipsum dolor sit amet "
+
+    # paths of the crawler traps linked from the domain root, if the site has traps: the months of a calendar, \
+    # and a directory (whose subdirectories are named the same)
+    CALENDAR_PATH = "/calendar?month="
+    LOOP_PATH = "/loop/"
+
+    def __init__ ( self, num_pages=100, fan_out=5, latency=0.0, seed=0, depth=None, page_size=0, asset_ratio=0.0,
+                   error_rate=0.0, has_traps=False ):
+        """
+        :param num_pages: number of html pages in the site (int)
+        :param fan_out: number of child pages linked from every page (int)
+        :param latency: delay in seconds before the server answers any request (float)
+        :param seed: seed of the random cross links, assets and errors, so that the same site is generated every \
+                     time (int)
+        :param depth: maximum number of clicks between the domain root and a page of the tree: the pages which \
+                      would be deeper are linked from the pages one click less deep instead (int >= 1 / None)
+        :param page_size: minimum size in bytes of every page and asset, which are padded with text (int)
+        :param asset_ratio: fraction of the urls of the site which are assets linked from the pages (0 <= float < 1)
+        :param error_rate: fraction of the pages (the first one excepted) answering 500 (0 <= float <= 1)
+        :param has_traps: True to link the domain root to the endless pages of crawler traps (see get_trap_page): a \
+                          calendar whose months link to the next and previous ones, and a directory linking to a \
+                          subdirectory of the same name (bool)
+        """
+        self.num_pages = num_pages
+        self.fan_out = fan_out
+        self.latency = latency
+
+        # Last-Modified header of every path of the site
+        self.last_modified = "Sat, 01 Jan 2022 00:00:00 GMT"
+
+        # maximum number of requests the server handles at once: it answers 429 (with retry_after as Retry-After \
+        # header, if not None) to the requests beyond it, like a throttling server (None for no limit)
+        self.max_concurrency = None
+        self.retry_after = None
+
+        # body of /robots.txt, which is not a page of the site (bytes / None for no robots.txt)
+        self.robots_txt = None
+
+        # paths which the server answers with 301 (Moved Permanently). Format is: {path_str: location_str}
+        self.redirects = dict ( )
+
+        # True if the server answers every HEAD request with 405 (Method Not Allowed), like some servers do
+        self.is_head_refused = False
+
+
+        # contents of every path of the site, served with the content type of its extension (html if it has none). \
+        # Format is: {path_str: body_bytes}
+        self.pages = dict ( )
+
+        # paths linked from the domain root and from every page. Format is: {path_str: [path_str, ...]}
+        self.links = self.get_tree_links ( num_pages, fan_out, depth )
+
+        # True if the server also answers the pages of the traps, which are not part of self.pages
+        self.has_traps = has_traps
+
+        # paths of the pages which the server answers with 500 (Internal Server Error)
+        self.error_paths = set ( )
+
+        # every page links to its children in the tree and to a random page of the site
+        rand = random.Random ( seed )
+        for page_no in range ( num_pages ):
+            self.links[ self.get_page_path ( page_no ) ].append ( self.get_page_path ( rand.randrange ( num_pages ) ) )
+
+        # asset k is linked from page k % num_pages
+        num_assets = round ( num_pages * asset_ratio / (1 - asset_ratio) ) if num_pages else 0
+        for asset_no in range ( num_assets ):
+            asset_path = "/assets/file{0}.{1}".format (
+                asset_no, self.ASSET_EXTENSIONS[ asset_no % len ( self.ASSET_EXTENSIONS ) ] )
+            self.links[ self.get_page_path ( asset_no % num_pages ) ].append ( asset_path )
+            self.pages[ asset_path ] = self.get_filler ( max ( page_size, 1 ) ).encode ( 'utf-8' )
+
+        num_errors = min ( num_pages - 1, round ( num_pages * error_rate ) ) if num_pages else 0
+        if num_errors > 0:
+            self.error_paths.update ( self.get_page_path ( page_no )
+                                      for page_no in rand.sample ( range ( 1, num_pages ), num_errors ) )
+
+        for path, links in self.links.items ( ):
+            self.pages[ path ] = self.get_page_body ( links, path == '/', page_size )
+
+        if has_traps:
+            self.pages[ '/' ] = self.get_page_body ( self.links[ '/' ] + [ self.CALENDAR_PATH + '0', self.LOOP_PATH ],
+                                                     True, page_size )
+
+    @staticmethod
+    def get_tree_links ( num_pages, fan_out, depth=None ):
+        """
+        Lays out the pages as a complete fan_out-ary tree, whose first page is linked from the domain root. \
+        If depth is given, the pages which would be deeper than depth clicks are linked in turn from the pages \
+        of depth - 1 clicks instead.
+        :param num_pages: int
+        :param fan_out: int
+        :param depth: int / None
+        :return: paths of the children of the domain root and of every page. Format is: {path_str: [path_str, ...]}
+        """
+        page_paths = [ SyntheticSite.get_page_path ( page_no ) for page_no in range ( num_pages ) ]
+        tree_links = { '/': page_paths[ :1 ] }
+        tree_links.update ( (path, [ ]) for path in page_paths )
+
+        # clicks between the domain root and every path, and the paths which the too deep pages are linked from
+        depths = { '/': 0, page_paths[ 0 ]: 1 } if page_paths else { '/': 0 }
+        last_parents = [ path for path, path_depth in depths.items ( ) if path_depth == (depth or 0) - 1 ]
+        num_moved = 0
+
+        for page_no in range ( 1, num_pages ):
+            parent_path = page_paths[ (page_no - 1) // max ( 1, fan_out ) ]
+            if depth is not None and depths[ parent_path ] >= depth:
+                parent_path = last_parents[ num_moved % len ( last_parents ) ]
+                num_moved += 1
+
+            tree_links[ parent_path ].append ( page_paths[ page_no ] )
+            depths[ page_paths[ page_no ] ] = depths[ parent_path ] + 1
+            if depths[ page_paths[ page_no ] ] == (depth or 0) - 1:
+                last_parents.append ( page_paths[ page_no ] )
+
+        return tree_links
+
+    def get_page_body ( self, links, is_root=False, page_size=0 ):
+        """
+        :param links: paths linked from the page (list of str)
+        :param is_root: True for the domain root (bool)
+        :param page_size: minimum size of the page in bytes, which is padded with text (int)
+        :return: html page (bytes)
+        """
+        body = "".join ( '<a href="{0}">{1}</a>\n'.format ( link, 'home' if is_root else 'page' ) for link in links )
+        page = "<html><body>\n{0}</body></html>\n".format ( body )
+        if len ( page ) < page_size:
+            page = "<html><body>\n{0}<p>{1}</p>\n</body></html>\n".format (
+                body, self.get_filler ( page_size - len ( page ) - 8 ) )
+        return page.encode ( 'utf-8' )
+
+    def get_filler ( self, size ):
+        """
+        :param size: int
+        :return: text of size characters (str)
+        """
+        return (self.FILLER * (size // len ( self.FILLER ) + 1))[ :max ( 0, size ) ]
+
+    @staticmethod
+    def get_page_path ( page_no ):
+        """
+        :param page_no: int
+        :return: path of the page on the site (str)
+        """
+        return "/page{0}.html".format ( page_no )
+
+    def get_all_urls ( self, domain_name ):
+        """
+        Returns all the urls of the site which are reachable from domain root.
+        :param domain_name: absolute url of the domain root (str)
+        :return: set of str
+        """
+        return { domain_name.rstrip ( '/' ) + path for path in self.pages }
+
+    def get_trap_page ( self, path ):
+        """
+        :param path: requested path, with its query (str)
+        :return: the page of a crawler trap (bytes) / None if path is not a page of a trap
+        """
+        month = path[ len ( self.CALENDAR_PATH ): ] if path.startswith ( self.CALENDAR_PATH ) else None
+        if month is not None and month.lstrip ( '-' ).isdigit ( ):
+            body = '<h1>Events</h1><p>There are no events this month.</p>\n' \
+                   '<a href="?month={0}">previous</a> <a href="?month={1}">next</a> <a href="/">home</a>\n'.format (
+                       int ( month ) - 1, int ( month ) + 1 )
+        elif path.startswith ( self.LOOP_PATH ) and path.endswith ( '/' ) and \
+                not path.replace ( self.LOOP_PATH.rstrip ( '/' ), '' ).strip ( '/' ):
+            body = '<a href="{0}">more</a> <a href="/">home</a>\n'.format ( self.LOOP_PATH.strip ( '/' ) + '/' )
+        else:
+            return None
+
+        return "<html><body>\n{0}</body></html>\n".format ( body ).encode ( 'utf-8' )
+
+    def get_reachable_urls ( self, domain_name ):
+        """
+        Returns the urls which a crawl of the generated site has to map: the paths reachable from the domain root \
+        through the links of the pages, where the links of the error pages cannot be followed.
+        :param domain_name: absolute url of the domain root (str)
+        :return: set of str
+        """
+        reachable_paths = { '/' }
+        pending_paths = [ '/' ]
+        while pending_paths:
+            path = pending_paths.pop ( )
+            if path in self.error_paths: continue
+            for link in self.links.get ( path, ( ) ):
+                if link not in reachable_paths:
+                    reachable_paths.add ( link )
+                    pending_paths.append ( link )
+
+        return { domain_name.rstrip ( '/' ) + path for path in reachable_paths }
+
+
+class LocalHTTPServer ( ThreadingHTTPServer ):
+    # the async engine opens hundreds of connections at once, so the default listen backlog (5) is too small
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class LocalSiteServer:
+    """
+    This class serves a SyntheticSite on a localhost port in a background thread
+    """
+    def __init__ ( self, site ):
+        """
+        :param site: an instance of SyntheticSite
+        """
+        self.site = site
+        self.httpd = None
+        self.server_th = None
+
+        # (method, path) of every request received, in arrival order
+        self.requests = [ ]
+
+        # paths of the requests answered 429 because of site.max_concurrency, and the most requests handled at once
+        self.throttled = [ ]
+        self.max_in_flight = 0
+        self.in_flight = 0
+        self.mutex = threading.Lock ( )
+
+    def start ( self ):
+        """
+        Starts serving the site and returns its domain name.
+        :return: absolute url of the site root (str)
+        """
+        site = self.site
+        requests = self.requests
+        server = self
+
+        class SiteRequestHandler ( BaseHTTPRequestHandler ):
+            protocol_version = "HTTP/1.1"
+
+            # send headers and body in a single segment, otherwise Nagle's algorithm and delayed ACKs \
+            # stall every response of a keep-alive connection
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def do_GET ( self ):
+                body = self.send_head ( )
+                if body is not None:
+                    self.wfile.write ( body )
+
+            def do_HEAD ( self ):
+                self.send_head ( )
+
+            def send_head ( self ):
+                """
+                Sends the status and headers of the requested path, with a content type guessed from its extension \
+                and an ETag computed from its body.
+                :return: body of the path (bytes) / None if it is not part of the site or has not changed
+                """
+                requests.append ( (self.command, self.path) )
+                with server.mutex:
+                    is_throttled = site.max_concurrency is not None and server.in_flight >= site.max_concurrency
+                    if not is_throttled:
+                        server.in_flight += 1
+                        server.max_in_flight = max ( server.max_in_flight, server.in_flight )
+
+                if is_throttled:
+                    server.throttled.append ( self.path )
+                    self.send_response ( 429 )
+                    if site.retry_after is not None:
+                        self.send_header ( "Retry-After", str ( site.retry_after ) )
+                    self.send_header ( "Content-Length", "0" )
+                    self.end_headers ( )
+                    return None
+
+                try:
+                    if site.latency: time.sleep ( site.latency )
+                finally:
+                    with server.mutex:
+                        server.in_flight -= 1
+
+                if self.path in site.error_paths:
+                    self.send_error ( 500 )
+                    return None
+
+                if self.command == 'HEAD' and site.is_head_refused:
+                    self.send_error ( 405 )
+                    return None
+
+                location = site.redirects.get ( self.path )
+                if location is not None:
+                    self.send_response ( 301 )
+                    self.send_header ( "Location", location )
+                    self.send_header ( "Content-Length", "0" )
+                    self.end_headers ( )
+                    return None
+
+                body = site.pages.get ( self.path )
+                if body is None and site.has_traps:
+                    body = site.get_trap_page ( self.path )
+                if self.path == "/robots.txt" and site.robots_txt is not None:
+                    body = site.robots_txt
+                if body is None:
+                    self.send_error ( 404 )
+                    return None
+
+                content_type = mimetypes.guess_type ( self.path )[ 0 ] or "text/html"
+                if content_type == "text/html":
+                    content_type += "; charset=utf-8"
+
+                # a conditional request for an unchanged page is answered 304, without a body
+                etag = '"{0:08x}"'.format ( zlib.crc32 ( body ) )
+                if self.headers.get ( "If-None-Match" ) == etag:
+                    self.send_response ( 304 )
+                    self.send_header ( "ETag", etag )
+                    self.end_headers ( )
+                    return None
+
+                self.send_response ( 200 )
+                self.send_header ( "Content-Type", content_type )
+                self.send_header ( "Content-Length", str ( len ( body ) ) )
+                self.send_header ( "ETag", etag )
+                self.send_header ( "Last-Modified", site.last_modified )
+                self.end_headers ( )
+                return body
+
+            def log_message ( self, *args ):
+                pass  # keep test output clean
+
+        self.httpd = LocalHTTPServer ( ('127.0.0.1', 0), SiteRequestHandler )
+
+        self.server_th = threading.Thread ( target=self.httpd.serve_forever, daemon=True )
+        self.server_th.start ( )
+
+        return "http://127.0.0.1:{0}/".format ( self.httpd.server_address[ 1 ] )
+
+    def stop ( self ):
+        """
+        Stops serving the site and releases the port.
+        :return:
+        """
+        self.httpd.shutdown ( )
+        self.httpd.server_close ( )
+        self.server_th.join ( )
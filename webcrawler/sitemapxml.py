@@ -0,0 +1,360 @@
+# References:
+# 1. Sitemaps XML format: https://www.sitemaps.org/protocol.html
+# 2. W3C Datetime: https://www.w3.org/TR/NOTE-datetime
+
+import collections
+import email.utils
+import gzip
+import http.client
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+# entities which have to be escaped in the urls of a sitemap (on top of &, < and >)
+XML_ENTITIES = { "'": "&apos;", '"': "&quot;" }
+
+# namespace of the tags of a sitemap, as they are named by the XML parser
+XML_NAMESPACE = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def get_lastmod ( last_modified ):
+    """
+    Converts the value of a Last-Modified header into the W3C Datetime format of <lastmod>.
+    :param last_modified: value of the Last-Modified header (str / None)
+    :return: str / None if last_modified is missing or invalid
+    """
+    if not last_modified: return None
+    try:
+        modified_at = email.utils.parsedate_to_datetime ( last_modified )
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    if modified_at.tzinfo is None:
+        modified_at = modified_at.replace ( tzinfo=timezone.utc )
+    return modified_at.isoformat ( )
+
+
+class XmlSitemapWriter:
+    """
+    This class writes the urls of a domain as a sitemaps.org XML sitemap, url by url while the domain is being \
+    crawled, so it needs neither the whole sitemap in memory nor a second pass. A sitemap file holds at most \
+    50,000 urls and 50MB (uncompressed): beyond that, the urls are split into numbered shards (name-1.xml, \
+    name-2.xml, ...) and name.xml becomes the sitemap index listing them. If all the urls fit in one file, \
+    name.xml is the sitemap itself. With compress, every file is gzipped (.xml.gz). It is thread safe.
+    """
+    # limits of a sitemap file set by the sitemaps.org protocol
+    MAX_URLS = 50000
+    MAX_BYTES = 50 * 1024 * 1024
+
+    # size of the buffer of an uncompressed output file
+    BUFFER_SIZE = 1024 * 1024
+
+    XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+    URLSET_START = XML_DECLARATION + '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    URLSET_END = '</urlset>\n'
+    SITEMAPINDEX_START = XML_DECLARATION + '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    SITEMAPINDEX_END = '</sitemapindex>\n'
+
+    def __init__ ( self, output_path, domain_name, compress=False, max_urls=MAX_URLS, max_bytes=MAX_BYTES ):
+        """
+        :param output_path: path of the sitemap; its extension is replaced by .xml (or .xml.gz) (str)
+        :param domain_name: absolute url of the domain root, where the shards are expected to be published (str)
+        :param compress: gzip the sitemap files (bool)
+        :param max_urls: maximum number of urls per sitemap file (int)
+        :param max_bytes: maximum uncompressed size in bytes of a sitemap file (int)
+        """
+        self.mutex = threading.Lock ( )
+
+        self.extension = '.xml.gz' if compress else '.xml'
+        self.base_path = os.path.splitext ( output_path )[ 0 ]
+        self.sitemap_path = self.base_path + self.extension
+        self.domain_name = domain_name.rstrip ( '/' ) + '/'
+        self.compress = compress
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+
+        # paths of the shards written so far; the last one is open
+        self.shard_paths = [ ]
+        self.shard_fd = None
+        self.shard_urls = 0
+        self.shard_bytes = 0
+
+        # number of urls written
+        self.num_urls = 0
+
+        self.open_shard ( )
+
+    def open_file ( self, path ):
+        """
+        :param path: str
+        :return: binary file object (gzipped if self.compress)
+        """
+        if self.compress:
+            return gzip.open ( path, 'wb' )
+        return open ( path, 'wb', buffering=self.BUFFER_SIZE )
+
+    def open_shard ( self ):
+        """
+        Opens the next numbered shard and writes its header.
+        :return:
+        """
+        shard_path = "{0}-{1}{2}".format ( self.base_path, len ( self.shard_paths ) + 1, self.extension )
+        self.shard_fd = self.open_file ( shard_path )
+        self.shard_paths.append ( shard_path )
+        self.shard_urls = 0
+        self.shard_bytes = 0
+        self.write_shard ( self.URLSET_START.encode ( 'utf-8' ) )
+
+    def close_shard ( self ):
+        """
+        Writes the footer of the open shard and closes it.
+        :return:
+        """
+        self.write_shard ( self.URLSET_END.encode ( 'utf-8' ) )
+        self.shard_fd.close ( )
+        self.shard_fd = None
+
+    def write_shard ( self, data ):
+        """
+        :param data: bytes
+        :return:
+        """
+        self.shard_fd.write ( data )
+        self.shard_bytes += len ( data )
+
+    def write_url ( self, url, lastmod=None ):
+        """
+        Adds an url to the sitemap, starting a new shard if the open one is full.
+        :param url: absolute url (str)
+        :param lastmod: last modification date in W3C Datetime format (str / None)
+        :return:
+        """
+        record = "<url><loc>{0}</loc>{1}</url>\n".format (
+            escape ( url, XML_ENTITIES ), "<lastmod>{0}</lastmod>".format ( lastmod ) if lastmod else "" )
+        record = record.encode ( 'utf-8' )
+
+        with self.mutex:
+            is_shard_full = self.shard_urls >= self.max_urls or \
+                            self.shard_bytes + len ( record ) + len ( self.URLSET_END ) > self.max_bytes
+            if is_shard_full and self.shard_urls:
+                self.close_shard ( )
+                self.open_shard ( )
+
+            self.write_shard ( record )
+            self.shard_urls += 1
+            self.num_urls += 1
+
+    def close ( self ):
+        """
+        Closes the last shard, then either renames the only shard to the sitemap path or writes the sitemap index \
+        of all the shards there.
+        :return: paths of the files written (list of str)
+        """
+        with self.mutex:
+            self.close_shard ( )
+
+            if len ( self.shard_paths ) == 1:
+                os.replace ( self.shard_paths[ 0 ], self.sitemap_path )
+                return [ self.sitemap_path ]
+
+            lastmod = datetime.now ( timezone.utc ).replace ( microsecond=0 ).isoformat ( )
+            with self.open_file ( self.sitemap_path ) as index_fd:
+                index_fd.write ( self.SITEMAPINDEX_START.encode ( 'utf-8' ) )
+                for shard_path in self.shard_paths:
+                    shard_url = self.domain_name + os.path.basename ( shard_path )
+                    index_fd.write ( "<sitemap><loc>{0}</loc><lastmod>{1}</lastmod></sitemap>\n".format (
+                        escape ( shard_url, XML_ENTITIES ), lastmod ).encode ( 'utf-8' ) )
+                index_fd.write ( self.SITEMAPINDEX_END.encode ( 'utf-8' ) )
+
+            return [ self.sitemap_path ] + self.shard_paths
+
+
+class SitemapEntries:
+    """
+    This class is the target of the XML parser of a sitemap (see SitemapReader): it keeps the <loc> of every \
+    <url> (or <sitemap> of a sitemap index) as soon as the entry is parsed, and nothing else.
+    """
+    # tags of the entries of a sitemap and of a sitemap index, with or without the sitemaps.org namespace
+    ENTRY_TAGS = frozenset ( ('url', 'sitemap', XML_NAMESPACE + 'url', XML_NAMESPACE + 'sitemap') )
+    LOC_TAGS = frozenset ( ('loc', XML_NAMESPACE + 'loc') )
+
+    def __init__ ( self ):
+        # entries parsed since the last pop_all. Format is: [('url' or 'sitemap', loc_str)]
+        self.entries = [ ]
+
+        # text of the <loc> being parsed (list of str / None outside of a <loc>), and <loc> of the current entry
+        self.loc_parts = None
+        self.loc = None
+
+    def start ( self, tag, attrib ):
+        if tag in self.LOC_TAGS:
+            self.loc_parts = [ ]
+
+    def data ( self, text ):
+        if self.loc_parts is not None:
+            self.loc_parts.append ( text )
+
+    def end ( self, tag ):
+        if tag in self.LOC_TAGS:
+            self.loc = "".join ( self.loc_parts ).strip ( )
+            self.loc_parts = None
+        elif tag in self.ENTRY_TAGS:
+            if self.loc:
+                self.entries.append ( (tag.rsplit ( '}', 1 )[ -1 ], self.loc) )
+            self.loc = None
+
+    def close ( self ):
+        pass
+
+    def pop_all ( self ):
+        """
+        :return: the entries parsed since the last call (list of 2-tuples ('url' or 'sitemap' (str), loc (str)))
+        """
+        entries, self.entries = self.entries, [ ]
+        return entries
+
+
+class SitemapReader:
+    """
+    This class reads the page urls listed by sitemaps.org XML sitemaps, following the sitemap indexes to the \
+    sitemaps they list. Every sitemap is streamed: it is parsed chunk by chunk while it is downloaded (gunzipped \
+    on the fly if it is gzipped) and the urls are yielded as soon as they are parsed, so a sitemap of any size is \
+    read in constant memory. A sitemap is read only once, and at most max_sitemaps sitemaps are read.
+    """
+    # size of the pieces in which sitemaps are read
+    CHUNK_SIZE = 64 * 1024
+
+    # maximum uncompressed size of a sitemap file, set by the sitemaps.org protocol (the rest is not read)
+    MAX_BYTES = XmlSitemapWriter.MAX_BYTES
+
+    # maximum number of sitemap files read, sitemap indexes included
+    MAX_SITEMAPS = 1000
+
+    # first bytes of a gzip file
+    GZIP_MAGIC = b'\x1f\x8b'
+
+    def __init__ ( self, fetch, max_sitemaps=MAX_SITEMAPS, max_bytes=MAX_BYTES ):
+        """
+        :param fetch: function sending a GET request for an url and returning its response (e.g; Crawler.fetch_page)
+        :param max_sitemaps: maximum number of sitemap files read (int)
+        :param max_bytes: maximum uncompressed size in bytes read of a sitemap file (int)
+        """
+        self.logger = logging.getLogger ( __name__ )
+        self.fetch = fetch
+        self.max_sitemaps = max_sitemaps
+        self.max_bytes = max_bytes
+
+        # number of sitemap files read and of page urls found in them
+        self.num_sitemaps = 0
+        self.num_urls = 0
+
+    def read_urls ( self, sitemap_urls ):
+        """
+        Yields the page urls of sitemaps, and of the sitemaps listed by the sitemap indexes among them.
+        :param sitemap_urls: urls of sitemaps or sitemap indexes (iterable of str)
+        :return: a generator of absolute urls (str)
+        """
+        pending_sitemaps = collections.deque ( sitemap_urls )
+        seen_sitemaps = set ( pending_sitemaps )
+
+        while pending_sitemaps:
+            if self.num_sitemaps >= self.max_sitemaps:
+                self.logger.warning ( "More than {0} sitemaps: {1} sitemaps are not read".format (
+                    self.max_sitemaps, len ( pending_sitemaps ) ) )
+                return
+
+            sitemap_url = pending_sitemaps.popleft ( )
+            self.num_sitemaps += 1
+            for tag, loc in self.read_sitemap ( sitemap_url ):
+                if tag == 'url':
+                    self.num_urls += 1
+                    yield loc
+                elif loc not in seen_sitemaps:
+                    seen_sitemaps.add ( loc )
+                    pending_sitemaps.append ( loc )
+
+    def read_sitemap ( self, sitemap_url ):
+        """
+        Yields the entries of a sitemap (<url>) or of a sitemap index (<sitemap>) while it is downloaded. \
+        A sitemap which cannot be downloaded or parsed is logged and left out (its entries parsed so far are kept).
+        :param sitemap_url: str
+        :return: a generator of 2-tuples ('url' or 'sitemap' (str), loc (str))
+        """
+        try:
+            response = self.fetch ( sitemap_url )
+        except (http.client.HTTPException, OSError, ValueError) as err:
+            self.logger.warning ( "Sitemap {0} cannot be open. Error: {1}".format ( sitemap_url, err ) )
+            return
+
+        try:
+            if response.getcode ( ) != 200:
+                self.logger.warning ( "Sitemap {0} cannot be open. Response code: {1}".format (
+                    sitemap_url, response.getcode ( ) ) )
+                return
+
+            # the parser builds no tree: its target only collects the entries, which are yielded after every chunk
+            entries = SitemapEntries ( )
+            parser = ElementTree.XMLParser ( target=entries )
+            xml_size = 0
+            for data in self.read_xml ( response ):
+                xml_size += len ( data )
+                parser.feed ( data )
+                yield from entries.pop_all ( )
+
+            # a sitemap cut at self.max_bytes is not complete, but it is not invalid either
+            if xml_size < self.max_bytes:
+                parser.close ( )
+                yield from entries.pop_all ( )
+
+        except (http.client.HTTPException, OSError, zlib.error) as err:
+            self.logger.warning ( "Sitemap {0} cannot be read. Error: {1}".format ( sitemap_url, err ) )
+        except ElementTree.ParseError as err:
+            self.logger.warning ( "Sitemap {0} is not a valid XML sitemap. Error: {1}".format ( sitemap_url, err ) )
+        finally:
+            response.close ( )
+
+    def read_xml ( self, response ):
+        """
+        Yields the XML of a sitemap response chunk by chunk, gunzipped if it is gzipped, up to self.max_bytes.
+        :param response: response of a sitemap, whose headers have been received
+        :return: a generator of bytes
+        """
+        decompressor = None
+        xml_size = 0
+        while xml_size < self.max_bytes:
+            chunk = response.read1 ( self.CHUNK_SIZE )
+            if not chunk: break
+
+            if decompressor is None:
+                # a gzipped sitemap (e.g; sitemap.xml.gz) is recognized by its first bytes, whatever its url
+                decompressor = zlib.decompressobj ( 16 + zlib.MAX_WBITS ) if chunk.startswith ( self.GZIP_MAGIC ) \
+                    else False
+
+            # a gzipped chunk is gunzipped piece by piece, as it can be many times bigger once gunzipped
+            for piece in (self.decompress ( decompressor, chunk ) if decompressor else (chunk,)):
+                piece = piece[ :self.max_bytes - xml_size ]
+                xml_size += len ( piece )
+                yield piece
+                if xml_size >= self.max_bytes: break
+        else:
+            self.logger.warning ( "Sitemap {0} is larger than {1} bytes: the rest of it is not read".format (
+                response.url, self.max_bytes ) )
+
+    def decompress ( self, decompressor, data ):
+        """
+        Yields the gunzipped data in pieces of at most self.CHUNK_SIZE bytes.
+        :param decompressor: zlib decompression object of the response
+        :param data: gzipped bytes
+        :return: a generator of bytes
+        """
+        while True:
+            piece = decompressor.decompress ( data, self.CHUNK_SIZE )
+            yield piece
+
+            # the decompressor may still hold output once all its input is consumed, if the last piece was full
+            data = decompressor.unconsumed_tail
+            if not data and len ( piece ) < self.CHUNK_SIZE: return
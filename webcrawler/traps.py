@@ -0,0 +1,187 @@
+# References:
+# 1. Charikar, Similarity Estimation Techniques from Rounding Algorithms (SimHash): https://doi.org/10.1145/509907.509965
+# 2. Manku, Jain, Das Sarma, Detecting Near-Duplicates for Web Crawling: https://doi.org/10.1145/1242572.1242592
+# 3. https://docs.python.org/3/library/hashlib.html#blake2
+
+import collections
+import hashlib
+import re
+import threading
+from urllib.parse import urlsplit
+
+# script and style elements, whose content is not text of the page, and the tags of the page
+NON_TEXT = re.compile ( r'<script\b.*?</script\s*>|<style\b.*?</style\s*>|<[^>]*>', re.IGNORECASE | re.DOTALL )
+
+# words of the text of a page
+WORD = re.compile ( r'\w+' )
+
+# segments of a path (or parts of them) which are ids: numbers, and long hexadecimal strings (e.g; session ids, uuids)
+PATH_ID = re.compile ( r'[0-9a-fA-F-]{16,}|\d+' )
+
+# number of bits of a fingerprint
+FINGERPRINT_BITS = 64
+
+# the votes of the bits of a fingerprint are summed at once in the lanes of one int, of LANE_BITS bits per bit of \
+# the fingerprint (enough for 16M features). LANES[byte] spreads the 8 bits of byte into 8 lanes.
+LANE_BITS = 24
+LANES = [ sum ( (byte >> bit & 1) << (bit * LANE_BITS) for bit in range ( 8 ) ) for byte in range ( 256 ) ]
+
+
+def get_simhash ( features ):
+    """
+    Returns the SimHash of a set of features: every bit is the majority vote of the same bit of the hashes of the \
+    features, so the fingerprints of two sets of features which share most of them differ by a few bits only.
+    :param features: iterable of str
+    :return: fingerprint (int of FINGERPRINT_BITS bits)
+    """
+    # number of features whose hash has every bit set, in the lane of the bit
+    lane_counts = 0
+    num_features = 0
+    # the digest is read as a big-endian int: its first byte holds the highest bits
+    byte_shifts = [ byte_no * 8 * LANE_BITS for byte_no in reversed ( range ( FINGERPRINT_BITS // 8 ) ) ]
+    for feature in features:
+        digest = hashlib.blake2b ( feature.encode ( 'utf-8', 'replace' ), digest_size=FINGERPRINT_BITS // 8 ).digest ( )
+        for byte, shift in zip ( digest, byte_shifts ):
+            lane_counts += LANES[ byte ] << shift
+        num_features += 1
+
+    lane_mask = (1 << LANE_BITS) - 1
+    return sum ( 1 << bit for bit in range ( FINGERPRINT_BITS )
+                 if 2 * (lane_counts >> (bit * LANE_BITS) & lane_mask) > num_features )
+
+
+def get_url_template ( url, is_path_kept=False ):
+    """
+    :param url: absolute url (str)
+    :param is_path_kept: True to keep the ids of the path (bool)
+    :return: the path of url whose ids are replaced by '{id}', followed by the sorted names of its query \
+             parameters (str), e.g; 'http://a.com/cal/2024/05?day=1&view=week' -> '/cal/{id}/{id}?day&view'
+    """
+    split_url = urlsplit ( url )
+    template = split_url.path if is_path_kept else PATH_ID.sub ( '{id}', split_url.path )
+    if split_url.query:
+        param_names = { param.split ( '=', 1 )[ 0 ] for param in split_url.query.split ( '&' ) }
+        template += '?' + '&'.join ( sorted ( param_names ) )
+    return template
+
+
+class TrapDetector:
+    """
+    This class spots the urls of crawler traps (calendars, faceted search, session ids, ...), which generate endless \
+    unique urls serving the same content, so that they are not crawled: \
+        1. urls whose path repeats a segment too many times (e.g; /a/b/a/b/a/b/), \
+        2. urls whose query is too long, \
+        3. urls of a path template (see get_url_template) whose cap of pages has been reached, and \
+        4. pages which are near-duplicates of a page already parsed: their SimHash fingerprints over the words of \
+           their text and their links differ by at most max_distance bits. \
+    The fingerprints are indexed by blocks of bits, so that a page is only compared with the pages sharing one of \
+    the blocks of its fingerprint. It is thread safe.
+    """
+    def __init__ ( self, max_segment_repeats=2, max_query_length=256, max_pages_per_template=10000, max_distance=3 ):
+        """
+        :param max_segment_repeats: maximum number of times a segment appears in the path of a url (int >= 1)
+        :param max_query_length: maximum number of characters of the query of a url (int)
+        :param max_pages_per_template: maximum number of pages crawled per path template (int)
+        :param max_distance: maximum number of different bits between the fingerprints of near-duplicate pages \
+                             (0 <= int < 8)
+        """
+        self.max_segment_repeats = max_segment_repeats
+        self.max_query_length = max_query_length
+        self.max_pages_per_template = max_pages_per_template
+        self.max_distance = max_distance
+
+        # two fingerprints which differ by at most max_distance bits share at least one of max_distance + 1 blocks
+        self.block_bits = FINGERPRINT_BITS // (max_distance + 1)
+
+        # it guards the counters and the fingerprint index below
+        self.mutex = threading.Lock ( )
+
+        # number of pages crawled per path template. Format is: {template_str: count}
+        self.template_pages = collections.Counter ( )
+
+        # fingerprints of the pages parsed, indexed per block. Format is: [{block_value: [(fingerprint, url), ...]}]
+        self.fingerprint_index = [ collections.defaultdict ( list ) for _ in range ( max_distance + 1 ) ]
+
+        # number of urls caught per heuristic, and number of fetches avoided
+        self.counters = collections.Counter ( )
+
+    def get_trap ( self, url ):
+        """
+        Tells whether url looks like a trap, before it is crawled. A url which does not is counted in its path \
+        template.
+        :param url: absolute url (str)
+        :return: the heuristic which has caught url (str) / None if url is not a trap
+        """
+        split_url = urlsplit ( url )
+        segments = [ segment for segment in split_url.path.split ( '/' ) if segment ]
+        if segments and max ( collections.Counter ( segments ).values ( ) ) > self.max_segment_repeats:
+            trap = 'repeated_segments'
+        elif len ( split_url.query ) > self.max_query_length:
+            trap = 'long_query'
+        else:
+            trap = None
+
+        with self.mutex:
+            if trap is None:
+                template = get_url_template ( url )
+                if self.template_pages[ template ] < self.max_pages_per_template:
+                    self.template_pages[ template ] += 1
+                    return None
+                trap = 'template_cap'
+
+            self.counters[ trap ] += 1
+            self.counters[ 'fetches_avoided' ] += 1
+        return trap
+
+    def get_fingerprint ( self, body, links ):
+        """
+        :param body: html page (str)
+        :param links: absolute links of the page (list of str)
+        :return: SimHash fingerprint of the page over the shingles of 3 words of its text and its links without \
+                 their query values (e.g; session ids) (int)
+        """
+        words = WORD.findall ( NON_TEXT.sub ( ' ', body ).lower ( ) )
+        features = { ' '.join ( words[ pos:pos + 3 ] ) for pos in range ( max ( 1, len ( words ) - 2 ) ) }
+        features.update ( get_url_template ( link, is_path_kept=True ) for link in links )
+        features.discard ( '' )
+        return get_simhash ( features )
+
+    def get_near_duplicate ( self, url, fingerprint ):
+        """
+        Returns the url of a page already parsed whose fingerprint is near fingerprint. Otherwise, the fingerprint \
+        of url is indexed.
+        :param url: str
+        :param fingerprint: see get_fingerprint (int)
+        :return: url of the page url is a near-duplicate of (str) / None
+        """
+        block_mask = (1 << self.block_bits) - 1
+        blocks = [ fingerprint >> (block_no * self.block_bits) & block_mask
+                   for block_no in range ( len ( self.fingerprint_index ) ) ]
+
+        with self.mutex:
+            for block_index, block in zip ( self.fingerprint_index, blocks ):
+                for other_fingerprint, other_url in block_index.get ( block, ( ) ):
+                    if bin ( fingerprint ^ other_fingerprint ).count ( '1' ) <= self.max_distance:
+                        self.counters[ 'near_duplicates' ] += 1
+                        return other_url
+
+            for block_index, block in zip ( self.fingerprint_index, blocks ):
+                block_index[ block ].append ( (fingerprint, url) )
+        return None
+
+    def count_avoided_fetches ( self, num_fetches ):
+        """
+        :param num_fetches: number of urls which have not been fetched as their page has not been expanded (int)
+        :return:
+        """
+        with self.mutex:
+            self.counters[ 'fetches_avoided' ] += num_fetches
+
+    def get_stats ( self ):
+        """
+        :return: {'repeated_segments': int, 'long_query': int, 'template_cap': int, 'near_duplicates': int, \
+                 'fetches_avoided': int} (dict)
+        """
+        with self.mutex:
+            return { key: self.counters[ key ] for key in ('repeated_segments', 'long_query', 'template_cap',
+                                                           'near_duplicates', 'fetches_avoided') }
@@ -0,0 +1,123 @@
+import io
+import threading
+import time
+import unittest
+
+import dflt_cfg
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.fetcher import Fetcher
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+from webcrawler.urlgraph import UrlGraph
+from webcrawler.urlparse import UrlNode, UrlTree
+from webcrawler.unittest.test_crawl_engines import get_tree_urls
+
+
+class ApiTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.saved_cfg = dict ( dflt_cfg.DFLT_CFG )
+
+        self.sites = [ SyntheticSite ( num_pages=40, fan_out=3, seed=seed ) for seed in (1, 2) ]
+        self.servers = [ LocalSiteServer ( site ) for site in self.sites ]
+        self.domain_names = [ server.start ( ) for server in self.servers ]
+
+        # never route localhost through a proxy
+        self.settings = { SYSTEM_PROXY: { }, TIMEOUT: 30, NUM_THREADS: 3, MAX_CONCURRENCY: 8 }
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        for server in self.servers:
+            server.stop ( )
+        self.assertEqual ( dflt_cfg.DFLT_CFG, self.saved_cfg )
+
+    def test_concurrent_crawls_share_a_fetcher ( self ):
+        fetcher = Fetcher ( timeout=30, proxies={ } )
+        roots = [ None, None ]
+
+        def crawl_site ( site_no, engine ):
+            settings = { **self.settings, ENGINE: engine }
+            roots[ site_no ] = api.crawl ( self.domain_names[ site_no ], settings, fetcher )
+
+        crawl_threads = [ threading.Thread ( target=crawl_site, args=(0, 'thread') ),
+                          threading.Thread ( target=crawl_site, args=(1, 'async') ) ]
+        for crawl_thread in crawl_threads:
+            crawl_thread.start ( )
+        for crawl_thread in crawl_threads:
+            crawl_thread.join ( )
+
+        # every crawl has mapped its own site only, over the connections of the shared pool
+        for site, domain_name, root in zip ( self.sites, self.domain_names, roots ):
+            self.assertEqual ( get_tree_urls ( root ), site.get_all_urls ( domain_name ) )
+        self.assertGreater ( fetcher.pool.requests_sent, 0 )
+        fetcher.close ( )
+
+    def test_iter_crawl_yields_every_url_once ( self ):
+        records = list ( api.iter_crawl ( self.domain_names[ 0 ], self.settings ) )
+
+        urls = [ url_node.url for url_node, _, _ in records ]
+        self.assertEqual ( len ( urls ), len ( set ( urls ) ) )
+        self.assertEqual ( set ( urls ), self.sites[ 0 ].get_all_urls ( self.domain_names[ 0 ] ) )
+
+        # the root comes first, and every other url comes after its parent, one level deeper
+        depths = { records[ 0 ][ 0 ].url: records[ 0 ][ 1 ] }
+        self.assertEqual ( (records[ 0 ][ 1 ], records[ 0 ][ 2 ]), (0, None) )
+        for url_node, depth, parent_node in records[ 1: ]:
+            self.assertEqual ( depth, depths[ parent_node.url ] + 1 )
+            depths[ url_node.url ] = depth
+
+    def test_iter_crawl_stops_when_the_caller_stops_reading ( self ):
+        site = SyntheticSite ( num_pages=300, fan_out=3, seed=3 )
+        site.latency = 0.01
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+
+        for engine in ('thread', 'async'):
+            del server.requests[ : ]
+            for record_no, _ in enumerate ( api.iter_crawl ( domain_name, { **self.settings, ENGINE: engine } ) ):
+                if record_no == 3: break
+
+            # the crawl thread is over once the generator is closed, and the rest of the site has not been requested
+            self.assertFalse ( [ th for th in threading.enumerate ( ) if th.name == "iter_crawl" ] )
+            num_requests = len ( server.requests )
+            self.assertLess ( num_requests, len ( site.pages ) // 2 )
+            time.sleep ( 0.1 )
+            self.assertEqual ( len ( server.requests ), num_requests )
+
+        server.stop ( )
+
+    def test_engines_leave_default_cfg_unchanged ( self ):
+        # the process engine turns off the settings it does not support in its own copy of the configuration
+        settings = { **self.settings, PROCESSES: 2, METRICS_PORT: 0 }
+        cfg = api.get_crawl_cfg ( self.domain_names[ 0 ], settings )
+        records = [ ]
+        crwlr = api.create_crawler ( cfg, on_record=lambda *record: records.append ( record ) )
+        crwlr.start_url_parsing ( )
+        root = crwlr.release_urlparse_resources ( )
+
+        self.assertEqual ( get_tree_urls ( root ), self.sites[ 0 ].get_all_urls ( self.domain_names[ 0 ] ) )
+        self.assertEqual ( { url_node.url for url_node, _, _ in records }, get_tree_urls ( root ) )
+        self.assertIsNone ( crwlr.cfg[ METRICS_PORT ] )
+        self.assertEqual ( cfg[ METRICS_PORT ], 0 )
+
+    def test_write_sitemap_in_given_file ( self ):
+        graph = UrlGraph ( )
+        root = UrlNode ( "http://a.com/", graph )
+        root.add_child ( UrlNode ( "http://a.com/x", graph ) )
+
+        output_fd = io.StringIO ( )
+        self.assertTrue ( UrlTree ( root, { OUTPUT_PATH: None } ).write_sitemap ( output_fd ) )
+        self.assertEqual ( output_fd.getvalue ( ).splitlines ( ), [ "http://a.com/", "....http://a.com/x" ] )
+
+        # an output file which cannot be created is reported, not raised
+        self.assertFalse ( UrlTree ( root, { OUTPUT_PATH: "/nonexistent/dir/output.txt" } ).write_sitemap ( ) )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
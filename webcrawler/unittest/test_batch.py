@@ -0,0 +1,112 @@
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+import dflt_cfg
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.batch import BatchCrawler
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+
+
+class BatchCrawlerTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.sites = [ SyntheticSite ( num_pages=20 + 10 * seed, fan_out=3, seed=seed ) for seed in range ( 3 ) ]
+        self.servers = [ LocalSiteServer ( site ) for site in self.sites ]
+        self.domain_names = [ server.start ( ) for server in self.servers ]
+
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        # never route localhost through a proxy
+        self.cfg = api.get_crawl_cfg ( None, { SYSTEM_PROXY: { }, TIMEOUT: 30, NUM_THREADS: 4, PROGRESS_INTERVAL: 0,
+                                               OUTPUT_PATH: os.path.join ( self.output_dir.name, "output.txt" ) } )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        for server in self.servers:
+            server.stop ( )
+        self.output_dir.cleanup ( )
+
+    def crawl ( self, domain_names, cfg ):
+        batch = BatchCrawler ( domain_names, cfg )
+        batch.start_url_parsing ( )
+        return batch, batch.release_urlparse_resources ( )
+
+    def test_every_domain_is_written_in_its_own_file ( self ):
+        # a domain listed twice is crawled once
+        batch, results = self.crawl ( self.domain_names + self.domain_names[ :1 ], self.cfg )
+
+        self.assertEqual ( [ result[ 'domain' ] for result in results ], self.domain_names )
+        for site, domain_name, result in zip ( self.sites, self.domain_names, results ):
+            self.assertIsNone ( result[ 'error' ] )
+            self.assertEqual ( result[ 'pages' ], len ( site.get_all_urls ( domain_name ) ) )
+            with open ( result[ 'output_path' ] ) as output_file:
+                tree_urls = { line.strip ( ).lstrip ( '.' ) for line in output_file }
+            self.assertEqual ( tree_urls, site.get_all_urls ( domain_name ) )
+
+        crawl_stats = batch.get_crawl_stats ( )
+        self.assertEqual ( crawl_stats[ 'frontier' ][ 'claimed' ], sum ( result[ 'pages' ] for result in results ) )
+        self.assertEqual ( crawl_stats[ 'domains' ], { 'total': 3, 'active': 0, 'failed': 0 } )
+        self.assertEqual ( dflt_cfg.DFLT_CFG[ DOMAIN ], None )
+
+    def test_workers_take_turns_between_domains ( self ):
+        batch = BatchCrawler ( self.domain_names, self.cfg )
+        batch.crawlers = [ batch.start_domain ( *pending_domain ) for pending_domain in batch.pending_domains ]
+
+        # every domain gets a page before any domain gets a second one
+        with batch.condition:
+            claimed_crawlers = [ batch.claim_urlnode ( )[ 0 ] for _ in batch.crawlers ]
+        self.assertCountEqual ( claimed_crawlers, batch.crawlers )
+        batch.fetcher.close ( )
+
+    def test_domains_are_started_by_the_worker_threads ( self ):
+        # hosts which accept connections but never answer: every request to them takes TIMEOUT seconds
+        dead_sockets = [ socket.create_server ( ('127.0.0.1', 0) ) for _ in range ( 6 ) ]
+        dead_names = [ "http://127.0.0.1:{0}/".format ( dead_socket.getsockname ( )[ 1 ] )
+                       for dead_socket in dead_sockets ]
+
+        start = time.monotonic ( )
+        batch, results = self.crawl ( dead_names + self.domain_names,
+                                      { **self.cfg, ROBOTS: True, TIMEOUT: 1, NUM_THREADS: 8 } )
+        seconds = time.monotonic ( ) - start
+        for dead_socket in dead_sockets:
+            dead_socket.close ( )
+
+        # the robots.txt of the dead hosts are read at once (then their domain root), not one after the other
+        self.assertLess ( seconds, 5 )
+        for site, domain_name, result in zip ( self.sites, self.domain_names, results[ len ( dead_names ): ] ):
+            self.assertEqual ( result[ 'pages' ], len ( site.get_all_urls ( domain_name ) ) )
+
+        # the robots.txt requests are counted in the statistics of the batch
+        self.assertEqual ( batch.get_crawl_stats ( )[ 'responses' ],
+                           sum ( result[ 'pages' ] for result in results[ len ( dead_names ): ] ) +
+                           len ( self.domain_names ) )
+
+    def test_budgets_apply_to_every_domain ( self ):
+        _, results = self.crawl ( self.domain_names, { **self.cfg, MAX_PAGES: 5 } )
+
+        for result in results:
+            self.assertEqual ( (result[ 'pages' ], result[ 'budget_exhausted' ]), (5, 'max pages') )
+
+    def test_output_paths_and_domains_file ( self ):
+        used_names = set ( )
+        self.assertEqual ( [ BatchCrawler.get_domain_output_path ( "./output/output.txt", domain_name, used_names )
+                             for domain_name in ("http://a.com/", "https://a.com/", "http://b.com:8080/") ],
+                           [ "./output/a.com.txt", "./output/a.com_2.txt", "./output/b.com_8080.txt" ] )
+
+        domains_path = os.path.join ( self.output_dir.name, "domains.txt" )
+        with open ( domains_path, 'w' ) as domains_file:
+            domains_file.write ( "# nightly domains\nhttp://a.com/\n\n  https://b.com/  \n" )
+        self.assertEqual ( BatchCrawler.read_domains_file ( domains_path ), [ "http://a.com/", "https://b.com/" ] )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
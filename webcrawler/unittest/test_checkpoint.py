@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from webcrawler.checkpoint import CrawlCheckpoint
+from webcrawler.urlgraph import UrlGraph
+from webcrawler.urlparse import UrlNode
+
+
+class CrawlCheckpointTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        self.path = os.path.join ( self.output_dir.name, "output.txt.checkpoint" )
+
+        url_graph = UrlGraph ( )
+        self.root = UrlNode ( "http://a.com/", url_graph )
+        self.page = UrlNode ( "http://a.com/page.html", url_graph )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.output_dir.cleanup ( )
+
+    def write_crawl ( self, checkpoint ):
+        checkpoint.write_enqueued ( self.root, 0 )
+        checkpoint.write_enqueued ( self.page, 1, self.root )
+        checkpoint.write_page ( self.root.url, "2022-01-01T00:00:00+00:00" )
+        checkpoint.write_parsed ( self.root )
+
+    def test_records ( self ):
+        checkpoint = CrawlCheckpoint ( self.path, interval=3600 )
+        self.write_crawl ( checkpoint )
+        checkpoint.close ( )
+
+        self.assertEqual ( list ( checkpoint.read_records ( ) ), [
+            [ 'E', '0', "http://a.com/", "" ],
+            [ 'E', '1', "http://a.com/page.html", "http://a.com/" ],
+            [ 'P', "http://a.com/", "2022-01-01T00:00:00+00:00" ],
+            [ 'D', "http://a.com/" ],
+        ] )
+        self.assertEqual ( CrawlCheckpoint.read_root_url ( self.path ), "http://a.com/" )
+        self.assertIsNone ( CrawlCheckpoint.read_root_url ( self.path + ".missing" ) )
+
+    def test_interval ( self ):
+        # records are flushed to disk once the interval has elapsed, not on every write
+        checkpoint = CrawlCheckpoint ( self.path, interval=3600 )
+        self.write_crawl ( checkpoint )
+        self.assertEqual ( (checkpoint.num_checkpoints, os.path.getsize ( self.path )), (0, 0) )
+        checkpoint.close ( )
+
+        checkpoint = CrawlCheckpoint ( self.path, interval=0 )
+        self.write_crawl ( checkpoint )
+        self.assertEqual ( checkpoint.num_checkpoints, 4 )
+        self.assertEqual ( len ( list ( checkpoint.read_records ( ) ) ), 4 )
+        checkpoint.close ( )
+
+    def test_resume_after_crash ( self ):
+        checkpoint = CrawlCheckpoint ( self.path )
+        self.write_crawl ( checkpoint )
+        checkpoint.close ( )
+
+        # the crash cut the last record, and a malformed line is in the middle of the log
+        with open ( self.path, 'r+b' ) as log_fd:
+            log = log_fd.read ( ).replace ( b"\nP\t", b"\nbad line\nP\t" )
+            log_fd.seek ( 0 )
+            log_fd.write ( log[ :-5 ] )
+            log_fd.truncate ( )
+
+        checkpoint = CrawlCheckpoint ( self.path, resume=True )
+        checkpoint.write_parsed ( self.page )
+        checkpoint.close ( )
+
+        self.assertEqual ( [ record[ 0 ] for record in checkpoint.read_records ( ) ], [ 'E', 'E', 'P', 'D' ] )
+        self.assertEqual ( list ( checkpoint.read_records ( ) )[ -1 ], [ 'D', "http://a.com/page.html" ] )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
@@ -0,0 +1,403 @@
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+
+import dflt_cfg
+from webcrawler.app_constant import *
+from webcrawler.async_crawler import AsyncCrawler
+from webcrawler.crawler import Crawler
+from webcrawler.distributed import FrontierCoordinator, NodeCrawler
+from webcrawler.process_crawler import ProcessCrawler, ShardCrawler
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+
+
+def get_tree_urls ( root ):
+    """
+    Returns the urls of all the UrlNodes of the tree hierarchy rooted at root.
+    :param root: an instance of UrlNode
+    :return: set of str
+    """
+    tree_urls = set ( )
+    pending_urlnodes = [ root ]
+    while pending_urlnodes:
+        url_node = pending_urlnodes.pop ( )
+        tree_urls.add ( url_node.url )
+        pending_urlnodes.extend ( url_node.child_urls )
+
+    return tree_urls
+
+
+class CrawlEnginesTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.saved_cfg = dict ( dflt_cfg.DFLT_CFG )
+
+        self.site = SyntheticSite ( num_pages=60, fan_out=4 )
+        self.server = LocalSiteServer ( self.site )
+        self.domain_name = self.server.start ( )
+
+        dflt_cfg.DFLT_CFG[ DOMAIN ] = self.domain_name
+        dflt_cfg.DFLT_CFG[ SYSTEM_PROXY ] = { }  # never route localhost through a proxy
+        dflt_cfg.DFLT_CFG[ TIMEOUT ] = 30
+        dflt_cfg.DFLT_CFG[ NUM_THREADS ] = 4
+        dflt_cfg.DFLT_CFG[ MAX_CONCURRENCY ] = 16
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.server.stop ( )
+        dflt_cfg.DFLT_CFG.clear ( )
+        dflt_cfg.DFLT_CFG.update ( self.saved_cfg )
+
+    def crawl ( self, crawler_class ):
+        crwlr = crawler_class ( )
+        crwlr.start_url_parsing ( )
+        return crwlr.release_urlparse_resources ( )
+
+    def test_thread_engine_maps_whole_site ( self ):
+        root = self.crawl ( Crawler )
+        self.assertEqual ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+
+    def test_thread_engine_ends_without_idle_wait ( self ):
+        start = time.monotonic ( )
+        self.crawl ( Crawler )
+
+        # TIMEOUT (30 seconds) is only a network timeout; it is not waited for at the end of the crawl
+        self.assertLess ( time.monotonic ( ) - start, 10 )
+
+    def test_thread_engine_without_threads ( self ):
+        dflt_cfg.DFLT_CFG[ NUM_THREADS ] = 0
+        root = self.crawl ( Crawler )
+        self.assertEqual ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+
+    def test_every_url_appears_once_in_tree ( self ):
+        for crawler_class in (Crawler, AsyncCrawler):
+            root = self.crawl ( crawler_class )
+            tree_urls = [ ]
+            pending_urlnodes = [ root ]
+            while pending_urlnodes:
+                url_node = pending_urlnodes.pop ( )
+                tree_urls.append ( url_node.url )
+                pending_urlnodes.extend ( url_node.child_urls )
+
+            self.assertEqual ( len ( tree_urls ), len ( set ( tree_urls ) ) )
+
+    def test_max_pages_gives_partial_sitemap ( self ):
+        dflt_cfg.DFLT_CFG[ MAX_PAGES ] = 5
+        for crawler_class in (Crawler, AsyncCrawler):
+            crwlr = crawler_class ( )
+            crwlr.start_url_parsing ( )
+            root = crwlr.release_urlparse_resources ( )
+
+            self.assertEqual ( crwlr.frontier.get_stats ( )[ 'claimed' ], 5 )
+            self.assertEqual ( crwlr.url_graph.get_visited_count ( ), 5 )
+            self.assertTrue ( get_tree_urls ( root ) < self.site.get_all_urls ( self.domain_name ) )
+
+    def test_max_depth ( self ):
+        dflt_cfg.DFLT_CFG[ MAX_DEPTH ] = 2
+        root = self.crawl ( AsyncCrawler )
+
+        # domain root -> page0 -> links of page0
+        page0_links = re.findall ( r'href="/(.*?)"', self.site.pages[ '/page0.html' ].decode ( ) )
+        expected_urls = { self.domain_name, self.domain_name + "page0.html" } | \
+                        { self.domain_name + link for link in page0_links }
+        self.assertEqual ( get_tree_urls ( root ), expected_urls )
+
+    def test_async_engine_maps_whole_site ( self ):
+        root = self.crawl ( AsyncCrawler )
+        self.assertEqual ( root.url, self.domain_name )
+        self.assertEqual ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+
+    def test_async_engine_logs_broken_urls ( self ):
+        self.site.pages[ '/' ] += b'<a href="/missing.html">broken</a>'
+        with self.assertLogs ( 'webcrawler.crawler', level='ERROR' ) as logs:
+            root = self.crawl ( AsyncCrawler )
+
+        self.assertIn ( self.domain_name + "missing.html", get_tree_urls ( root ) )
+        self.assertTrue ( any ( "missing.html" in line and "404" in line for line in logs.output ) )
+
+    def test_non_html_urls_are_leaves_without_download ( self ):
+        # bodies which would add hidden.html to the sitemap if they were parsed as pages
+        self.site.pages[ '/images/photo.JPG' ] = b'<a href="/hidden.html">'
+        self.site.pages[ '/data.bin' ] = b'<a href="/hidden.html">'
+        self.site.pages[ '/' ] += b'<a href="/images/photo.JPG">photo</a><a href="/data.bin">data</a>'
+
+        for crawler_class in (Crawler, AsyncCrawler):
+            del self.server.requests[ : ]
+            crwlr = crawler_class ( )
+            crwlr.start_url_parsing ( )
+            root = crwlr.release_urlparse_resources ( )
+
+            tree_urls = get_tree_urls ( root )
+            self.assertIn ( self.domain_name + "images/photo.JPG", tree_urls )
+            self.assertIn ( self.domain_name + "data.bin", tree_urls )
+            self.assertNotIn ( self.domain_name + "hidden.html", tree_urls )
+            self.assertEqual ( crwlr.skipped_bodies[ 'non_html' ], 2 )
+
+            # asset-like urls are only checked with HEAD
+            self.assertIn ( ('HEAD', '/images/photo.JPG'), self.server.requests )
+            self.assertNotIn ( ('GET', '/images/photo.JPG'), self.server.requests )
+
+    def test_max_body_size ( self ):
+        self.site.pages[ '/' ] += b' ' * 100000 + b'<a href="/late.html">late</a>'
+        self.site.pages[ '/late.html' ] = b'<html></html>'
+        dflt_cfg.DFLT_CFG[ MAX_BODY_SIZE ] = 50000
+
+        for crawler_class in (Crawler, AsyncCrawler):
+            crwlr = crawler_class ( )
+            crwlr.start_url_parsing ( )
+            root = crwlr.release_urlparse_resources ( )
+
+            tree_urls = get_tree_urls ( root )
+            self.assertIn ( self.domain_name + "page0.html", tree_urls )
+            self.assertNotIn ( self.domain_name + "late.html", tree_urls )
+            self.assertEqual ( crwlr.skipped_bodies[ 'truncated' ], 1 )
+
+    def test_streamed_sitemap ( self ):
+        with tempfile.TemporaryDirectory ( ) as output_dir:
+            dflt_cfg.DFLT_CFG[ OUTPUT_PATH ] = os.path.join ( output_dir, "sitemap.tsv" )
+            dflt_cfg.DFLT_CFG[ STREAM_SITEMAP ] = True
+
+            for crawler_class in (Crawler, AsyncCrawler):
+                self.crawl ( crawler_class )
+                with open ( dflt_cfg.DFLT_CFG[ OUTPUT_PATH ] ) as output_fd:
+                    records = [ line.rstrip ( "\n" ).split ( "\t" ) for line in output_fd ]
+
+                # every url once, written after its parent
+                depths = { }
+                for depth, url, parent_url in records:
+                    self.assertNotIn ( url, depths )
+                    self.assertEqual ( int ( depth ), depths[ parent_url ] + 1 if parent_url else 0 )
+                    depths[ url ] = int ( depth )
+
+                self.assertEqual ( set ( depths ), self.site.get_all_urls ( self.domain_name ) )
+
+    def test_xml_sitemap ( self ):
+        self.site.pages[ '/data.bin' ] = b'data'
+        self.site.pages[ '/' ] += b'<a href="/data.bin">data</a>'
+
+        with tempfile.TemporaryDirectory ( ) as output_dir:
+            dflt_cfg.DFLT_CFG[ OUTPUT_PATH ] = os.path.join ( output_dir, "sitemap.txt" )
+            dflt_cfg.DFLT_CFG[ SITEMAP_FORMAT ] = 'xml'
+
+            for crawler_class in (Crawler, AsyncCrawler):
+                crwlr = crawler_class ( )
+                crwlr.start_url_parsing ( )
+                crwlr.release_urlparse_resources ( )
+
+                with open ( os.path.join ( output_dir, "sitemap.xml" ) ) as sitemap_fd:
+                    sitemap = sitemap_fd.read ( )
+
+                # every html page once, with the date of its Last-Modified header
+                locs = re.findall ( "<loc>(.*?)</loc>", sitemap )
+                self.assertEqual ( len ( locs ), len ( set ( locs ) ) )
+                self.assertEqual ( set ( locs ), self.site.get_all_urls ( self.domain_name ) -
+                                   { self.domain_name + "data.bin" } )
+                self.assertEqual ( sitemap.count ( "<lastmod>2022-01-01T00:00:00+00:00</lastmod>" ), len ( locs ) )
+
+    def test_resume_from_checkpoint ( self ):
+        with tempfile.TemporaryDirectory ( ) as output_dir:
+            dflt_cfg.DFLT_CFG[ CHECKPOINT_PATH ] = os.path.join ( output_dir, "output.txt.checkpoint" )
+
+            for crawler_class in (Crawler, AsyncCrawler):
+                # the first crawl is interrupted by a budget, the second one goes on from its checkpoint
+                dflt_cfg.DFLT_CFG.update ( { MAX_PAGES: 10, RESUME: False } )
+                del self.server.requests[ : ]
+                self.crawl ( crawler_class )
+                first_requests = set ( self.server.requests )
+
+                dflt_cfg.DFLT_CFG.update ( { MAX_PAGES: None, RESUME: True } )
+                del self.server.requests[ : ]
+                crwlr = crawler_class ( )
+                self.assertTrue ( crwlr.is_resumed )
+                crwlr.start_url_parsing ( )
+                root = crwlr.release_urlparse_resources ( )
+
+                # pages parsed before the interruption are not downloaded again
+                self.assertEqual ( len ( first_requests ), 10 )
+                self.assertFalse ( first_requests & set ( self.server.requests ) )
+                self.assertEqual ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+                self.assertEqual ( crwlr.url_graph.get_visited_count ( ), len ( self.site.pages ) )
+
+    def test_recrawl_with_page_cache ( self ):
+        page1 = self.site.pages[ '/page1.html' ]
+        with tempfile.TemporaryDirectory ( ) as output_dir:
+            for crawler_class in (Crawler, AsyncCrawler):
+                dflt_cfg.DFLT_CFG[ CACHE_PATH ] = os.path.join ( output_dir, crawler_class.__name__ + ".sqlite3" )
+                self.site.pages[ '/page1.html' ] = page1
+                self.site.pages.pop ( '/new.html', None )
+
+                crwlr = crawler_class ( )
+                crwlr.start_url_parsing ( )
+                first_tree_urls = get_tree_urls ( crwlr.release_urlparse_resources ( ) )
+                self.assertEqual ( crwlr.page_cache.get_stats ( )[ 'stored' ], len ( self.site.pages ) )
+
+                # one page changes: it is downloaded again, the links of the others come from the cache
+                self.site.pages[ '/page1.html' ] += b'<a href="/new.html">new</a>'
+                self.site.pages[ '/new.html' ] = b'<html></html>'
+                crwlr = crawler_class ( )
+                crwlr.start_url_parsing ( )
+                tree_urls = get_tree_urls ( crwlr.release_urlparse_resources ( ) )
+
+                self.assertEqual ( tree_urls, first_tree_urls | { self.domain_name + "new.html" } )
+                stats = crwlr.page_cache.get_stats ( )
+                self.assertEqual ( (stats[ 'hits' ], stats[ 'updated' ], stats[ 'misses' ]),
+                                   (len ( self.site.pages ) - 2, 1, 1) )
+
+    def test_process_crawler ( self ):
+        for num_processes in (1, 3):
+            del self.server.requests[ : ]
+            root = self.crawl ( lambda: ProcessCrawler ( num_processes ) )
+
+            # every url is crawled once, by the process which owns it, and the sitemaps of all are merged
+            self.assertEqual ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+            self.assertEqual ( sorted ( self.server.requests ), sorted ( set ( self.server.requests ) ) )
+            self.assertEqual ( len ( self.server.requests ), len ( self.site.pages ) )
+
+    @unittest.skipUnless ( 'fork' in multiprocessing.get_all_start_methods ( ), "the crawl processes are spawned" )
+    def test_process_crawler_returns_when_a_process_dies ( self ):
+        parse_urlnode = ShardCrawler.parse_urlnode
+
+        def parse_urlnode_or_die ( crwlr, new_url_node, depth ):
+            # the crawl processes are forked, so they inherit this method: the second one dies at its first page
+            if crwlr.shard_no == 1:
+                os._exit ( 3 )
+            parse_urlnode ( crwlr, new_url_node, depth )
+
+        ShardCrawler.parse_urlnode = parse_urlnode_or_die
+        try:
+            start = time.monotonic ( )
+            root = self.crawl ( lambda: ProcessCrawler ( 3 ) )
+        finally:
+            ShardCrawler.parse_urlnode = parse_urlnode
+
+        # the other processes, which wait for the links of the dead one, are stopped and a partial sitemap is built
+        self.assertLess ( time.monotonic ( ) - start, 20 )
+        self.assertLess ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+
+    def test_distributed_crawl ( self ):
+        coordinator = FrontierCoordinator ( ('127.0.0.1', 0) )
+        address = coordinator.start ( )
+
+        nodes = [ NodeCrawler ( address ) for _ in range ( 3 ) ]
+        node_threads = [ threading.Thread ( target=lambda node=node: (node.start_url_parsing ( ),
+                                                                      node.release_urlparse_resources ( )) )
+                         for node in nodes ]
+        for node_thread in node_threads:
+            node_thread.start ( )
+        self.assertTrue ( coordinator.wait ( timeout=30 ) )
+        for node_thread in node_threads:
+            node_thread.join ( )
+        root = coordinator.stop ( )
+
+        # every page is crawled once, by one of the nodes, and the coordinator has merged the sitemap
+        self.assertEqual ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+        self.assertEqual ( sorted ( self.server.requests ), sorted ( set ( self.server.requests ) ) )
+        self.assertEqual ( sum ( node.frontier.get_stats ( )[ 'claimed' ] for node in nodes ), len ( self.site.pages ) )
+
+    def test_polite_crawl_of_throttling_server ( self ):
+        # the server answers 429 beyond 2 requests at once, with a short Retry-After
+        self.site.latency = 0.01
+        self.site.max_concurrency = 2
+        self.site.retry_after = 0
+        dflt_cfg.DFLT_CFG[ NUM_THREADS ] = 8
+        dflt_cfg.DFLT_CFG[ MAX_CONCURRENCY ] = 8
+
+        # without politeness, the throttled pages are missing from the sitemap
+        root = self.crawl ( Crawler )
+        self.assertTrue ( self.server.throttled )
+        self.assertLess ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+
+        dflt_cfg.DFLT_CFG[ POLITE ] = True
+        dflt_cfg.DFLT_CFG[ MAX_RETRIES ] = 10
+        for crawler_class in (Crawler, AsyncCrawler):
+            del self.server.throttled[ : ]
+            crwlr = crawler_class ( )
+            crwlr.start_url_parsing ( )
+            root = crwlr.release_urlparse_resources ( )
+
+            # throttled requests are retried, and the concurrency adapts so that few requests are throttled
+            self.assertEqual ( get_tree_urls ( root ), self.site.get_all_urls ( self.domain_name ) )
+            stats = crwlr.scheduler.get_stats ( )
+            self.assertEqual ( stats[ 'throttled' ], len ( self.server.throttled ) )
+            self.assertLess ( stats[ 'throttled' ], len ( self.site.pages ) / 2 )
+
+    def test_polite_crawl_honours_crawl_delay ( self ):
+        dflt_cfg.DFLT_CFG[ POLITE ] = True
+        host_key = self.domain_name.rstrip ( '/' )
+        for robots_txt, interval in ((None, 0.0), (b"User-agent: *\nCrawl-delay: 2\n", 2.0),
+                                     (b"User-agent: *\nCrawl-delay: 2\nRequest-rate: 1/5\n", 5.0),
+                                     (b"User-agent: other\nCrawl-delay: 2\n", 0.0)):
+            self.site.robots_txt = robots_txt
+            crwlr = Crawler ( )
+            self.assertEqual ( crwlr.scheduler.get_host ( host_key ).interval, interval )
+            crwlr.fetcher.close ( )
+
+    def test_robots_txt_and_sitemap_seeds ( self ):
+        # an orphan page and a disallowed page are listed by a sitemap of a gzipped sitemap index of robots.txt
+        sitemap_paths = ('/sitemap_index.xml.gz', '/sitemap-pages.xml')
+        self.site.pages[ '/orphan.html' ] = b'<html><body><a href="/page1.html">page</a></body></html>'
+        self.site.pages[ sitemap_paths[ 0 ] ] = gzip.compress (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            '<sitemap><loc>{0}sitemap-pages.xml</loc></sitemap></sitemapindex>'.format ( self.domain_name ).encode ( ) )
+        self.site.pages[ sitemap_paths[ 1 ] ] = ''.join (
+            [ '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' ] +
+            [ '<url><loc>{0}{1}</loc></url>'.format ( self.domain_name, path )
+              for path in ('orphan.html', 'page59.html', 'page1.html') ] +
+            [ '<url><loc>http://other.com/</loc></url></urlset>' ] ).encode ( )
+        self.site.robots_txt = "User-agent: *\nDisallow: /page1\nSitemap: {0}sitemap_index.xml.gz\n".format (
+            self.domain_name ).encode ( )
+        site_urls = self.site.get_all_urls ( self.domain_name ) - { self.domain_name + path[ 1: ] for path in sitemap_paths }
+
+        # without the seeds, the orphan page is not found
+        root = self.crawl ( Crawler )
+        self.assertEqual ( get_tree_urls ( root ), site_urls - { self.domain_name + "orphan.html" } )
+
+        dflt_cfg.DFLT_CFG[ SEED_SITEMAPS ] = True
+        root = self.crawl ( Crawler )
+        self.assertEqual ( get_tree_urls ( root ), site_urls )
+        self.assertIn ( self.domain_name + "orphan.html", [ child.url for child in root.child_urls ] )
+
+        dflt_cfg.DFLT_CFG[ ROBOTS ] = True
+        for crawler_class in (Crawler, AsyncCrawler, lambda: ProcessCrawler ( 2 )):
+            del self.server.requests[ : ]
+            tree_urls = get_tree_urls ( self.crawl ( crawler_class ) )
+
+            # the orphan page is seeded, and no url disallowed by robots.txt is requested
+            self.assertIn ( self.domain_name + "orphan.html", tree_urls )
+            self.assertFalse ( [ url for url in tree_urls if url.startswith ( self.domain_name + "page1" ) ] )
+            self.assertFalse ( [ path for _, path in self.server.requests if path.startswith ( "/page1" ) ] )
+            self.assertLess ( tree_urls, site_urls )
+
+    def test_crawl_stats ( self ):
+        self.site.pages[ '/' ] += b'<a href="/missing.html">broken</a>'
+        num_pages = len ( self.site.pages )
+        with tempfile.TemporaryDirectory ( ) as tmp_dir:
+            stats_path = dflt_cfg.DFLT_CFG[ STATS_PATH ] = os.path.join ( tmp_dir, "sitemap.txt.stats.json" )
+            for crawler_class in (Crawler, AsyncCrawler, lambda: ProcessCrawler ( 2 )):
+                self.crawl ( crawler_class )
+                with open ( stats_path ) as stats_file:
+                    crawl_stats = json.load ( stats_file )
+
+                self.assertEqual ( crawl_stats[ 'status_codes' ], { '200': num_pages, '404': 1 } )
+                self.assertEqual ( crawl_stats[ 'frontier' ][ 'claimed' ], num_pages + 1 )
+                self.assertGreater ( crawl_stats[ 'bytes_downloaded' ], 0 )
+
+                # every response is timed, and the body of every page is downloaded and parsed once
+                stages = crawl_stats[ 'stages' ]
+                self.assertEqual ( stages[ 'ttfb' ][ 'count' ], num_pages + 1 )
+                self.assertEqual ( stages[ 'download' ][ 'count' ], num_pages )
+                self.assertEqual ( stages[ 'parse' ][ 'count' ], num_pages )
+                self.assertGreaterEqual ( stages[ 'connect' ][ 'count' ], 1 )
+                self.assertEqual ( stages[ 'dns' ][ 'count' ], stages[ 'connect' ][ 'count' ] )
@@ -0,0 +1,99 @@
+import json
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from webcrawler.crawlstats import CrawlMonitor, CrawlStats
+
+
+class CrawlStatsTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.stats = CrawlStats ( )
+        for seconds in (0.0005, 0.003, 0.003, 0.003, 0.2):
+            self.stats.add_time ( 'ttfb', seconds )
+        self.stats.count_response ( 200 )
+        self.stats.count_response ( 200 )
+        self.stats.count_response ( 404 )
+        self.stats.count_error ( ConnectionResetError ( ) )
+        self.stats.add_bytes ( 1000 )
+
+    def get_crawl_stats ( self ):
+        crawl_stats = self.stats.get_snapshot ( )
+        crawl_stats[ 'frontier' ] = { 'pending': 7, 'claimed': 3 }
+        return crawl_stats
+
+    def test_snapshot ( self ):
+        snapshot = self.stats.get_snapshot ( )
+        self.assertEqual ( snapshot[ 'responses' ], 3 )
+        self.assertEqual ( snapshot[ 'status_codes' ], { '200': 2, '404': 1 } )
+        self.assertEqual ( snapshot[ 'errors' ], { 'ConnectionResetError': 1 } )
+        self.assertEqual ( snapshot[ 'bytes_downloaded' ], 1000 )
+
+        # percentiles are the upper bounds of the histogram buckets
+        ttfb = snapshot[ 'stages' ][ 'ttfb' ]
+        self.assertEqual ( ttfb[ 'count' ], 5 )
+        self.assertAlmostEqual ( ttfb[ 'mean_ms' ], 41.9 )
+        self.assertEqual ( ttfb[ 'p50_ms' ], 4.0 )
+        self.assertEqual ( ttfb[ 'p95_ms' ], 256.0 )
+        self.assertEqual ( ttfb[ 'max_ms' ], 200.0 )
+        self.assertEqual ( snapshot[ 'stages' ][ 'dns' ], { 'count': 0, 'total_seconds': 0.0, 'mean_ms': None,
+                                                          'p50_ms': None, 'p95_ms': None, 'max_ms': 0.0 } )
+
+    def test_add_counters ( self ):
+        stats = CrawlStats ( )
+        stats.add_time ( 'ttfb', 300.0 )
+        stats.count_response ( 200 )
+        stats.add_counters ( self.stats.get_counters ( ) )
+
+        snapshot = stats.get_snapshot ( )
+        self.assertEqual ( snapshot[ 'status_codes' ], { '200': 3, '404': 1 } )
+        self.assertEqual ( snapshot[ 'stages' ][ 'ttfb' ][ 'count' ], 6 )
+        # the longest duration is beyond the last bucket: the maximum stands for it
+        self.assertEqual ( snapshot[ 'stages' ][ 'ttfb' ][ 'p95_ms' ], 300000.0 )
+
+    def test_prometheus_text ( self ):
+        lines = self.stats.get_prometheus_text ( { 'frontier_pending': 7 } ).splitlines ( )
+        self.assertIn ( 'webcrawler_responses_total{code="404"} 1', lines )
+        self.assertIn ( 'webcrawler_errors_total{error="ConnectionResetError"} 1', lines )
+        self.assertIn ( 'webcrawler_stage_seconds_bucket{stage="ttfb",le="0.004"} 4', lines )
+        self.assertIn ( 'webcrawler_stage_seconds_bucket{stage="ttfb",le="+Inf"} 5', lines )
+        self.assertIn ( 'webcrawler_stage_seconds_count{stage="parse"} 0', lines )
+        self.assertIn ( 'webcrawler_frontier_pending 7', lines )
+
+    def test_monitor_serves_stats ( self ):
+        monitor = CrawlMonitor ( self.stats, self.get_crawl_stats, port=0 )
+        host, port = monitor.start ( )
+        try:
+            with urllib.request.urlopen ( "http://{0}:{1}/stats".format ( host, port ), timeout=10 ) as response:
+                crawl_stats = json.loads ( response.read ( ).decode ( 'utf-8' ) )
+            self.assertEqual ( crawl_stats[ 'status_codes' ], { '200': 2, '404': 1 } )
+            self.assertEqual ( crawl_stats[ 'frontier' ][ 'pending' ], 7 )
+
+            with urllib.request.urlopen ( "http://{0}:{1}/metrics".format ( host, port ), timeout=10 ) as response:
+                self.assertIn ( b'webcrawler_frontier_pending 7\n', response.read ( ) )
+
+            with self.assertRaises ( urllib.error.HTTPError ):
+                urllib.request.urlopen ( "http://{0}:{1}/other".format ( host, port ), timeout=10 )
+        finally:
+            monitor.stop ( )
+
+    def test_monitor_logs_progress ( self ):
+        monitor = CrawlMonitor ( self.stats, self.get_crawl_stats, interval=0.01 )
+        with self.assertLogs ( 'webcrawler.crawlstats', level='INFO' ) as logs:
+            monitor.start ( )
+            deadline = time.monotonic ( ) + 10
+            while not logs.output and time.monotonic ( ) < deadline:
+                time.sleep ( 0.01 )
+            monitor.stop ( )
+
+        self.assertIn ( "3 responses", logs.output[ 0 ] )
+        self.assertIn ( "7 urls pending", logs.output[ 0 ] )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
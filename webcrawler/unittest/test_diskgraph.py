@@ -0,0 +1,131 @@
+import io
+import os
+import unittest
+
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.diskgraph import BloomFilter, DiskUrlGraph
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+from webcrawler.unittest.test_crawl_engines import get_tree_urls
+from webcrawler.urlgraph import UrlGraph
+from webcrawler.urlparse import UrlNode, UrlTree
+
+
+def get_sitemap ( root ):
+    """
+    :param root: root of a UrlNode tree hierarchy (an instance of UrlNode)
+    :return: the sitemap written by UrlTree (str)
+    """
+    output_fd = io.StringIO ( )
+    UrlTree ( root ).write_sitemap ( output_fd )
+    return output_fd.getvalue ( )
+
+
+class DiskUrlGraphTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        # a budget so small that the graph caches the rows of 64 urls only
+        self.graph = DiskUrlGraph ( 1024 )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.graph.close ( )
+
+    def test_bloom_filter ( self ):
+        bloom_filter = BloomFilter ( 10 * 1000 )
+        for no in range ( 1000 ):
+            bloom_filter.add ( BloomFilter.get_digest ( "http://a.com/{0}".format ( no ) ) )
+
+        self.assertTrue ( all ( BloomFilter.get_digest ( "http://a.com/{0}".format ( no ) ) in bloom_filter
+                                for no in range ( 1000 ) ) )
+        false_positives = sum ( BloomFilter.get_digest ( "http://b.com/{0}".format ( no ) ) in bloom_filter
+                                for no in range ( 10000 ) )
+        self.assertLess ( false_positives, 300 )
+
+    def test_graph_matches_url_graph_once_rows_are_evicted ( self ):
+        url_graph = UrlGraph ( )
+        for graph in (url_graph, self.graph):
+            root = UrlNode ( "http://a.com/", graph )
+            for no in range ( 1, 500 ):
+                urlnode = UrlNode ( "http://a.com/page{0}.html".format ( no ), graph )
+                UrlNode ( "http://a.com/page{0}.html".format ( (no - 1) // 3 ) if no > 3 else "http://a.com/",
+                          graph ).add_child ( urlnode )
+                # links back to pages whose rows have been evicted are not added again
+                self.assertFalse ( root.add_child ( UrlNode ( "http://a.com/page1.html", graph ) ) )
+                if no % 2:
+                    graph.mark_visited ( urlnode.url_id )
+
+        self.assertGreater ( self.graph.get_stats ( )[ 'written' ], 0 )
+        self.assertEqual ( len ( self.graph.rows ), len ( self.graph.cached_ids ) )
+        self.assertLessEqual ( len ( self.graph.rows ), 64 )
+
+        self.assertEqual ( len ( self.graph ), len ( url_graph ) )
+        self.assertEqual ( self.graph.get_visited_count ( ), url_graph.get_visited_count ( ) )
+        for url_id in range ( len ( url_graph ) ):
+            url = url_graph.get_url ( url_id )
+            self.assertEqual ( (self.graph.find_url ( url ), self.graph.get_url ( url_id )), (url_id, url) )
+            self.assertEqual ( self.graph.is_visited ( url_id ), url_graph.is_visited ( url_id ) )
+        self.assertIsNone ( self.graph.find_url ( "http://a.com/missing.html" ) )
+
+        self.assertFalse ( self.graph.mark_visited ( 1 ) )
+        self.assertTrue ( self.graph.mark_visited ( 2 ) )
+        self.assertEqual ( get_sitemap ( UrlNode ( None, self.graph, 0 ) ),
+                           get_sitemap ( UrlNode ( None, url_graph, 0 ) ) )
+
+        path = self.graph.path
+        self.assertTrue ( os.path.exists ( path ) )
+        self.graph.close ( )
+        self.assertFalse ( os.path.exists ( path ) )
+
+    def test_memory_bounded_crawl_builds_the_same_sitemap ( self ):
+        site = SyntheticSite ( num_pages=300, fan_out=4, seed=5, asset_ratio=0.2, error_rate=0.05 )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+
+        for order in ('bfs', 'priority'):
+            settings = { SYSTEM_PROXY: { }, TIMEOUT: 30, NUM_THREADS: 1, FRONTIER_ORDER: order }
+            expected_root = api.crawl ( domain_name, settings )
+
+            # the budget holds 64 urls and 2 urlnodes of the frontier in memory
+            crwlr = api.create_crawler ( api.get_crawl_cfg ( domain_name, {
+                **settings, MEMORY_BUDGET: 1024, GRAPH_PATH: "unused.graph.npz" } ) )
+            crwlr.start_url_parsing ( )
+            root = crwlr.release_urlparse_resources ( )
+
+            self.assertTrue ( crwlr.is_memory_bounded )
+            self.assertIsNone ( crwlr.cfg[ GRAPH_PATH ] )
+            self.assertGreater ( crwlr.frontier.spilled, 0 )
+            self.assertTrue ( crwlr.frontier.spill_file.file.closed )
+            self.assertEqual ( get_tree_urls ( root ), get_tree_urls ( expected_root ) )
+            self.assertEqual ( get_sitemap ( root ), get_sitemap ( expected_root ) )
+            root.graph.close ( )
+
+        server.stop ( )
+
+    def test_memory_bounded_async_crawl_closes_its_frontier ( self ):
+        site = SyntheticSite ( num_pages=300, fan_out=4, seed=5 )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+
+        crwlr = api.create_crawler ( api.get_crawl_cfg ( domain_name, {
+            SYSTEM_PROXY: { }, TIMEOUT: 30, ENGINE: 'async', MEMORY_BUDGET: 1024 } ) )
+        crwlr.start_url_parsing ( )
+        root = crwlr.release_urlparse_resources ( )
+        server.stop ( )
+
+        # the urlnodes spilled by the frontier are deleted at the end of the crawl, as with parse threads
+        self.assertTrue ( crwlr.is_memory_bounded )
+        self.assertGreater ( crwlr.frontier.spilled, 0 )
+        self.assertTrue ( crwlr.frontier.spill_file.file.closed )
+        self.assertEqual ( get_tree_urls ( root ), site.get_all_urls ( domain_name ) )
+        root.graph.close ( )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
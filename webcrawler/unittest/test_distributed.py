@@ -0,0 +1,74 @@
+import unittest
+
+import dflt_cfg
+from webcrawler.app_constant import *
+from webcrawler.distributed import FrontierCoordinator, RemoteFrontier
+from webcrawler.urlgraph import UrlGraph
+from webcrawler.urlparse import UrlNode
+
+
+class DistributedFrontierTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.saved_cfg = dict ( dflt_cfg.DFLT_CFG )
+        dflt_cfg.DFLT_CFG[ DOMAIN ] = "http://a.com/"
+
+        self.coordinator = FrontierCoordinator ( ('127.0.0.1', 0) )
+        self.address = self.coordinator.start ( )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.coordinator.stop ( )
+        dflt_cfg.DFLT_CFG.clear ( )
+        dflt_cfg.DFLT_CFG.update ( self.saved_cfg )
+
+    def test_links_are_enqueued_once_under_their_first_page ( self ):
+        url_graph = UrlGraph ( )
+        node1, node2 = RemoteFrontier ( self.address, url_graph ), RemoteFrontier ( self.address, url_graph )
+
+        root, depth = node1.get ( )
+        self.assertEqual ( (root.url, depth), ("http://a.com/", 0) )
+        self.assertTrue ( node1.put ( UrlNode ( "http://a.com/x", url_graph ), 1 ) )
+        self.assertFalse ( node1.put ( UrlNode ( "http://a.com/x", url_graph ), 1 ) )
+        node1.task_done ( )
+
+        x_node, depth = node2.get ( )
+        self.assertEqual ( (x_node.url, depth), ("http://a.com/x", 1) )
+        node2.put ( UrlNode ( "http://a.com/", url_graph ), 2 )
+        node2.task_done ( )
+
+        self.assertTrue ( self.coordinator.wait ( timeout=5 ) )
+        self.assertIsNone ( node1.get ( ) )
+        self.assertEqual ( [ child.url for child in self.coordinator.urlnode_parse_root.child_urls ], [ "http://a.com/x" ] )
+        self.assertEqual ( node1.get_stats ( )[ 'duplicates_suppressed' ], 1 )
+        self.assertEqual ( node2.get_stats ( )[ 'duplicates_suppressed' ], 1 )
+        node1.close ( )
+        node2.close ( )
+
+    def test_disconnected_node_does_not_block_the_crawl ( self ):
+        node = RemoteFrontier ( self.address, UrlGraph ( ) )
+        self.assertIsNotNone ( node.get ( ) )
+        self.assertFalse ( self.coordinator.wait ( timeout=0.2 ) )
+
+        # the node goes away while parsing the domain root
+        with self.assertLogs ( 'webcrawler.distributed', level='WARNING' ):
+            node.close ( )
+            self.assertTrue ( self.coordinator.wait ( timeout=5 ) )
+
+    def test_unreachable_coordinator_ends_the_crawl_of_node ( self ):
+        self.coordinator.stop ( )
+
+        node = RemoteFrontier ( self.address, UrlGraph ( ) )
+        with self.assertLogs ( 'webcrawler.distributed', level='ERROR' ):
+            self.assertIsNone ( node.get ( ) )
+        self.assertFalse ( node.put ( UrlNode ( "http://a.com/x", node.url_graph ), 1 ) )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
@@ -0,0 +1,164 @@
+import threading
+import time
+import unittest
+
+from webcrawler.frontier import Frontier
+from webcrawler.urlparse import UrlNode
+
+
+class FrontierTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.frontier = Frontier ( )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        pass
+
+    def test_get_returns_none_once_finished ( self ):
+        self.frontier.put ( "a" )
+        self.assertEqual ( self.frontier.get ( ), ("a", 0) )
+        self.assertFalse ( self.frontier.is_finished ( ) )
+
+        self.frontier.task_done ( )
+        self.assertTrue ( self.frontier.is_finished ( ) )
+        self.assertIsNone ( self.frontier.get ( ) )
+
+    def test_get_waits_for_in_flight_work ( self ):
+        self.frontier.put ( "parent" )
+        self.assertEqual ( self.frontier.get ( ), ("parent", 0) )
+
+        # a second worker has to wait, because "parent" may still discover children
+        results = [ ]
+        waiter = threading.Thread ( target=lambda: results.append ( self.frontier.get ( ) ) )
+        waiter.start ( )
+        waiter.join ( timeout=0.2 )
+        self.assertTrue ( waiter.is_alive ( ) )
+
+        self.frontier.put ( "child", 1 )
+        self.frontier.task_done ( )
+        waiter.join ( timeout=5 )
+        self.assertEqual ( results, [ ("child", 1) ] )
+
+    def test_waiting_workers_exit_when_finished ( self ):
+        self.frontier.put ( "a" )
+        self.frontier.get ( )
+
+        waiters = [ threading.Thread ( target=self.frontier.get ) for _ in range ( 4 ) ]
+        for waiter in waiters:
+            waiter.start ( )
+
+        self.frontier.task_done ( )
+        for waiter in waiters:
+            waiter.join ( timeout=5 )
+            self.assertFalse ( waiter.is_alive ( ) )
+
+    def test_held_frontier_waits_until_released ( self ):
+        self.frontier.hold ( )
+
+        # nothing is in-flight, but urlnodes can still be put while the frontier is held
+        results = [ ]
+        waiter = threading.Thread ( target=lambda: [ results.append ( self.frontier.get ( ) ) for _ in range ( 2 ) ] )
+        waiter.start ( )
+        waiter.join ( timeout=0.2 )
+        self.assertTrue ( waiter.is_alive ( ) )
+        self.assertFalse ( self.frontier.is_finished ( ) )
+
+        self.frontier.put ( "a" )
+        deadline = time.monotonic ( ) + 5
+        while not results and time.monotonic ( ) < deadline:
+            time.sleep ( 0.01 )
+        self.frontier.task_done ( )
+        self.assertTrue ( self.frontier.is_idle_now ( ) )
+
+        self.frontier.release ( )
+        waiter.join ( timeout=5 )
+        self.assertEqual ( results, [ ("a", 0), None ] )
+        self.assertTrue ( self.frontier.is_finished ( ) )
+
+    def test_urlnode_is_enqueued_once ( self ):
+        self.assertTrue ( self.frontier.put ( "a" ) )
+        self.assertFalse ( self.frontier.put ( "a", 3 ) )
+        self.frontier.get ( )
+        self.assertFalse ( self.frontier.put ( "a" ) )
+
+        self.assertEqual ( len ( self.frontier ), 0 )
+        self.assertEqual ( self.frontier.get_stats ( )[ 'duplicates_suppressed' ], 2 )
+
+    def test_max_depth ( self ):
+        frontier = Frontier ( max_depth=1 )
+        self.assertTrue ( frontier.put ( "a", 1 ) )
+        self.assertFalse ( frontier.put ( "b", 2 ) )
+        self.assertEqual ( frontier.get_stats ( )[ 'depth_limited' ], 1 )
+
+    def test_max_pages ( self ):
+        frontier = Frontier ( max_pages=2 )
+        for urlnode in "abc":
+            frontier.put ( urlnode )
+
+        self.assertEqual ( frontier.get ( ), ("a", 0) )
+        self.assertEqual ( frontier.get_nowait ( ), ("b", 0) )
+        self.assertIsNone ( frontier.get ( ) )
+        self.assertFalse ( frontier.is_finished ( ) )
+
+        frontier.task_done ( )
+        frontier.task_done ( )
+        self.assertTrue ( frontier.is_finished ( ) )
+        self.assertEqual ( frontier.get_stats ( )[ 'budget_exhausted' ], 'max pages' )
+
+    def test_max_time_releases_waiting_workers ( self ):
+        frontier = Frontier ( max_time=0.2 )
+        frontier.put ( "a" )
+        frontier.get ( )
+
+        # nothing to hand out while "a" is in-flight, until max_time runs out
+        start = time.monotonic ( )
+        self.assertIsNone ( frontier.get ( ) )
+        self.assertLess ( time.monotonic ( ) - start, 5 )
+        self.assertEqual ( frontier.get_stats ( )[ 'budget_exhausted' ], 'max time' )
+
+    def test_priority_order ( self ):
+        frontier = Frontier ( order=Frontier.ORDER_PRIORITY )
+        for url in ( "http://a.com/x/y/z.html", "http://a.com/x/", "http://a.com/x/y/", "http://a.com/" ):
+            frontier.put ( UrlNode ( url ) )
+
+        urls = [ frontier.get_nowait ( )[ 0 ].url for _ in range ( 4 ) ]
+        self.assertEqual ( urls, [ "http://a.com/", "http://a.com/x/", "http://a.com/x/y/", "http://a.com/x/y/z.html" ] )
+
+    def test_spilled_urlnodes_are_handed_out_in_order ( self ):
+        graph = UrlNode ( "http://a.com/" ).graph
+        urlnodes = [ UrlNode ( "http://a.com/{0}/{1}".format ( "/".join ( "s" * (no % 4) ), no ), graph )
+                     for no in range ( 60 ) ]
+        for order in (Frontier.ORDER_BFS, Frontier.ORDER_PRIORITY):
+            expected_frontier = Frontier ( order=order )
+            frontier = Frontier ( order=order, key=lambda urlnode: urlnode.url_id, max_queued=6,
+                                  load=lambda url_id: UrlNode ( None, graph, url_id ) )
+
+            # urlnodes are put while others are handed out, as in a crawl
+            handed_out, expected = [ ], [ ]
+            for no, urlnode in enumerate ( urlnodes ):
+                for each_frontier in (frontier, expected_frontier):
+                    each_frontier.put ( urlnode, no % 3 )
+                    each_frontier.put ( urlnode, no % 3 )
+                if no % 3 == 2:
+                    handed_out.append ( frontier.get_nowait ( ) )
+                    expected.append ( expected_frontier.get_nowait ( ) )
+                self.assertLessEqual ( len ( frontier.urlnodes ), 6 )
+                self.assertEqual ( len ( frontier ), len ( expected_frontier ) )
+
+            self.assertGreater ( frontier.spilled, 0 )
+            while len ( frontier ):
+                handed_out.append ( frontier.get_nowait ( ) )
+                expected.append ( expected_frontier.get_nowait ( ) )
+                self.assertLessEqual ( len ( frontier.urlnodes ), 6 )
+
+            self.assertEqual ( handed_out, expected )
+            self.assertEqual ( frontier.get_stats ( )[ 'pending' ], 0 )
+            self.assertEqual ( frontier.spill_file.size, 0 )
+            frontier.close ( )
@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import unittest
+
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+
+
+class LinkCheckTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.site = SyntheticSite ( num_pages=30, fan_out=3, seed=1, error_rate=0.1 )
+        # an external site, linked from the pages of the crawled one
+        self.external_site = SyntheticSite ( num_pages=3, fan_out=2 )
+        self.servers = [ LocalSiteServer ( self.site ), LocalSiteServer ( self.external_site ) ]
+        self.domain_name, self.external_name = [ server.start ( ) for server in self.servers ]
+
+        # the domain root links to a moved page, to external pages (one of them missing) and to a missing page
+        self.site.redirects[ '/moved.html' ] = '/page1.html'
+        self.external_urls = [ self.external_name + "page0.html", self.external_name + "missing.html" ]
+        self.site.pages[ '/' ] = self.site.get_page_body (
+            self.site.links[ '/' ] + [ '/moved.html', '/missing.html' ] + self.external_urls, is_root=True )
+
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        self.report_path = os.path.join ( self.output_dir.name, "output.txt.links.json" )
+        # never route localhost through a proxy
+        self.settings = { SYSTEM_PROXY: { }, TIMEOUT: 30, NUM_THREADS: 3, PROGRESS_INTERVAL: 0,
+                          LINK_REPORT_PATH: self.report_path }
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        for server in self.servers:
+            server.stop ( )
+        self.output_dir.cleanup ( )
+
+    def check_links ( self, settings ):
+        """
+        Crawls the site with a link check and returns the records of its report, keyed by url.
+        :param settings: settings of the crawl (dictionary keyed by app_constant)
+        :return: dict
+        """
+        api.crawl ( self.domain_name, { **self.settings, **settings } )
+        with open ( self.report_path ) as report_file:
+            report = json.load ( report_file )
+        return { record[ 'url' ]: record for record in report[ 'links' ] }
+
+    def test_broken_links_are_reported_with_their_referrers ( self ):
+        for engine in ('thread', 'async'):
+            records = self.check_links ( { ENGINE: engine } )
+
+            # every url of the site is checked once, however many pages link to it
+            domain_url = self.domain_name.rstrip ( '/' )
+            reachable_urls = self.site.get_reachable_urls ( self.domain_name )
+            self.assertTrue ( reachable_urls - { domain_url } <= set ( records ) )
+            for path in self.site.error_paths:
+                record = records[ domain_url + path ]
+                self.assertEqual ( record[ 'status' ], 500 )
+                # the pages linking to it, among the ones which could be crawled
+                self.assertEqual ( set ( record[ 'referrers' ] ), {
+                    (domain_url + page_path).replace ( domain_url + '/', self.domain_name ) for page_path, links
+                    in self.site.links.items ( ) if path in links and page_path not in self.site.error_paths
+                    and domain_url + page_path in reachable_urls } )
+
+            missing_record = records[ self.domain_name + "missing.html" ]
+            self.assertEqual ( (missing_record[ 'status' ], missing_record[ 'referrers' ]),
+                               (404, [ self.domain_name ]) )
+
+    def test_external_links_are_checked_without_their_body ( self ):
+        records = self.check_links ( { } )
+
+        external_records = [ records[ url ] for url in self.external_urls ]
+        self.assertEqual ( [ record[ 'status' ] for record in external_records ], [ 200, 404 ] )
+        self.assertTrue ( all ( record[ 'is_external' ] for record in external_records ) )
+        # the links of the external pages are not followed
+        self.assertEqual ( [ url for url, record in records.items ( ) if record[ 'is_external' ] ],
+                           sorted ( self.external_urls ) )
+        # a missing url is checked with HEAD, then with a GET request for its first byte
+        self.assertEqual ( sorted ( self.servers[ 1 ].requests ),
+                           [ ('GET', "/missing.html"), ('HEAD', "/missing.html"), ('HEAD', "/page0.html") ] )
+
+    def test_redirect_chain_and_refused_head ( self ):
+        self.external_site.is_head_refused = True
+        records = self.check_links ( { } )
+
+        moved_record = records[ self.domain_name + "moved.html" ]
+        self.assertEqual ( moved_record[ 'status' ], 200 )
+        self.assertEqual ( moved_record[ 'final_url' ], self.domain_name + "page1.html" )
+        self.assertEqual ( moved_record[ 'redirects' ], [ [ self.domain_name + "moved.html", 301 ] ] )
+
+        # a server refusing HEAD requests is checked with GET requests
+        external_record = records[ self.external_urls[ 0 ] ]
+        self.assertEqual ( (external_record[ 'status' ], external_record[ 'method' ]), (200, 'GET') )
+
+    def test_links_left_out_by_a_budget_are_checked ( self ):
+        records = self.check_links ( { MAX_DEPTH: 1 } )
+
+        # the pages beyond the maximum depth are not crawled, but the links to them are checked with HEAD
+        self.assertEqual ( records[ self.domain_name + "page0.html" ][ 'method' ], 'GET' )
+        self.assertEqual ( [ records[ self.domain_name + "page2.html" ][ key ] for key in ('status', 'method') ],
+                           [ 200, 'HEAD' ] )
+        self.assertNotIn ( self.domain_name + "page7.html", records )
+        self.assertEqual ( sum ( 1 for record in records.values ( ) if record[ 'status' ] is None ), 0 )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
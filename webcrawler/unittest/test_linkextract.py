@@ -0,0 +1,84 @@
+import unittest
+
+from webcrawler.linkextract import LinkExtractor
+
+PAGE_URL = "http://example.com/docs/index.html"
+
+
+def extract_links ( page, charset=None, chunk_size=None ):
+    """
+    :param page: bytes
+    :param charset: charset of the Content-Type header (str / None)
+    :param chunk_size: size of the chunks given to the extractor (int / None for the whole page at once)
+    :return: list of the links of page (str)
+    """
+    link_extractor = LinkExtractor ( PAGE_URL, charset )
+    chunk_size = chunk_size or len ( page ) or 1
+    links = [ ]
+    for pos in range ( 0, len ( page ), chunk_size ):
+        links.extend ( link_extractor.feed ( page[ pos:pos + chunk_size ] ) )
+    links.extend ( link_extractor.close ( ) )
+    return links
+
+
+class LinkExtractorTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        pass
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        pass
+
+    def test_links_are_resolved_against_page_url ( self ):
+        page = b'<a href="a.html">a</a> <A HREF=/b.html>b</A> <a class="x" href=\'../c.html?x=1&amp;y=2\'>c</a>'
+        self.assertEqual ( extract_links ( page ), [ "http://example.com/docs/a.html", "http://example.com/b.html",
+                                                     "http://example.com/c.html?x=1&y=2" ] )
+
+    def test_chunk_boundaries_do_not_change_links ( self ):
+        page = b'<html><!-- <a href="commented.html"> --><script>var s = "<a href=\'script.html\'>";</script>' + \
+               b'<a title="1 > 0" href="gt.html">x</a><link rel="stylesheet" href="/style.css">' + \
+               b'<map><area shape="rect" href="area.html"></map><a href="last.html">'
+        expected_links = [ "http://example.com/docs/gt.html", "http://example.com/style.css",
+                           "http://example.com/docs/area.html", "http://example.com/docs/last.html" ]
+
+        for chunk_size in (1, 2, 3, 7, 64, None):
+            self.assertEqual ( extract_links ( page, chunk_size=chunk_size ), expected_links )
+
+    def test_links_are_emitted_before_page_ends ( self ):
+        link_extractor = LinkExtractor ( PAGE_URL )
+        first_chunk = b'<a href="first.html">' + b' ' * 2048
+        self.assertEqual ( link_extractor.feed ( first_chunk ), [ "http://example.com/docs/first.html" ] )
+        self.assertEqual ( link_extractor.feed ( b'<a href="second.html">' ), [ "http://example.com/docs/second.html" ] )
+        self.assertEqual ( link_extractor.close ( ), [ ] )
+
+    def test_base_href ( self ):
+        page = b'<head><base href="http://cdn.example.com/root/"><base href="/ignored/"></head><a href="x.html">'
+        self.assertEqual ( extract_links ( page ), [ "http://cdn.example.com/root/x.html" ] )
+
+    def test_nofollow_and_non_document_links_are_skipped ( self ):
+        page = b'<a rel="external nofollow" href="n.html"><link rel="preconnect" href="//fonts.example.com">' + \
+               b'<a href="ok.html">'
+        link_extractor = LinkExtractor ( PAGE_URL )
+        links = link_extractor.feed ( page ) + link_extractor.close ( )
+        self.assertEqual ( links, [ "http://example.com/docs/ok.html" ] )
+        self.assertEqual ( link_extractor.nofollow_links, 1 )
+
+    def test_meta_charset ( self ):
+        page = '<meta charset="iso-8859-1"><a href="café.html">'.encode ( 'iso-8859-1' )
+        self.assertEqual ( extract_links ( page, chunk_size=5 ), [ "http://example.com/docs/café.html" ] )
+
+    def test_header_charset_takes_precedence ( self ):
+        page = '<meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1">' \
+               '<a href="über.html">'.encode ( 'utf-8' )
+        self.assertEqual ( extract_links ( page, charset="utf-8" ), [ "http://example.com/docs/über.html" ] )
+
+    def test_byte_order_mark ( self ):
+        page = '<a href="über.html">'.encode ( 'utf-16' )
+        self.assertEqual ( extract_links ( page, charset="iso-8859-1" ), [ "http://example.com/docs/über.html" ] )
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from webcrawler import api, linkgraph
+from webcrawler.app_constant import *
+from webcrawler.linkgraph import LinkGraph
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+
+# url ids 0 (the domain root) -> 1 -> 2 -> 1, 0 -> 3 -> 4, 5 is only listed by a sitemap and links to 0
+LINKS = { 0: [ 1, 3 ], 1: [ 2 ], 2: [ 1 ], 3: [ 4 ], 4: [ ], 5: [ 0 ] }
+
+
+def get_link_graph ( links ):
+    """
+    :param links: links of every url id. Format is: {url_id: [url_id, ...]}
+    :return: an instance of LinkGraph, whose url of id i is 'http://a.com/i'
+    """
+    indptr = [ 0 ]
+    for url_id in range ( len ( links ) ):
+        indptr.append ( indptr[ -1 ] + len ( links[ url_id ] ) )
+    return LinkGraph ( indptr, [ linked_id for url_id in range ( len ( links ) ) for linked_id in links[ url_id ] ],
+                       [ "http://a.com/{0}".format ( url_id ) for url_id in range ( len ( links ) ) ] )
+
+
+@unittest.skipUnless ( linkgraph.numpy, "numpy is not installed" )
+class LinkGraphTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.link_graph = get_link_graph ( LINKS )
+        self.output_dir = tempfile.mkdtemp ( )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        shutil.rmtree ( self.output_dir )
+
+    def test_depths_degrees_and_orphans ( self ):
+        self.assertEqual ( self.link_graph.get_click_depths ( ).tolist ( ), [ 0, 1, 2, 1, 2, -1 ] )
+        self.assertEqual ( self.link_graph.get_in_degrees ( ).tolist ( ), [ 1, 2, 1, 1, 1, 0 ] )
+        self.assertEqual ( self.link_graph.get_orphans ( ).tolist ( ), [ 5 ] )
+        self.assertEqual ( self.link_graph.get_near_orphans ( ).tolist ( ), [ 2, 3, 4 ] )
+        self.assertEqual ( self.link_graph.get_near_orphans ( max_links=2 ).tolist ( ), [ 1, 2, 3, 4 ] )
+
+    def test_strong_components ( self ):
+        for num_components, labels in (self.link_graph.get_strong_components ( ),
+                                       self.link_graph.get_strong_components_tarjan ( )):
+            self.assertEqual ( num_components, 5 )
+            self.assertEqual ( labels[ 1 ], labels[ 2 ] )
+            self.assertEqual ( len ( set ( labels[ [ 0, 1, 3, 4, 5 ] ].tolist ( ) ) ), 5 )
+
+    def test_pagerank ( self ):
+        # reference power iteration over the links, one page at a time
+        num_urls, damping = len ( LINKS ), 0.85
+        expected = [ 1.0 / num_urls ] * num_urls
+        for _ in range ( 200 ):
+            dangling_rank = sum ( expected[ url_id ] for url_id in LINKS if not LINKS[ url_id ] )
+            new_rank = [ (1 - damping) / num_urls + damping * dangling_rank / num_urls ] * num_urls
+            for url_id, linked_ids in LINKS.items ( ):
+                for linked_id in linked_ids:
+                    new_rank[ linked_id ] += damping * expected[ url_id ] / len ( linked_ids )
+            expected = new_rank
+
+        rank = self.link_graph.get_pagerank ( tolerance=1e-12 )
+        self.assertAlmostEqual ( rank.sum ( ), 1.0 )
+        for value, expected_value in zip ( rank.tolist ( ), expected ):
+            self.assertAlmostEqual ( value, expected_value, places=9 )
+
+    def test_crawl_writes_link_graph ( self ):
+        site = SyntheticSite ( num_pages=20, fan_out=3, seed=2 )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+        expected_links = { (domain_name + path[ 1: ], domain_name + linked_path[ 1: ])
+                           for path, linked_paths in site.links.items ( ) for linked_path in linked_paths
+                           if linked_path != path }
+
+        for engine in ('thread', 'async'):
+            graph_path = os.path.join ( self.output_dir, engine + ".graph.npz" )
+            crwlr = api.create_crawler ( api.get_crawl_cfg ( domain_name, {
+                SYSTEM_PROXY: { }, TIMEOUT: 30, ENGINE: engine, GRAPH_PATH: graph_path } ) )
+            crwlr.start_url_parsing ( )
+            crwlr.release_urlparse_resources ( )
+
+            link_graph = LinkGraph.load ( graph_path )
+            self.assertEqual ( link_graph.urls[ link_graph.root_id ], domain_name )
+            self.assertEqual ( set ( link_graph.urls ), site.get_all_urls ( domain_name ) )
+            self.assertEqual ( { (url, link_graph.urls[ linked_id ]) for url_id, url in enumerate ( link_graph.urls )
+                                 for linked_id in link_graph.indices[ link_graph.indptr[ url_id ]:
+                                                                      link_graph.indptr[ url_id + 1 ] ] },
+                               expected_links )
+            self.assertEqual ( crwlr.link_graph_size, (len ( link_graph.urls ), len ( expected_links )) )
+
+            summary = link_graph.get_summary ( link_graph.get_metrics ( ), top=3 )
+            self.assertEqual ( (summary[ 'crawled' ], summary[ 'unreachable' ], summary[ 'orphans' ]),
+                               (len ( link_graph.urls ), 0, 0) )
+            self.assertEqual ( len ( summary[ 'top_pagerank' ] ), 3 )
+
+        server.stop ( )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
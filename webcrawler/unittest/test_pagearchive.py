@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.pagearchive import PageArchive, PageArchiveReader
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+from webcrawler.unittest.test_crawl_engines import get_tree_urls
+
+
+class PageArchiveTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        self.archive_path = os.path.join ( self.output_dir.name, "output.txt.warc.gz" )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.output_dir.cleanup ( )
+
+    def test_responses_are_read_back_by_url ( self ):
+        archive = PageArchive ( self.archive_path )
+        archive.write_response ( "http://a.com/", 'GET', 200, [ ('Content-Type', 'text/html; charset=utf-8'),
+                                                                ('Transfer-Encoding', 'chunked') ], b'<a href="/x">' )
+        archive.write_response ( "http://a.com/x.pdf", 'HEAD', 200, [ ('Content-Type', 'application/pdf') ], b'' )
+        archive.write_response ( "http://a.com/y", 'GET', 200, [ ], b'first' )
+        archive.write_response ( "http://a.com/y", 'GET', 404, [ ], b'second' * 1000, is_truncated=True )
+        archive.write_response ( "http://a.com/y", 'HEAD', 200, [ ], b'' )
+        archive.close ( )
+        self.assertEqual ( archive.num_records, 5 )
+
+        # an interrupted crawl may leave an incomplete record and index line
+        with open ( self.archive_path + PageArchive.INDEX_SUFFIX, 'a' ) as index_file:
+            index_file.write ( "{0} 100 GET http://a.com/z\n123".format ( archive.size ) )
+
+        reader = PageArchiveReader ( self.archive_path )
+        self.assertEqual ( len ( reader ), 3 )
+        status, headers, body = reader.get ( "http://a.com/" )
+        self.assertEqual ( (status, headers.get_content_charset ( ), body), (200, 'utf-8', b'<a href="/x">') )
+        self.assertNotIn ( 'Transfer-Encoding', headers )
+        self.assertEqual ( reader.get ( "http://a.com/x.pdf" )[ 1 ].get_content_type ( ), 'application/pdf' )
+        # the last GET record of a url is read, not its HEAD record
+        self.assertEqual ( reader.get ( "http://a.com/y" )[ 0::2 ], (404, b'second' * 1000) )
+        self.assertIsNone ( reader.get ( "http://a.com/z" ) )
+        reader.close ( )
+
+    def test_replayed_crawl_builds_the_same_sitemap_offline ( self ):
+        site = SyntheticSite ( num_pages=30, fan_out=3, seed=4, asset_ratio=0.2, error_rate=0.1 )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+        site.redirects[ '/moved.html' ] = '/page1.html'
+        site.pages[ '/' ] = site.get_page_body ( site.links[ '/' ] + [ '/moved.html', '/missing.html' ],
+                                                 is_root=True )
+        settings = { SYSTEM_PROXY: { }, TIMEOUT: 30, ROBOTS: True }
+
+        live_urls = get_tree_urls ( api.crawl ( domain_name, { **settings, ARCHIVE_PATH: self.archive_path } ) )
+        num_requests = len ( server.requests )
+        server.stop ( )
+
+        for engine in ('thread', 'async'):
+            crwlr = api.create_crawler ( api.get_crawl_cfg ( domain_name, {
+                **settings, ENGINE: engine, REPLAY_PATH: self.archive_path } ) )
+            crwlr.start_url_parsing ( )
+            self.assertEqual ( get_tree_urls ( crwlr.release_urlparse_resources ( ) ), live_urls )
+
+            # every request of the live crawl is replayed (robots.txt, redirect, errors, HEAD of the assets)
+            self.assertEqual ( (crwlr.fetcher.num_replayed, crwlr.fetcher.num_missing), (num_requests, 0) )
+            self.assertEqual ( crwlr.get_crawl_stats ( )[ 'responses' ], num_requests )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
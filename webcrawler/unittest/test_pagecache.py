@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from webcrawler.pagecache import PageCache
+
+
+class PageCacheTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        self.path = os.path.join ( self.output_dir.name, "page_cache.sqlite3" )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.output_dir.cleanup ( )
+
+    def test_pages_are_kept_between_crawls ( self ):
+        cache = PageCache ( self.path )
+        self.assertIsNone ( cache.get ( "http://a.com/" ) )
+        cache.put ( "http://a.com/", '"v1"', None, [ "http://a.com/x", "http://a.com/y" ] )
+        cache.put ( "http://a.com/x", None, "Sat, 01 Jan 2022 00:00:00 GMT", [ ] )
+        cache.close ( )
+
+        cache = PageCache ( self.path )
+        self.assertEqual ( cache.get ( "http://a.com/" ), ('"v1"', None, [ "http://a.com/x", "http://a.com/y" ]) )
+        self.assertEqual ( cache.get ( "http://a.com/x" ), (None, "Sat, 01 Jan 2022 00:00:00 GMT", [ ]) )
+        cache.mark_hit ( "http://a.com/" )
+        cache.put ( "http://a.com/x", '"v2"', None, [ ] )
+
+        stats = cache.get_stats ( )
+        self.assertEqual ( (stats[ 'hits' ], stats[ 'misses' ], stats[ 'updated' ], stats[ 'pages' ]), (1, 0, 1, 2) )
+        cache.close ( )
+
+    def test_conditional_headers ( self ):
+        self.assertEqual ( PageCache.get_conditional_headers ( None ), { } )
+        self.assertEqual ( PageCache.get_conditional_headers ( ('"v1"', "Sat, 01 Jan 2022 00:00:00 GMT", [ ]) ),
+                           { 'If-None-Match': '"v1"', 'If-Modified-Since': "Sat, 01 Jan 2022 00:00:00 GMT" } )
+
+    def test_least_recently_used_pages_are_evicted ( self ):
+        cache = PageCache ( self.path, max_size=1000 )
+        links = [ "http://a.com/" + "x" * 80 ]
+        for page_no in range ( 20 ):
+            cache.put ( "http://a.com/page{0}".format ( page_no ), '"v"', None, links )
+            if page_no == 0:
+                cache.mark_hit ( "http://a.com/page0" )
+
+        # the cache never takes more than max_size, the oldest pages are evicted first
+        stats = cache.get_stats ( )
+        self.assertLessEqual ( stats[ 'size' ], 1000 )
+        self.assertEqual ( stats[ 'pages' ] + stats[ 'evicted' ], 20 )
+        self.assertIsNone ( cache.get ( "http://a.com/page1" ) )
+        self.assertIsNotNone ( cache.get ( "http://a.com/page19" ) )
+        cache.close ( )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
@@ -0,0 +1,89 @@
+import time
+import unittest
+
+from webcrawler.politeness import PolitenessScheduler
+
+
+class PolitenessSchedulerTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.url = "http://a.com/page.html"
+
+    def test_concurrency_grows_while_latency_holds ( self ):
+        scheduler = PolitenessScheduler ( max_concurrency=4 )
+        for _ in range ( 20 ):
+            host_key = scheduler.acquire ( self.url )
+            self.assertFalse ( scheduler.release ( host_key, 200, 0.01 ) )
+
+        self.assertEqual ( scheduler.get_stats ( )[ 'concurrency' ], { "http://a.com": 4 } )
+
+        # at most max_concurrency requests at once
+        host_keys = [ scheduler.try_acquire ( self.url ) for _ in range ( 5 ) ]
+        self.assertEqual ( [ wait_time for _, wait_time in host_keys ], [ 0, 0, 0, 0, None ] )
+
+    def test_throttled_request_is_retried_after_backoff ( self ):
+        scheduler = PolitenessScheduler ( max_concurrency=4, max_retries=1 )
+        for _ in range ( 20 ):
+            scheduler.release ( scheduler.acquire ( self.url ), 200, 0.01 )
+
+        host_key = scheduler.acquire ( self.url )
+        self.assertTrue ( scheduler.release ( host_key, 429, 0.01, retry_after="1" ) )
+        self.assertEqual ( scheduler.get_stats ( )[ 'concurrency' ], { "http://a.com": 2 } )
+
+        # the host is left alone for the time of its Retry-After header
+        _, wait_time = scheduler.try_acquire ( self.url )
+        self.assertGreater ( wait_time, 0.9 )
+
+        # the last attempt is not retried anymore
+        scheduler.hosts[ host_key ].backoff_until = 0.0
+        host_key = scheduler.acquire ( self.url )
+        self.assertFalse ( scheduler.release ( host_key, 503, 0.01, attempt=1 ) )
+        self.assertEqual ( scheduler.get_stats ( )[ 'throttled' ], 2 )
+
+    def test_concurrency_stays_below_throttling_level ( self ):
+        scheduler = PolitenessScheduler ( max_concurrency=8 )
+        for _ in range ( 100 ):
+            scheduler.release ( scheduler.acquire ( self.url ), 200, 0.01 )
+
+        # the host throttles the 6th request at once
+        host_keys = [ scheduler.acquire ( self.url ) for _ in range ( 6 ) ]
+        scheduler.release ( host_keys.pop ( ), 429, 0.01, retry_after="0" )
+        for host_key in host_keys:
+            scheduler.release ( host_key, 200, 0.01 )
+
+        for _ in range ( 100 ):
+            scheduler.release ( scheduler.acquire ( self.url ), 200, 0.01 )
+        self.assertEqual ( scheduler.get_stats ( )[ 'concurrency' ], { "http://a.com": 5 } )
+
+    def test_rate_and_crawl_delay_space_out_requests ( self ):
+        scheduler = PolitenessScheduler ( rate=100 )
+        scheduler.set_crawl_delay ( "http://b.com/", 0.05 )
+
+        start = time.monotonic ( )
+        for _ in range ( 3 ):
+            scheduler.release ( scheduler.acquire ( "http://b.com/x" ), 200, 0.001 )
+        self.assertGreaterEqual ( time.monotonic ( ) - start, 0.1 )
+
+        # the rate limit applies to a host without Crawl-delay
+        scheduler.release ( scheduler.acquire ( self.url ), 200, 0.001 )
+        _, wait_time = scheduler.try_acquire ( self.url )
+        self.assertLessEqual ( wait_time, 0.01 )
+
+    def test_backoff ( self ):
+        scheduler = PolitenessScheduler ( )
+        for errors in range ( 1, 10 ):
+            backoff = scheduler.get_backoff ( errors )
+            expected = min ( scheduler.MAX_BACKOFF, scheduler.BACKOFF_BASE * 2 ** (errors - 1) )
+            self.assertTrue ( expected / 2 <= backoff <= expected )
+
+        self.assertEqual ( PolitenessScheduler.parse_retry_after ( "120" ), 120.0 )
+        self.assertEqual ( PolitenessScheduler.parse_retry_after ( "Sat, 01 Jan 2000 00:00:00 GMT" ), 0.0 )
+        self.assertIsNone ( PolitenessScheduler.parse_retry_after ( "soon" ) )
+        self.assertEqual ( scheduler.get_backoff ( 1, "1000" ), scheduler.MAX_RETRY_AFTER )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
@@ -0,0 +1,86 @@
+import unittest
+
+from webcrawler.robots import RobotsRules
+
+ROBOTS_TXT = """
+# rules of every crawler
+User-agent: *
+Disallow: /private/
+Allow: /private/public.html
+Disallow: /*?sort=
+Disallow: /*.pdf$
+Crawl-delay: 1.5
+
+User-agent: Googlebot
+User-agent: mozilla
+Disallow: /nomozilla/
+Disallow: /both/
+Allow: /both/
+Request-rate: 1/4
+
+Sitemap: http://a.com/sitemap_index.xml
+Sitemap: http://a.com/news.xml.gz
+"""
+
+
+class RobotsRulesTestCase ( unittest.TestCase ):
+    def test_groups_of_the_user_agent_are_used_first ( self ):
+        rules = RobotsRules ( ROBOTS_TXT, "Mozilla/5.0" )
+        self.assertFalse ( rules.can_fetch ( "http://a.com/nomozilla/page.html" ) )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/private/page.html" ) )
+        self.assertEqual ( rules.crawl_delay, 4.0 )
+
+        other_rules = RobotsRules ( ROBOTS_TXT, "OtherBot/1.0" )
+        self.assertTrue ( other_rules.can_fetch ( "http://a.com/nomozilla/page.html" ) )
+        self.assertFalse ( other_rules.can_fetch ( "http://a.com/private/page.html" ) )
+        self.assertEqual ( other_rules.crawl_delay, 1.5 )
+
+    def test_empty_group_of_the_user_agent_is_used ( self ):
+        robots_txt = "User-agent: MOZILLA\nDisallow:\n\nUser-agent: *\nDisallow: /\n"
+        rules = RobotsRules ( robots_txt, "Mozilla/5.0" )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/page.html" ) )
+        self.assertFalse ( RobotsRules ( robots_txt, "OtherBot/1.0" ).can_fetch ( "http://a.com/page.html" ) )
+
+    def test_whole_product_token_is_matched ( self ):
+        for agent in ("a", "zilla", "mozillabot"):
+            robots_txt = "User-agent: {0}\nDisallow:\n\nUser-agent: *\nDisallow: /\n".format ( agent )
+            self.assertFalse ( RobotsRules ( robots_txt, "Mozilla/5.0" ).can_fetch ( "http://a.com/page.html" ) )
+
+    def test_longest_match_wins ( self ):
+        rules = RobotsRules ( ROBOTS_TXT, "OtherBot" )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/private/public.html" ) )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/private/public.html.bak" ) )
+        self.assertFalse ( rules.can_fetch ( "http://a.com/private/public.htm" ) )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/" ) )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/privatepage.html" ) )
+
+        # an Allow rule wins over a Disallow rule of the same length
+        self.assertTrue ( RobotsRules ( ROBOTS_TXT, "Mozilla" ).can_fetch ( "http://a.com/both/page.html" ) )
+
+    def test_wildcards ( self ):
+        rules = RobotsRules ( ROBOTS_TXT, "OtherBot" )
+        self.assertFalse ( rules.can_fetch ( "http://a.com/list.html?sort=name" ) )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/list.html?page=2" ) )
+        self.assertFalse ( rules.can_fetch ( "http://a.com/docs/report.pdf" ) )
+        self.assertTrue ( rules.can_fetch ( "http://a.com/docs/report.pdf.html" ) )
+
+    def test_percent_encoding ( self ):
+        rules = RobotsRules ( "User-agent: *\nDisallow: /caf%C3%A9/\nDisallow: /a b\n", "Mozilla/5.0" )
+        self.assertFalse ( rules.can_fetch ( "http://a.com/café/menu.html" ) )
+        self.assertFalse ( rules.can_fetch ( "http://a.com/caf%c3%a9/menu.html" ) )
+        self.assertFalse ( rules.can_fetch ( "http://a.com/a%20b.html" ) )
+
+    def test_sitemaps_and_invalid_lines ( self ):
+        rules = RobotsRules ( ROBOTS_TXT + "Crawl-delay: soon\nno colon here\nDisallow:\n", "Mozilla/5.0" )
+        self.assertEqual ( rules.sitemaps, [ "http://a.com/sitemap_index.xml", "http://a.com/news.xml.gz" ] )
+        self.assertEqual ( rules.crawl_delay, 4.0 )
+
+        # no robots.txt allows everything
+        empty_rules = RobotsRules ( "", "Mozilla/5.0" )
+        self.assertTrue ( empty_rules.can_fetch ( "http://a.com/private/" ) )
+        self.assertIsNone ( empty_rules.crawl_delay )
+        self.assertEqual ( empty_rules.sitemaps, [ ] )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
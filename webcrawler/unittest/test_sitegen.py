@@ -0,0 +1,73 @@
+import unittest
+
+from webcrawler.sitegen import SyntheticSite
+
+
+class SyntheticSiteTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.domain_name = "http://a.com/"
+
+    def get_depths ( self, site ):
+        """
+        :param site: an instance of SyntheticSite
+        :return: clicks between the domain root and every path of the site. Format is: {path_str: depth_int}
+        """
+        depths = { '/': 0 }
+        pending_paths = [ '/' ]
+        while pending_paths:
+            path = pending_paths.pop ( 0 )
+            for link in site.links.get ( path, ( ) ):
+                if link not in depths:
+                    depths[ link ] = depths[ path ] + 1
+                    pending_paths.append ( link )
+        return depths
+
+    def test_same_site_for_same_seed ( self ):
+        site_args = { 'num_pages': 50, 'fan_out': 3, 'page_size': 500, 'asset_ratio': 0.3, 'error_rate': 0.1 }
+        self.assertEqual ( SyntheticSite ( **site_args ).pages, SyntheticSite ( **site_args ).pages )
+        self.assertNotEqual ( SyntheticSite ( **site_args ).pages, SyntheticSite ( seed=1, **site_args ).pages )
+
+    def test_depth ( self ):
+        for depth in (1, 2, 3):
+            site = SyntheticSite ( num_pages=100, fan_out=3, depth=depth )
+            depths = self.get_depths ( site )
+            self.assertEqual ( len ( depths ), 101 )
+            self.assertEqual ( max ( depths.values ( ) ), depth )
+
+        # without depth, the pages form a complete tree (the cross links may only make them closer)
+        self.assertEqual ( max ( self.get_depths ( SyntheticSite ( num_pages=100, fan_out=3 ) ).values ( ) ), 5 )
+
+    def test_page_size_and_assets ( self ):
+        site = SyntheticSite ( num_pages=40, fan_out=3, page_size=1000, asset_ratio=0.2 )
+        assets = [ path for path in site.pages if path.startswith ( "/assets/" ) ]
+        self.assertEqual ( len ( assets ), 10 )
+        self.assertEqual ( { path.rsplit ( '.', 1 )[ 1 ] for path in assets }, set ( SyntheticSite.ASSET_EXTENSIONS ) )
+        self.assertTrue ( all ( len ( body ) >= 1000 for body in site.pages.values ( ) ) )
+
+        page = site.pages[ SyntheticSite.get_page_path ( 0 ) ]
+        self.assertIn ( b'<a href="/assets/file0.jpg">', page )
+        self.assertTrue ( page.endswith ( b"</p>\n</body></html>\n" ) )
+
+    def test_links_of_error_pages_are_not_reachable ( self ):
+        site = SyntheticSite ( num_pages=30, fan_out=1, error_rate=0.1 )
+        self.assertEqual ( len ( site.error_paths ), 3 )
+        self.assertNotIn ( SyntheticSite.get_page_path ( 0 ), site.error_paths )
+
+        # the pages linked only from error pages are not reachable, the error pages themselves may be
+        reachable_urls = site.get_reachable_urls ( self.domain_name )
+        reachable_paths = { url[ len ( self.domain_name ) - 1: ] for url in reachable_urls }
+        self.assertLess ( reachable_urls, site.get_all_urls ( self.domain_name ) )
+        self.assertTrue ( site.error_paths & reachable_paths )
+        for path in reachable_paths - { '/' }:
+            self.assertTrue ( any ( path in site.links[ parent_path ] for parent_path in reachable_paths
+                                    if parent_path not in site.error_paths ) )
+        self.assertEqual ( SyntheticSite ( num_pages=30, fan_out=1 ).get_reachable_urls ( self.domain_name ),
+                           site.get_all_urls ( self.domain_name ) )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
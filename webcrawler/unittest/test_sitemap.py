@@ -1,5 +1,14 @@
+import os
+import tempfile
 import unittest
 
+import dflt_cfg
+from webcrawler.app_constant import *
+from webcrawler.crawler import Crawler
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+from webcrawler.urlgraph import UrlGraph
+from webcrawler.urlparse import SitemapStream, UrlNode, UrlTree
+
 
 class SiteMapTestCase ( unittest.TestCase ):
     def setUp ( self ):
@@ -7,20 +16,112 @@ class SiteMapTestCase ( unittest.TestCase ):
         Method called before any unittest case
         :return:
         """
-        pass
+        self.saved_output_path = dflt_cfg.DFLT_CFG[ OUTPUT_PATH ]
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        self.output_path = os.path.join ( self.output_dir.name, "sitemap.txt" )
+        dflt_cfg.DFLT_CFG[ OUTPUT_PATH ] = self.output_path
 
     def tearDown ( self ):
         """
         Method called after every unittest case
         :return:
         """
-        pass
+        dflt_cfg.DFLT_CFG[ OUTPUT_PATH ] = self.saved_output_path
+        self.output_dir.cleanup ( )
+
+    def read_output ( self ):
+        with open ( self.output_path ) as output_fd:
+            return output_fd.read ( ).splitlines ( )
+
+    def serve_site ( self, site ):
+        """
+        Serves site from localhost and configures the crawl of it until the end of the unittest case.
+        :param site: an instance of SyntheticSite
+        :return: absolute url of the site root (str)
+        """
+        saved_cfg = dict ( dflt_cfg.DFLT_CFG )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+        self.addCleanup ( server.stop )
+        self.addCleanup ( dflt_cfg.DFLT_CFG.update, saved_cfg )
+
+        dflt_cfg.DFLT_CFG.update ( { DOMAIN: domain_name, SYSTEM_PROXY: { }, TIMEOUT: 30, NUM_THREADS: 4,
+                                     PROGRESS_INTERVAL: 0 } )
+        return domain_name
 
     def test_parse_site_urls ( self ):
-        self.assertEqual ( 1, 1 )
+        site = SyntheticSite ( num_pages=80, fan_out=3, page_size=2000, asset_ratio=0.2, error_rate=0.05 )
+        domain_name = self.serve_site ( site )
+
+        crwlr = Crawler ( )
+        with self.assertLogs ( 'webcrawler.crawler', level='ERROR' ):
+            crwlr.start_url_parsing ( )
+            root = crwlr.release_urlparse_resources ( )
+
+        # every reachable url is mapped once, under a page which links to it
+        tree_urls = [ root.url ]
+        pending_urlnodes = [ root ]
+        while pending_urlnodes:
+            url_node = pending_urlnodes.pop ( )
+            for child_urlnode in url_node.child_urls:
+                self.assertIn ( child_urlnode.url[ len ( domain_name ) - 1: ],
+                                site.links[ url_node.url[ len ( domain_name ) - 1: ] ] )
+                tree_urls.append ( child_urlnode.url )
+                pending_urlnodes.append ( child_urlnode )
+
+        self.assertEqual ( len ( tree_urls ), len ( set ( tree_urls ) ) )
+        self.assertEqual ( set ( tree_urls ), site.get_reachable_urls ( domain_name ) )
 
     def test_find_valid_links_in_urlpage ( self ):
-        self.assertTrue ( True )
+        site = SyntheticSite ( num_pages=20, fan_out=4, asset_ratio=0.5 )
+        domain_name = self.serve_site ( site )
+
+        crwlr = Crawler ( )
+        page_path = SyntheticSite.get_page_path ( 0 )
+        child_urls = [ child_urlnode.url for child_urlnode in
+                       crwlr.find_valid_urlchildnodes_in_urlpage ( domain_name + page_path[ 1: ] ) ]
+        crwlr.fetcher.close ( )
+
+        self.assertEqual ( sorted ( child_urls ), sorted ( { domain_name + path[ 1: ] for path in site.links[ page_path ] } ) )
 
     def test_config_urllib_proxy ( self ):
         self.assertFalse ( False )
+
+    def test_write_sitemap_in_depth_first_order ( self ):
+        graph = UrlGraph ( )
+        root = UrlNode ( "http://a.com/", graph )
+        for parent, child in (("", "b"), ("", "a"), ("b", "b/1"), ("a", "a/1"), ("a/1", "a/1/x")):
+            UrlNode ( "http://a.com/" + parent, graph ).add_child ( UrlNode ( "http://a.com/" + child, graph ) )
+
+        UrlTree ( root ).write_sitemap ( )
+        self.assertEqual ( self.read_output ( ), [ "http://a.com/", "....http://a.com/b", "........http://a.com/b/1",
+                                                   "....http://a.com/a", "........http://a.com/a/1",
+                                                   "............http://a.com/a/1/x" ] )
+
+    def test_write_deep_sitemap ( self ):
+        # far deeper than the recursion limit
+        graph = UrlGraph ( )
+        root = UrlNode ( "http://a.com/", graph )
+        parent = root
+        for level in range ( 1, 5000 ):
+            child = UrlNode ( "http://a.com/{0}".format ( level ), graph )
+            parent.add_child ( child )
+            parent = child
+
+        UrlTree ( root ).write_sitemap ( )
+        lines = self.read_output ( )
+        self.assertEqual ( len ( lines ), 5000 )
+        self.assertEqual ( lines[ -1 ], "." * 4 * 4999 + "http://a.com/4999" )
+
+    def test_sitemap_stream ( self ):
+        graph = UrlGraph ( )
+        root = UrlNode ( "http://a.com/", graph )
+        child = UrlNode ( "http://a.com/x", graph )
+
+        sitemap_stream = SitemapStream ( self.output_path )
+        sitemap_stream.write_record ( root, 0 )
+        sitemap_stream.write_record ( child, 1, root )
+        sitemap_stream.close ( )
+
+        self.assertEqual ( sitemap_stream.num_records, 2 )
+        self.assertEqual ( self.read_output ( ), [ "0\thttp://a.com/\t", "1\thttp://a.com/x\thttp://a.com/" ] )
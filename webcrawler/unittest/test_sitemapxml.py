@@ -0,0 +1,188 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from webcrawler.sitemapxml import SitemapReader, XmlSitemapWriter, get_lastmod
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+class XmlSitemapTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        self.output_path = os.path.join ( self.output_dir.name, "sitemap.txt" )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.output_dir.cleanup ( )
+
+    def parse ( self, path ):
+        """
+        :param path: path of a sitemap or sitemap index (str)
+        :return: root element of the XML document
+        """
+        opener = gzip.open if path.endswith ( '.gz' ) else open
+        with opener ( path, 'rb' ) as sitemap_fd:
+            return ElementTree.fromstring ( sitemap_fd.read ( ) )
+
+    def get_locs ( self, path ):
+        return [ loc.text for loc in self.parse ( path ).iter ( SITEMAP_NS + "loc" ) ]
+
+    def test_single_sitemap ( self ):
+        writer = XmlSitemapWriter ( self.output_path, "http://a.com" )
+        writer.write_url ( "http://a.com/", "2022-01-01T00:00:00+00:00" )
+        writer.write_url ( "http://a.com/q?a=1&b='2'" )
+
+        self.assertEqual ( writer.close ( ), [ os.path.join ( self.output_dir.name, "sitemap.xml" ) ] )
+        self.assertEqual ( os.listdir ( self.output_dir.name ), [ "sitemap.xml" ] )
+
+        urlset = self.parse ( writer.sitemap_path )
+        self.assertEqual ( urlset.tag, SITEMAP_NS + "urlset" )
+        self.assertEqual ( self.get_locs ( writer.sitemap_path ), [ "http://a.com/", "http://a.com/q?a=1&b='2'" ] )
+        self.assertEqual ( [ lastmod.text for lastmod in urlset.iter ( SITEMAP_NS + "lastmod" ) ],
+                           [ "2022-01-01T00:00:00+00:00" ] )
+
+    def test_shards_by_url_count ( self ):
+        urls = [ "http://a.com/page{0}.html".format ( page_no ) for page_no in range ( 25 ) ]
+        writer = XmlSitemapWriter ( self.output_path, "http://a.com/", compress=True, max_urls=10 )
+        for url in urls:
+            writer.write_url ( url )
+        sitemap_paths = writer.close ( )
+
+        # index first, then 3 gzipped shards of 10, 10 and 5 urls
+        self.assertEqual ( [ os.path.basename ( path ) for path in sitemap_paths ],
+                           [ "sitemap.xml.gz", "sitemap-1.xml.gz", "sitemap-2.xml.gz", "sitemap-3.xml.gz" ] )
+        self.assertEqual ( self.parse ( sitemap_paths[ 0 ] ).tag, SITEMAP_NS + "sitemapindex" )
+        self.assertEqual ( self.get_locs ( sitemap_paths[ 0 ] ),
+                           [ "http://a.com/" + os.path.basename ( path ) for path in sitemap_paths[ 1: ] ] )
+        self.assertEqual ( [ len ( self.get_locs ( path ) ) for path in sitemap_paths[ 1: ] ], [ 10, 10, 5 ] )
+        self.assertEqual ( sum ( (self.get_locs ( path ) for path in sitemap_paths[ 1: ]), [ ] ), urls )
+
+    def test_shards_by_size ( self ):
+        writer = XmlSitemapWriter ( self.output_path, "http://a.com/", max_bytes=400 )
+        for page_no in range ( 20 ):
+            writer.write_url ( "http://a.com/page{0}.html".format ( page_no ) )
+        sitemap_paths = writer.close ( )
+
+        self.assertGreater ( len ( sitemap_paths ), 2 )
+        for path in sitemap_paths[ 1: ]:
+            self.assertLessEqual ( os.path.getsize ( path ), 400 )
+        self.assertEqual ( sum ( len ( self.get_locs ( path ) ) for path in sitemap_paths[ 1: ] ), 20 )
+
+    def test_get_lastmod ( self ):
+        self.assertEqual ( get_lastmod ( "Sat, 01 Jan 2022 10:20:30 GMT" ), "2022-01-01T10:20:30+00:00" )
+        self.assertIsNone ( get_lastmod ( None ) )
+        self.assertIsNone ( get_lastmod ( "yesterday" ) )
+
+
+class FileResponse:
+    """
+    Response of SitemapReaderTestCase.fetch: the content of a file, read in small pieces like a slow download.
+    """
+    def __init__ ( self, url, status, body ):
+        self.url = url
+        self.status = status
+        self.body = io.BytesIO ( body )
+        self.is_closed = False
+
+    def getcode ( self ):
+        return self.status
+
+    def read1 ( self, amt ):
+        return self.body.read ( min ( amt, 100 ) )
+
+    def close ( self ):
+        self.is_closed = True
+
+
+class SitemapReaderTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.output_dir = tempfile.TemporaryDirectory ( )
+        self.output_path = os.path.join ( self.output_dir.name, "sitemap.txt" )
+        self.fetched_urls = [ ]
+        self.responses = [ ]
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        self.output_dir.cleanup ( )
+
+    def fetch ( self, url ):
+        """
+        Serves the files of self.output_dir at http://a.com/.
+        :param url: str
+        :return: an instance of FileResponse
+        """
+        self.fetched_urls.append ( url )
+        path = os.path.join ( self.output_dir.name, url.replace ( "http://a.com/", "" ) )
+        if not os.path.isfile ( path ):
+            return FileResponse ( url, 404, b'' )
+
+        with open ( path, 'rb' ) as file_fd:
+            response = FileResponse ( url, 200, file_fd.read ( ) )
+        self.responses.append ( response )
+        return response
+
+    def write_file ( self, name, content ):
+        with open ( os.path.join ( self.output_dir.name, name ), 'wb' ) as file_fd:
+            file_fd.write ( content )
+
+    def test_gzipped_sitemap_index ( self ):
+        urls = [ "http://a.com/page{0}.html".format ( page_no ) for page_no in range ( 25 ) ]
+        writer = XmlSitemapWriter ( self.output_path, "http://a.com/", compress=True, max_urls=10 )
+        for url in urls:
+            writer.write_url ( url )
+        writer.close ( )
+
+        # the index is listed twice and lists a missing sitemap: every sitemap is read once
+        self.write_file ( "missing.xml", XmlSitemapWriter.SITEMAPINDEX_START.encode ( 'utf-8' ) +
+                          b"<sitemap><loc>http://a.com/sitemap.xml.gz</loc></sitemap>"
+                          b"<sitemap><loc>http://a.com/none.xml</loc></sitemap>" +
+                          XmlSitemapWriter.SITEMAPINDEX_END.encode ( 'utf-8' ) )
+
+        reader = SitemapReader ( self.fetch )
+        with self.assertLogs ( 'webcrawler.sitemapxml', level='WARNING' ):
+            self.assertEqual ( list ( reader.read_urls ( [ "http://a.com/sitemap.xml.gz", "http://a.com/missing.xml" ] ) ),
+                               urls )
+        self.assertEqual ( sorted ( self.fetched_urls ), sorted ( set ( self.fetched_urls ) ) )
+        self.assertEqual ( (reader.num_sitemaps, reader.num_urls), (6, 25) )
+        self.assertTrue ( all ( response.is_closed for response in self.responses ) )
+
+    def test_invalid_and_oversized_sitemaps ( self ):
+        self.write_file ( "broken.xml", b'<urlset><url><loc>http://a.com/1</loc></url><url><loc>http://a' )
+        self.write_file ( "big.xml", XmlSitemapWriter.URLSET_START.encode ( 'utf-8' ) + b"".join (
+            "<url><loc>http://a.com/{0}</loc></url>\n".format ( url_no ).encode ( 'utf-8' ) for url_no in range ( 1000 ) ) )
+
+        # the urls parsed before the error, or before the size limit, are kept
+        reader = SitemapReader ( self.fetch, max_bytes=1000 )
+        with self.assertLogs ( 'webcrawler.sitemapxml', level='WARNING' ) as logs:
+            self.assertEqual ( list ( reader.read_urls ( [ "http://a.com/broken.xml" ] ) ), [ "http://a.com/1" ] )
+            big_urls = list ( reader.read_urls ( [ "http://a.com/big.xml" ] ) )
+        self.assertTrue ( 0 < len ( big_urls ) < 1000 )
+        self.assertEqual ( len ( logs.output ), 2 )
+
+        # no more than max_sitemaps sitemaps are read
+        reader = SitemapReader ( self.fetch, max_sitemaps=1 )
+        with self.assertLogs ( 'webcrawler.sitemapxml', level='WARNING' ):
+            self.assertEqual ( len ( list ( reader.read_urls ( [ "http://a.com/big.xml", "http://a.com/broken.xml" ] ) ) ),
+                               1000 )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
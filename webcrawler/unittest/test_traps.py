@@ -0,0 +1,101 @@
+import json
+import os
+import tempfile
+import unittest
+
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+from webcrawler.traps import TrapDetector, get_url_template
+from webcrawler.unittest.test_crawl_engines import get_tree_urls
+
+
+class TrapDetectorTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.trap_detector = TrapDetector ( max_segment_repeats=2, max_query_length=40, max_pages_per_template=2 )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        pass
+
+    def test_trap_urls ( self ):
+        self.assertEqual ( get_url_template ( "http://a.com/cal/2024/05?view=week&day=1" ), "/cal/{id}/{id}?day&view" )
+
+        long_query = "&".join ( "filter={0}".format ( n ) for n in range ( 10 ) )
+        self.assertEqual ( [ self.trap_detector.get_trap ( url ) for url in (
+            "http://a.com/a/b/a/b/", "http://a.com/a/b/a/b/a/", "http://a.com/search?" + long_query,
+            "http://a.com/item/1", "http://a.com/item/2", "http://a.com/item/3", "http://a.com/item/4?x=1") ],
+            [ None, 'repeated_segments', 'long_query', None, None, 'template_cap', None ] )
+        self.assertEqual ( self.trap_detector.get_stats ( ), { 'repeated_segments': 1, 'long_query': 1,
+                                                               'template_cap': 1, 'near_duplicates': 0,
+                                                               'fetches_avoided': 3 } )
+
+    def test_near_duplicate_pages ( self ):
+        text = "<p>{0}</p>".format ( " ".join ( "word{0}".format ( n ) for n in range ( 200 ) ) )
+        page = "<html><body>{0}<a href='?sid=1'>x</a><script>var now = 1;</script></body></html>"
+        fingerprints = [ self.trap_detector.get_fingerprint ( page.format ( body ), links ) for body, links in (
+            (text, [ "http://a.com/cal?sid=1" ]),
+            (text.replace ( "word7 ", "word7 today " ), [ "http://a.com/cal?sid=2" ]),
+            (text.replace ( "word", "term" ), [ "http://a.com/cal?sid=1" ])) ]
+
+        self.assertIsNone ( self.trap_detector.get_near_duplicate ( "http://a.com/1", fingerprints[ 0 ] ) )
+        self.assertEqual ( self.trap_detector.get_near_duplicate ( "http://a.com/2", fingerprints[ 1 ] ),
+                           "http://a.com/1" )
+        self.assertIsNone ( self.trap_detector.get_near_duplicate ( "http://a.com/3", fingerprints[ 2 ] ) )
+        self.assertEqual ( self.trap_detector.get_stats ( )[ 'near_duplicates' ], 1 )
+
+    def test_crawl_of_a_site_with_traps_finishes ( self ):
+        site = SyntheticSite ( num_pages=30, fan_out=3, seed=1, has_traps=True )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+
+        for engine in ('thread', 'async'):
+            del server.requests[ : ]
+            crwlr = api.create_crawler ( api.get_crawl_cfg ( domain_name, {
+                SYSTEM_PROXY: { }, TIMEOUT: 30, ENGINE: engine, TRAP_DETECTION: True } ) )
+            crwlr.start_url_parsing ( )
+            root = crwlr.release_urlparse_resources ( )
+
+            # the calendar months after the first one are near-duplicates, whose links are not followed, and the \
+            # directory nested three times is linked but not fetched
+            trap_urls = { domain_name + path for path in ("calendar?month=0", "calendar?month=1", "calendar?month=-1",
+                                                          "loop/", "loop/loop/", "loop/loop/loop/") }
+            self.assertEqual ( get_tree_urls ( root ), site.get_all_urls ( domain_name ) | trap_urls )
+            self.assertNotIn ( ('GET', "/loop/loop/loop/"), server.requests )
+
+            trap_stats = crwlr.get_crawl_stats ( )[ 'traps' ]
+            self.assertEqual ( trap_stats[ 'repeated_segments' ], 1 )
+            self.assertGreaterEqual ( trap_stats[ 'near_duplicates' ], 2 )
+            self.assertGreaterEqual ( trap_stats[ 'fetches_avoided' ], 3 )
+
+        server.stop ( )
+
+    def test_trap_urls_are_not_checked_by_the_link_check ( self ):
+        site = SyntheticSite ( num_pages=30, fan_out=3, seed=1, has_traps=True )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+
+        with tempfile.TemporaryDirectory ( ) as output_dir:
+            report_path = os.path.join ( output_dir, "output.txt.links.json" )
+            api.crawl ( domain_name, { SYSTEM_PROXY: { }, TIMEOUT: 30, TRAP_DETECTION: True,
+                                       LINK_REPORT_PATH: report_path } )
+            with open ( report_path ) as report_file:
+                report = json.load ( report_file )
+        server.stop ( )
+
+        # the trap url is reported as skipped, and neither the crawl nor the link check requests it
+        records = { record[ 'url' ]: record for record in report[ 'links' ] }
+        self.assertEqual ( records[ domain_name + "loop/loop/loop/" ][ 'skipped' ], "trap: repeated_segments" )
+        self.assertEqual ( report[ 'summary' ][ 'skipped' ], 1 )
+        self.assertFalse ( [ request for request in server.requests if request[ 1 ] == "/loop/loop/loop/" ] )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
@@ -0,0 +1,81 @@
+import unittest
+
+from webcrawler import api
+from webcrawler.app_constant import *
+from webcrawler.sitegen import LocalSiteServer, SyntheticSite
+from webcrawler.urlcanon import UrlCanonicalizer
+from webcrawler.unittest.test_crawl_engines import get_tree_urls
+
+PAGE_URL = "http://example.com/docs/index.html"
+
+
+class UrlCanonicalizerTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.canonicalizer = UrlCanonicalizer ( ignored_params=[ 'utm_*', 'gclid' ] )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        pass
+
+    def test_spellings_of_a_url_are_collapsed ( self ):
+        for url in ("http://example.com/a", "HTTP://Example.COM:80/a", "http://example.com/a#top",
+                    "http://example.com/docs/../a", "http://example.com/a?utm_source=x&gclid=1", "/a", "../a"):
+            self.assertEqual ( self.canonicalizer.canonicalize ( url, PAGE_URL ), "http://example.com/a" )
+
+        self.assertEqual ( self.canonicalizer.canonicalize ( "https://Example.com:443" ), "https://example.com/" )
+        self.assertEqual ( self.canonicalizer.canonicalize ( "http://user@[::1]:8080/a?b=1&utm_medium=2&c" ),
+                           "http://user@[::1]:8080/a?b=1&c" )
+
+    def test_relative_urls_are_resolved_against_the_page ( self ):
+        self.assertEqual ( self.canonicalizer.canonicalize ( "b.html", PAGE_URL ), "http://example.com/docs/b.html" )
+        self.assertEqual ( self.canonicalizer.canonicalize ( "?page=2", PAGE_URL ),
+                           "http://example.com/docs/index.html?page=2" )
+
+    def test_non_http_urls_are_rejected ( self ):
+        for url in ("mailto:a@example.com", "javascript:void(0)", "ftp://example.com/a", "http://[::1/a"):
+            self.assertIsNone ( self.canonicalizer.canonicalize ( url, PAGE_URL ) )
+
+    def test_configurable_rules ( self ):
+        strip = UrlCanonicalizer ( trailing_slash='strip', sort_query=True )
+        self.assertEqual ( strip.canonicalize ( "http://a.com/x/?b=2&a=1&b=1" ), "http://a.com/x?a=1&b=2&b=1" )
+        self.assertEqual ( strip.canonicalize ( "http://a.com/" ), "http://a.com/" )
+        # tracking parameters are only removed if configured
+        self.assertEqual ( strip.canonicalize ( "http://a.com/x?utm_source=y" ), "http://a.com/x?utm_source=y" )
+
+        add = UrlCanonicalizer ( trailing_slash='add' )
+        self.assertEqual ( [ add.canonicalize ( url ) for url in ("http://a.com/x", "http://a.com/x.html") ],
+                           [ "http://a.com/x/", "http://a.com/x.html" ] )
+        self.assertRaises ( ValueError, UrlCanonicalizer, trailing_slash='remove' )
+
+    def test_memo_is_bounded ( self ):
+        canonicalizer = UrlCanonicalizer ( memo_size=2 )
+        for url in ("http://a.com/1", "http://a.com/2", "http://a.com/1", "http://a.com/3"):
+            canonicalizer.canonicalize ( url )
+        self.assertEqual ( canonicalizer.get_memo_stats ( ), { 'hits': 1, 'misses': 3, 'size': 2 } )
+
+    def test_crawl_collapses_duplicate_urls ( self ):
+        site = SyntheticSite ( num_pages=10, fan_out=3 )
+        server = LocalSiteServer ( site )
+        domain_name = server.start ( )
+        host = domain_name.split ( '/' )[ 2 ]
+
+        # the domain root links to other spellings of its pages, which the server does not know
+        site.pages[ '/' ] = site.get_page_body ( site.links[ '/' ] + [
+            "HTTP://{0}/page0.html#top".format ( host.upper ( ) ), "/page1.html?utm_source=feed", "/page2.html/",
+            "/x/../page3.html" ], is_root=True )
+        root = api.crawl ( domain_name, { SYSTEM_PROXY: { }, TIMEOUT: 30, URL_TRAILING_SLASH: 'strip' } )
+        server.stop ( )
+
+        self.assertEqual ( get_tree_urls ( root ), site.get_all_urls ( domain_name ) )
+        self.assertFalse ( any ( path != '/' and path.endswith ( '/' ) for path, _ in server.requests ) )
+
+
+if __name__ == '__main__':
+    unittest.main ( )
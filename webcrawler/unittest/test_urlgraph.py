@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+from webcrawler.urlgraph import UrlGraph
+from webcrawler.urlparse import UrlNode
+
+
+class UrlGraphTestCase ( unittest.TestCase ):
+    def setUp ( self ):
+        """
+        Method called before any unittest case
+        :return:
+        """
+        self.graph = UrlGraph ( )
+
+    def tearDown ( self ):
+        """
+        Method called after every unittest case
+        :return:
+        """
+        pass
+
+    def test_urls_are_interned_once ( self ):
+        urls = [ "http://a.com/", "http://a.com/x/y.html?q=1", "https://a.com/x/y.html", "http://b.com:8080/",
+                 "http://b.com" ]
+        url_ids = [ self.graph.intern_url ( url ) for url in urls ]
+
+        self.assertEqual ( url_ids, list ( range ( len ( urls ) ) ) )
+        self.assertEqual ( [ self.graph.intern_url ( url ) for url in urls ], url_ids )
+        self.assertEqual ( [ self.graph.get_url ( url_id ) for url_id in url_ids ], urls )
+        self.assertEqual ( len ( self.graph ), len ( urls ) )
+
+        # the scheme and host are stored once per host
+        self.assertEqual ( self.graph.prefixes, [ "http://a.com", "https://a.com", "http://b.com:8080", "http://b.com" ] )
+
+    def test_interning_is_thread_safe ( self ):
+        urls = [ "http://a.com/page{0}.html".format ( page_no ) for page_no in range ( 500 ) ]
+        results = [ ]
+        threads = [ threading.Thread ( target=lambda: results.append ( [ self.graph.intern_url ( url ) for url in urls ] ) )
+                    for _ in range ( 4 ) ]
+        for th in threads: th.start ( )
+        for th in threads: th.join ( )
+
+        self.assertEqual ( len ( self.graph ), len ( urls ) )
+        self.assertTrue ( all ( url_ids == results[ 0 ] for url_ids in results ) )
+
+    def test_children_in_discovery_order ( self ):
+        root, a, b, c = (self.graph.intern_url ( "http://a.com/" + name ) for name in ("", "a", "b", "c"))
+
+        self.assertTrue ( self.graph.link ( root, b ) )
+        self.assertTrue ( self.graph.link ( root, a ) )
+        self.assertTrue ( self.graph.link ( a, c ) )
+        self.assertEqual ( list ( self.graph.get_child_ids ( root ) ), [ a, b ] )
+
+        # a url appears once in the sitemap: it stays under the first page which linked to it
+        self.assertFalse ( self.graph.link ( b, c ) )
+        self.assertEqual ( list ( self.graph.get_child_ids ( a ) ), [ c ] )
+        self.assertEqual ( list ( self.graph.get_child_ids ( b ) ), [ ] )
+
+        # the children index follows new links and new urls
+        d = self.graph.intern_url ( "http://a.com/d" )
+        self.assertEqual ( list ( self.graph.get_child_ids ( d ) ), [ ] )
+        self.graph.link ( b, d )
+        self.assertEqual ( list ( self.graph.get_child_ids ( b ) ), [ d ] )
+
+    def test_visited_flags ( self ):
+        url_id = self.graph.intern_url ( "http://a.com/" )
+        self.assertFalse ( self.graph.is_visited ( url_id ) )
+        self.assertTrue ( self.graph.mark_visited ( url_id ) )
+        self.assertFalse ( self.graph.mark_visited ( url_id ) )
+        self.assertTrue ( self.graph.is_visited ( url_id ) )
+        self.assertEqual ( self.graph.get_visited_count ( ), 1 )
+
+    def test_urlnode_is_a_view ( self ):
+        root = UrlNode ( "http://a.com/", self.graph )
+        child = UrlNode ( "http://a.com/x.html", self.graph )
+        self.assertTrue ( root.add_child ( child ) )
+
+        self.assertEqual ( UrlNode ( "http://a.com/", self.graph ), root )
+        self.assertEqual ( len ( { root, UrlNode ( "http://a.com/", self.graph ) } ), 1 )
+        self.assertEqual ( root.child_urls, [ child ] )
+        self.assertEqual ( root.child_urls[ 0 ].url, "http://a.com/x.html" )
+
+        # a urlnode created without a graph gets its own one
+        self.assertNotEqual ( UrlNode ( "http://a.com/" ), root )
+        self.assertEqual ( UrlNode ( "http://a.com/" ).url, "http://a.com/" )
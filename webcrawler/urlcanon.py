@@ -0,0 +1,143 @@
+# References:
+# 1. RFC 3986 - Normalization and Comparison: https://tools.ietf.org/html/rfc3986#section-6
+# 2. RFC 3986 - Remove Dot Segments: https://tools.ietf.org/html/rfc3986#section-5.2.4
+# 3. https://docs.python.org/3/library/functools.html#functools.lru_cache
+
+import fnmatch
+import functools
+import re
+from urllib.parse import urljoin, urlsplit
+
+# port of every crawled scheme which is dropped from its urls
+DEFAULT_PORTS = { 'http': '80', 'https': '443' }
+
+# rules for the trailing slash of the path of a url: keep it as it is, strip it (the root path excepted), or add it \
+# to the paths whose last segment has no extension (e.g; /a -> /a/, but not /a.html)
+TRAILING_SLASH_RULES = ('keep', 'strip', 'add')
+
+
+def get_canonical_netloc ( scheme, netloc ):
+    """
+    :param scheme: lowercase scheme of the url (str)
+    :param netloc: [user@]host[:port] (str)
+    :return: netloc with a lowercase host and without the default port of scheme (str)
+    """
+    user, at, host_port = netloc.rpartition ( '@' )
+    host, colon, port = host_port.rpartition ( ':' )
+    # no port, or an IPv6 address without a port
+    if not colon or ']' in port:
+        host, port = host_port, ''
+
+    host = host.lower ( ).rstrip ( '.' )
+    if port and port != DEFAULT_PORTS.get ( scheme ):
+        host += ':' + port
+    return user + at + host
+
+
+def remove_dot_segments ( path ):
+    """
+    :param path: absolute path (str)
+    :return: path without its '.' and '..' segments (str)
+    """
+    segments = [ ]
+    for segment in path.split ( '/' )[ 1: ]:
+        if segment == '..':
+            if segments: segments.pop ( )
+        elif segment != '.':
+            segments.append ( segment )
+
+    if path.endswith ( ('/.', '/..') ):
+        segments.append ( '' )
+    return '/' + '/'.join ( segments )
+
+
+class UrlCanonicalizer:
+    """
+    This class turns every spelling of a url into one canonical url, so that the variants of a page (e.g; /a, \
+    HTTP://Host:80/a and /a?utm_source=x) are crawled once: it resolves the url against the page which links to \
+    it, drops its fragment, lowercases its scheme and host, drops the default port, removes the dot segments of \
+    its path and applies the configured rules for trailing slashes, ignored query parameters (e.g; tracking \
+    parameters) and the order of query parameters. The canonical urls of the last memo_size urls are memoized, as \
+    a page links to the same urls (menus, footers) as the other pages of its site. It is thread safe.
+    """
+    def __init__ ( self, trailing_slash='keep', sort_query=False, ignored_params=( ), memo_size=100000 ):
+        """
+        :param trailing_slash: 'keep', 'strip' or 'add', see TRAILING_SLASH_RULES (str)
+        :param sort_query: True to sort the query parameters by name (bool)
+        :param ignored_params: names of the query parameters removed from the urls, where '*' matches any \
+                               characters (e.g; 'utm_*') (iterable of str)
+        :param memo_size: maximum number of urls whose canonical url is memoized (int >= 0)
+        :raises ValueError: if trailing_slash is not a rule of TRAILING_SLASH_RULES
+        """
+        if trailing_slash not in TRAILING_SLASH_RULES:
+            raise ValueError ( "Trailing slash rule {0} is not one of {1}".format ( trailing_slash,
+                                                                                  TRAILING_SLASH_RULES ) )
+        self.trailing_slash = trailing_slash
+        self.sort_query = sort_query
+
+        ignored_params = list ( ignored_params )
+        self.ignored_param = re.compile ( '|'.join ( fnmatch.translate ( param ) for param in ignored_params ) ) \
+            if ignored_params else None
+
+        # least recently used memo of the canonical urls of absolute urls
+        self.get_memoized_url = functools.lru_cache ( maxsize=memo_size ) ( self.get_canonical_url )
+
+    def canonicalize ( self, url, base_url=None ):
+        """
+        :param url: absolute url, or url relative to base_url (str)
+        :param base_url: absolute url of the page which links to url (str / None)
+        :return: canonical absolute url (str) / None if url is not a http or https url
+        """
+        if base_url is not None and not url.startswith ( ('http://', 'https://') ):
+            url = urljoin ( base_url, url )
+        return self.get_memoized_url ( url )
+
+    def get_canonical_url ( self, url ):
+        """
+        :param url: absolute url (str)
+        :return: canonical url (str) / None if url is not a http or https url
+        """
+        try:
+            scheme, netloc, path, query, _ = urlsplit ( url )
+        except ValueError:
+            # e.g; an invalid IPv6 host
+            return None
+
+        scheme = scheme.lower ( )
+        if scheme not in DEFAULT_PORTS or not netloc: return None
+
+        netloc = get_canonical_netloc ( scheme, netloc )
+
+        if '/.' in path:
+            path = remove_dot_segments ( path )
+        if not path:
+            path = '/'
+        elif self.trailing_slash == 'strip' and len ( path ) > 1 and path.endswith ( '/' ):
+            path = path.rstrip ( '/' ) or '/'
+        elif self.trailing_slash == 'add' and not path.endswith ( '/' ) and '.' not in path.rsplit ( '/', 1 )[ 1 ]:
+            path += '/'
+
+        if query:
+            query = self.get_canonical_query ( query )
+
+        return "{0}://{1}{2}{3}{4}".format ( scheme, netloc, path, '?' if query else '', query )
+
+    def get_canonical_query ( self, query ):
+        """
+        :param query: query of a url, without '?' (str)
+        :return: query without its ignored parameters nor empty parameters, sorted if asked for (str)
+        """
+        params = [ param for param in query.split ( '&' ) if param ]
+        if self.ignored_param:
+            params = [ param for param in params if not self.ignored_param.match ( param.split ( '=', 1 )[ 0 ] ) ]
+        if self.sort_query:
+            # sorting is stable, so the parameters of the same name keep their order
+            params.sort ( key=lambda param: param.split ( '=', 1 )[ 0 ] )
+        return '&'.join ( params )
+
+    def get_memo_stats ( self ):
+        """
+        :return: {'hits': int, 'misses': int, 'size': int} (dict)
+        """
+        memo_info = self.get_memoized_url.cache_info ( )
+        return { 'hits': memo_info.hits, 'misses': memo_info.misses, 'size': memo_info.currsize }
@@ -0,0 +1,226 @@
+# References:
+# 1. https://docs.python.org/3/library/array.html
+# 2. Compressed sparse row (CSR) adjacency: https://en.wikipedia.org/wiki/Sparse_matrix#Compressed_sparse_row_(CSR,_CRS_or_Yale_format)
+
+import threading
+from array import array
+
+
+class UrlGraph:
+    """
+    This class holds every url discovered by a crawl and the links of the sitemap between them, without one \
+    Python object per url. Every url is interned once and gets an integer id: the "scheme://host" prefix is stored \
+    once per host and only the rest of the url (path and query) is kept per url. The sitemap is a tree (every url \
+    appears once, under the first page which linked to it), so its links are stored as an array of parent ids; \
+    the children of every url are indexed from it in compressed sparse row form when they are read. \
+    The visited flags of the crawl are kept in a bytearray indexed by id. Every link found on the pages (not only \
+    the links of the sitemap) can be recorded too, as two arrays of source and target ids (see add_edge), to \
+    export the link graph of the site. It is thread safe.
+    """
+    # parent id of an url which is not linked under any page (e.g; the domain root)
+    NO_PARENT = -1
+
+    def __init__ ( self ):
+        self.mutex = threading.Lock ( )
+
+        # distinct "scheme://host[:port]" prefixes and their ids. Format is: {prefix_str: prefix_id}
+        self.prefixes = [ ]
+        self.prefix_ids = dict ( )
+
+        # ids of the urls of every prefix, keyed by the rest of the url. Format is: {prefix_id: {rest_str: url_id}}
+        self.url_ids = dict ( )
+
+        # per url id: its prefix id, the rest of the url, its parent id in the sitemap and its visited flag
+        self.url_prefixes = array ( 'I' )
+        self.url_rests = [ ]
+        self.parents = array ( 'i' )
+        self.visited = bytearray ( )
+
+        # number of links (urls with a parent) and the children index built for that number of links
+        self.num_links = 0
+        self.children_index = None
+        self.children_index_links = -1
+
+        # links found on the pages, recorded by add_edge: the i-th link goes from edge_sources[i] to edge_targets[i]
+        self.edge_sources = array ( 'I' )
+        self.edge_targets = array ( 'I' )
+
+    @staticmethod
+    def split_url ( url ):
+        """
+        :param url: absolute url (str)
+        :return: a 2-tuple ("scheme://host[:port]" (str), rest of the url (str))
+        """
+        host_start = url.find ( '://' )
+        host_start = host_start + 3 if host_start >= 0 else 0
+        rest_start = url.find ( '/', host_start )
+        if rest_start < 0:
+            return url, ''
+        return url[ :rest_start ], url[ rest_start: ]
+
+    def intern_url ( self, url ):
+        """
+        Returns the id of url, adding url to the graph if it is not there yet.
+        :param url: absolute url (str)
+        :return: url id (int)
+        """
+        prefix, rest = self.split_url ( url )
+        with self.mutex:
+            prefix_id = self.prefix_ids.get ( prefix )
+            if prefix_id is None:
+                prefix_id = len ( self.prefixes )
+                self.prefixes.append ( prefix )
+                self.prefix_ids[ prefix ] = prefix_id
+                self.url_ids[ prefix_id ] = dict ( )
+
+            rest_ids = self.url_ids[ prefix_id ]
+            url_id = rest_ids.get ( rest )
+            if url_id is None:
+                url_id = len ( self.url_rests )
+                rest_ids[ rest ] = url_id
+                self.url_prefixes.append ( prefix_id )
+                self.url_rests.append ( rest )
+                self.parents.append ( self.NO_PARENT )
+                self.visited.append ( 0 )
+
+            return url_id
+
+    def find_url ( self, url ):
+        """
+        :param url: absolute url (str)
+        :return: url id (int) / None if url is not in the graph
+        """
+        prefix, rest = self.split_url ( url )
+        with self.mutex:
+            prefix_id = self.prefix_ids.get ( prefix )
+            return None if prefix_id is None else self.url_ids[ prefix_id ].get ( rest )
+
+    def get_url ( self, url_id ):
+        """
+        :param url_id: int
+        :return: url (str)
+        """
+        return self.prefixes[ self.url_prefixes[ url_id ] ] + self.url_rests[ url_id ]
+
+    def get_urls ( self ):
+        """
+        :return: every url of the graph, indexed by url id (list of str)
+        """
+        with self.mutex:
+            return [ self.prefixes[ prefix_id ] + rest for prefix_id, rest in zip ( self.url_prefixes,
+                                                                                  self.url_rests ) ]
+
+    def add_edge ( self, source_id, target_id ):
+        """
+        Records a link found on the page source_id to target_id, whether it is in the sitemap or not. A page may \
+        link several times to the same url, so the same edge may be recorded more than once.
+        :param source_id: int
+        :param target_id: int
+        :return:
+        """
+        with self.mutex:
+            self.edge_sources.append ( source_id )
+            self.edge_targets.append ( target_id )
+
+    def link ( self, parent_id, child_id ):
+        """
+        Links child_id under parent_id in the sitemap, unless child_id is already linked under a page.
+        :param parent_id: int
+        :param child_id: int
+        :return: True if the link has been added (bool)
+        """
+        with self.mutex:
+            if self.parents[ child_id ] != self.NO_PARENT: return False
+            self.parents[ child_id ] = parent_id
+            self.num_links += 1
+            return True
+
+    def get_child_ids ( self, url_id ):
+        """
+        Returns the ids of the children of url_id in the sitemap, in discovery order.
+        :param url_id: int
+        :return: array of int
+        """
+        offsets, children = self.get_children_index ( )
+        if url_id + 1 >= len ( offsets ):  # url interned after the index was built, it has no child yet
+            return children[ 0:0 ]
+        return children[ offsets[ url_id ]:offsets[ url_id + 1 ] ]
+
+    def get_children_lookup ( self ):
+        """
+        Returns a function giving the children of an url id like get_child_ids, from one children index, to walk \
+        the whole sitemap without checking the index for every url.
+        :return: function returning the ids of the children of an url id (array of int)
+        """
+        offsets, children = self.get_children_index ( )
+        num_indexed = len ( offsets ) - 1
+
+        def get_child_ids ( url_id ):
+            if url_id >= num_indexed:  # url interned after the index was built, it has no child yet
+                return children[ 0:0 ]
+            return children[ offsets[ url_id ]:offsets[ url_id + 1 ] ]
+
+        return get_child_ids
+
+    def get_children_index ( self ):
+        """
+        Returns the children index of the current links (see build_children_index), building it if needed.
+        :return: a 2-tuple (offsets (array of int), children (array of int))
+        """
+        with self.mutex:
+            if self.children_index_links != self.num_links:
+                self.children_index = self.build_children_index ( )
+                self.children_index_links = self.num_links
+            return self.children_index
+
+    def build_children_index ( self ):
+        """
+        Builds the compressed sparse row index of the children of every url: the children of url id i are \
+        children[offsets[i]:offsets[i + 1]]. It has to be called with self.mutex held.
+        :return: a 2-tuple (offsets (array of int), children (array of int))
+        """
+        num_urls = len ( self.parents )
+        offsets = array ( 'I', bytes ( 4 * (num_urls + 1) ) )
+        for parent_id in self.parents:
+            if parent_id != self.NO_PARENT:
+                offsets[ parent_id + 1 ] += 1
+        for url_id in range ( num_urls ):
+            offsets[ url_id + 1 ] += offsets[ url_id ]
+
+        # child ids are visited in increasing order, which is the order in which they have been discovered
+        children = array ( 'I', bytes ( 4 * self.num_links ) )
+        next_slots = array ( 'I', offsets[ :num_urls ] )
+        for child_id, parent_id in enumerate ( self.parents ):
+            if parent_id != self.NO_PARENT:
+                children[ next_slots[ parent_id ] ] = child_id
+                next_slots[ parent_id ] += 1
+
+        return offsets, children
+
+    def mark_visited ( self, url_id ):
+        """
+        Marks url_id as visited. Checking and marking is atomic, so that only one caller gets True for an url.
+        :param url_id: int
+        :return: True if url_id had not been visited yet (bool)
+        """
+        with self.mutex:
+            if self.visited[ url_id ]: return False
+            self.visited[ url_id ] = 1
+            return True
+
+    def is_visited ( self, url_id ):
+        """
+        :param url_id: int
+        :return: bool
+        """
+        return bool ( self.visited[ url_id ] )
+
+    def get_visited_count ( self ):
+        """
+        :return: number of visited urls (int)
+        """
+        with self.mutex:
+            return len ( self.visited ) - self.visited.count ( 0 )
+
+    def __len__ ( self ):
+        return len ( self.url_rests )
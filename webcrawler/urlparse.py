@@ -1,78 +1,185 @@
 import logging
+import threading
 
 import dflt_cfg
-from webcrawler.app_constant import OUTPUT_PATH, DOMAIN
+from webcrawler.app_constant import OUTPUT_PATH
+from webcrawler.urlgraph import UrlGraph
 
 
 class UrlNode:
     """
-    This class represents an URL and its children
+    This class represents an URL and its children. It is a thin view over an url of a UrlGraph, which holds the \
+    urls and their links compactly: UrlNodes are created on demand and two UrlNodes of the same url are equal.
     """
-    def __init__ ( self, url ):
+    __slots__ = ('graph', 'url_id')
+
+    def __init__ ( self, url, graph=None, url_id=None ):
         """
-        :param url: str
+        :param url: absolute url (str / None if url_id is given)
+        :param graph: UrlGraph holding url (a new graph is created if None)
+        :param url_id: id of the url in graph, if it is already known (int / None)
         """
-        self.logger = logging.getLogger ( __name__ )
+        self.graph = graph if graph is not None else UrlGraph ( )
+        self.url_id = url_id if url_id is not None else self.graph.intern_url ( url )
+
+    @property
+    def url ( self ):
+        """
+        :return: an url in str format
+        """
+        return self.graph.get_url ( self.url_id )
+
+    @property
+    def child_urls ( self ):
+        """
+        :return: list of the UrlNodes linked under this urlnode in the sitemap, in discovery order
+        """
+        return [ UrlNode ( None, self.graph, child_id ) for child_id in self.graph.get_child_ids ( self.url_id ) ]
+
+    def add_child ( self, child_urlnode ):
+        """
+        Links child_urlnode under this urlnode in the sitemap, unless it is already linked under another urlnode.
+        :param child_urlnode: an instance of UrlNode of the same graph
+        :return: True if the link has been added (bool)
+        """
+        return self.graph.link ( self.url_id, child_urlnode.url_id )
 
-        # an url in str format
-        self.url = url
+    def __eq__ ( self, other ):
+        return isinstance ( other, UrlNode ) and self.url_id == other.url_id and self.graph is other.graph
 
-        # each element in child_urls contains an instance of UrlNode
-        self.child_urls = set ( )
+    def __hash__ ( self ):
+        return hash ( self.url_id )
+
+    def __repr__ ( self ):
+        return "UrlNode({0!r})".format ( self.url )
 
 
 class UrlTree:
     """
     This class contains the UrlNode(s) as tree hierarchy
     """
-    def __init__ ( self, root ):
+    # size of the buffer of the output file
+    BUFFER_SIZE = 1024 * 1024
+
+    # number of lines handed to the output file at once
+    LINES_PER_WRITE = 4096
+
+    def __init__ ( self, root, cfg=None ):
         """
         :param root: an instance of UrlNode which represents the root of UrlTree
+        :param cfg: configuration of the crawl, whose OUTPUT_PATH is written (dictionary / None for dflt_cfg.DFLT_CFG)
         """
         self.logger = logging.getLogger ( __name__ )
 
         # root urlnode of the urltree hierarchy
         self.root = root
 
+        # path of the output file
+        self.output_path = (cfg if cfg is not None else dflt_cfg.DFLT_CFG)[ OUTPUT_PATH ]
+
         # file pointer to the output file
         self.output_fd = None
 
-    def write_sitemap ( self ):
+    def write_sitemap ( self, output_fd=None ):
         """
         This function opens the output file and writes the sitemap into that and finally closes it safely.
-        :return:
+        :param output_fd: text file (e.g; io.StringIO) in which the sitemap is written instead of the output file, \
+                          and which is left open (None for the output file)
+        :return: True if the sitemap has been written (bool)
         """
+        if output_fd is not None:
+            self.output_fd = output_fd
+            self.print_url_links ( self.root )
+            return True
+
+        try:
+            self.output_fd = open ( file=self.output_path, mode='w', buffering=self.BUFFER_SIZE )
+        except OSError as err:
+            self.logger.error ( "Error {0} occurred. Output file {1} cannot be created".format (
+                err, self.output_path ) )
+            return False
+
         try:
-            self.output_fd = open ( file=dflt_cfg.DFLT_CFG[ OUTPUT_PATH ], mode='w' )
             self.print_url_links ( self.root )
-        except (PermissionError, AttributeError) as err:
-            self.logger.error ( "Error {0} occurred. Output file {1} cannot be created".format ( err, \
-                                                                                                        dflt_cfg.DFLT_CFG[
-                                                                                                            OUTPUT_PATH ] ) )
         except Exception as err:
-            self.logger.error ( "Error {0} occurred while writing sitemap in output file: {1}".format ( err, \
-                                                                                                        dflt_cfg.DFLT_CFG[ OUTPUT_PATH ] ) )
-            self.output_fd.close ( )
-        else:
-            print("Sitemap for {} is written in {}.".format(dflt_cfg.DFLT_CFG[DOMAIN], dflt_cfg.DFLT_CFG[ OUTPUT_PATH ]))
-            print( "Logs (Broken or dead URLs along with application logs) for domain {0} are available in {1} directory.".format ( dflt_cfg.DFLT_CFG[DOMAIN], "./logs" ) )
+            self.logger.error ( "Error {0} occurred while writing sitemap in output file: {1}".format (
+                err, self.output_path ) )
+            return False
+        finally:
             self.output_fd.close ( )
+        return True
 
     def print_url_links ( self, url_node, level=0 ):
         """
-        print urls in recursiveDescription manner using dfs
+        print urls in depth first order, every url indented by 4 dots per level. It walks the tree with an explicit \
+        stack instead of recursion, so that deep sites do not hit the recursion limit.
         :param url_node: An instance of UrlNode
         :param level:current level in UrlTree (int)
         :return:
         """
         if not url_node: return
 
-        dash = ""
-        for i in range ( 4 * level ):
-            dash += "."
-        url_text = dash + str ( url_node.url )
+        # the tree is walked over the url ids of the graph and its children index, without creating a UrlNode per url
+        graph = url_node.graph
+        get_child_ids = graph.get_children_lookup ( )
 
-        self.output_fd.write ( url_text + "\n" )
+        # indent of every level, computed once per level
+        dashes = [ ]
 
-        for child_url in url_node.child_urls:
-            self.print_url_links ( child_url, level + 1 )
+        lines = [ ]
+        pending = [ (url_node.url_id, level) ]
+        while pending:
+            url_id, level = pending.pop ( )
+            while len ( dashes ) <= level:
+                dashes.append ( "." * (4 * len ( dashes )) )
+
+            lines.append ( dashes[ level ] + graph.get_url ( url_id ) + "\n" )
+            if len ( lines ) >= self.LINES_PER_WRITE:
+                self.output_fd.writelines ( lines )
+                lines.clear ( )
+
+            # children are pushed in reverse, so that they are written in discovery order
+            pending.extend ( (child_id, level + 1) for child_id in reversed ( get_child_ids ( url_id ) ) )
+
+        self.output_fd.writelines ( lines )
+
+
+class SitemapStream:
+    """
+    This class writes the sitemap while the domain is still being crawled: a record is written for every url as \
+    soon as it is linked in the sitemap, so the output of a big crawl starts right away and the sitemap does not \
+    have to be walked at the end. Every record is a line "depth<TAB>url<TAB>parent url" (the parent url of the \
+    domain root is empty). It is thread safe.
+    """
+    # size of the buffer of the output file
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__ ( self, output_path ):
+        """
+        :param output_path: path of the output file (str)
+        """
+        self.mutex = threading.Lock ( )
+        self.output_fd = open ( file=output_path, mode='w', buffering=self.BUFFER_SIZE )
+
+        # number of records written
+        self.num_records = 0
+
+    def write_record ( self, url_node, depth, parent_node=None ):
+        """
+        :param url_node: an instance of UrlNode which has just been linked in the sitemap
+        :param depth: level of url_node in the sitemap (int)
+        :param parent_node: the UrlNode under which url_node is linked (None for the root)
+        :return:
+        """
+        record = "{0}\t{1}\t{2}\n".format ( depth, url_node.url, parent_node.url if parent_node else "" )
+        with self.mutex:
+            self.output_fd.write ( record )
+            self.num_records += 1
+
+    def close ( self ):
+        """
+        Flushes the buffered records and closes the output file.
+        :return:
+        """
+        with self.mutex:
+            self.output_fd.close ( )